@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Any
+
+from dify_plugin.entities.trigger import Variables
+from dify_plugin.errors.trigger import EventIgnoreError
+from dify_plugin.interfaces.trigger import Event
+from werkzeug import Request
+
+
+class AccountEvent(Event):
+    """Mercury account event handler."""
+
+    def _on_event(
+        self, request: Request, parameters: Mapping[str, Any], payload: Mapping[str, Any]
+    ) -> Variables:
+        raw_payload = request.get_json(force=True) or {}
+
+        operation_type = raw_payload.get("operationType", "")
+        operation_filter = parameters.get("operation_filter", "all")
+        if operation_filter not in ("all", operation_type):
+            raise EventIgnoreError()
+
+        merge_patch = raw_payload.get("mergePatch", {})
+
+        variables = {
+            "event_id": raw_payload.get("id", ""),
+            "account_id": raw_payload.get("resourceId", ""),
+            "operation_type": operation_type,
+            "name": merge_patch.get("nickname") or merge_patch.get("name", ""),
+            "status": merge_patch.get("status", ""),
+            "account_type": merge_patch.get("kind", merge_patch.get("type", "")),
+            "available_balance": merge_patch.get("availableBalance"),
+            "current_balance": merge_patch.get("currentBalance"),
+            "changed_paths": list(raw_payload.get("changedPaths") or merge_patch.keys()),
+        }
+
+        return Variables(variables=variables)
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Any
+
+from dify_plugin.entities.trigger import Variables
+from dify_plugin.errors.trigger import EventIgnoreError
+from dify_plugin.interfaces.trigger import Event
+from werkzeug import Request
+
+
+class BalanceEvent(Event):
+    """Mercury account balance change handler."""
+
+    def _on_event(
+        self, request: Request, parameters: Mapping[str, Any], payload: Mapping[str, Any]
+    ) -> Variables:
+        raw_payload = request.get_json(force=True) or {}
+
+        merge_patch = raw_payload.get("mergePatch", {})
+        previous = raw_payload.get("previousValues") or {}
+
+        available = merge_patch.get("availableBalance")
+        current = merge_patch.get("currentBalance")
+        previous_available = previous.get("availableBalance")
+
+        # Optionally skip small movements, measured on the available balance
+        min_change = parameters.get("min_change")
+        if min_change and available is not None and previous_available is not None:
+            try:
+                if abs(float(available) - float(previous_available)) < float(min_change):
+                    raise EventIgnoreError()
+            except (TypeError, ValueError):
+                pass
+
+        variables = {
+            "event_id": raw_payload.get("id", ""),
+            "account_id": raw_payload.get("resourceId", ""),
+            "available_balance": available,
+            "current_balance": current,
+            "previous_available_balance": previous_available,
+            "previous_current_balance": previous.get("currentBalance"),
+            "occurred_at": raw_payload.get("occurredAt", ""),
+        }
+
+        return Variables(variables=variables)
@@ -8,6 +8,7 @@ from werkzeug import Request
 from dify_plugin.entities.trigger import Variables
 from dify_plugin.errors.trigger import EventIgnoreError
 from dify_plugin.interfaces.trigger import Event
+from provider.enrichment import enrich_transaction
 
 
 class TransactionEvent(Event):
@@ -31,6 +32,10 @@ class TransactionEvent(Event):
         # Extract fields from Mercury's JSON Merge Patch format
         merge_patch = raw_payload.get("mergePatch", {})
 
+        # Updated events only carry changed fields; optionally fill in the rest from the API
+        if parameters.get("enrich"):
+            merge_patch = enrich_transaction(self.runtime.credentials, raw_payload) or merge_patch
+
         variables = {
             "event_id": raw_payload.get("id", ""),
             "transaction_id": raw_payload.get("resourceId", ""),
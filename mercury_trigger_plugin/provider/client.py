@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import functools
+import ipaddress
+import threading
+from collections.abc import Mapping
+from typing import Any
+from urllib.parse import urlparse
+
+import httpx
+from dify_plugin.errors.trigger import TriggerProviderCredentialValidationError
+
+API_BASE_URLS = {
+    "production": "https://api.mercury.com/api/v1",
+    "sandbox": "https://api-sandbox.mercury.com/api/v1",
+}
+
+_REQUEST_TIMEOUT = 15
+_POOL_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+
+_client_lock = threading.Lock()
+
+
+@functools.cache
+def _shared_client() -> httpx.Client:
+    return httpx.Client(timeout=_REQUEST_TIMEOUT, limits=_POOL_LIMITS)
+
+
+def get_client() -> httpx.Client:
+    """Return the process-wide keep-alive client for Mercury API calls.
+
+    Webhook handlers run once per delivery; sharing one pooled client avoids a TCP/TLS handshake per call.
+    """
+    # The cache alone would let concurrent first calls each build a client
+    with _client_lock:
+        return _shared_client()
+
+
+def auth_headers(access_token: str) -> dict[str, str]:
+    return {
+        "Authorization": f"Bearer {access_token}",
+        "Accept": "application/json;charset=utf-8",
+    }
+
+
+def get_api_base_url(credentials: Mapping[str, Any]) -> str:
+    """Get the API base URL based on environment setting."""
+    api_environment = credentials.get("api_environment", "sandbox")
+
+    if api_environment == "mock":
+        mock_url = credentials.get("mock_server_url", "").strip()
+        if not mock_url:
+            raise TriggerProviderCredentialValidationError(
+                "Mock Server URL is required when using Mock environment"
+            )
+
+        # SSRF protection: validate mock_server_url
+        validate_mock_url(mock_url)
+
+        base_url = mock_url.rstrip("/")
+        if not base_url.endswith("/api/v1"):
+            base_url = f"{base_url}/api/v1"
+        return base_url
+
+    return API_BASE_URLS.get(api_environment, API_BASE_URLS["sandbox"])
+
+
+def validate_mock_url(url: str) -> None:
+    """Validate mock server URL to prevent SSRF attacks.
+
+    Only allows localhost and 127.0.0.1 for mock/testing purposes.
+    Rejects private IP ranges and other potentially dangerous URLs.
+    """
+    try:
+        parsed = urlparse(url)
+
+        # Must have http or https scheme
+        if parsed.scheme not in ("http", "https"):
+            raise TriggerProviderCredentialValidationError(
+                f"Invalid URL scheme: {parsed.scheme}. Only http or https are allowed."
+            )
+
+        hostname = parsed.hostname
+        if not hostname:
+            raise TriggerProviderCredentialValidationError("Invalid URL: missing hostname")
+
+        # Allow only localhost for mock testing
+        allowed_hosts = {"localhost", "127.0.0.1", "::1"}
+        if hostname.lower() in allowed_hosts:
+            return
+
+        # Check if it's an IP address
+        try:
+            ip = ipaddress.ip_address(hostname)
+
+            # Only allow loopback addresses
+            if ip.is_loopback:
+                return
+
+            # Block private, link-local, and reserved ranges
+            if ip.is_private or ip.is_link_local or ip.is_reserved:
+                raise TriggerProviderCredentialValidationError(
+                    f"Mock server URL cannot use private/internal IP address: {hostname}. "
+                    "Only localhost (127.0.0.1) is allowed for security reasons."
+                )
+
+            # Block any other IP address
+            raise TriggerProviderCredentialValidationError(
+                f"Mock server URL cannot use IP address: {hostname}. "
+                "Only localhost (127.0.0.1) is allowed for security reasons."
+            )
+
+        except ValueError:
+            # Not an IP address - it's a hostname
+            # Block any hostname that's not localhost
+            raise TriggerProviderCredentialValidationError(
+                f"Mock server URL hostname not allowed: {hostname}. "
+                "Only localhost (127.0.0.1) is allowed for mock testing."
+            ) from None
+
+    except TriggerProviderCredentialValidationError:
+        raise
+    except Exception as e:
+        raise TriggerProviderCredentialValidationError(f"Invalid mock server URL: {e}") from e
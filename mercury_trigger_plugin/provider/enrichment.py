@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any
+
+from provider.client import auth_headers, get_api_base_url, get_client
+
+logger = logging.getLogger(__name__)
+
+_CACHE_TTL = 5 * 60
+_CACHE_MAX_ENTRIES = 1024
+
+
+def apply_merge_patch(target: Mapping[str, Any], patch: Mapping[str, Any]) -> dict[str, Any]:
+    """Apply an RFC 7386 JSON Merge Patch, returning a new document."""
+    result = dict(target)
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        elif isinstance(value, Mapping) and isinstance(result.get(key), Mapping):
+            result[key] = apply_merge_patch(result[key], value)
+        else:
+            result[key] = copy.deepcopy(value)
+    return result
+
+
+class TransactionCache:
+    """Small TTL/LRU cache of full Mercury transactions keyed by transaction id.
+
+    Updates for a cached transaction are merged into the cached copy, so a burst of ``updated``
+    webhooks for one transaction costs a single API fetch. Concurrent misses for the same id wait on
+    one in-flight fetch instead of issuing their own.
+    """
+
+    def __init__(self, ttl: float = _CACHE_TTL, max_entries: int = _CACHE_MAX_ENTRIES):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: dict[str, threading.Lock] = {}
+
+    def get(self, transaction_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            entry = self._entries.get(transaction_id)
+            if entry is None:
+                return None
+            stored_at, transaction = entry
+            if time.monotonic() - stored_at > self._ttl:
+                del self._entries[transaction_id]
+                return None
+            self._entries.move_to_end(transaction_id)
+            return transaction
+
+    def put(self, transaction_id: str, transaction: dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[transaction_id] = (time.monotonic(), transaction)
+            self._entries.move_to_end(transaction_id)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def fetch_lock(self, transaction_id: str) -> threading.Lock:
+        with self._lock:
+            return self._inflight.setdefault(transaction_id, threading.Lock())
+
+    def release_fetch_lock(self, transaction_id: str, lock: threading.Lock) -> None:
+        with self._lock:
+            if self._inflight.get(transaction_id) is lock:
+                del self._inflight[transaction_id]
+
+
+_cache = TransactionCache()
+
+
+def _fetch_transaction(
+    credentials: Mapping[str, Any], transaction_id: str, account_id: str | None
+) -> dict[str, Any] | None:
+    api_base_url = get_api_base_url(credentials)
+    if account_id:
+        url = f"{api_base_url}/account/{account_id}/transaction/{transaction_id}"
+    else:
+        url = f"{api_base_url}/transaction/{transaction_id}"
+
+    response = get_client().get(url, headers=auth_headers(credentials["access_token"]))
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()
+
+
+def enrich_transaction(
+    credentials: Mapping[str, Any] | None, payload: Mapping[str, Any]
+) -> dict[str, Any] | None:
+    """Return the full transaction for a webhook payload with its merge patch applied.
+
+    Returns None when enrichment is not possible (no credentials, unknown transaction, API failure);
+    callers fall back to the merge patch alone.
+    """
+    transaction_id = payload.get("resourceId")
+    if not transaction_id or not credentials or not credentials.get("access_token"):
+        return None
+
+    merge_patch = payload.get("mergePatch") or {}
+    cached = _cache.get(transaction_id)
+    if cached is not None:
+        merged = apply_merge_patch(cached, merge_patch)
+        _cache.put(transaction_id, merged)
+        return merged
+
+    lock = _cache.fetch_lock(transaction_id)
+    with lock:
+        try:
+            # Another delivery may have filled the cache while we waited
+            cached = _cache.get(transaction_id)
+            if cached is not None:
+                merged = apply_merge_patch(cached, merge_patch)
+                _cache.put(transaction_id, merged)
+                return merged
+
+            try:
+                transaction = _fetch_transaction(credentials, transaction_id, merge_patch.get("accountId"))
+            except Exception as exc:
+                logger.warning("Failed to enrich Mercury transaction %s: %s", transaction_id, exc)
+                return None
+            if transaction is None:
+                return None
+
+            # The fetched copy already reflects this event; merging the patch only covers read-after-write lag
+            merged = apply_merge_patch(transaction, merge_patch)
+            _cache.put(transaction_id, merged)
+            return merged
+        finally:
+            _cache.release_fetch_lock(transaction_id, lock)
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+import zlib
+from collections.abc import Iterator, Mapping
+from pathlib import Path
+from typing import Any, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# Set to a directory path to journal every verified webhook delivery
+JOURNAL_DIR_ENV = "MERCURY_WEBHOOK_JOURNAL_DIR"
+SEGMENT_SIZE_ENV = "MERCURY_WEBHOOK_JOURNAL_SEGMENT_MB"
+
+_DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+_SEGMENT_PREFIX = "segment-"
+_SEGMENT_SUFFIX = ".mwj"
+
+# Headers kept with each record; enough to re-verify the signature during an audit
+JOURNALED_HEADERS = ("Mercury-Signature", "Content-Type", "User-Agent")
+# Set by the replay script; deliveries carrying it are already in the journal
+REPLAY_HEADER = "X-Mercury-Journal-Replay"
+
+# Record layout (big-endian):
+#   received_at: float64 | meta_len: uint32 | body_len: uint32 | crc32(meta + body): uint32
+#   meta: UTF-8 JSON (webhook id and header subset) | body: raw request bytes
+_RECORD_HEADER = struct.Struct(">dIII")
+
+
+class JournalRecord(NamedTuple):
+    received_at: float
+    webhook_id: str
+    headers: dict[str, str]
+    body: bytes
+
+
+# Random tag per process id, since processes in different containers may share a pid
+_writer_tags: dict[int, str] = {}
+
+
+def _writer_id() -> str:
+    pid = os.getpid()
+    return f"{pid}-{_writer_tags.setdefault(pid, uuid.uuid4().hex[:8])}"
+
+
+def _segment_name(started_at: float) -> str:
+    # Millisecond start time lets readers skip segments past a replay range; the writer id keeps one writer per file
+    return f"{_SEGMENT_PREFIX}{int(started_at * 1000):015d}-{_writer_id()}{_SEGMENT_SUFFIX}"
+
+
+def _segment_start(path: Path) -> float:
+    return int(path.name[len(_SEGMENT_PREFIX) :].split("-", 1)[0]) / 1000
+
+
+def _segment_writer(path: Path) -> str:
+    return path.name[len(_SEGMENT_PREFIX) : -len(_SEGMENT_SUFFIX)].split("-", 1)[-1]
+
+
+def list_segments(directory: str | os.PathLike[str]) -> list[Path]:
+    """Return journal segments in chronological order."""
+    root = Path(directory)
+    if not root.is_dir():
+        return []
+    segments = [p for p in root.iterdir() if p.name.startswith(_SEGMENT_PREFIX) and p.name.endswith(_SEGMENT_SUFFIX)]
+    return sorted(segments, key=lambda p: (_segment_start(p), p.name))
+
+
+class WebhookJournal:
+    """Append-only, segment-rotated journal of raw webhook deliveries.
+
+    Every process writes its own segments, and each record goes out in a single ``write``. A torn final
+    record (crash mid-write) fails its CRC check and ends that segment for readers; a restarted process
+    opens a new segment, so nothing is ever appended after a torn record.
+    """
+
+    def __init__(self, directory: str | os.PathLike[str], segment_bytes: int = _DEFAULT_SEGMENT_BYTES):
+        self._directory = Path(directory)
+        self._segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        self._fd: int | None = None
+        self._size = 0
+
+    def append(
+        self, body: bytes, headers: Mapping[str, str], webhook_id: str = "", received_at: float | None = None
+    ) -> None:
+        meta = json.dumps(
+            {"webhook_id": webhook_id, "headers": {k: headers[k] for k in JOURNALED_HEADERS if k in headers}},
+            separators=(",", ":"),
+        ).encode()
+
+        with self._lock:
+            # Stamp under the lock so records within a segment are in receive order
+            received_at = received_at if received_at is not None else time.time()
+            record = _RECORD_HEADER.pack(received_at, len(meta), len(body), zlib.crc32(meta + body)) + meta + body
+            if self._fd is None or self._size + len(record) > self._segment_bytes:
+                self._rotate(received_at)
+            assert self._fd is not None
+            os.write(self._fd, record)
+            self._size += len(record)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def _rotate(self, started_at: float) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        path = self._directory / _segment_name(started_at)
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        self._size = os.fstat(self._fd).st_size
+
+
+_journals: dict[str, WebhookJournal] = {}
+_journals_lock = threading.Lock()
+
+
+def get_journal() -> WebhookJournal | None:
+    """Return the process-wide journal if ``MERCURY_WEBHOOK_JOURNAL_DIR`` is set."""
+    directory = os.environ.get(JOURNAL_DIR_ENV, "").strip()
+    if not directory:
+        return None
+    with _journals_lock:
+        journal = _journals.get(directory)
+        if journal is None:
+            try:
+                segment_bytes = int(float(os.environ.get(SEGMENT_SIZE_ENV, "0")) * 1024 * 1024)
+            except ValueError:
+                segment_bytes = 0
+            journal = WebhookJournal(directory, segment_bytes or _DEFAULT_SEGMENT_BYTES)
+            _journals[directory] = journal
+        return journal
+
+
+def _read_segment(path: Path) -> Iterator[JournalRecord]:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            offset = 0
+            end = len(mm)
+            while offset + _RECORD_HEADER.size <= end:
+                received_at, meta_len, body_len, crc = _RECORD_HEADER.unpack_from(mm, offset)
+                start = offset + _RECORD_HEADER.size
+                stop = start + meta_len + body_len
+                if stop > end:
+                    logger.warning("Truncated record at %s:%d", path.name, offset)
+                    return
+                payload = mm[start:stop]
+                if zlib.crc32(payload) != crc:
+                    logger.warning("Corrupt record at %s:%d", path.name, offset)
+                    return
+                meta: dict[str, Any] = json.loads(payload[:meta_len])
+                yield JournalRecord(
+                    received_at, meta.get("webhook_id", ""), meta.get("headers", {}), payload[meta_len:]
+                )
+                offset = stop
+
+
+def _iter_writer(
+    segments: list[Path], start: float | None, end: float | None
+) -> Iterator[JournalRecord]:
+    """Records of one writer's segments, which follow each other in time."""
+    for path in segments:
+        if end is not None and _segment_start(path) >= end:
+            return
+        for record in _read_segment(path):
+            if start is not None and record.received_at < start:
+                continue
+            if end is not None and record.received_at >= end:
+                continue
+            yield record
+
+
+def iter_records(
+    directory: str | os.PathLike[str], start: float | None = None, end: float | None = None
+) -> Iterator[JournalRecord]:
+    """Yield journaled deliveries received in ``[start, end)``, in receive order.
+
+    Each plugin worker writes its own segments, which overlap those of other workers, so the workers'
+    record streams are merged by receive time. One segment per worker is memory-mapped at a time.
+    """
+    segments = list_segments(directory)
+    writers = [
+        _iter_writer(list(paths), start, end)
+        for _, paths in itertools.groupby(sorted(segments, key=_segment_writer), key=_segment_writer)
+    ]
+    yield from heapq.merge(*writers, key=lambda record: record.received_at)
@@ -2,16 +2,14 @@ from __future__ import annotations
 
 import hashlib
 import hmac
-import ipaddress
 import json
 import logging
 import re
 import secrets
 import time
 import urllib.parse
-from collections.abc import Mapping
+from collections.abc import Mapping, Sequence
 from typing import Any
-from urllib.parse import urlparse
 
 import httpx
 from werkzeug import Request, Response
@@ -28,6 +26,17 @@ from dify_plugin.errors.trigger import (
     UnsubscribeError,
 )
 from dify_plugin.interfaces.trigger import Trigger, TriggerSubscriptionConstructor
+from provider.client import API_BASE_URLS, get_api_base_url, validate_mock_url
+from provider.journal import REPLAY_HEADER, get_journal
+from provider.reconciliation import (
+    RECONCILED_RESOURCE_TYPE,
+    MercuryReconciler,
+    backfill_interval,
+    record_seen_event,
+    start_watermark,
+)
+from provider.routing import resolve_events
+from provider.webhooks import WebhookHealth, check_webhooks, webhook_directory
 
 logger = logging.getLogger(__name__)
 
@@ -46,10 +55,18 @@ class MercuryTrigger(Trigger):
                 "This may indicate a subscription setup issue."
             )
         self._validate_signature(request, webhook_secret)
+        self._journal_delivery(subscription, request)
 
         payload = self._validate_payload(request)
+        self._record_delivery(subscription, payload)
         response = Response(response='{"status": "ok"}', status=200, mimetype="application/json")
         events = self._resolve_event_types(payload)
+        if not events:
+            logger.debug(
+                "Dropping Mercury %s.%s delivery with no matching event",
+                payload.get("resourceType"),
+                payload.get("operationType"),
+            )
 
         return EventDispatch(events=events, response=response)
 
@@ -104,104 +121,70 @@ class MercuryTrigger(Trigger):
         except Exception as exc:
             raise TriggerDispatchError(f"Failed to parse payload: {exc}") from exc
 
+    def _journal_delivery(self, subscription: Subscription, request: Request) -> None:
+        """Append the verified raw delivery to the webhook journal, when one is configured."""
+        journal = get_journal()
+        if journal is None or request.headers.get(REPLAY_HEADER):
+            # Replays from the journal are already recorded
+            return
+        try:
+            journal.append(
+                body=request.get_data(),
+                headers=request.headers,
+                webhook_id=subscription.properties.get("external_id", ""),
+            )
+        except Exception as exc:
+            logger.warning("Failed to journal Mercury webhook delivery: %s", exc)
+
+    def _record_delivery(self, subscription: Subscription, payload: Mapping[str, Any]) -> None:
+        """Remember the event id so reconciliation can tell delivered events from missed ones.
+
+        Only subscriptions with gap detection enabled are reconciled, and only for transaction events, so only
+        those record markers; reconciliation deletes them as it moves past their events.
+        """
+        external_id = subscription.properties.get("external_id")
+        event_id = payload.get("id")
+        if not external_id or not event_id or not backfill_interval(subscription.parameters):
+            return
+        if payload.get("resourceType") != RECONCILED_RESOURCE_TYPE:
+            return
+        try:
+            record_seen_event(self.runtime.session.storage, external_id, event_id)
+        except Exception as exc:
+            # Never fail a delivery because bookkeeping failed; the worst case is a duplicate replay
+            logger.warning("Failed to record Mercury event %s: %s", event_id, exc)
+
     def _resolve_event_types(self, payload: Mapping[str, Any]) -> list[str]:
         """Determine which event handlers to dispatch to based on payload content."""
-        resource_type = payload.get("resourceType", "").lower()
-        if resource_type == "transaction":
-            return ["transaction"]
-        return ["transaction"]
+        return resolve_events(payload)
 
 
 class MercurySubscriptionConstructor(TriggerSubscriptionConstructor):
     """Manage Mercury webhook subscriptions."""
 
-    _API_BASE_URLS = {
-        "production": "https://api.mercury.com/api/v1",
-        "sandbox": "https://api-sandbox.mercury.com/api/v1",
-    }
+    _API_BASE_URLS = API_BASE_URLS
     _AUTH_URL = "https://app.mercury.com/oauth/authorize"
     _TOKEN_URL = "https://oauth2.mercury.com/oauth2/token"
     _REQUEST_TIMEOUT = 15
     _WEBHOOK_TTL = 30 * 24 * 60 * 60  # 30 days
 
-    def _get_api_base_url(self, credentials: Mapping[str, Any]) -> str:
-        """Get the API base URL based on environment setting."""
-        api_environment = credentials.get("api_environment", "sandbox")
-
-        if api_environment == "mock":
-            mock_url = credentials.get("mock_server_url", "").strip()
-            if not mock_url:
-                raise TriggerProviderCredentialValidationError(
-                    "Mock Server URL is required when using Mock environment"
-                )
-
-            # SSRF protection: validate mock_server_url
-            self._validate_mock_url(mock_url)
+    def _get_backfill_interval(self, parameters: Mapping[str, Any] | None) -> int:
+        """Seconds between reconciliation passes, or 0 when gap detection is disabled.
 
-            base_url = mock_url.rstrip("/")
-            if not base_url.endswith("/api/v1"):
-                base_url = f"{base_url}/api/v1"
-            return base_url
-
-        return self._API_BASE_URLS.get(api_environment, self._API_BASE_URLS["sandbox"])
-
-    def _validate_mock_url(self, url: str) -> None:
-        """Validate mock server URL to prevent SSRF attacks.
-
-        Only allows localhost and 127.0.0.1 for mock/testing purposes.
-        Rejects private IP ranges and other potentially dangerous URLs.
+        Reconciliation runs during subscription refresh, so the interval doubles as the refresh lease.
         """
-        try:
-            parsed = urlparse(url)
+        return backfill_interval(parameters)
 
-            # Must have http or https scheme
-            if parsed.scheme not in ("http", "https"):
-                raise TriggerProviderCredentialValidationError(
-                    f"Invalid URL scheme: {parsed.scheme}. Only http or https are allowed."
-                )
-
-            hostname = parsed.hostname
-            if not hostname:
-                raise TriggerProviderCredentialValidationError("Invalid URL: missing hostname")
+    def _next_expiry(self, parameters: Mapping[str, Any] | None) -> int:
+        return int(time.time()) + (self._get_backfill_interval(parameters) or self._WEBHOOK_TTL)
 
-            # Allow only localhost for mock testing
-            allowed_hosts = {"localhost", "127.0.0.1", "::1"}
-            if hostname.lower() in allowed_hosts:
-                return
-
-            # Check if it's an IP address
-            try:
-                ip = ipaddress.ip_address(hostname)
-
-                # Only allow loopback addresses
-                if ip.is_loopback:
-                    return
-
-                # Block private, link-local, and reserved ranges
-                if ip.is_private or ip.is_link_local or ip.is_reserved:
-                    raise TriggerProviderCredentialValidationError(
-                        f"Mock server URL cannot use private/internal IP address: {hostname}. "
-                        "Only localhost (127.0.0.1) is allowed for security reasons."
-                    )
-
-                # Block any other IP address
-                raise TriggerProviderCredentialValidationError(
-                    f"Mock server URL cannot use IP address: {hostname}. "
-                    "Only localhost (127.0.0.1) is allowed for security reasons."
-                )
-
-            except ValueError:
-                # Not an IP address - it's a hostname
-                # Block any hostname that's not localhost
-                raise TriggerProviderCredentialValidationError(
-                    f"Mock server URL hostname not allowed: {hostname}. "
-                    "Only localhost (127.0.0.1) is allowed for mock testing."
-                )
+    def _get_api_base_url(self, credentials: Mapping[str, Any]) -> str:
+        """Get the API base URL based on environment setting."""
+        return get_api_base_url(credentials)
 
-        except TriggerProviderCredentialValidationError:
-            raise
-        except Exception as e:
-            raise TriggerProviderCredentialValidationError(f"Invalid mock server URL: {e}") from e
+    def _validate_mock_url(self, url: str) -> None:
+        """Validate mock server URL to prevent SSRF attacks."""
+        validate_mock_url(url)
 
     def _oauth_get_authorization_url(self, redirect_uri: str, system_credentials: Mapping[str, Any]) -> str:
         state = secrets.token_urlsafe(16)
@@ -388,9 +371,15 @@ class MercurySubscriptionConstructor(TriggerSubscriptionConstructor):
             raise SubscriptionError(f"Network error while creating webhook: {exc}", error_code="NETWORK_ERROR") from exc
 
         if response.status_code in (200, 201):
+            webhook_directory.invalidate(api_base_url, access_token)
             webhook_response = response.json()
+            if webhook_response.get("id") and self._get_backfill_interval(parameters):
+                try:
+                    start_watermark(self.runtime.session.storage, webhook_response["id"])
+                except Exception as exc:
+                    logger.warning("Failed to initialize gap detection for webhook %s: %s", webhook_response["id"], exc)
             return Subscription(
-                expires_at=int(time.time()) + self._WEBHOOK_TTL,
+                expires_at=self._next_expiry(parameters),
                 endpoint=endpoint,
                 parameters=parameters,
                 properties={
@@ -447,6 +436,7 @@ class MercurySubscriptionConstructor(TriggerSubscriptionConstructor):
             ) from exc
 
         if response.status_code in (200, 204):
+            webhook_directory.invalidate(api_base_url, access_token)
             return UnsubscribeResult(success=True, message=f"Successfully removed webhook {external_id} from Mercury")
 
         if response.status_code == 404:
@@ -477,34 +467,84 @@ class MercurySubscriptionConstructor(TriggerSubscriptionConstructor):
         if not access_token:
             raise SubscriptionError("Mercury API access token is required.", error_code="MISSING_CREDENTIALS")
 
-        api_base_url = self._get_api_base_url(credentials)
-        url = f"{api_base_url}/webhook/{external_id}"
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json;charset=utf-8",
-        }
-
-        try:
-            response = httpx.get(url, headers=headers, timeout=self._REQUEST_TIMEOUT)
-        except httpx.HTTPError as exc:
-            raise SubscriptionError(
-                f"Network error while refreshing webhook: {exc}", error_code="NETWORK_ERROR"
-            ) from exc
-
-        if response.status_code == 200:
-            webhook_data = response.json()
-            updated_properties = dict(subscription.properties)
-            updated_properties["status"] = webhook_data.get("status", "active")
-            return Subscription(
-                expires_at=int(time.time()) + self._WEBHOOK_TTL,
-                endpoint=subscription.endpoint,
-                parameters=subscription.parameters,
-                properties=updated_properties,
-            )
-
-        if response.status_code == 404:
+        refreshed, report = self.refresh_subscriptions([(subscription, credentials)])
+        if refreshed:
+            return refreshed[0]
+        health = report[0]
+        if health.status == "missing":
             raise SubscriptionError(
                 f"Webhook {external_id} no longer exists on Mercury", error_code="WEBHOOK_NOT_FOUND"
             )
+        raise SubscriptionError(f"Failed to refresh webhook: {health.detail}", error_code="WEBHOOK_REFRESH_FAILED")
+
+    def refresh_subscriptions(
+        self, subscriptions: Sequence[tuple[Subscription, Mapping[str, Any]]]
+    ) -> tuple[list[Subscription], list[WebhookHealth]]:
+        """Refresh many subscriptions in one pass and report unhealthy webhooks.
+
+        Each Mercury organization's webhooks are listed with a single ``GET /webhooks`` and organizations
+        are checked concurrently over the pooled client, instead of one ``GET /webhook/{id}`` per subscription.
+        A webhook missing from the listing is confirmed with a direct lookup before it is reported missing.
+        ``_refresh_subscription`` goes through here as well, so single refreshes share the listing.
+
+        Args:
+            subscriptions: Pairs of subscription and the credentials it was created with
 
-        raise SubscriptionError(f"Failed to refresh webhook: {response.text}", error_code="WEBHOOK_REFRESH_FAILED")
+        Returns:
+            Refreshed subscriptions for webhooks that still exist, and a health entry for every webhook
+            that is disabled, missing, or could not be checked
+        """
+        report: list[WebhookHealth] = []
+        targets: list[tuple[str, str, str]] = []
+        pending: list[Subscription] = []
+        for subscription, credentials in subscriptions:
+            external_id = subscription.properties.get("external_id", "")
+            access_token = credentials.get("access_token", "")
+            if not external_id or not access_token:
+                report.append(WebhookHealth(external_id, "error", "Missing webhook ID or access token", None))
+                continue
+            try:
+                api_base_url = self._get_api_base_url(credentials)
+            except TriggerProviderCredentialValidationError as exc:
+                report.append(WebhookHealth(external_id, "error", str(exc), None))
+                continue
+            targets.append((external_id, api_base_url, access_token))
+            pending.append(subscription)
+
+        refreshed: list[Subscription] = []
+        for subscription, target, health in zip(pending, targets, check_webhooks(targets), strict=True):
+            if health.status != "active":
+                logger.warning("Mercury webhook %s is %s: %s", health.external_id, health.status, health.detail)
+                report.append(health)
+            if health.webhook is not None:
+                refreshed.append(self._renew_subscription(subscription, health.webhook, target[1], target[2]))
+        return refreshed, report
+
+    def _renew_subscription(
+        self, subscription: Subscription, webhook_data: Mapping[str, Any], api_base_url: str, access_token: str
+    ) -> Subscription:
+        updated_properties = dict(subscription.properties)
+        updated_properties["status"] = webhook_data.get("status", "active")
+        if self._get_backfill_interval(subscription.parameters):
+            updated_properties.update(self._reconcile(subscription, api_base_url, access_token))
+        return Subscription(
+            expires_at=self._next_expiry(subscription.parameters),
+            endpoint=subscription.endpoint,
+            parameters=subscription.parameters,
+            properties=updated_properties,
+        )
+
+    def _reconcile(self, subscription: Subscription, api_base_url: str, access_token: str) -> dict[str, Any]:
+        """Backfill webhook deliveries Mercury sent while the endpoint was unreachable."""
+        try:
+            reconciler = MercuryReconciler(
+                storage=self.runtime.session.storage,
+                subscription=subscription,
+                api_base_url=api_base_url,
+                access_token=access_token,
+            )
+            return reconciler.run()
+        except Exception as exc:
+            # A failed pass must not break the refresh; the watermark is unchanged so the next pass retries
+            logger.warning("Reconciliation failed for webhook %s: %s", subscription.properties.get("external_id"), exc)
+            return {}
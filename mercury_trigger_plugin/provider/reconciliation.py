@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import logging
+import time
+from collections.abc import Mapping
+from datetime import UTC, datetime
+from typing import Any
+
+import httpx
+from dify_plugin.entities.trigger import Subscription
+
+from provider.client import auth_headers, get_client
+from provider.routing import changed_fields, field_name
+
+logger = logging.getLogger(__name__)
+
+# Storage key prefixes. Seen markers are one key per event so concurrent deliveries never race on a shared list.
+_SEEN_KEY_PREFIX = "mercury_seen"
+_STATE_KEY_PREFIX = "mercury_reconcile"
+# The only resource type reconciliation reads from /events, and so the only one that records seen markers
+RECONCILED_RESOURCE_TYPE = "transaction"
+
+# Re-scan this far behind the watermark to catch events whose createdAt lands near the previous boundary
+_WATERMARK_OVERLAP = 10 * 60
+# Ignore events younger than this; their webhook delivery may still be in flight
+_SETTLE_DELAY = 2 * 60
+_PAGE_LIMIT = 100
+_MAX_PAGES = 50
+# Reconciliation never scans further back than this; markers of older events are swept without replaying them
+_SEEN_TTL = 3 * 24 * 60 * 60
+MIN_BACKFILL_INTERVAL = 5 * 60
+
+
+def _seen_key(external_id: str, event_id: str) -> str:
+    return f"{_SEEN_KEY_PREFIX}:{external_id}:{event_id}"
+
+
+def _state_key(external_id: str) -> str:
+    return f"{_STATE_KEY_PREFIX}:{external_id}"
+
+
+def backfill_interval(parameters: Mapping[str, Any] | None) -> int:
+    """Seconds between reconciliation passes, or 0 when gap detection is disabled."""
+    try:
+        minutes = float((parameters or {}).get("backfill_interval") or 0)
+    except (TypeError, ValueError):
+        return 0
+    if minutes <= 0:
+        return 0
+    return max(int(minutes * 60), MIN_BACKFILL_INTERVAL)
+
+
+def _parse_timestamp(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def _format_timestamp(value: float) -> str:
+    return datetime.fromtimestamp(value, tz=UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def record_seen_event(storage: Any, external_id: str, event_id: str) -> None:
+    """Mark an event id as delivered for the given webhook.
+
+    Markers are deleted by reconciliation passes once the ``/events`` feed has moved past their event.
+    """
+    storage.set(_seen_key(external_id, event_id), str(int(time.time())).encode())
+
+
+def _event_kind(event: Mapping[str, Any]) -> tuple[str, str]:
+    """Resource and operation type of an event, from its own fields or else its dotted ``type``."""
+    event_type = event.get("type") or ""
+    return (
+        event.get("resourceType") or event_type.split(".", 1)[0],
+        event.get("operationType") or event_type.rsplit(".", 1)[-1],
+    )
+
+
+def event_type(event: Mapping[str, Any]) -> str:
+    """Dotted event type such as ``transaction.created``, as webhooks subscribe to it."""
+    if event.get("type"):
+        return event["type"]
+    resource_type, operation_type = _event_kind(event)
+    return f"{resource_type}.{operation_type}"
+
+
+def start_watermark(storage: Any, external_id: str) -> None:
+    """Begin gap detection from now so events older than the subscription are never backfilled."""
+    storage.set(_state_key(external_id), json.dumps({"watermark": time.time()}).encode())
+
+
+def sign_payload(secret: str, body: str, timestamp: int | None = None) -> str:
+    """Build a Mercury-Signature header value for a webhook body."""
+    timestamp = timestamp if timestamp is not None else int(time.time())
+    signature = hmac.new(secret.encode(), f"{timestamp}.{body}".encode(), hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def event_to_webhook_payload(event: Mapping[str, Any]) -> dict[str, Any]:
+    """Convert an ``/events`` feed entry into the JSON Merge Patch shape Mercury webhooks use."""
+    resource_type, operation_type = _event_kind(event)
+    return {
+        "id": event.get("id", ""),
+        "resourceType": resource_type,
+        "resourceId": event.get("resourceId", ""),
+        "operationType": operation_type,
+        "resourceVersion": event.get("resourceVersion"),
+        "occurredAt": event.get("createdAt", event.get("occurredAt", "")),
+        "changedPaths": event.get("changedPaths", []),
+        "mergePatch": event.get("mergePatch") or event.get("data") or {},
+        "previousValues": event.get("previousValues", event.get("previousData")),
+    }
+
+
+class MercuryReconciler:
+    """Detect webhook deliveries that never reached the trigger and replay them.
+
+    Every event accepted by ``MercuryTrigger`` is recorded in plugin storage. A reconciliation run pages
+    through Mercury's ``/events`` feed between the stored watermark and now, and re-delivers any event
+    without a seen marker to the subscription endpoint, signed with the webhook secret. Replayed events
+    therefore pass signature verification and reach ``TransactionEvent`` exactly like a live delivery.
+    """
+
+    def __init__(
+        self,
+        storage: Any,
+        subscription: Subscription,
+        api_base_url: str,
+        access_token: str,
+        client: httpx.Client | None = None,
+    ):
+        self._storage = storage
+        self._subscription = subscription
+        self._api_base_url = api_base_url
+        self._headers = auth_headers(access_token)
+        self._client = client or get_client()
+        self._external_id = subscription.properties.get("external_id", "")
+        self._webhook_secret = subscription.properties.get("webhook_secret", "")
+
+    def run(self) -> dict[str, Any]:
+        """Run one reconciliation pass and return a summary for the subscription properties."""
+        if not self._external_id or not self._webhook_secret:
+            raise ValueError("Subscription is missing its webhook id or secret")
+
+        now = time.time()
+        watermark = self._load_watermark()
+        if watermark is None:
+            # Subscriptions created before gap detection existed: start tracking from here
+            start_watermark(self._storage, self._external_id)
+            return {"last_reconciled_at": int(now), "last_backfill_count": 0}
+
+        window_start = watermark - _WATERMARK_OVERLAP
+        if window_start < now - _SEEN_TTL:
+            logger.warning(
+                "Reconciliation for webhook %s skips events older than %d hours", self._external_id, _SEEN_TTL // 3600
+            )
+            # Drop the skipped span's markers without replaying anything, so they do not outlive the TTL
+            skipped, _ = self._fetch_events(window_start, now - _SEEN_TTL)
+            self._prune_seen(skipped, now - _SEEN_TTL)
+            window_start = now - _SEEN_TTL
+        window_end = now - _SETTLE_DELAY
+        if window_end <= window_start:
+            return {"last_reconciled_at": int(now), "last_backfill_count": 0}
+
+        events, complete = self._fetch_events(window_start, window_end)
+        if not complete and events:
+            # Page cap reached: advance only as far as the events actually fetched
+            window_end = min(window_end, _parse_timestamp(events[-1].get("createdAt")) or window_end)
+        missing = [event for event in events if self._is_subscribed(event) and not self._is_seen(event["id"])]
+
+        new_watermark = window_end
+        replayed = 0
+        for event in missing:
+            if not self._redeliver(event):
+                # Retry from this event on the next pass
+                new_watermark = (_parse_timestamp(event.get("createdAt")) or window_start) + _WATERMARK_OVERLAP - 1
+                break
+            record_seen_event(self._storage, self._external_id, event["id"])
+            replayed += 1
+
+        self._save_watermark(max(new_watermark, watermark))
+        self._prune_seen(events, max(new_watermark, watermark) - _WATERMARK_OVERLAP)
+
+        if replayed:
+            logger.info("Backfilled %d missed Mercury events for webhook %s", replayed, self._external_id)
+        return {"last_reconciled_at": int(now), "last_backfill_count": replayed}
+
+    def _is_subscribed(self, event: Mapping[str, Any]) -> bool:
+        """Whether the webhook would have delivered the event, given its event types and filter paths."""
+        parameters = self._subscription.parameters or {}
+        event_types = parameters.get("event_types") or []
+        if event_types and event_type(event) not in event_types:
+            return False
+        filter_paths = {field_name(path.strip()) for path in (parameters.get("filter_paths") or "").split(",")}
+        filter_paths.discard("")
+        return not filter_paths or bool(filter_paths & changed_fields(event_to_webhook_payload(event)))
+
+    def _fetch_events(self, start: float, end: float) -> tuple[list[dict[str, Any]], bool]:
+        """Page through ``/events`` for the window, oldest first; the flag is False if the page cap was hit.
+
+        Every event is returned, subscribed or not, so markers can be pruned for all of them.
+        """
+        params: dict[str, Any] = {
+            "resourceType": "transaction",
+            "start": _format_timestamp(start),
+            "end": _format_timestamp(end),
+            "limit": _PAGE_LIMIT,
+        }
+
+        events: list[dict[str, Any]] = []
+        complete = False
+        for _ in range(_MAX_PAGES):
+            response = self._client.get(f"{self._api_base_url}/events", headers=self._headers, params=params)
+            response.raise_for_status()
+            data = response.json()
+
+            for event in data.get("events", []):
+                if not event.get("id"):
+                    continue
+                created_at = _parse_timestamp(event.get("createdAt"))
+                if created_at is not None and created_at > end:
+                    continue
+                events.append(event)
+
+            if not data.get("hasMore") or not data.get("nextCursor"):
+                complete = True
+                break
+            params["start_after"] = data["nextCursor"]
+        else:
+            logger.warning("Reconciliation window for webhook %s exceeded %d pages", self._external_id, _MAX_PAGES)
+
+        events.sort(key=lambda e: _parse_timestamp(e.get("createdAt")) or 0.0)
+        return events, complete
+
+    def _redeliver(self, event: Mapping[str, Any]) -> bool:
+        body = json.dumps(event_to_webhook_payload(event))
+        headers = {
+            "Content-Type": "application/json",
+            "Mercury-Signature": sign_payload(self._webhook_secret, body),
+        }
+        try:
+            response = self._client.post(self._subscription.endpoint, content=body.encode(), headers=headers)
+        except httpx.HTTPError as exc:
+            logger.warning("Failed to replay Mercury event %s: %s", event.get("id"), exc)
+            return False
+
+        if response.status_code >= 400:
+            logger.warning("Replay of Mercury event %s rejected: %s", event.get("id"), response.status_code)
+            return False
+        return True
+
+    def _is_seen(self, event_id: str) -> bool:
+        return bool(event_id) and self._storage.exist(_seen_key(self._external_id, event_id))
+
+    def _prune_seen(self, events: list[dict[str, Any]], before: float) -> None:
+        """Drop seen markers the next window can no longer reach, keeping storage bounded.
+
+        The feed enumerates the events, so no shared list of markers is needed to expire them.
+        """
+        for event in events:
+            created_at = _parse_timestamp(event.get("createdAt"))
+            if created_at is None or created_at >= before:
+                continue
+            key = _seen_key(self._external_id, event["id"])
+            if self._storage.exist(key):
+                self._storage.delete(key)
+
+    def _load_watermark(self) -> float | None:
+        key = _state_key(self._external_id)
+        if not self._storage.exist(key):
+            return None
+        try:
+            return float(json.loads(self._storage.get(key)).get("watermark"))
+        except (TypeError, ValueError):
+            return None
+
+    def _save_watermark(self, watermark: float) -> None:
+        self._storage.set(_state_key(self._external_id), json.dumps({"watermark": watermark}).encode())
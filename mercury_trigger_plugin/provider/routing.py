@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Any, NamedTuple
+
+# Account fields whose change counts as a balance movement
+BALANCE_FIELDS = frozenset({"availableBalance", "currentBalance"})
+
+
+class Route(NamedTuple):
+    event: str
+    # Only dispatch when one of these top-level fields changed; empty matches every delivery
+    changed_fields: frozenset[str] = frozenset()
+
+
+def _build_routing_table() -> dict[tuple[str, str], tuple[Route, ...]]:
+    return {
+        ("transaction", "created"): (Route("transaction"),),
+        ("transaction", "updated"): (Route("transaction"),),
+        ("account", "created"): (Route("account"),),
+        ("account", "updated"): (Route("account"), Route("balance", BALANCE_FIELDS)),
+        ("account", "balance.updated"): (Route("balance"),),
+        # Deliveries without an operation type go to the resource's main event, which filters on its own
+        ("transaction", "*"): (Route("transaction"),),
+        ("account", "*"): (Route("account"),),
+    }
+
+
+# Built once at import; dispatch is a single dictionary lookup per delivery
+ROUTING_TABLE = _build_routing_table()
+
+
+def _normalize_resource_type(resource_type: str) -> str:
+    # Mercury names account resources by kind (checkingAccount, savingsAccount, treasuryAccount, ...)
+    resource_type = resource_type.lower()
+    if resource_type.endswith("account"):
+        return "account"
+    return resource_type
+
+
+def field_name(path: Any) -> str:
+    """Top-level field of a changed path such as ``/status`` or ``counterparty.name``."""
+    return str(path).lstrip("/").split("/", 1)[0].split(".", 1)[0]
+
+
+def changed_fields(payload: Mapping[str, Any]) -> set[str]:
+    """Top-level fields a delivery changed, from its changedPaths or else its merge patch."""
+    paths = payload.get("changedPaths") or []
+    fields = {field_name(path) for path in paths}
+    if not fields:
+        fields = set((payload.get("mergePatch") or {}).keys())
+    return fields
+
+
+def resolve_events(payload: Mapping[str, Any]) -> list[str]:
+    """Map a webhook payload to the event handlers that should run for it.
+
+    Deliveries without a matching route resolve to an empty list, so no workflow starts for them.
+    """
+    resource_type = payload.get("resourceType") or ""
+    operation_type = payload.get("operationType") or ""
+    event_type = payload.get("type") or ""
+    if event_type and (not resource_type or not operation_type):
+        # Some feeds only carry a dotted type such as "checkingAccount.balance.updated"
+        head, _, tail = event_type.partition(".")
+        resource_type = resource_type or head
+        operation_type = operation_type or tail
+
+    resource_type = _normalize_resource_type(resource_type)
+    routes = ROUTING_TABLE.get((resource_type, operation_type.lower() or "*"), ())
+    if not routes:
+        return []
+
+    changed: set[str] | None = None
+    events: list[str] = []
+    for route in routes:
+        if route.changed_fields:
+            if changed is None:
+                changed = changed_fields(payload)
+            if not route.changed_fields & changed:
+                continue
+        events.append(route.event)
+    return events
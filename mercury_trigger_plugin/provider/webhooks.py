@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, NamedTuple
+
+import httpx
+
+from provider.client import auth_headers, get_client
+
+logger = logging.getLogger(__name__)
+
+# Listings are reused for this long, so a refresh run over many subscriptions makes one request per organization
+_LISTING_TTL = 60
+_MAX_WORKERS = 8
+
+
+class WebhookHealth(NamedTuple):
+    external_id: str
+    status: str  # active, disabled, missing or error
+    detail: str
+    webhook: dict[str, Any] | None
+
+
+class WebhookDirectory:
+    """Short-lived cache of ``GET /webhooks`` listings keyed by API base URL and token.
+
+    Concurrent callers for the same organization wait on a single in-flight listing request.
+    """
+
+    def __init__(self, ttl: float = _LISTING_TTL):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._listings: dict[tuple[str, str], tuple[float, dict[str, dict[str, Any]]]] = {}
+        self._inflight: dict[tuple[str, str], threading.Lock] = {}
+
+    @staticmethod
+    def _key(api_base_url: str, access_token: str) -> tuple[str, str]:
+        # Never keep raw tokens as dictionary keys
+        return api_base_url, hashlib.sha256(access_token.encode()).hexdigest()
+
+    def get(self, api_base_url: str, access_token: str) -> dict[str, dict[str, Any]]:
+        """Return webhooks by id for the organization behind ``access_token``."""
+        key = self._key(api_base_url, access_token)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            fetch_lock = self._inflight.setdefault(key, threading.Lock())
+        with fetch_lock:
+            cached = self._cached(key)
+            if cached is not None:
+                return cached
+            response = get_client().get(f"{api_base_url}/webhooks", headers=auth_headers(access_token))
+            response.raise_for_status()
+            webhooks = {w["id"]: w for w in response.json().get("webhooks", []) if w.get("id")}
+            with self._lock:
+                self._listings[key] = (time.monotonic(), webhooks)
+                self._inflight.pop(key, None)
+            return webhooks
+
+    def invalidate(self, api_base_url: str, access_token: str) -> None:
+        with self._lock:
+            self._listings.pop(self._key(api_base_url, access_token), None)
+
+    def _cached(self, key: tuple[str, str]) -> dict[str, dict[str, Any]] | None:
+        with self._lock:
+            entry = self._listings.get(key)
+            if entry is None or time.monotonic() - entry[0] > self._ttl:
+                return None
+            return entry[1]
+
+
+webhook_directory = WebhookDirectory()
+
+
+def classify_webhook(external_id: str, webhook: dict[str, Any] | None) -> WebhookHealth:
+    if webhook is None:
+        return WebhookHealth(external_id, "missing", "Webhook no longer exists on Mercury", None)
+    status = webhook.get("status", "active")
+    if status == "active":
+        return WebhookHealth(external_id, "active", "", webhook)
+    return WebhookHealth(external_id, "disabled", f"Webhook status is '{status}'", webhook)
+
+
+def lookup_webhook(api_base_url: str, access_token: str, external_id: str) -> dict[str, Any] | None:
+    """Fetch one webhook with ``GET /webhook/{id}``; None when Mercury says it does not exist."""
+    response = get_client().get(f"{api_base_url}/webhook/{external_id}", headers=auth_headers(access_token))
+    if response.status_code == httpx.codes.NOT_FOUND:
+        return None
+    response.raise_for_status()
+    return response.json()
+
+
+def _check_directly(external_id: str, api_base_url: str, access_token: str) -> WebhookHealth:
+    try:
+        return classify_webhook(external_id, lookup_webhook(api_base_url, access_token, external_id))
+    except (httpx.HTTPError, ValueError) as exc:
+        return WebhookHealth(external_id, "error", f"Network error while checking webhook: {exc}", None)
+
+
+def check_webhooks(targets: Sequence[tuple[str, str, str]]) -> list[WebhookHealth]:
+    """Check many webhooks, listing each organization's webhooks once and organizations concurrently.
+
+    Args:
+        targets: ``(external_id, api_base_url, access_token)`` for every subscription to check
+
+    Returns:
+        One WebhookHealth per target, in input order. A webhook absent from the listing is only reported
+        missing after a direct ``GET /webhook/{id}`` confirms it; if the listing fails, every webhook of
+        that organization is looked up directly.
+    """
+    groups: dict[tuple[str, str], list[int]] = {}
+    for index, (_, api_base_url, access_token) in enumerate(targets):
+        groups.setdefault((api_base_url, access_token), []).append(index)
+
+    def check_group(group: tuple[str, str]) -> list[tuple[int, WebhookHealth]]:
+        api_base_url, access_token = group
+        indexes = groups[group]
+        try:
+            webhooks = webhook_directory.get(api_base_url, access_token)
+        except (httpx.HTTPError, ValueError) as exc:
+            logger.info("Listing Mercury webhooks at %s failed, looking them up directly: %s", api_base_url, exc)
+            webhooks = {}
+        checked = []
+        for i in indexes:
+            external_id = targets[i][0]
+            if external_id in webhooks:
+                checked.append((i, classify_webhook(external_id, webhooks[external_id])))
+            else:
+                checked.append((i, _check_directly(external_id, api_base_url, access_token)))
+        return checked
+
+    results: list[WebhookHealth | None] = [None] * len(targets)
+    with ThreadPoolExecutor(max_workers=min(_MAX_WORKERS, max(len(groups), 1))) as executor:
+        for checked in executor.map(check_group, list(groups)):
+            for index, health in checked:
+                results[index] = health
+    return [health for health in results if health is not None]
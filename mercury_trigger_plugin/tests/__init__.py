@@ -0,0 +1 @@
+# Mercury Trigger Plugin Tests
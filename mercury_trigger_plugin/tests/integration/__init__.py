@@ -0,0 +1 @@
+# Integration tests for Mercury Trigger Plugin
@@ -0,0 +1,114 @@
+"""Unit tests for the raw webhook journal."""
+
+from __future__ import annotations
+
+import pytest
+
+from provider import journal
+from provider.journal import WebhookJournal, iter_records, list_segments
+
+SEGMENT_BYTES = 100
+HEADERS = {"Mercury-Signature": "t=1,v1=abc", "Content-Type": "application/json", "Authorization": "secret"}
+
+
+@pytest.fixture
+def writer_id(monkeypatch):
+    """Switch the writer id the journal stamps on new segments, as if another worker were writing."""
+
+    def use(name: str) -> None:
+        monkeypatch.setattr(journal, "_writer_id", lambda: name)
+
+    use("100-aaaaaaaa")
+    return use
+
+
+def bodies(directory, **kwargs) -> list[bytes]:
+    return [record.body for record in iter_records(directory, **kwargs)]
+
+
+class TestRoundTrip:
+    """Records read back as they were written."""
+
+    def test_append_and_read(self, tmp_path, writer_id):
+        webhook_journal = WebhookJournal(tmp_path)
+        webhook_journal.append(b'{"id": "evt_1"}', HEADERS, webhook_id="wh_1", received_at=1.5)
+        webhook_journal.close()
+
+        (record,) = list(iter_records(tmp_path))
+        assert record.received_at == pytest.approx(1.5)
+        assert record.webhook_id == "wh_1"
+        assert record.body == b'{"id": "evt_1"}'
+
+    def test_only_journaled_headers_are_kept(self, tmp_path, writer_id):
+        webhook_journal = WebhookJournal(tmp_path)
+        webhook_journal.append(b"{}", HEADERS, received_at=10.0)
+        webhook_journal.close()
+
+        (record,) = list(iter_records(tmp_path))
+        assert "Authorization" not in record.headers
+        assert record.headers["Mercury-Signature"] == "t=1,v1=abc"
+
+    def test_range_is_half_open(self, tmp_path, writer_id):
+        webhook_journal = WebhookJournal(tmp_path)
+        for second in (10.0, 20.0, 30.0):
+            webhook_journal.append(str(second).encode(), {}, received_at=second)
+        webhook_journal.close()
+
+        assert bodies(tmp_path, start=20.0) == [b"20.0", b"30.0"]
+        assert bodies(tmp_path, start=10.0, end=30.0) == [b"10.0", b"20.0"]
+
+
+class TestSegments:
+    """Segment rotation and damaged segments."""
+
+    def test_rotates_when_segment_is_full(self, tmp_path, writer_id):
+        webhook_journal = WebhookJournal(tmp_path, segment_bytes=SEGMENT_BYTES)
+        for second in range(3):
+            webhook_journal.append(str(second).encode() * 50, {}, received_at=float(second))
+        webhook_journal.close()
+
+        assert [segment.stat().st_size <= SEGMENT_BYTES for segment in list_segments(tmp_path)] == [True] * 3
+        assert bodies(tmp_path) == [b"0" * 50, b"1" * 50, b"2" * 50]
+
+    def test_torn_record_ends_the_segment(self, tmp_path, writer_id):
+        webhook_journal = WebhookJournal(tmp_path)
+        webhook_journal.append(b"first", {}, received_at=1.0)
+        webhook_journal.append(b"second", {}, received_at=2.0)
+        webhook_journal.close()
+
+        (segment,) = list_segments(tmp_path)
+        segment.write_bytes(segment.read_bytes()[:-3])
+        assert bodies(tmp_path) == [b"first"]
+
+    def test_corrupt_record_ends_the_segment(self, tmp_path, writer_id):
+        webhook_journal = WebhookJournal(tmp_path)
+        webhook_journal.append(b"first", {}, received_at=1.0)
+        webhook_journal.append(b"second", {}, received_at=2.0)
+        webhook_journal.close()
+
+        (segment,) = list_segments(tmp_path)
+        data = bytearray(segment.read_bytes())
+        data[-1] ^= 0xFF
+        segment.write_bytes(bytes(data))
+        assert bodies(tmp_path) == [b"first"]
+
+
+class TestWorkers:
+    """Segments written by several workers replay in receive order."""
+
+    def test_records_are_merged_across_workers(self, tmp_path, writer_id):
+        first = WebhookJournal(tmp_path)
+        second = WebhookJournal(tmp_path)
+
+        writer_id("100-aaaaaaaa")
+        first.append(b"a1", {}, received_at=1.0)
+        writer_id("200-bbbbbbbb")
+        second.append(b"b2", {}, received_at=2.0)
+        first.append(b"a3", {}, received_at=3.0)
+        second.append(b"b4", {}, received_at=4.0)
+        first.close()
+        second.close()
+
+        writers = {segment.name.split("-", 2)[-1] for segment in list_segments(tmp_path)}
+        assert writers == {"100-aaaaaaaa.mwj", "200-bbbbbbbb.mwj"}
+        assert bodies(tmp_path) == [b"a1", b"b2", b"a3", b"b4"]
@@ -0,0 +1,171 @@
+"""Unit tests for webhook gap detection and backfill."""
+
+from __future__ import annotations
+
+import json
+import time
+from datetime import UTC, datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+from provider.reconciliation import (
+    MIN_BACKFILL_INTERVAL,
+    MercuryReconciler,
+    backfill_interval,
+    event_to_webhook_payload,
+    event_type,
+    record_seen_event,
+)
+
+EXTERNAL_ID = "wh_001"
+ENDPOINT = "https://dify.example/triggers/abc"
+
+
+class MockStorage:
+    """In-memory stand-in for plugin storage."""
+
+    def __init__(self):
+        self.data: dict[str, bytes] = {}
+
+    def get(self, key: str) -> bytes:
+        return self.data[key]
+
+    def set(self, key: str, value: bytes) -> None:
+        self.data[key] = value
+
+    def exist(self, key: str) -> bool:
+        return key in self.data
+
+    def delete(self, key: str) -> None:
+        self.data.pop(key, None)
+
+
+def iso(seconds_ago: float) -> str:
+    return datetime.fromtimestamp(time.time() - seconds_ago, tz=UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def feed_event(event_id: str, seconds_ago: float, **fields) -> dict:
+    return {
+        "id": event_id,
+        "resourceType": "transaction",
+        "operationType": "updated",
+        "resourceId": f"txn_{event_id}",
+        "createdAt": iso(seconds_ago),
+        "changedPaths": ["/status"],
+        **fields,
+    }
+
+
+def make_reconciler(storage: MockStorage, events: list[dict], parameters: dict | None = None):
+    subscription = MagicMock()
+    subscription.endpoint = ENDPOINT
+    subscription.properties = {"external_id": EXTERNAL_ID, "webhook_secret": "secret"}
+    subscription.parameters = parameters or {}
+
+    client = MagicMock()
+    client.get.return_value.json.return_value = {"events": events, "hasMore": False}
+    client.post.return_value.status_code = 200
+    return MercuryReconciler(storage, subscription, "https://api.mercury.com/api/v1", "token", client=client), client
+
+
+def replayed_ids(client: MagicMock) -> list[str]:
+    return [json.loads(call.kwargs["content"])["id"] for call in client.post.call_args_list]
+
+
+@pytest.fixture
+def storage():
+    storage = MockStorage()
+    # The last pass ran an hour ago
+    storage.set(f"mercury_reconcile:{EXTERNAL_ID}", json.dumps({"watermark": time.time() - 3600}).encode())
+    return storage
+
+
+class TestEventShape:
+    """Feed entries are converted to the webhook payload shape."""
+
+    def test_event_type_from_resource_and_operation(self):
+        assert event_type({"resourceType": "transaction", "operationType": "created"}) == "transaction.created"
+
+    def test_event_type_prefers_dotted_type(self):
+        assert event_type({"type": "transaction.updated"}) == "transaction.updated"
+
+    def test_payload_splits_dotted_type(self):
+        payload = event_to_webhook_payload({"id": "evt_1", "type": "transaction.created", "data": {"amount": 5}})
+        assert payload["resourceType"] == "transaction"
+        assert payload["operationType"] == "created"
+        assert payload["mergePatch"] == {"amount": 5}
+
+
+class TestBackfillInterval:
+    """The backfill interval parameter is in minutes with a floor."""
+
+    def test_disabled_by_default(self):
+        assert backfill_interval(None) == 0
+        assert backfill_interval({"backfill_interval": "abc"}) == 0
+
+    def test_minimum_interval(self):
+        assert backfill_interval({"backfill_interval": 1}) == MIN_BACKFILL_INTERVAL
+        assert backfill_interval({"backfill_interval": 30}) == 30 * 60
+
+
+class TestReconcile:
+    """A pass replays only events the webhook would have delivered and has not."""
+
+    def test_replays_unseen_events(self, storage):
+        record_seen_event(storage, EXTERNAL_ID, "evt_seen")
+        events = [feed_event("evt_seen", 1200), feed_event("evt_missed", 500)]
+        reconciler, client = make_reconciler(storage, events)
+
+        summary = reconciler.run()
+
+        assert replayed_ids(client) == ["evt_missed"]
+        assert summary["last_backfill_count"] == 1
+        assert storage.exist(f"mercury_seen:{EXTERNAL_ID}:evt_missed")
+
+    def test_replay_is_signed(self, storage):
+        reconciler, client = make_reconciler(storage, [feed_event("evt_1", 900)])
+        reconciler.run()
+        assert client.post.call_args.kwargs["headers"]["Mercury-Signature"].startswith("t=")
+
+    def test_respects_event_types(self, storage):
+        events = [feed_event("evt_created", 900, operationType="created"), feed_event("evt_updated", 800)]
+        reconciler, client = make_reconciler(storage, events, {"event_types": ["transaction.created"]})
+        reconciler.run()
+        assert replayed_ids(client) == ["evt_created"]
+
+    def test_respects_filter_paths(self, storage):
+        events = [
+            feed_event("evt_status", 900),
+            feed_event("evt_note", 800, changedPaths=["/note"]),
+        ]
+        reconciler, client = make_reconciler(storage, events, {"filter_paths": "note"})
+        reconciler.run()
+        assert replayed_ids(client) == ["evt_note"]
+
+    def test_failed_replay_is_retried_next_pass(self, storage):
+        reconciler, client = make_reconciler(storage, [feed_event("evt_1", 900)])
+        client.post.return_value.status_code = 500
+        reconciler.run()
+        assert not storage.exist(f"mercury_seen:{EXTERNAL_ID}:evt_1")
+
+        client.post.return_value.status_code = 200
+        reconciler.run()
+        assert replayed_ids(client) == ["evt_1", "evt_1"]
+
+    def test_prunes_markers_behind_the_window(self, storage):
+        record_seen_event(storage, EXTERNAL_ID, "evt_old")
+        record_seen_event(storage, EXTERNAL_ID, "evt_recent")
+        events = [feed_event("evt_old", 3000), feed_event("evt_recent", 300)]
+        reconciler, _ = make_reconciler(storage, events)
+
+        reconciler.run()
+
+        assert not storage.exist(f"mercury_seen:{EXTERNAL_ID}:evt_old")
+        assert storage.exist(f"mercury_seen:{EXTERNAL_ID}:evt_recent")
+
+    def test_first_pass_only_starts_the_watermark(self):
+        storage = MockStorage()
+        reconciler, client = make_reconciler(storage, [feed_event("evt_1", 900)])
+        assert reconciler.run()["last_backfill_count"] == 0
+        client.get.assert_not_called()
@@ -9,6 +9,7 @@ from werkzeug import Request
 from dify_plugin import ToolProvider
 from dify_plugin.entities.oauth import ToolOAuthCredentials
 from dify_plugin.errors.tool import ToolProviderCredentialValidationError, ToolProviderOAuthError
+from provider.token_refresh import proactive_expires_at, token_refresh_coordinator
 
 
 class QuickBooksPaymentsProvider(ToolProvider):
@@ -90,8 +91,7 @@ class QuickBooksPaymentsProvider(ToolProvider):
                 raise ToolProviderOAuthError(f"Error in QuickBooks OAuth: {response_json}")
 
             # Calculate expiration timestamp
-            import time
-            expires_at = int(time.time()) + expires_in
+            expires_at = proactive_expires_at(expires_in)
 
             credentials = {"access_token": access_token}
             if refresh_token:
@@ -110,6 +110,10 @@ class QuickBooksPaymentsProvider(ToolProvider):
         """
         Refresh the access token using the refresh token.
 
+        Intuit rotates refresh tokens, so refreshes are single-flight per refresh token: concurrent
+        callers, including the QuickBooks accounting plugin when QUICKBOOKS_TOKEN_LOCK_DIR is shared,
+        reuse the first caller's result instead of spending the rotated-out token again.
+
         Args:
             redirect_uri: The callback URL
             system_credentials: System-level credentials containing client_id and client_secret
@@ -122,6 +126,20 @@ class QuickBooksPaymentsProvider(ToolProvider):
         if not refresh_token:
             raise ToolProviderOAuthError("No refresh token available")
 
+        result = token_refresh_coordinator.refresh(
+            refresh_token, lambda: self._request_token_refresh(system_credentials, refresh_token)
+        )
+        # Keep only what this plugin stores; a refresh shared by the accounting plugin carries more
+        return ToolOAuthCredentials(
+            credentials={
+                "access_token": result.credentials["access_token"],
+                "refresh_token": result.credentials["refresh_token"]
+            },
+            expires_at=result.expires_at
+        )
+
+    def _request_token_refresh(self, system_credentials: Mapping[str, Any], refresh_token: str) -> ToolOAuthCredentials:
+        """Exchange a refresh token for new tokens at the Intuit token endpoint."""
         data = {
             "grant_type": "refresh_token",
             "refresh_token": refresh_token,
@@ -165,8 +183,7 @@ class QuickBooksPaymentsProvider(ToolProvider):
             if not access_token:
                 raise ToolProviderOAuthError(f"Error refreshing token: {response_json}")
 
-            import time
-            expires_at = int(time.time()) + expires_in
+            expires_at = proactive_expires_at(expires_in)
 
             new_credentials = {
                 "access_token": access_token,
@@ -0,0 +1,159 @@
+import contextlib
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+from dify_plugin.entities.oauth import ToolOAuthCredentials
+
+logger = logging.getLogger(__name__)
+
+# Directory shared by every plugin that refreshes the same Intuit tokens (accounting, payments)
+LOCK_DIR_ENV = "QUICKBOOKS_TOKEN_LOCK_DIR"
+
+# How long a refresh result is handed to callers still holding the rotated-out refresh token
+RESULT_TTL = 300
+# Report tokens as expiring this much early, plus jitter, so refreshes happen before calls fail
+# and do not all line up at the top of the hour
+REFRESH_MARGIN = 300
+REFRESH_JITTER = 300
+# A refresh is one HTTP call; never wait much longer than its timeout for another process
+_LOCK_TIMEOUT = 45
+_LOCK_POLL_INTERVAL = 0.05
+# Lock files of long-rotated tokens are removed after this long
+_LOCK_FILE_MAX_AGE = 86400
+
+
+def proactive_expires_at(expires_in: int) -> int:
+    """Return the ``expires_at`` to report for a token valid for ``expires_in`` seconds."""
+    early = REFRESH_MARGIN + random.randint(0, REFRESH_JITTER)
+    return int(time.time()) + max(60, expires_in - early)
+
+
+def _token_key(refresh_token: str) -> str:
+    return hashlib.sha256(refresh_token.encode()).hexdigest()
+
+
+class TokenRefreshCoordinator:
+    """Single-flight OAuth refresh keyed by the refresh token being spent.
+
+    Intuit rotates refresh tokens, so a second refresh with the same token fails and the winner's
+    tokens are the only valid ones. Concurrent refreshes of one token wait for the first and reuse
+    its result. With ``QUICKBOOKS_TOKEN_LOCK_DIR`` set, the same holds across processes and plugins
+    through a file lock and a short-lived result file (mode 0600) in that directory.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._inflight: dict[str, threading.Lock] = {}
+        self._results: dict[str, tuple[float, ToolOAuthCredentials]] = {}
+
+    def _recent(self, key: str) -> ToolOAuthCredentials | None:
+        now = time.time()
+        with self._lock:
+            for stale in [k for k, (at, _) in self._results.items() if now - at > RESULT_TTL]:
+                del self._results[stale]
+                inflight = self._inflight.get(stale)
+                if inflight is not None and not inflight.locked():
+                    del self._inflight[stale]
+            entry = self._results.get(key)
+        return entry[1] if entry else None
+
+    def _remember(self, key: str, result: ToolOAuthCredentials) -> None:
+        with self._lock:
+            self._results[key] = (time.time(), result)
+
+    @contextlib.contextmanager
+    def _shared(self, key: str) -> Iterator[Path | None]:
+        """Hold the cross-process lock for ``key`` and yield its result file path, if configured."""
+        directory = os.environ.get(LOCK_DIR_ENV, "").strip()
+        if not directory:
+            yield None
+            return
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path / f"{key}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            # Poll instead of blocking so a cooperative (gevent) runtime keeps serving other requests
+            deadline = time.monotonic() + _LOCK_TIMEOUT
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() > deadline:
+                        raise TimeoutError("Timed out waiting for another token refresh to finish") from None
+                    time.sleep(_LOCK_POLL_INTERVAL)
+            yield path / f"{key}.json"
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _load(result_path: Path) -> ToolOAuthCredentials | None:
+        try:
+            stored = json.loads(result_path.read_text())
+        except (OSError, ValueError):
+            return None
+        if time.time() - stored.get("refreshed_at", 0) > RESULT_TTL:
+            return None
+        return ToolOAuthCredentials(credentials=stored["credentials"], expires_at=stored["expires_at"])
+
+    @staticmethod
+    def _save(result_path: Path, result: ToolOAuthCredentials) -> None:
+        payload = json.dumps({
+            "refreshed_at": time.time(),
+            "credentials": dict(result.credentials),
+            "expires_at": result.expires_at
+        })
+        tmp_path = result_path.with_suffix(".tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(payload)
+        os.replace(tmp_path, result_path)
+
+        # Tidy up after tokens rotated out long ago
+        now = time.time()
+        for entry in result_path.parent.iterdir():
+            max_age = RESULT_TTL if entry.suffix == ".json" else _LOCK_FILE_MAX_AGE
+            with contextlib.suppress(OSError):
+                if entry != result_path and now - entry.stat().st_mtime > max_age:
+                    entry.unlink()
+
+    def refresh(
+        self, refresh_token: str, do_refresh: Callable[[], ToolOAuthCredentials]
+    ) -> ToolOAuthCredentials:
+        """Run ``do_refresh`` unless another caller already spent ``refresh_token``; then reuse its result."""
+        key = _token_key(refresh_token)
+        with self._lock:
+            refresh_lock = self._inflight.setdefault(key, threading.Lock())
+        with refresh_lock:
+            result = self._recent(key)
+            if result is not None:
+                logger.info("[TOKEN_REFRESH] Reusing tokens from a concurrent refresh")
+                return result
+
+            with self._shared(key) as result_path:
+                if result_path is not None:
+                    result = self._load(result_path)
+                    if result is not None:
+                        logger.info("[TOKEN_REFRESH] Reusing tokens refreshed by another process")
+                        self._remember(key, result)
+                        return result
+
+                result = do_refresh()
+                self._remember(key, result)
+                if result_path is not None:
+                    try:
+                        self._save(result_path, result)
+                    except OSError as e:
+                        logger.warning("[TOKEN_REFRESH] Could not share refreshed tokens: %s", e)
+                return result
+
+
+token_refresh_coordinator = TokenRefreshCoordinator()
@@ -6,6 +6,7 @@ import httpx
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
 from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.governor import governor_for_token
 
 
 class CreateBankAccountTool(Tool):
@@ -47,11 +48,13 @@ class CreateBankAccountTool(Tool):
             request_body["phone"] = phone
 
         try:
-            response = httpx.post(
-                f"{api_base_url}/customers/{customer_id}/bank-accounts",
-                headers=headers,
-                json=request_body,
-                timeout=30
+            response = governor_for_token(access_token, environment).send(
+                lambda: httpx.post(
+                    f"{api_base_url}/customers/{customer_id}/bank-accounts",
+                    headers=headers,
+                    json=request_body,
+                    timeout=30
+                )
             )
 
             if response.status_code == 201:
@@ -61,6 +64,9 @@ class CreateBankAccountTool(Tool):
                 yield self.create_json_message(data)
             elif response.status_code == 404:
                 raise ValueError(f"Customer with ID '{customer_id}' not found.")
+            elif response.status_code == 429:
+                raise Exception("QuickBooks Payments rate limit exceeded after retries. Try again in a minute.")
+
             elif response.status_code == 401:
                 raise ToolProviderCredentialValidationError("Authentication failed. Please check your access token.")
             else:
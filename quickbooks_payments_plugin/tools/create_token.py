@@ -6,6 +6,7 @@ import httpx
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
 from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.governor import governor_for_token
 
 
 class CreateTokenTool(Tool):
@@ -93,11 +94,13 @@ class CreateTokenTool(Tool):
 
         try:
             # Make API request
-            response = httpx.post(
-                f"{api_base_url}/tokens",
-                headers=headers,
-                json=request_body,
-                timeout=30
+            response = governor_for_token(access_token, environment).send(
+                lambda: httpx.post(
+                    f"{api_base_url}/tokens",
+                    headers=headers,
+                    json=request_body,
+                    timeout=30
+                )
             )
 
             if response.status_code == 201:
@@ -121,6 +124,9 @@ class CreateTokenTool(Tool):
                 error_msg = error_detail.get("message", response.text)
                 raise ValueError(f"Invalid request: {error_msg}")
 
+            elif response.status_code == 429:
+                raise Exception("QuickBooks Payments rate limit exceeded after retries. Try again in a minute.")
+
             elif response.status_code == 401:
                 raise ToolProviderCredentialValidationError(
                     "Authentication failed. Please check your QuickBooks Payments API access token."
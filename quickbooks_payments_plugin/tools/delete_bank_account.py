@@ -6,6 +6,7 @@ import httpx
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
 from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.governor import governor_for_token
 
 
 class DeleteBankAccountTool(Tool):
@@ -32,10 +33,12 @@ class DeleteBankAccountTool(Tool):
         }
 
         try:
-            response = httpx.delete(
-                f"{api_base_url}/customers/{customer_id}/bank-accounts/{bank_account_id}",
-                headers=headers,
-                timeout=30
+            response = governor_for_token(access_token, environment).send(
+                lambda: httpx.delete(
+                    f"{api_base_url}/customers/{customer_id}/bank-accounts/{bank_account_id}",
+                    headers=headers,
+                    timeout=30
+                )
             )
 
             if response.status_code == 204:
@@ -45,6 +48,9 @@ class DeleteBankAccountTool(Tool):
                 yield self.create_json_message(result)
             elif response.status_code == 404:
                 raise ValueError("Customer or bank account not found.")
+            elif response.status_code == 429:
+                raise Exception("QuickBooks Payments rate limit exceeded after retries. Try again in a minute.")
+
             elif response.status_code == 401:
                 raise ToolProviderCredentialValidationError("Authentication failed. Please check your access token.")
             else:
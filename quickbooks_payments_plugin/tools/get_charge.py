@@ -6,6 +6,7 @@ import httpx
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
 from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.governor import governor_for_token
 
 
 class GetChargeTool(Tool):
@@ -43,10 +44,12 @@ class GetChargeTool(Tool):
         }
 
         try:
-            response = httpx.get(
-                f"{api_base_url}/charges/{charge_id}",
-                headers=headers,
-                timeout=30
+            response = governor_for_token(access_token, environment).send(
+                lambda: httpx.get(
+                    f"{api_base_url}/charges/{charge_id}",
+                    headers=headers,
+                    timeout=30
+                )
             )
 
             if response.status_code == 200:
@@ -58,6 +61,9 @@ class GetChargeTool(Tool):
             elif response.status_code == 404:
                 raise ValueError(f"Charge with ID '{charge_id}' not found.")
 
+            elif response.status_code == 429:
+                raise Exception("QuickBooks Payments rate limit exceeded after retries. Try again in a minute.")
+
             elif response.status_code == 401:
                 raise ToolProviderCredentialValidationError(
                     "Authentication failed. Please check your QuickBooks Payments API access token."
@@ -0,0 +1,169 @@
+import threading
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from provider.cdc import add_change_listener
+from provider.client import QuickBooksClient
+from provider.pagination import iter_query_pages
+
+# Charts of accounts change rarely; CDC syncs patch the cache in between
+ACCOUNT_CACHE_TTL = 600
+
+_ACCOUNT_QUERY = "SELECT * FROM Account"
+
+# Most ids named in one balance query; larger selections read every balance instead
+_BALANCE_BATCH = 50
+
+
+def normalize_name(name: str) -> str:
+    """Fold case and collapse whitespace so lookups match names as users type them."""
+    return " ".join(str(name).split()).casefold()
+
+
+class AccountIndex:
+    """Immutable lookup tables over one realm's active accounts."""
+
+    def __init__(self, accounts: Iterable[dict[str, Any]]):
+        self.accounts = [acc for acc in accounts if acc.get("Active", True)]
+        self.by_id: dict[str, dict[str, Any]] = {}
+        self.by_name: dict[str, list[dict[str, Any]]] = {}
+        self.by_fully_qualified_name: dict[str, dict[str, Any]] = {}
+        self.by_type: dict[str, list[dict[str, Any]]] = {}
+        self.by_sub_type: dict[str, list[dict[str, Any]]] = {}
+
+        for acc in self.accounts:
+            self.by_id[str(acc.get("Id"))] = acc
+            if acc.get("Name"):
+                self.by_name.setdefault(normalize_name(acc["Name"]), []).append(acc)
+            if acc.get("FullyQualifiedName"):
+                self.by_fully_qualified_name[normalize_name(acc["FullyQualifiedName"])] = acc
+            if acc.get("AccountType"):
+                self.by_type.setdefault(normalize_name(acc["AccountType"]), []).append(acc)
+            if acc.get("AccountSubType"):
+                self.by_sub_type.setdefault(normalize_name(acc["AccountSubType"]), []).append(acc)
+
+    def find_by_name(self, name: str) -> list[dict[str, Any]]:
+        """Match a fully qualified name ("Expenses:Rent") exactly, otherwise every sub-account with that name."""
+        key = normalize_name(name)
+        account = self.by_fully_qualified_name.get(key)
+        if account is not None:
+            return [account]
+        return list(self.by_name.get(key, []))
+
+    def filter(
+        self,
+        account_id: str | None = None,
+        name: str | None = None,
+        account_type: str | None = None,
+        account_sub_type: str | None = None
+    ) -> list[dict[str, Any]]:
+        """Return accounts matching every given criterion, in chart order."""
+        if account_id:
+            account = self.by_id.get(str(account_id))
+            matches = [account] if account is not None else []
+        elif name:
+            matches = self.find_by_name(name)
+        elif account_type:
+            matches = list(self.by_type.get(normalize_name(account_type), []))
+        elif account_sub_type:
+            matches = list(self.by_sub_type.get(normalize_name(account_sub_type), []))
+        else:
+            matches = list(self.accounts)
+
+        if account_type:
+            wanted = normalize_name(account_type)
+            matches = [acc for acc in matches if normalize_name(acc.get("AccountType", "")) == wanted]
+        if account_sub_type:
+            wanted = normalize_name(account_sub_type)
+            matches = [acc for acc in matches if normalize_name(acc.get("AccountSubType", "")) == wanted]
+        return matches
+
+    def patched(self, objects: Iterable[dict[str, Any]]) -> "AccountIndex":
+        """Return a new index with CDC changes applied; deleted or deactivated accounts drop out."""
+        accounts = {str(acc.get("Id")): acc for acc in self.accounts}
+        for obj in objects:
+            account_id = str(obj.get("Id"))
+            if obj.get("status") == "Deleted" or not obj.get("Active", True):
+                accounts.pop(account_id, None)
+            else:
+                accounts[account_id] = obj
+        return AccountIndex(accounts.values())
+
+
+class AccountCache:
+    """Per-realm chart-of-accounts indexes with a TTL.
+
+    Concurrent callers for the same realm wait on a single in-flight load. Account changes seen by a
+    CDC sync are applied to a cached index directly instead of forcing a reload.
+    """
+
+    def __init__(self, ttl: float = ACCOUNT_CACHE_TTL):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, str], tuple[float, AccountIndex]] = {}
+        self._inflight: dict[tuple[str, str], threading.Lock] = {}
+
+    def _cached(self, key: tuple[str, str]) -> AccountIndex | None:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[0] < self._ttl:
+            return entry[1]
+        return None
+
+    def get(self, client: QuickBooksClient, refresh: bool = False) -> AccountIndex:
+        """Return the realm's account index, loading the chart of accounts if it is stale or missing."""
+        key = (client.realm_id, client.environment)
+        if not refresh:
+            cached = self._cached(key)
+            if cached is not None:
+                return cached
+
+        with self._lock:
+            load_lock = self._inflight.setdefault(key, threading.Lock())
+        with load_lock:
+            if not refresh:
+                cached = self._cached(key)
+                if cached is not None:
+                    return cached
+            loaded_at = time.monotonic()
+            index = AccountIndex(row for page in iter_query_pages(client, _ACCOUNT_QUERY) for row in page.rows)
+            with self._lock:
+                self._entries[key] = (loaded_at, index)
+            return index
+
+    def invalidate(self, realm_id: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == realm_id]:
+                del self._entries[key]
+
+    def apply_changes(self, realm_id: str, entity: str, objects: list[dict[str, Any]]) -> None:
+        """CDC change listener: patch cached indexes for the realm without resetting their TTL."""
+        if entity != "Account":
+            return
+        with self._lock:
+            for key, (loaded_at, index) in list(self._entries.items()):
+                if key[0] == realm_id:
+                    self._entries[key] = (loaded_at, index.patched(objects))
+
+
+def fetch_balances(client: QuickBooksClient, account_ids: list[str]) -> dict[str, Any]:
+    """Read current balances straight from QuickBooks, keyed by account id.
+
+    Balances move with every posted transaction, so they never come from the cached index.
+    """
+    if not account_ids:
+        return {}
+    query = "SELECT Id, CurrentBalance FROM Account"
+    if len(account_ids) <= _BALANCE_BATCH:
+        ids = ", ".join(f"'{account_id}'" for account_id in account_ids)
+        query += f" WHERE Id IN ({ids})"
+    balances: dict[str, Any] = {}
+    for page in iter_query_pages(client, query):
+        for row in page.rows:
+            balances[str(row.get("Id"))] = row.get("CurrentBalance", 0)
+    return balances
+
+
+account_cache = AccountCache()
+add_change_listener(account_cache.apply_changes)
@@ -0,0 +1,169 @@
+import json
+import mimetypes
+import os
+import tempfile
+from collections.abc import Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, NamedTuple
+
+import httpx
+
+from provider.client import QuickBooksClient, error_message
+
+# File types QuickBooks accepts as attachments
+APPROVED_EXTENSIONS = frozenset({
+    "ai", "csv", "doc", "docx", "eps", "gif", "jpeg", "jpg", "ods", "pdf", "png", "rtf", "tif", "txt", "xls",
+    "xlsx", "xml"
+})
+ATTACHABLE_CATEGORIES = ["Contact Photo", "Document", "Image", "Receipt", "Signature", "Sound", "Other"]
+# An upload request may not exceed 100 MB; each file is sent in its own request
+MAX_UPLOAD_BYTES = 100 * 1024 * 1024
+DEFAULT_UPLOAD_CONCURRENCY = 4
+MAX_UPLOAD_CONCURRENCY = 10
+# Large files take longer than the client's default timeout to send or fetch
+TRANSFER_TIMEOUT = 120
+# Network reads; files relayed to Dify are re-sliced, as the host rejects blob chunks over 8 KB
+CHUNK_SIZE = 64 * 1024
+BLOB_CHUNK_SIZE = 8192
+
+
+class UploadSource(NamedTuple):
+    filename: str
+    content_type: str
+    content: IO[bytes] | bytes
+    size: int
+
+
+def _content_type(filename: str, mime_type: str | None) -> str:
+    return mime_type or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+
+def _check_file_name(filename: str) -> None:
+    extension = os.path.splitext(filename)[1].lstrip(".").lower()
+    if extension not in APPROVED_EXTENSIONS:
+        raise ValueError(
+            f"{filename}: QuickBooks does not accept .{extension or '?'} files. "
+            f"Supported: {', '.join(sorted(APPROVED_EXTENSIONS))}"
+        )
+
+
+def _spool(url: str, filename: str) -> tuple[IO[bytes], int]:
+    """Copy a file from its URL into a temporary file chunk by chunk, so it is never held in memory whole."""
+    spooled = tempfile.TemporaryFile()
+    size = 0
+    try:
+        with httpx.stream("GET", url, timeout=TRANSFER_TIMEOUT, follow_redirects=True) as response:
+            response.raise_for_status()
+            for chunk in response.iter_bytes(CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise ValueError(f"{filename} is larger than QuickBooks' 100 MB upload limit")
+                spooled.write(chunk)
+    except httpx.UnsupportedProtocol as e:
+        spooled.close()
+        raise ValueError(
+            f"Invalid file URL '{url}': {e}. Ensure the FILES_URL environment variable is set"
+        ) from e
+    except BaseException:
+        spooled.close()
+        raise
+    spooled.seek(0)
+    return spooled, size
+
+
+def open_upload(file: Any) -> UploadSource:
+    """Prepare a Dify file reference, or a ``{"data", "filename", "mime_type"}`` dict, for upload.
+
+    Dify files are streamed from their URL into a temporary file; the caller closes ``content``.
+    """
+    if isinstance(file, dict):
+        filename = file.get("filename") or "attachment"
+        data = file.get("data") or b""
+        mime_type = file.get("mime_type")
+    else:
+        filename = getattr(file, "filename", None) or "attachment"
+        mime_type = getattr(file, "mime_type", None)
+        data = None
+    _check_file_name(filename)
+
+    if data is not None:
+        if len(data) > MAX_UPLOAD_BYTES:
+            raise ValueError(f"{filename} is larger than QuickBooks' 100 MB upload limit")
+        return UploadSource(filename, _content_type(filename, mime_type), data, len(data))
+    content, size = _spool(file.url, filename)
+    return UploadSource(filename, _content_type(filename, mime_type), content, size)
+
+
+def upload_attachment(client: QuickBooksClient, source: UploadSource, metadata: dict[str, Any]) -> httpx.Response:
+    """Upload one file with its Attachable metadata to ``/upload``."""
+    attachable = {**metadata, "FileName": source.filename, "ContentType": source.content_type}
+    files = [
+        ("file_metadata_01", ("attachment.json", json.dumps(attachable).encode(), "application/json")),
+        ("file_content_01", (source.filename, source.content, source.content_type))
+    ]
+    return client.post("upload", files=files, timeout=TRANSFER_TIMEOUT)
+
+
+def _upload_one(client: QuickBooksClient, file: Any, metadata: dict[str, Any]) -> dict[str, Any]:
+    filename = file.get("filename") if isinstance(file, dict) else getattr(file, "filename", None)
+    try:
+        source = open_upload(file)
+    except (ValueError, httpx.HTTPError) as e:
+        return {"file_name": filename, "success": False, "error": str(e)}
+    try:
+        response = upload_attachment(client, source, metadata)
+    except httpx.HTTPError as e:
+        return {"file_name": source.filename, "success": False, "error": f"Network error: {e}"}
+    finally:
+        if not isinstance(source.content, bytes):
+            source.content.close()
+
+    if response.status_code != 200:
+        error = error_message(response)
+        return {"file_name": source.filename, "success": False, "error": error}
+    item = (response.json().get("AttachableResponse") or [{}])[0]
+    if "Fault" in item:
+        errors = item["Fault"].get("Error") or [{}]
+        return {"file_name": source.filename, "success": False, "error": errors[0].get("Message", "Upload failed")}
+    return {"file_name": source.filename, "success": True, "attachable": item.get("Attachable", {})}
+
+
+def upload_attachments(
+    client: QuickBooksClient,
+    files: Sequence[Any],
+    metadata: dict[str, Any],
+    max_concurrency: int = DEFAULT_UPLOAD_CONCURRENCY
+) -> list[dict[str, Any]]:
+    """Upload several files with the same metadata, several at a time.
+
+    Returns one result per file, in input order; a file that fails does not stop the others.
+    """
+    if not files:
+        return []
+    workers = max(1, min(max_concurrency, MAX_UPLOAD_CONCURRENCY, len(files)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda file: _upload_one(client, file, metadata), files))
+
+
+def iter_download(url: str, expected_size: int | None = None) -> Iterator[tuple[bytes, int]]:
+    """Stream a TempDownloadUri, yielding ``(chunk, total_size)`` pairs.
+
+    The total comes from Content-Length, then ``expected_size``. When neither is known the file is
+    first copied to a temporary file to measure it.
+    """
+    with httpx.stream("GET", url, timeout=TRANSFER_TIMEOUT, follow_redirects=True) as response:
+        if response.status_code != 200:
+            raise Exception(f"Attachment download failed: {response.status_code}")
+        length = response.headers.get("Content-Length")
+        total = int(length) if length and length.isdigit() else expected_size
+        if total is not None:
+            for chunk in response.iter_bytes(CHUNK_SIZE):
+                yield chunk, total
+            return
+        with tempfile.TemporaryFile() as spooled:
+            for chunk in response.iter_bytes(CHUNK_SIZE):
+                spooled.write(chunk)
+            total = spooled.tell()
+            spooled.seek(0)
+            while chunk := spooled.read(CHUNK_SIZE):
+                yield chunk, total
@@ -0,0 +1,115 @@
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import httpx
+from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+
+from provider.client import QuickBooksClient, error_message
+
+# QuickBooks accepts at most 30 operations per batch request
+BATCH_LIMIT = 30
+# QuickBooks allows 10 concurrent requests per realm; leave headroom for other tools
+DEFAULT_CONCURRENCY = 4
+MAX_CONCURRENCY = 10
+
+BATCH_ENTITIES = [
+    "Attachable", "Bill", "BillPayment", "Class", "CreditMemo", "Customer",
+    "Department", "Deposit", "Employee", "Estimate", "Invoice", "Item",
+    "JournalEntry", "Payment", "Purchase", "PurchaseOrder", "RefundReceipt",
+    "SalesReceipt", "Transfer", "Vendor", "VendorCredit"
+]
+BATCH_OPERATIONS = ["create", "update", "delete", "query"]
+
+
+def build_batch_item(index: int, operation: Any) -> dict[str, Any]:
+    """Convert ``{"operation", "entity", "data"}`` or ``{"operation": "query", "query"}`` into a BatchItemRequest."""
+    if not isinstance(operation, dict):
+        raise ValueError(f"Operation {index}: must be an object")
+    op = str(operation.get("operation", "")).lower()
+    if op not in BATCH_OPERATIONS:
+        raise ValueError(f"Operation {index}: unknown operation '{op}'. Supported: {', '.join(BATCH_OPERATIONS)}")
+
+    if op == "query":
+        query = operation.get("query")
+        if not query:
+            raise ValueError(f"Operation {index}: query is required for query operations")
+        return {"bId": str(index), "Query": query}
+
+    entity = operation.get("entity")
+    if entity not in BATCH_ENTITIES:
+        raise ValueError(
+            f"Operation {index}: unsupported entity '{entity}'. Supported: {', '.join(BATCH_ENTITIES)}"
+        )
+    data = operation.get("data")
+    if not isinstance(data, dict) or not data:
+        raise ValueError(f"Operation {index}: data must be a non-empty object")
+    if op in ("update", "delete") and not (data.get("Id") and data.get("SyncToken") is not None):
+        raise ValueError(f"Operation {index}: Id and SyncToken are required to {op} {entity}")
+
+    return {"bId": str(index), "operation": op, entity: data}
+
+
+def _post_batch(client: QuickBooksClient, items: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Send one batch request and return its responses in request order."""
+    try:
+        response = client.post("batch", json={"BatchItemRequest": items})
+    except httpx.HTTPError as e:
+        return [{"bId": item["bId"], "Error": f"Network error: {e}"} for item in items]
+
+    if response.status_code == 401:
+        raise ToolProviderCredentialValidationError("Authentication failed.")
+    if response.status_code != 200:
+        error_msg = error_message(response)
+        return [{"bId": item["bId"], "Error": error_msg} for item in items]
+
+    by_id = {item.get("bId"): item for item in response.json().get("BatchItemResponse", [])}
+    return [by_id.get(item["bId"], {"bId": item["bId"], "Error": "No response for batch item"}) for item in items]
+
+
+def execute_batch(
+    client: QuickBooksClient, items: Sequence[dict[str, Any]], max_concurrency: int = DEFAULT_CONCURRENCY
+) -> list[dict[str, Any]]:
+    """Run BatchItemRequests in chunks of 30, several chunks at a time.
+
+    Returns one BatchItemResponse per item, in input order. A chunk that fails as a whole reports
+    the failure on each of its items instead of aborting the other chunks.
+    """
+    chunks = [list(items[i:i + BATCH_LIMIT]) for i in range(0, len(items), BATCH_LIMIT)]
+    if not chunks:
+        return []
+
+    workers = max(1, min(max_concurrency, MAX_CONCURRENCY, len(chunks)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(lambda chunk: _post_batch(client, chunk), chunks)
+        return [response for chunk_result in results for response in chunk_result]
+
+
+def summarize_batch_response(response: dict[str, Any]) -> dict[str, Any]:
+    """Flatten a BatchItemResponse into a per-item result."""
+    if "Error" in response:
+        return {"success": False, "error": response["Error"]}
+
+    if "Fault" in response:
+        errors = response["Fault"].get("Error") or [{}]
+        message = errors[0].get("Message", "Unknown error")
+        detail = errors[0].get("Detail")
+        return {"success": False, "error": f"{message}: {detail}" if detail else message}
+
+    if "QueryResponse" in response:
+        query_response = response["QueryResponse"]
+        for key, value in query_response.items():
+            if isinstance(value, list):
+                return {"success": True, "entity": key, "data": value, "count": len(value)}
+        return {"success": True, "data": [], "count": 0}
+
+    for key, value in response.items():
+        if key != "bId" and isinstance(value, dict):
+            return {
+                "success": True,
+                "entity": key,
+                "id": value.get("Id"),
+                "sync_token": value.get("SyncToken"),
+                "data": value
+            }
+    return {"success": True}
@@ -0,0 +1,201 @@
+import json
+import logging
+from collections.abc import Callable, Sequence
+from datetime import UTC, datetime, timedelta
+from typing import Any, NamedTuple
+
+from provider.client import QuickBooksClient, raise_for_error
+from provider.pagination import iter_query_pages
+
+logger = logging.getLogger(__name__)
+
+CDC_ENTITIES = [
+    "Account", "Bill", "BillPayment", "Class", "CreditMemo", "Customer",
+    "Department", "Deposit", "Employee", "Estimate", "Invoice", "Item",
+    "JournalEntry", "Payment", "PaymentMethod", "Purchase", "PurchaseOrder",
+    "RefundReceipt", "SalesReceipt", "TaxCode", "Term", "TimeActivity",
+    "Transfer", "Vendor", "VendorCredit"
+]
+
+# QuickBooks only keeps change data for the last 30 days
+CDC_MAX_LOOKBACK = timedelta(days=30)
+# And returns at most 1000 objects per entity per call
+CDC_PAGE_LIMIT = 1000
+
+# Name-list entities: QuickBooks hides inactive records unless a query filters on Active
+NAME_LIST_ENTITIES = frozenset({
+    "Account", "Class", "Customer", "Department", "Employee", "Item", "PaymentMethod", "TaxCode", "Term", "Vendor"
+})
+
+_WATERMARK_KEY_PREFIX = "qbo_cdc"
+
+# Called with (realm_id, entity, changed objects) after every successful sync
+ChangeListener = Callable[[str, str, list[dict[str, Any]]], None]
+_listeners: list[ChangeListener] = []
+
+
+class EntityChanges(NamedTuple):
+    entity: str
+    changed: list[dict[str, Any]]
+    deleted: list[dict[str, Any]]
+    changed_since: str
+    watermark: str
+    # More changes remain; the next run continues from the last object returned
+    truncated: bool
+    # The stored watermark was older than QuickBooks keeps change data for
+    resync_required: bool
+
+
+def add_change_listener(listener: ChangeListener) -> None:
+    """Register a callback notified of the objects each CDC sync returns, e.g. to invalidate caches."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def _format_time(value: datetime) -> str:
+    return value.astimezone(UTC).isoformat(timespec="seconds")
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _watermark_key(realm_id: str, entity: str) -> str:
+    return f"{_WATERMARK_KEY_PREFIX}:{realm_id}:{entity}"
+
+
+def load_watermark(storage: Any, realm_id: str, entity: str) -> str | None:
+    key = _watermark_key(realm_id, entity)
+    if not storage.exist(key):
+        return None
+    try:
+        return json.loads(storage.get(key)).get("changed_since")
+    except (TypeError, ValueError):
+        return None
+
+
+def save_watermark(storage: Any, realm_id: str, entity: str, watermark: str) -> None:
+    storage.set(_watermark_key(realm_id, entity), json.dumps({"changed_since": watermark}).encode())
+
+
+def reset_watermark(storage: Any, realm_id: str, entity: str) -> None:
+    key = _watermark_key(realm_id, entity)
+    if storage.exist(key):
+        storage.delete(key)
+
+
+def fetch_changes(
+    client: QuickBooksClient, entities: Sequence[str], changed_since: str
+) -> tuple[str | None, dict[str, list[dict[str, Any]]]]:
+    """Call ``/cdc`` once and return the server time and the changed objects per entity."""
+    response = client.get("cdc", params={"entities": ",".join(entities), "changedSince": changed_since})
+    raise_for_error(response)
+    data = response.json()
+
+    changes: dict[str, list[dict[str, Any]]] = {entity: [] for entity in entities}
+    for cdc_response in data.get("CDCResponse", []):
+        for query_response in cdc_response.get("QueryResponse", []):
+            for key, value in query_response.items():
+                if isinstance(value, list):
+                    changes.setdefault(key, []).extend(value)
+    return data.get("time"), changes
+
+
+def _read_second(client: QuickBooksClient, entity: str, since: str) -> tuple[list[dict[str, Any]], str]:
+    """Every object of ``entity`` last updated within the second starting at ``since``, through a paged query."""
+    until = _format_time(_parse_time(since) + timedelta(seconds=1))
+    query = (
+        f"SELECT * FROM {entity} "
+        f"WHERE MetaData.LastUpdatedTime >= '{since}' AND MetaData.LastUpdatedTime < '{until}'"
+    )
+    if entity in NAME_LIST_ENTITIES:
+        query += " AND Active IN (true, false)"
+    return [row for page in iter_query_pages(client, query) for row in page.rows], until
+
+
+def advance_watermark(
+    client: QuickBooksClient,
+    entity: str,
+    objects: list[dict[str, Any]],
+    since: str,
+    server_time: str | None
+) -> tuple[list[dict[str, Any]], str, bool]:
+    """Return the objects to apply, the next watermark and whether more changes remain after one CDC call.
+
+    A full page resumes from the newest object received; ``changedSince`` is inclusive, so objects sharing
+    that second are returned again rather than lost. When every object on a full page shares the second
+    CDC was asked from, CDC can never get past it, so that second is read with a paged query instead and
+    the watermark moves one second on. The query cannot report deletions made within that second.
+    """
+    if len(objects) < CDC_PAGE_LIMIT:
+        return objects, server_time or _format_time(datetime.now(UTC)), False
+
+    newest = max((o.get("MetaData", {}).get("LastUpdatedTime") or since for o in objects), key=_parse_time)
+    if _parse_time(newest) > _parse_time(since):
+        return objects, newest, True
+
+    logger.warning("More than %d %s changes share %s; reading them with a query", CDC_PAGE_LIMIT, entity, since)
+    rows, watermark = _read_second(client, entity, since)
+    merged = {str(o.get("Id")): o for o in objects}
+    merged.update((str(row.get("Id")), row) for row in rows)
+    return list(merged.values()), watermark, True
+
+
+def sync_changes(
+    client: QuickBooksClient,
+    storage: Any,
+    entities: Sequence[str],
+    changed_since: str | None = None,
+    commit: bool = True
+) -> list[EntityChanges]:
+    """Return objects changed since each entity's stored watermark and advance the watermarks.
+
+    Entities sharing a watermark are fetched in one ``/cdc`` call. Without a watermark or explicit
+    ``changed_since`` an entity starts from the oldest point QuickBooks still has change data for.
+    """
+    now = datetime.now(UTC)
+    # Stay a little inside the limit so the request is not rejected by clock skew
+    oldest = now - CDC_MAX_LOOKBACK + timedelta(minutes=5)
+
+    groups: dict[str, list[str]] = {}
+    resync: set[str] = set()
+    for entity in entities:
+        since = changed_since or load_watermark(storage, client.realm_id, entity)
+        if since is None or _parse_time(since) < oldest:
+            if since is not None:
+                resync.add(entity)
+            since = _format_time(oldest)
+        groups.setdefault(since, []).append(entity)
+
+    results: list[EntityChanges] = []
+    for since, group in groups.items():
+        server_time, changes = fetch_changes(client, group, since)
+        for entity in group:
+            objects, watermark, truncated = advance_watermark(
+                client, entity, changes.get(entity, []), since, server_time
+            )
+            results.append(EntityChanges(
+                entity=entity,
+                changed=[o for o in objects if o.get("status") != "Deleted"],
+                deleted=[o for o in objects if o.get("status") == "Deleted"],
+                changed_since=since,
+                watermark=watermark,
+                truncated=truncated,
+                resync_required=entity in resync
+            ))
+
+    if commit:
+        for result in results:
+            save_watermark(storage, client.realm_id, result.entity, result.watermark)
+
+    for result in results:
+        objects = result.changed + result.deleted
+        if not objects:
+            continue
+        for listener in _listeners:
+            try:
+                listener(client.realm_id, result.entity, objects)
+            except Exception as e:
+                logger.warning("CDC change listener failed for %s: %s", result.entity, e)
+
+    return results
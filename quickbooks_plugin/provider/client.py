@@ -0,0 +1,165 @@
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any
+
+import httpx
+from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+
+from provider.governor import get_governor
+
+API_BASE_URLS = {
+    "production": "https://quickbooks.api.intuit.com/v3",
+    "sandbox": "https://sandbox-quickbooks.api.intuit.com/v3"
+}
+MINOR_VERSION = "65"
+
+_REQUEST_TIMEOUT = 30
+_MAX_POOLS = 32
+_POOL_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+
+_pools: OrderedDict[tuple[str, str], httpx.Client] = OrderedDict()
+_pools_lock = threading.Lock()
+
+
+def get_api_base_url(environment: str | None) -> str:
+    """Get the API base URL for an environment, defaulting to sandbox."""
+    return API_BASE_URLS.get(environment or "sandbox", API_BASE_URLS["sandbox"])
+
+
+def _get_pool(realm_id: str, environment: str) -> httpx.Client:
+    """Return the keep-alive connection pool for a realm, creating it on first use."""
+    key = (realm_id, environment)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is not None:
+            _pools.move_to_end(key)
+            return pool
+
+        pool = httpx.Client(
+            base_url=f"{get_api_base_url(environment)}/company/{realm_id}/",
+            timeout=_REQUEST_TIMEOUT,
+            limits=_POOL_LIMITS
+        )
+        _pools[key] = pool
+        while len(_pools) > _MAX_POOLS:
+            # Not closed: requests in flight and live QuickBooksClients may still hold the evicted pool.
+            # Its connections are released when the last of them lets go of it.
+            _pools.popitem(last=False)
+        return pool
+
+
+def fault_message(response: httpx.Response) -> str:
+    """Extract the first error message from a QuickBooks Fault response body."""
+    try:
+        error_detail = response.json() if response.content else {}
+    except ValueError:
+        return response.text
+    if not isinstance(error_detail, dict):
+        return response.text
+    errors = error_detail.get("Fault", {}).get("Error") or [{}]
+    return errors[0].get("Message", response.text)
+
+
+def error_message(response: httpx.Response) -> str:
+    """Describe a failed QuickBooks response, with a retry hint when the company is being throttled."""
+    if response.status_code == 429:
+        return (
+            f"QuickBooks rate limit exceeded for this company after retries: {fault_message(response)}. "
+            "Try again in a minute."
+        )
+    return f"API error {response.status_code}: {fault_message(response)}"
+
+
+def raise_for_error(response: httpx.Response) -> None:
+    """Raise the plugin's usual errors for a failed QuickBooks response."""
+    if response.status_code == 401:
+        raise ToolProviderCredentialValidationError("Authentication failed.")
+    if response.status_code >= 400:
+        raise Exception(error_message(response))
+
+
+def _rewind(files: Any) -> None:
+    """Seek the file objects in an httpx ``files`` argument back to their start."""
+    fields = files.items() if isinstance(files, Mapping) else files or ()
+    for _, value in fields:
+        # A field is a file or a (filename, file[, content_type]) tuple
+        content = value[1] if isinstance(value, tuple) else value
+        if hasattr(content, "seek"):
+            content.seek(0)
+
+
+class QuickBooksClient:
+    """Accounting API client for one realm.
+
+    Instances are cheap: they carry the caller's access token and share a pooled, keep-alive
+    connection keyed by realm and environment. Paths are relative to ``/v3/company/{realm_id}/``
+    and every request carries the pinned ``minorversion``. Requests pass through the realm's
+    governor, which keeps within Intuit's rate and concurrency limits and retries 429s.
+    """
+
+    def __init__(self, access_token: str, realm_id: str, environment: str = "sandbox"):
+        self.access_token = access_token
+        self.realm_id = realm_id
+        self.environment = environment
+        self._http = _get_pool(realm_id, environment)
+
+    @classmethod
+    def from_credentials(cls, credentials: Mapping[str, Any]) -> "QuickBooksClient":
+        access_token = credentials.get("access_token")
+        realm_id = credentials.get("realm_id")
+
+        if not access_token or not realm_id:
+            raise ToolProviderCredentialValidationError("QuickBooks API Access Token and Realm ID are required.")
+
+        return cls(access_token, realm_id, credentials.get("environment", "sandbox"))
+
+    @property
+    def base_url(self) -> str:
+        return get_api_base_url(self.environment)
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: Mapping[str, Any] | None = None,
+        json: Any = None,
+        files: Any = None,
+        headers: Mapping[str, str] | None = None,
+        timeout: float | None = None
+    ) -> httpx.Response:
+        request_headers = {
+            "Authorization": f"Bearer {self.access_token}",
+            "Accept": "application/json"
+        }
+        # Multipart uploads carry their own Content-Type with the part boundary
+        if files is None:
+            request_headers["Content-Type"] = "application/json"
+        if headers:
+            request_headers.update(headers)
+
+        def send() -> httpx.Response:
+            # A throttled attempt has already read file parts to the end; every attempt sends them whole
+            _rewind(files)
+            return self._http.request(
+                method,
+                path,
+                params={**(params or {}), "minorversion": MINOR_VERSION},
+                json=json,
+                files=files,
+                headers=request_headers,
+                timeout=timeout or _REQUEST_TIMEOUT
+            )
+
+        return get_governor((self.realm_id, self.environment)).send(send)
+
+    def get(self, path: str, **kwargs: Any) -> httpx.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs: Any) -> httpx.Response:
+        return self.request("POST", path, **kwargs)
+
+    def query(self, query: str) -> httpx.Response:
+        """Run a QuickBooks query statement."""
+        return self.get("query", params={"query": query})
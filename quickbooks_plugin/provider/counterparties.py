@@ -0,0 +1,171 @@
+import threading
+import time
+from typing import Any, NamedTuple
+
+from provider.accounts import normalize_name
+from provider.cdc import add_change_listener
+from provider.client import QuickBooksClient, fault_message, raise_for_error
+from provider.pagination import iter_query_pages
+
+COUNTERPARTY_ENTITIES = ["Vendor", "Customer"]
+COUNTERPARTY_CACHE_TTL = 900
+
+# QuickBooks error code for a DisplayName already used by another name-list entry
+_DUPLICATE_NAME_CODE = "6240"
+
+_CacheKey = tuple[str, str, str]
+
+
+class Resolution(NamedTuple):
+    entity: str
+    record: dict[str, Any]
+    created: bool
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("'", "\\'")
+
+
+def _is_duplicate_name(response: Any) -> bool:
+    try:
+        errors = response.json().get("Fault", {}).get("Error") or []
+    except ValueError:
+        return False
+    return any(str(error.get("code")) == _DUPLICATE_NAME_CODE for error in errors)
+
+
+class CounterpartyResolver:
+    """Per-realm DisplayName indexes for vendors and customers with single-flight find-or-create.
+
+    The first lookup for a realm and entity loads every record, active or not, into memory; later
+    lookups for known names never call QuickBooks. Unknown names are created at most once per
+    process: concurrent callers asking for the same new name wait on one create request.
+    """
+
+    def __init__(self, ttl: float = COUNTERPARTY_CACHE_TTL):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._indexes: dict[_CacheKey, tuple[float, dict[str, dict[str, Any]]]] = {}
+        self._loading: dict[_CacheKey, threading.Lock] = {}
+        self._creating: dict[tuple[_CacheKey, str], threading.Lock] = {}
+
+    @staticmethod
+    def _key(client: QuickBooksClient, entity: str) -> _CacheKey:
+        return client.realm_id, client.environment, entity
+
+    def _cached(self, key: _CacheKey) -> dict[str, dict[str, Any]] | None:
+        with self._lock:
+            entry = self._indexes.get(key)
+        if entry and time.monotonic() - entry[0] < self._ttl:
+            return entry[1]
+        return None
+
+    def _index(self, client: QuickBooksClient, entity: str, refresh: bool = False) -> dict[str, dict[str, Any]]:
+        key = self._key(client, entity)
+        if not refresh:
+            cached = self._cached(key)
+            if cached is not None:
+                return cached
+
+        with self._lock:
+            load_lock = self._loading.setdefault(key, threading.Lock())
+        with load_lock:
+            if not refresh:
+                cached = self._cached(key)
+                if cached is not None:
+                    return cached
+            loaded_at = time.monotonic()
+            index: dict[str, dict[str, Any]] = {}
+            query = f"SELECT * FROM {entity} WHERE Active IN (true, false)"
+            for page in iter_query_pages(client, query):
+                for row in page.rows:
+                    if row.get("DisplayName"):
+                        index[normalize_name(row["DisplayName"])] = row
+            with self._lock:
+                self._indexes[key] = (loaded_at, index)
+            return index
+
+    def _remember(self, key: _CacheKey, record: dict[str, Any]) -> None:
+        with self._lock:
+            entry = self._indexes.get(key)
+            if entry is not None:
+                entry[1][normalize_name(record["DisplayName"])] = record
+
+    def _find_exact(self, client: QuickBooksClient, entity: str, name: str) -> dict[str, Any] | None:
+        query = f"SELECT * FROM {entity} WHERE DisplayName = '{_escape(name)}' AND Active IN (true, false)"
+        response = client.query(query)
+        raise_for_error(response)
+        rows = response.json().get("QueryResponse", {}).get(entity, [])
+        return rows[0] if rows else None
+
+    def _create(self, client: QuickBooksClient, entity: str, name: str) -> Resolution:
+        payload = {"DisplayName": name}
+        if entity == "Vendor":
+            payload["CompanyName"] = name
+        response = client.post(entity.lower(), json=payload)
+        if response.status_code == 400 and _is_duplicate_name(response):
+            # Created elsewhere since the index was loaded, or the name belongs to another list
+            existing = self._find_exact(client, entity, name)
+            if existing is None:
+                raise ValueError(f"'{name}' is already used by another customer, vendor or employee")
+            return Resolution(entity, existing, False)
+        raise_for_error(response)
+        if response.status_code != 200:
+            raise Exception(f"Failed to create {entity.lower()}: {fault_message(response)}")
+        return Resolution(entity, response.json().get(entity, {}), True)
+
+    def resolve(
+        self, client: QuickBooksClient, entity: str, name: str, create: bool = True, refresh: bool = False
+    ) -> Resolution | None:
+        """Return the vendor or customer whose DisplayName matches ``name``, creating it if allowed.
+
+        Names match ignoring case and repeated whitespace. Returns None when the name is unknown and
+        ``create`` is False.
+        """
+        if entity not in COUNTERPARTY_ENTITIES:
+            raise ValueError(f"Unsupported entity '{entity}'. Supported: {', '.join(COUNTERPARTY_ENTITIES)}")
+        display_name = " ".join(name.split())
+        if not display_name:
+            raise ValueError("name is required")
+        normalized = normalize_name(display_name)
+
+        record = self._index(client, entity, refresh).get(normalized)
+        if record is not None:
+            return Resolution(entity, record, False)
+        if not create:
+            return None
+
+        key = self._key(client, entity)
+        with self._lock:
+            create_lock = self._creating.setdefault((key, normalized), threading.Lock())
+        try:
+            with create_lock:
+                # Another caller may have created it while we waited
+                record = self._index(client, entity).get(normalized)
+                if record is not None:
+                    return Resolution(entity, record, False)
+                resolution = self._create(client, entity, display_name)
+                self._remember(key, resolution.record)
+                return resolution
+        finally:
+            with self._lock:
+                self._creating.pop((key, normalized), None)
+
+    def apply_changes(self, realm_id: str, entity: str, objects: list[dict[str, Any]]) -> None:
+        """CDC change listener: keep cached name indexes in step with renames and deletions."""
+        if entity not in COUNTERPARTY_ENTITIES:
+            return
+        with self._lock:
+            for key, (_, index) in self._indexes.items():
+                if key[0] != realm_id or key[2] != entity:
+                    continue
+                changed_ids = {str(obj.get("Id")) for obj in objects}
+                for name in [name for name, row in index.items() if str(row.get("Id")) in changed_ids]:
+                    del index[name]
+                for obj in objects:
+                    if obj.get("status") != "Deleted" and obj.get("DisplayName"):
+                        index[normalize_name(obj["DisplayName"])] = obj
+
+
+counterparty_resolver = CounterpartyResolver()
+add_change_listener(counterparty_resolver.apply_changes)
@@ -0,0 +1,155 @@
+import json
+import time
+from collections.abc import Callable, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, NamedTuple
+
+import httpx
+from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+
+from provider.client import QuickBooksClient, raise_for_error
+
+# Each realm has its own governor, so realms run side by side; this bounds threads, not QuickBooks load
+DEFAULT_REALM_CONCURRENCY = 4
+MAX_REALM_CONCURRENCY = 10
+MAX_REALMS = 50
+
+# Intuit access tokens are valid for one hour
+ACCESS_TOKEN_LIFETIME = 3600
+
+_CONNECTION_KEY_PREFIX = "qbo_realm_connection"
+
+
+class Realm(NamedTuple):
+    realm_id: str
+    name: str
+    client: QuickBooksClient
+
+
+class RealmResult(NamedTuple):
+    realm: Realm
+    value: Any
+    error: str | None
+
+
+def _connection_key(realm_id: str) -> str:
+    return f"{_CONNECTION_KEY_PREFIX}:{realm_id}"
+
+
+def remember_connection(storage: Any, credentials: Mapping[str, Any]) -> None:
+    """Store the connected company's current token so searches under other connections can reach it.
+
+    Tokens only ever come from the plugin's own credentials, never from tool parameters.
+    """
+    realm_id = str(credentials.get("realm_id") or "")
+    access_token = credentials.get("access_token")
+    if not realm_id or not access_token:
+        return
+    key = _connection_key(realm_id)
+    if storage.exist(key):
+        try:
+            if json.loads(storage.get(key)).get("access_token") == access_token:
+                return
+        except (TypeError, ValueError, AttributeError):
+            pass
+    storage.set(key, json.dumps({
+        "access_token": access_token,
+        "environment": credentials.get("environment", "sandbox"),
+        "saved_at": time.time()
+    }).encode())
+
+
+def _stored_connection(storage: Any, realm_id: str) -> dict[str, Any] | None:
+    key = _connection_key(realm_id)
+    if not storage.exist(key):
+        return None
+    try:
+        stored = json.loads(storage.get(key))
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(stored, dict) or time.time() - stored.get("saved_at", 0) > ACCESS_TOKEN_LIFETIME:
+        return None
+    return stored
+
+
+def parse_realms(realms_json: Any, credentials: Mapping[str, Any], storage: Any) -> list[Realm]:
+    """Build one client per company from ``[{"realm_id", "name"}]``.
+
+    The connected company uses the plugin credentials. Other companies use the token last stored for
+    them by ``remember_connection``, which must be less than an hour old.
+    """
+    try:
+        entries = json.loads(realms_json) if isinstance(realms_json, str) else realms_json
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid realms_json format: {e}") from e
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("realms_json must be a non-empty JSON array")
+    if len(entries) > MAX_REALMS:
+        raise ValueError(f"realms_json lists {len(entries)} companies; at most {MAX_REALMS} are supported")
+
+    realms: list[Realm] = []
+    seen: set[str] = set()
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict) or not entry.get("realm_id"):
+            raise ValueError(f"realms_json item {index}: realm_id is required")
+        if "access_token" in entry:
+            raise ValueError(f"realms_json item {index}: access tokens are not accepted; list realm ids only")
+        realm_id = str(entry["realm_id"]).strip()
+        if realm_id in seen:
+            raise ValueError(f"realms_json item {index}: realm {realm_id} is listed twice")
+        seen.add(realm_id)
+
+        if realm_id == str(credentials.get("realm_id")):
+            access_token = credentials.get("access_token")
+            environment = credentials.get("environment", "sandbox")
+        else:
+            stored = _stored_connection(storage, realm_id)
+            if stored is None:
+                raise ValueError(
+                    f"realms_json item {index}: no current connection for realm {realm_id}; "
+                    "run Advanced Search once with that company's QuickBooks connection"
+                )
+            access_token = stored["access_token"]
+            environment = stored.get("environment", "sandbox")
+        client = QuickBooksClient(access_token, realm_id, environment)
+        realms.append(Realm(realm_id, str(entry.get("name") or realm_id), client))
+    return realms
+
+
+def verify_access(client: QuickBooksClient, credentials: Mapping[str, Any]) -> None:
+    """Prove a stored token is still valid for its realm with a live CompanyInfo read.
+
+    Data cached per realm must not be served to a token QuickBooks would reject for that realm. The
+    company and token this plugin is connected with need no check.
+    """
+    if (
+        client.realm_id == str(credentials.get("realm_id"))
+        and client.access_token == credentials.get("access_token")
+        and client.environment == credentials.get("environment", "sandbox")
+    ):
+        return
+    raise_for_error(client.get(f"companyinfo/{client.realm_id}"))
+
+
+def _run(realm: Realm, fn: Callable[[QuickBooksClient], Any]) -> RealmResult:
+    try:
+        return RealmResult(realm, fn(realm.client), None)
+    except ToolProviderCredentialValidationError:
+        return RealmResult(realm, None, "Authentication failed; the access token is invalid or expired")
+    except httpx.HTTPError as e:
+        return RealmResult(realm, None, f"Network error: {e}")
+    except Exception as e:
+        return RealmResult(realm, None, str(e))
+
+
+def fan_out(
+    realms: list[Realm], fn: Callable[[QuickBooksClient], Any], max_concurrency: int = DEFAULT_REALM_CONCURRENCY
+) -> list[RealmResult]:
+    """Call ``fn`` with each realm's client concurrently, returning results in realm order.
+
+    Requests still pass through each realm's own governor. A realm that fails reports its error
+    instead of failing the others.
+    """
+    workers = max(1, min(max_concurrency, MAX_REALM_CONCURRENCY, len(realms)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda realm: _run(realm, fn), realms))
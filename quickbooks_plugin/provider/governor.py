@@ -0,0 +1,106 @@
+import email.utils
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable, Hashable
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Intuit allows 500 requests per minute and 10 concurrent requests per company; stay a little below
+RATE_LIMIT = 450
+RATE_WINDOW = 60.0
+MAX_CONCURRENT = 10
+# Retries of a throttled (429) request; it was not processed, so retrying is safe for writes too
+MAX_RETRIES = 3
+_BASE_BACKOFF = 2.0
+_MAX_BACKOFF = 60.0
+_MAX_GOVERNORS = 256
+
+
+def retry_after_seconds(response: httpx.Response) -> float | None:
+    """Parse a Retry-After header given either in seconds or as an HTTP date."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RealmGovernor:
+    """Sliding-window rate limit, concurrency cap and shared 429 back-off for one company."""
+
+    def __init__(self, rate_limit: int = RATE_LIMIT, window: float = RATE_WINDOW, max_concurrent: int = MAX_CONCURRENT):
+        self.rate_limit = rate_limit
+        self.window = window
+        self._lock = threading.Lock()
+        self._sent: deque[float] = deque()
+        self._paused_until = 0.0
+        self._concurrency = threading.BoundedSemaphore(max_concurrent)
+
+    def _reserve(self) -> float:
+        """Take a slot in the window and return 0, or return how long to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            while self._sent and now - self._sent[0] >= self.window:
+                self._sent.popleft()
+            if len(self._sent) < self.rate_limit:
+                self._sent.append(now)
+                return 0.0
+            return self._sent[0] + self.window - now
+
+    def wait_turn(self) -> None:
+        while True:
+            delay = self._reserve()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def back_off(self, delay: float) -> None:
+        """Hold every request for this company for ``delay`` seconds, e.g. after a 429."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    def send(self, send: Callable[[], httpx.Response], max_retries: int = MAX_RETRIES) -> httpx.Response:
+        """Send a request within the limits, retrying throttled responses after the advised delay."""
+        for attempt in range(max_retries + 1):
+            self.wait_turn()
+            with self._concurrency:
+                response = send()
+            if response.status_code != 429 or attempt == max_retries:
+                return response
+            delay = retry_after_seconds(response)
+            if delay is None:
+                delay = min(_BASE_BACKOFF * 2 ** attempt, _MAX_BACKOFF) + random.uniform(0, 1)
+            logger.warning("QuickBooks throttled the request; retrying in %.1fs (attempt %d)", delay, attempt + 1)
+            self.back_off(delay)
+        return response
+
+
+_governors: OrderedDict[Hashable, RealmGovernor] = OrderedDict()
+_governors_lock = threading.Lock()
+
+
+def get_governor(key: Hashable) -> RealmGovernor:
+    """Return the shared governor for a company, creating it on first use."""
+    with _governors_lock:
+        governor = _governors.get(key)
+        if governor is None:
+            governor = RealmGovernor()
+            _governors[key] = governor
+            while len(_governors) > _MAX_GOVERNORS:
+                _governors.popitem(last=False)
+        else:
+            _governors.move_to_end(key)
+        return governor
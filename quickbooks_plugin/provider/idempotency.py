@@ -0,0 +1,235 @@
+import contextlib
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from collections.abc import Iterator, Mapping
+from datetime import UTC, datetime
+from typing import Any, NamedTuple
+
+import httpx
+
+from provider.client import QuickBooksClient
+
+logger = logging.getLogger(__name__)
+
+_POSTED_KEY_PREFIX = "qbo_posted"
+# One ledger key per saved entry, numbered per worker process and day, so workers never share a mutable list
+# and entries can still be expired without listing storage. Each day also lists the workers that saved.
+_LEDGER_KEY_PREFIX = "qbo_posted_ledger"
+_WORKERS_KEY_PREFIX = "qbo_posted_workers"
+_EXPIRY_KEY_PREFIX = "qbo_posted_expiry"
+# Entries are kept long enough to catch re-runs of an import; older ones are deleted as new ones are saved
+POSTED_TTL = 30 * 24 * 60 * 60
+_LEDGER_BUCKET = 24 * 60 * 60
+# Another worker's write can replace the day's worker list; re-read it and add this worker again
+_REGISTER_ATTEMPTS = 5
+
+_WORKER_ID = uuid.uuid4().hex[:16]
+
+_lock = threading.Lock()
+_posting: dict[str, threading.Lock] = {}
+_ledger_lock = threading.Lock()
+# Next ledger number for this worker per (realm, day)
+_ledger_sequence: dict[tuple[str, int], int] = {}
+# Stamped on the entity's PrivateNote so a posted entry can be traced back to its source
+EXTERNAL_ID_LABEL = "External ID"
+# PrivateNote holds at most 4000 characters
+_PRIVATE_NOTE_MAX_LENGTH = 4000
+
+
+class PostedEntry(NamedTuple):
+    entity: str
+    id: str
+    sync_token: str | None
+    posted_at: str
+
+
+def _digest(realm_id: str, entity: str, external_id: str) -> str:
+    return hashlib.sha256(f"{realm_id}:{entity}:{external_id}".encode()).hexdigest()
+
+
+def _posted_key(realm_id: str, entity: str, external_id: str) -> str:
+    return f"{_POSTED_KEY_PREFIX}:{realm_id}:{entity}:{_digest(realm_id, entity, external_id)}"
+
+
+def _ledger_key(realm_id: str, bucket: int, worker: str, number: int) -> str:
+    return f"{_LEDGER_KEY_PREFIX}:{realm_id}:{bucket}:{worker}:{number}"
+
+
+def _workers_key(realm_id: str, bucket: int) -> str:
+    return f"{_WORKERS_KEY_PREFIX}:{realm_id}:{bucket}"
+
+
+def _expiry_key(realm_id: str) -> str:
+    return f"{_EXPIRY_KEY_PREFIX}:{realm_id}"
+
+
+def _load_json(storage: Any, key: str) -> Any:
+    if not storage.exist(key):
+        return None
+    try:
+        return json.loads(storage.get(key))
+    except (TypeError, ValueError):
+        return None
+
+
+def request_id(realm_id: str, entity: str, external_id: str) -> str:
+    """Intuit ``requestid`` for posting ``external_id``; a repeated request ID replays the first response."""
+    return _digest(realm_id, entity, external_id)[:32]
+
+
+def load_posted(storage: Any, realm_id: str, entity: str, external_id: str) -> PostedEntry | None:
+    key = _posted_key(realm_id, entity, external_id)
+    if not storage.exist(key):
+        return None
+    try:
+        stored = json.loads(storage.get(key))
+        entry = PostedEntry(entity, stored["id"], stored.get("sync_token"), stored.get("posted_at", ""))
+    except (KeyError, TypeError, ValueError):
+        return None
+    if _expired(entry.posted_at):
+        # Normally deleted with its ledger; this covers an entry whose ledger write was lost
+        storage.delete(key)
+        return None
+    return entry
+
+
+def _expired(posted_at: str) -> bool:
+    try:
+        return datetime.fromisoformat(posted_at).timestamp() < time.time() - POSTED_TTL
+    except ValueError:
+        return False
+
+
+def save_posted(
+    storage: Any, realm_id: str, entity: str, external_id: str, record: Mapping[str, Any]
+) -> PostedEntry:
+    """Record a posted entity in the index and expire entries older than ``POSTED_TTL``.
+
+    The entity already exists in QuickBooks, so a storage failure is logged rather than raised; a
+    retry is still caught by the ``requestid`` the post carried.
+    """
+    entry = PostedEntry(
+        entity, str(record.get("Id")), record.get("SyncToken"), datetime.now(UTC).isoformat(timespec="seconds")
+    )
+    key = _posted_key(realm_id, entity, external_id)
+    try:
+        storage.set(
+            key, json.dumps({"id": entry.id, "sync_token": entry.sync_token, "posted_at": entry.posted_at}).encode()
+        )
+        now = time.time()
+        _add_to_ledger(storage, realm_id, int(now // _LEDGER_BUCKET), key)
+        expire_posted(storage, realm_id, now)
+    except Exception as e:
+        logger.warning("Could not record %s %s for external ID %s: %s", entity, entry.id, external_id, e)
+    return entry
+
+
+def _add_to_ledger(storage: Any, realm_id: str, bucket: int, key: str) -> None:
+    with _ledger_lock:
+        number = _ledger_sequence.get((realm_id, bucket))
+        if number is None:
+            _register_worker(storage, realm_id, bucket)
+            number = 0
+            # Days this worker no longer writes to need no counter
+            for stale in [k for k in _ledger_sequence if k[0] == realm_id and k[1] < bucket]:
+                del _ledger_sequence[stale]
+        _ledger_sequence[(realm_id, bucket)] = number + 1
+    storage.set(_ledger_key(realm_id, bucket, _WORKER_ID, number), key.encode())
+
+
+def _register_worker(storage: Any, realm_id: str, bucket: int) -> None:
+    """Add this worker to the day's worker list, once per day, checking the write survived."""
+    key = _workers_key(realm_id, bucket)
+    for _ in range(_REGISTER_ATTEMPTS):
+        workers = _load_json(storage, key) or []
+        if _WORKER_ID in workers:
+            return
+        storage.set(key, json.dumps([*workers, _WORKER_ID]).encode())
+    logger.warning("Could not register in the posted index ledger for %s; its entries expire when next read", realm_id)
+
+
+def expire_posted(storage: Any, realm_id: str, now: float | None = None) -> int:
+    """Delete the index entries recorded more than ``POSTED_TTL`` ago, one day at a time.
+
+    Returns the number of entries deleted.
+    """
+    cutoff = int(((now or time.time()) - POSTED_TTL) // _LEDGER_BUCKET)
+    expiry_key = _expiry_key(realm_id)
+    next_bucket = _load_json(storage, expiry_key)
+    if not isinstance(next_bucket, int):
+        # First run: no ledger is older than the cutoff yet
+        storage.set(expiry_key, json.dumps(cutoff).encode())
+        return 0
+    deleted = 0
+    for bucket in range(next_bucket, cutoff):
+        workers_key = _workers_key(realm_id, bucket)
+        for worker in _load_json(storage, workers_key) or []:
+            number = 0
+            while storage.exist(ledger_key := _ledger_key(realm_id, bucket, worker, number)):
+                key = storage.get(ledger_key).decode()
+                if storage.exist(key):
+                    storage.delete(key)
+                    deleted += 1
+                storage.delete(ledger_key)
+                number += 1
+        if storage.exist(workers_key):
+            storage.delete(workers_key)
+        # Saved per day, so a pass cut short resumes where it stopped
+        storage.set(expiry_key, json.dumps(bucket + 1).encode())
+    return deleted
+
+
+def stamp_note(note: str, external_id: str) -> str:
+    """Append the external ID to a PrivateNote, keeping the stamp when the note is long."""
+    stamp = f"{EXTERNAL_ID_LABEL}: {external_id}"
+    if stamp in note:
+        return note
+    if not note:
+        return stamp
+    room = _PRIVATE_NOTE_MAX_LENGTH - len(stamp) - 1
+    return f"{note[:room]}\n{stamp}"
+
+
+@contextlib.contextmanager
+def _single_flight(key: str) -> Iterator[None]:
+    with _lock:
+        posting_lock = _posting.setdefault(key, threading.Lock())
+    try:
+        with posting_lock:
+            yield
+    finally:
+        with _lock:
+            if not posting_lock.locked():
+                _posting.pop(key, None)
+
+
+def post_once(
+    client: QuickBooksClient, storage: Any, entity: str, external_id: str, payload: dict[str, Any]
+) -> PostedEntry | httpx.Response:
+    """Create ``entity`` for ``external_id`` unless it was already posted to this company.
+
+    Returns the stored entry, without calling QuickBooks, when the ID is already in the index.
+    Otherwise posts ``payload`` with the ID stamped on its PrivateNote and returns the response;
+    a successful create is recorded in the index. The request carries a ``requestid`` derived
+    from the ID, so a retry after a create that was never recorded gets the original entity back
+    instead of a duplicate. Concurrent posts of one ID in this process wait for the first.
+    """
+    key = _posted_key(client.realm_id, entity, external_id)
+    with _single_flight(key):
+        posted = load_posted(storage, client.realm_id, entity, external_id)
+        if posted is not None:
+            return posted
+
+        payload = {**payload, "PrivateNote": stamp_note(payload.get("PrivateNote", ""), external_id)}
+        response = client.post(
+            entity.lower(),
+            json=payload,
+            params={"requestid": request_id(client.realm_id, entity, external_id)}
+        )
+        if response.status_code == 200:
+            save_posted(storage, client.realm_id, entity, external_id, response.json().get(entity, {}))
+        return response
@@ -0,0 +1,241 @@
+import csv
+import io
+import re
+from collections.abc import Iterable, Iterator
+from decimal import Decimal, InvalidOperation
+from typing import Any, NamedTuple
+
+from provider.accounts import AccountIndex
+
+# Spreadsheet headers accepted for each field, compared lower-cased with spaces as underscores
+CSV_FIELDS = {
+    "entry_key": ["entry_key", "entry", "entry_id", "journal_entry", "je"],
+    "txn_date": ["txn_date", "date"],
+    "doc_number": ["doc_number", "doc_num", "journal_no", "number"],
+    "private_note": ["private_note", "memo", "note"],
+    "account": ["account", "account_name"],
+    "account_id": ["account_id"],
+    "debit": ["debit"],
+    "credit": ["credit"],
+    "description": ["description", "line_description"],
+    "class_id": ["class_id"],
+    "department_id": ["department_id", "location_id"]
+}
+# Entry-level fields; every line of an entry must agree on them
+_ENTRY_FIELDS = ["txn_date", "doc_number", "private_note"]
+MAX_IMPORT_LINES = 20000
+# QuickBooks DocNumber holds at most 21 characters
+_DOC_NUMBER_MAX_LENGTH = 21
+_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_CENT = Decimal("0.01")
+
+
+class JournalLine(NamedTuple):
+    row: int
+    posting_type: str
+    amount: Decimal
+    account: str
+    account_id: str
+    description: str
+    class_id: str
+    department_id: str
+
+
+class EntryDraft:
+    """Lines sharing one entry key, with the running debit and credit totals and any problems found."""
+
+    def __init__(self, key: str, row: int):
+        self.key = key
+        self.first_row = row
+        self.fields: dict[str, str] = {}
+        self.lines: list[JournalLine] = []
+        self.debits = Decimal(0)
+        self.credits = Decimal(0)
+        self.errors: list[str] = []
+
+    def add(self, line: JournalLine, fields: dict[str, str]) -> None:
+        for name in _ENTRY_FIELDS:
+            value = fields.get(name, "")
+            if not value:
+                continue
+            if self.fields.setdefault(name, value) != value:
+                self.errors.append(f"Row {line.row}: {name} '{value}' differs from '{self.fields[name]}'")
+        self.lines.append(line)
+        if line.posting_type == "Debit":
+            self.debits += line.amount
+        else:
+            self.credits += line.amount
+
+    def check(self) -> None:
+        """Record entry-level problems: too few lines, unbalanced totals, bad header fields."""
+        if len(self.lines) < 2:
+            self.errors.append("A journal entry needs at least 2 lines")
+        if self.debits != self.credits:
+            self.errors.append(f"Debits ({self.debits}) do not equal credits ({self.credits})")
+        txn_date = self.fields.get("txn_date", "")
+        if txn_date and not _DATE.match(txn_date):
+            self.errors.append(f"txn_date '{txn_date}' is not YYYY-MM-DD")
+        if len(self.fields.get("doc_number", "")) > _DOC_NUMBER_MAX_LENGTH:
+            self.errors.append(f"doc_number is longer than {_DOC_NUMBER_MAX_LENGTH} characters")
+
+
+def _header_map(header: list[str]) -> dict[str, int]:
+    positions: dict[str, int] = {}
+    normalized = [re.sub(r"\s+", "_", name.strip().lower()) for name in header]
+    for field, aliases in CSV_FIELDS.items():
+        for alias in aliases:
+            if alias in normalized:
+                positions[field] = normalized.index(alias)
+                break
+    missing = [f for f in ("entry_key", "debit", "credit") if f not in positions]
+    if "account" not in positions and "account_id" not in positions:
+        missing.append("account or account_id")
+    if missing:
+        raise ValueError(f"CSV is missing column(s): {', '.join(missing)}")
+    return positions
+
+
+def _amount(value: str) -> Decimal | None:
+    cleaned = value.replace(",", "").replace("$", "").strip()
+    if not cleaned:
+        return None
+    amount = Decimal(cleaned)
+    # NaN and Infinity parse, but cannot be compared or rounded to cents
+    if not amount.is_finite():
+        raise InvalidOperation(cleaned)
+    return amount
+
+
+def _parse_line(row: int, fields: dict[str, str]) -> tuple[JournalLine | None, str | None]:
+    try:
+        debit = _amount(fields.get("debit", ""))
+        credit = _amount(fields.get("credit", ""))
+    except InvalidOperation:
+        return None, f"Row {row}: debit and credit must be numbers"
+    if (debit is None) == (credit is None):
+        return None, f"Row {row}: give exactly one of debit or credit"
+    amount = debit if debit is not None else credit
+    if amount <= 0:
+        return None, f"Row {row}: amounts must be positive; use the other column for reversals"
+    try:
+        # Quantizing a number too large for the decimal context (1e400) raises too
+        rounded = amount.quantize(_CENT)
+    except InvalidOperation:
+        return None, f"Row {row}: amount {amount} is too large"
+    if amount != rounded:
+        return None, f"Row {row}: amounts can have at most 2 decimal places"
+    if not fields.get("account") and not fields.get("account_id"):
+        return None, f"Row {row}: account or account_id is required"
+    return JournalLine(
+        row,
+        "Debit" if debit is not None else "Credit",
+        amount,
+        fields.get("account", ""),
+        fields.get("account_id", ""),
+        fields.get("description", ""),
+        fields.get("class_id", ""),
+        fields.get("department_id", "")
+    ), None
+
+
+def csv_lines(source: Any) -> Iterator[str]:
+    """Iterate the text lines of an uploaded CSV file or pasted CSV text, dropping any UTF-8 BOM."""
+    if isinstance(source, str):
+        return iter(io.StringIO(source.lstrip("\ufeff"), newline=""))
+    if isinstance(source, dict):
+        data = source.get("data", b"")
+    else:
+        data = getattr(source, "blob", source)
+    if not isinstance(data, bytes | bytearray):
+        raise ValueError("csv_file could not be read; upload a .csv file")
+    return iter(io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", newline=""))
+
+
+def parse_journal_csv(lines: Iterable[str]) -> list[EntryDraft]:
+    """Read journal lines row by row and group them by entry key, in first-seen order.
+
+    Totals are summed per entry as rows arrive, in exact decimal cents, so balance checks need no
+    second pass. Problems are recorded on the entry they belong to rather than raised.
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if not header:
+        raise ValueError("CSV is empty")
+    positions = _header_map(header)
+
+    drafts: dict[str, EntryDraft] = {}
+    line_count = 0
+    for row, values in enumerate(reader, start=2):
+        if not any(value.strip() for value in values):
+            continue
+        line_count += 1
+        if line_count > MAX_IMPORT_LINES:
+            raise ValueError(f"CSV has more than {MAX_IMPORT_LINES} lines; split it into smaller files")
+        fields = {f: values[i].strip() for f, i in positions.items() if i < len(values)}
+        key = fields.get("entry_key", "")
+        if not key:
+            raise ValueError(f"Row {row}: entry_key is required")
+        draft = drafts.get(key)
+        if draft is None:
+            draft = drafts[key] = EntryDraft(key, row)
+        line, error = _parse_line(row, fields)
+        if error:
+            draft.errors.append(error)
+        else:
+            draft.add(line, fields)
+
+    for draft in drafts.values():
+        draft.check()
+    return list(drafts.values())
+
+
+def resolve_accounts(drafts: Iterable[EntryDraft], index: AccountIndex) -> dict[int, str]:
+    """Map each line's row to an active account ID, recording unknown or ambiguous accounts as errors."""
+    resolved: dict[int, str] = {}
+    for draft in drafts:
+        for line in draft.lines:
+            if line.account_id:
+                if str(line.account_id) in index.by_id:
+                    resolved[line.row] = str(line.account_id)
+                else:
+                    draft.errors.append(f"Row {line.row}: account_id {line.account_id} is unknown or inactive")
+                continue
+            matches = index.find_by_name(line.account)
+            if len(matches) == 1:
+                resolved[line.row] = str(matches[0].get("Id"))
+            elif not matches:
+                draft.errors.append(f"Row {line.row}: no active account named '{line.account}'")
+            else:
+                names = ", ".join(acc.get("FullyQualifiedName") or acc.get("Name", "") for acc in matches)
+                draft.errors.append(f"Row {line.row}: account '{line.account}' is ambiguous ({names})")
+    return resolved
+
+
+def build_journal_entry(draft: EntryDraft, account_ids: dict[int, str]) -> dict[str, Any]:
+    lines = []
+    for line in draft.lines:
+        detail: dict[str, Any] = {
+            "PostingType": line.posting_type,
+            "AccountRef": {"value": account_ids[line.row]}
+        }
+        if line.class_id:
+            detail["ClassRef"] = {"value": line.class_id}
+        if line.department_id:
+            detail["DepartmentRef"] = {"value": line.department_id}
+        entry_line: dict[str, Any] = {
+            "DetailType": "JournalEntryLineDetail",
+            "Amount": float(line.amount),
+            "JournalEntryLineDetail": detail
+        }
+        if line.description:
+            entry_line["Description"] = line.description
+        lines.append(entry_line)
+
+    payload: dict[str, Any] = {"Line": lines}
+    if draft.fields.get("txn_date"):
+        payload["TxnDate"] = draft.fields["txn_date"]
+    if draft.fields.get("doc_number"):
+        payload["DocNumber"] = draft.fields["doc_number"]
+    if draft.fields.get("private_note"):
+        payload["PrivateNote"] = draft.fields["private_note"]
+    return payload
@@ -0,0 +1,369 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+from datetime import UTC, datetime, timedelta
+from typing import Any, NamedTuple
+
+from provider.cdc import (
+    CDC_ENTITIES,
+    CDC_MAX_LOOKBACK,
+    NAME_LIST_ENTITIES,
+    add_change_listener,
+    advance_watermark,
+    fetch_changes
+)
+from provider.client import QuickBooksClient
+from provider.pagination import iter_query_pages
+from provider.query_parser import Condition, parse_query
+
+logger = logging.getLogger(__name__)
+
+MIRROR_PATH_ENV = "QUICKBOOKS_MIRROR_PATH"
+
+# QuickBooks defaults to 100 rows per query and never returns more than 1000
+_DEFAULT_MAX_RESULTS = 100
+_MAX_RESULTS_LIMIT = 1000
+
+# Filter fields stored in their own indexed columns. Each column holds exactly that property, so a filter
+# on VendorRef never matches a purchase that only names its payee through EntityRef.
+_INDEXED_FIELDS = {
+    "Id": "id",
+    "TxnDate": "txn_date",
+    "DocNumber": "doc_number",
+    "VendorRef": "vendor_ref",
+    "EntityRef": "entity_ref",
+    "AccountRef": "account_ref"
+}
+
+# Line properties are arrays; QuickBooks does not filter on them and json_extract cannot either
+_UNFILTERABLE_FIELDS = frozenset({"Line"})
+
+# Bumped whenever the layout of the records table changes; older mirrors are rebuilt from QuickBooks
+_SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    realm_id TEXT NOT NULL,
+    entity TEXT NOT NULL,
+    id TEXT NOT NULL,
+    txn_date TEXT,
+    doc_number TEXT,
+    vendor_ref TEXT,
+    entity_ref TEXT,
+    account_ref TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (realm_id, entity, id)
+);
+CREATE INDEX IF NOT EXISTS records_txn_date ON records (realm_id, entity, txn_date);
+CREATE INDEX IF NOT EXISTS records_doc_number ON records (realm_id, entity, doc_number);
+CREATE INDEX IF NOT EXISTS records_vendor_ref ON records (realm_id, entity, vendor_ref);
+CREATE INDEX IF NOT EXISTS records_entity_ref ON records (realm_id, entity, entity_ref);
+CREATE INDEX IF NOT EXISTS records_account_ref ON records (realm_id, entity, account_ref);
+CREATE TABLE IF NOT EXISTS sync_state (
+    realm_id TEXT NOT NULL,
+    entity TEXT NOT NULL,
+    watermark TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (realm_id, entity)
+);
+"""
+
+class MirrorResult(NamedTuple):
+    entity: str
+    rows: list[dict[str, Any]]
+    # Set for COUNT(*) queries
+    total_count: int | None
+    # Unix time the mirror last caught up with QuickBooks for this entity
+    synced_at: float
+
+
+class _Query(NamedTuple):
+    entity: str
+    fields: list[str] | None
+    count: bool
+    where: list[str]
+    params: list[Any]
+    order_by: str
+    offset: int
+    limit: int | None
+
+
+def _ref_value(record: dict[str, Any], name: str) -> str | None:
+    ref = record.get(name)
+    if isinstance(ref, dict) and ref.get("value") is not None:
+        return str(ref["value"])
+    return None
+
+
+def _row(realm_id: str, entity: str, record: dict[str, Any]) -> tuple[Any, ...]:
+    return (
+        realm_id,
+        entity,
+        str(record.get("Id")),
+        record.get("TxnDate"),
+        record.get("DocNumber"),
+        _ref_value(record, "VendorRef"),
+        _ref_value(record, "EntityRef"),
+        _ref_value(record, "AccountRef"),
+        json.dumps(record)
+    )
+
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_RANGE_OPERATORS = frozenset({"<", ">", "<=", ">="})
+
+
+def _sql_value(value: Any) -> Any:
+    # JSON booleans come back from json_extract as 1 and 0
+    return int(value) if isinstance(value, bool) else value
+
+
+def _number(value: Any) -> int | float | None:
+    """The numeric value of a literal, quoted or not; None for anything else."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int | float):
+        return value
+    if isinstance(value, str) and _NUMBER.fullmatch(value.strip()):
+        text = value.strip()
+        return float(text) if "." in text else int(text)
+    return None
+
+
+def _column(field: str) -> str:
+    if field in _INDEXED_FIELDS:
+        return _INDEXED_FIELDS[field]
+    path = field
+    if field.rsplit(".", 1)[-1].endswith("Ref"):
+        path += ".value"
+    return f"json_extract(data, '$.{path}')"
+
+
+def _condition(condition: Condition) -> tuple[str, list[Any]]:
+    """SQL for one condition and its parameters.
+
+    SQLite orders every number before every string, so a quoted number such as ``Balance > '0'`` must not be
+    bound as TEXT against a numeric JSON value. The type of a JSON property is only known per row, hence
+    the ``typeof`` switch: numbers compare numerically and strings keep QuickBooks' string comparison.
+    """
+    op = "!=" if condition.op == "<>" else condition.op
+    values = list(condition.value) if op == "IN" else [condition.value]
+    numbers = [_number(value) for value in values]
+    placeholder = f"({', '.join('?' * len(values))})" if op == "IN" else "?"
+
+    if condition.field == "Id":
+        # Ids are numeric strings; ranges over them compare as numbers, equality as the stored text
+        if op in _RANGE_OPERATORS and numbers[0] is not None:
+            return f"CAST(id AS INTEGER) {op} ?", numbers
+        return f"id {op} {placeholder}", [str(_sql_value(value)) for value in values]
+
+    column = _column(condition.field)
+    if condition.field in _INDEXED_FIELDS or op == "LIKE" or None in numbers:
+        return f"{column} {op} {placeholder}", [_sql_value(value) for value in values]
+    return (
+        f"CASE WHEN typeof({column}) IN ('integer', 'real') THEN {column} {op} {placeholder} "
+        f"ELSE {column} {op} {placeholder} END",
+        [*numbers, *(str(value) for value in values)]
+    )
+
+
+def _parse_query(query: str, unlimited: bool) -> _Query | None:
+    """Translate a QuickBooks query into SQL fragments, or None if it needs features the mirror lacks."""
+    try:
+        parsed = parse_query(query)
+    except ValueError:
+        return None
+    if parsed.uses_or or len(parsed.order_by) > 1:
+        return None
+    if any(condition.field.split(".")[0] in _UNFILTERABLE_FIELDS for condition in parsed.conditions):
+        return None
+
+    where: list[str] = []
+    params: list[Any] = []
+    for condition in parsed.conditions:
+        sql, values = _condition(condition)
+        where.append(sql)
+        params.extend(values)
+
+    filters_active = any(condition.field == "Active" for condition in parsed.conditions)
+    if parsed.entity in NAME_LIST_ENTITIES and not filters_active:
+        where.append("COALESCE(json_extract(data, '$.Active'), 1) = 1")
+
+    # Ids are numeric strings; order them as numbers like QuickBooks does
+    order_by = "CAST(id AS INTEGER)"
+    if parsed.order_by:
+        order_field, direction = parsed.order_by[0]
+        column = order_by if order_field == "Id" else _column(order_field)
+        order_by = f"{column} {direction}"
+
+    max_results = _DEFAULT_MAX_RESULTS if parsed.max_results is None else parsed.max_results
+    limit: int | None = min(max_results, _MAX_RESULTS_LIMIT)
+    if unlimited:
+        limit = None
+    offset = max(parsed.start_position or 1, 1) - 1
+    fields = list(parsed.fields) or None
+    return _Query(parsed.entity, fields, parsed.count, where, params, order_by, offset, limit)
+
+
+def _project(record: dict[str, Any], fields: list[str]) -> dict[str, Any]:
+    """Keep the selected top-level properties, as QuickBooks does for ``SELECT a, b``."""
+    keys = {field.split(".")[0] for field in fields} | {"Id", "SyncToken", "domain", "sparse"}
+    return {key: value for key, value in record.items() if key in keys}
+
+
+def _set_sync_state(conn: sqlite3.Connection, realm_id: str, entity: str, watermark: str, synced_at: float) -> None:
+    conn.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?)", (realm_id, entity, watermark, synced_at))
+
+
+class EntityMirror:
+    """SQLite copy of QuickBooks entities, refreshed through Change Data Capture.
+
+    Each (realm, entity) is loaded in full on first use and then caught up incrementally whenever a
+    query needs fresher data than the mirror holds. Refreshes for the same entity are single-flight.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._refreshing: dict[tuple[str, str], threading.Lock] = {}
+        with self._connect() as conn:
+            (version,) = conn.execute("PRAGMA user_version").fetchone()
+            if version != _SCHEMA_VERSION:
+                conn.executescript("DROP TABLE IF EXISTS records; DROP TABLE IF EXISTS sync_state;")
+            conn.executescript(_SCHEMA)
+            conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _synced_at(self, realm_id: str, entity: str) -> tuple[str, float] | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT watermark, synced_at FROM sync_state WHERE realm_id = ? AND entity = ?", (realm_id, entity)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def upsert(self, realm_id: str, entity: str, records: Iterable[dict[str, Any]]) -> None:
+        """Store changed records and drop deleted ones."""
+        upserts = []
+        deletes = []
+        for record in records:
+            if record.get("status") == "Deleted":
+                deletes.append((realm_id, entity, str(record.get("Id"))))
+            else:
+                upserts.append(_row(realm_id, entity, record))
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", upserts)
+            conn.executemany("DELETE FROM records WHERE realm_id = ? AND entity = ? AND id = ?", deletes)
+
+    def _mark_synced(self, realm_id: str, entity: str, watermark: str, synced_at: float) -> None:
+        with self._connect() as conn:
+            _set_sync_state(conn, realm_id, entity, watermark, synced_at)
+
+    def _load(self, client: QuickBooksClient, entity: str) -> None:
+        started = time.time()
+        # Changes made while the load runs are picked up by the next CDC refresh
+        watermark = (datetime.now(UTC) - timedelta(minutes=1)).isoformat(timespec="seconds")
+        logger.info("Loading %s for realm %s into the local mirror", entity, client.realm_id)
+        query = f"SELECT * FROM {entity}"
+        if entity in NAME_LIST_ENTITIES:
+            query += " WHERE Active IN (true, false)"
+        # Fetch everything before touching the table so readers never see a half-loaded entity
+        rows = []
+        for page in iter_query_pages(client, query):
+            rows.extend(_row(client.realm_id, entity, record) for record in page.rows)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM records WHERE realm_id = ? AND entity = ?", (client.realm_id, entity))
+            conn.executemany("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            _set_sync_state(conn, client.realm_id, entity, watermark, started)
+
+    def _catch_up(self, client: QuickBooksClient, entity: str, watermark: str) -> None:
+        started = time.time()
+        while True:
+            server_time, changes = fetch_changes(client, [entity], watermark)
+            objects, watermark, truncated = advance_watermark(
+                client, entity, changes.get(entity, []), watermark, server_time
+            )
+            self.upsert(client.realm_id, entity, objects)
+            if not truncated:
+                break
+        self._mark_synced(client.realm_id, entity, watermark, started)
+
+    def refresh(self, client: QuickBooksClient, entity: str, max_staleness: float) -> float:
+        """Bring an entity to within ``max_staleness`` seconds of QuickBooks and return its sync time."""
+        key = (client.realm_id, entity)
+        with self._lock:
+            refresh_lock = self._refreshing.setdefault(key, threading.Lock())
+        with refresh_lock:
+            state = self._synced_at(client.realm_id, entity)
+            if state and time.time() - state[1] <= max_staleness:
+                return state[1]
+
+            oldest = datetime.now(UTC) - CDC_MAX_LOOKBACK + timedelta(minutes=5)
+            if state and datetime.fromisoformat(state[0].replace("Z", "+00:00")) > oldest:
+                self._catch_up(client, entity, state[0])
+            else:
+                self._load(client, entity)
+            return self._synced_at(client.realm_id, entity)[1]
+
+    def query(
+        self, client: QuickBooksClient, query: str, max_staleness: float, unlimited: bool = False
+    ) -> MirrorResult | None:
+        """Answer a read-only query from the mirror, refreshing it first if it is too stale.
+
+        Returns None when the query uses something the mirror cannot evaluate or the entity is not
+        tracked by Change Data Capture; callers should then send the query to QuickBooks.
+        """
+        parsed = _parse_query(query, unlimited)
+        if parsed is None or parsed.entity not in CDC_ENTITIES:
+            return None
+
+        synced_at = self.refresh(client, parsed.entity, max_staleness)
+
+        where = " AND ".join(["realm_id = ?", "entity = ?", *parsed.where])
+        params = [client.realm_id, parsed.entity, *parsed.params]
+        with self._connect() as conn:
+            if parsed.count:
+                (total,) = conn.execute(f"SELECT COUNT(*) FROM records WHERE {where}", params).fetchone()
+                return MirrorResult(parsed.entity, [], total, synced_at)
+            sql = f"SELECT data FROM records WHERE {where} ORDER BY {parsed.order_by} LIMIT ? OFFSET ?"
+            rows = conn.execute(sql, [*params, -1 if parsed.limit is None else parsed.limit, parsed.offset])
+            records = [json.loads(data) for (data,) in rows]
+
+        if parsed.fields:
+            records = [_project(record, parsed.fields) for record in records]
+        return MirrorResult(parsed.entity, records, None, synced_at)
+
+    def apply_changes(self, realm_id: str, entity: str, objects: list[dict[str, Any]]) -> None:
+        """CDC change listener: fold changes seen by other tools into already mirrored entities."""
+        with self._connect() as conn:
+            mirrored = conn.execute(
+                "SELECT 1 FROM sync_state WHERE realm_id = ? AND entity = ?", (realm_id, entity)
+            ).fetchone()
+        if mirrored:
+            self.upsert(realm_id, entity, objects)
+
+
+_mirrors: dict[str, EntityMirror] = {}
+_mirrors_lock = threading.Lock()
+
+
+def get_mirror() -> EntityMirror | None:
+    """Return the process-wide mirror if ``QUICKBOOKS_MIRROR_PATH`` is set."""
+    path = os.environ.get(MIRROR_PATH_ENV, "").strip()
+    if not path:
+        return None
+    with _mirrors_lock:
+        mirror = _mirrors.get(path)
+        if mirror is None:
+            mirror = EntityMirror(path)
+            _mirrors[path] = mirror
+            add_change_listener(mirror.apply_changes)
+        return mirror
@@ -0,0 +1,243 @@
+import threading
+import time
+from collections.abc import Iterable, Sequence
+from decimal import Decimal
+from typing import Any, NamedTuple
+
+from provider.cdc import add_change_listener
+from provider.client import QuickBooksClient
+from provider.pagination import iter_query_pages
+from provider.query_parser import Condition, Query
+
+# Balances move with every payment, so open invoices are kept for less time than reference lists
+OPEN_INVOICE_CACHE_TTL = 300
+ALLOCATION_STRATEGIES = ["oldest_first", "exact_match"]
+# Bound on the distinct partial sums explored when looking for an exact match
+_MAX_SUBSET_STATES = 1000000
+CENT = Decimal("0.01")
+
+
+class OpenInvoice(NamedTuple):
+    id: str
+    doc_number: str | None
+    txn_date: str
+    due_date: str
+    balance: Decimal
+
+
+class Allocation(NamedTuple):
+    invoice: OpenInvoice
+    amount: Decimal
+
+
+def _open_invoice(row: dict[str, Any]) -> OpenInvoice:
+    txn_date = row.get("TxnDate") or ""
+    return OpenInvoice(
+        str(row.get("Id")),
+        row.get("DocNumber"),
+        txn_date,
+        row.get("DueDate") or txn_date,
+        Decimal(str(row.get("Balance") or 0)).quantize(CENT)
+    )
+
+
+def _age_key(invoice: OpenInvoice) -> tuple[str, str, int, str]:
+    return invoice.due_date, invoice.txn_date, int(invoice.id) if invoice.id.isdigit() else 0, invoice.id
+
+
+class OpenInvoiceIndex:
+    """Immutable view of one customer's open invoices, oldest due date first, indexed by ID and DocNumber."""
+
+    def __init__(self, invoices: Iterable[OpenInvoice]):
+        self.invoices = sorted((inv for inv in invoices if inv.balance > 0), key=_age_key)
+        self.by_id = {inv.id: inv for inv in self.invoices}
+        self.by_doc_number: dict[str, list[OpenInvoice]] = {}
+        for inv in self.invoices:
+            if inv.doc_number:
+                self.by_doc_number.setdefault(inv.doc_number, []).append(inv)
+
+    @property
+    def total_balance(self) -> Decimal:
+        return sum((inv.balance for inv in self.invoices), Decimal(0))
+
+    def select(self, refs: Sequence[str]) -> list[OpenInvoice]:
+        """Return the open invoices named by ``refs`` (IDs or invoice numbers), oldest first."""
+        selected: dict[str, OpenInvoice] = {}
+        for ref in refs:
+            invoice = self.by_id.get(ref)
+            matches = [invoice] if invoice else self.by_doc_number.get(ref, [])
+            if not matches:
+                raise ValueError(f"Invoice '{ref}' is not an open invoice of this customer")
+            if len(matches) > 1:
+                raise ValueError(f"Invoice number '{ref}' matches several open invoices; use the invoice ID")
+            selected[matches[0].id] = matches[0]
+        return sorted(selected.values(), key=_age_key)
+
+    def patched(self, rows: Iterable[dict[str, Any]]) -> "OpenInvoiceIndex":
+        """Return a new index with changed invoices applied; paid or deleted invoices drop out."""
+        current = dict(self.by_id)
+        for row in rows:
+            if row.get("status") == "Deleted":
+                current.pop(str(row.get("Id")), None)
+            else:
+                current[str(row.get("Id"))] = _open_invoice(row)
+        return OpenInvoiceIndex(current.values())
+
+    def applied(self, allocations: Iterable[Allocation]) -> "OpenInvoiceIndex":
+        """Return a new index with ``allocations`` deducted from the invoice balances."""
+        current = dict(self.by_id)
+        for allocation in allocations:
+            invoice = current.get(allocation.invoice.id)
+            if invoice is not None:
+                current[invoice.id] = invoice._replace(balance=invoice.balance - allocation.amount)
+        return OpenInvoiceIndex(current.values())
+
+
+def allocate_oldest_first(invoices: Sequence[OpenInvoice], amount: Decimal) -> list[Allocation]:
+    """Pay invoices in order until ``amount`` runs out; the last one may be paid in part."""
+    allocations = []
+    remaining = amount
+    for invoice in invoices:
+        if remaining <= 0:
+            break
+        applied = min(invoice.balance, remaining)
+        allocations.append(Allocation(invoice, applied))
+        remaining -= applied
+    return allocations
+
+
+def allocate_exact(invoices: Sequence[OpenInvoice], amount: Decimal) -> list[Allocation]:
+    """Pay in full the invoices whose balances add up to exactly ``amount``.
+
+    An invoice whose balance equals the amount wins, then a run of the oldest invoices. Otherwise the
+    combination found first is used; invoices are tried oldest first, so older invoices are preferred.
+    """
+    for invoice in invoices:
+        if invoice.balance == amount:
+            return [Allocation(invoice, invoice.balance)]
+    running = Decimal(0)
+    for count, invoice in enumerate(invoices, 1):
+        running += invoice.balance
+        if running == amount:
+            return [Allocation(inv, inv.balance) for inv in invoices[:count]]
+
+    target = int(amount / CENT)
+    # Each reachable sum (in cents) maps to the previous sum and the invoice added to reach it
+    reachable: dict[int, tuple[int, int]] = {0: (0, -1)}
+    for position, invoice in enumerate(invoices):
+        cents = int(invoice.balance / CENT)
+        for total in list(reachable):
+            combined = total + cents
+            if combined > target or combined in reachable:
+                continue
+            reachable[combined] = (total, position)
+            if combined == target:
+                chosen = []
+                while combined:
+                    combined, index = reachable[combined]
+                    chosen.append(invoices[index])
+                return [Allocation(inv, inv.balance) for inv in sorted(chosen, key=_age_key)]
+        if len(reachable) > _MAX_SUBSET_STATES:
+            raise ValueError(
+                "Too many open invoices to search for an exact match; choose them with invoice_ids "
+                "or use the oldest_first allocation"
+            )
+    raise ValueError(f"No combination of the {len(invoices)} open invoices adds up to exactly {amount}")
+
+
+def allocate(invoices: Sequence[OpenInvoice], amount: Decimal, strategy: str) -> list[Allocation]:
+    if strategy == "oldest_first":
+        return allocate_oldest_first(invoices, amount)
+    if strategy == "exact_match":
+        return allocate_exact(invoices, amount)
+    raise ValueError(f"Unknown allocation '{strategy}'. Supported: {', '.join(ALLOCATION_STRATEGIES)}")
+
+
+def _open_invoice_query(customer_id: str) -> str:
+    conditions = Condition("CustomerRef", "=", customer_id), Condition("Balance", ">", "0")
+    return Query("Invoice").where(*conditions).render()
+
+
+class OpenInvoiceCache:
+    """Per-customer open invoice indexes with a TTL.
+
+    Concurrent callers for the same customer wait on a single in-flight load. Invoice changes seen by
+    a CDC sync are applied to cached indexes; a changed payment drops its customer's index, since the
+    balances it touched are not in the payment itself.
+    """
+
+    def __init__(self, ttl: float = OPEN_INVOICE_CACHE_TTL):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, str, str], tuple[float, OpenInvoiceIndex]] = {}
+        self._inflight: dict[tuple[str, str, str], threading.Lock] = {}
+
+    def _cached(self, key: tuple[str, str, str]) -> OpenInvoiceIndex | None:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[0] < self._ttl:
+            return entry[1]
+        return None
+
+    def get(self, client: QuickBooksClient, customer_id: str, refresh: bool = False) -> OpenInvoiceIndex:
+        """Return the customer's open invoices, querying QuickBooks if they are stale or missing."""
+        key = (client.realm_id, client.environment, customer_id)
+        if not refresh:
+            cached = self._cached(key)
+            if cached is not None:
+                return cached
+
+        with self._lock:
+            load_lock = self._inflight.setdefault(key, threading.Lock())
+        with load_lock:
+            if not refresh:
+                cached = self._cached(key)
+                if cached is not None:
+                    return cached
+            loaded_at = time.monotonic()
+            pages = iter_query_pages(client, _open_invoice_query(customer_id))
+            index = OpenInvoiceIndex(_open_invoice(row) for page in pages for row in page.rows)
+            with self._lock:
+                self._entries[key] = (loaded_at, index)
+            return index
+
+    def record_payment(self, client: QuickBooksClient, customer_id: str, allocations: list[Allocation]) -> None:
+        """Deduct a payment created through this plugin from the cached balances."""
+        key = (client.realm_id, client.environment, customer_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (entry[0], entry[1].applied(allocations))
+
+    def invalidate(self, realm_id: str, customer_id: str | None = None) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == realm_id and customer_id in (None, key[2])]:
+                del self._entries[key]
+
+    def apply_changes(self, realm_id: str, entity: str, objects: list[dict[str, Any]]) -> None:
+        """CDC change listener: patch invoices into cached indexes and drop indexes a payment touched."""
+        if entity == "Payment":
+            customers = {(obj.get("CustomerRef") or {}).get("value") for obj in objects}
+            for customer_id in customers:
+                # A deleted payment carries no customer, so every customer's balances may have moved
+                self.invalidate(realm_id, str(customer_id) if customer_id else None)
+            return
+        if entity != "Invoice" or not objects:
+            return
+        with self._lock:
+            for key, (loaded_at, index) in list(self._entries.items()):
+                if key[0] != realm_id:
+                    continue
+                rows = []
+                for obj in objects:
+                    if (obj.get("CustomerRef") or {}).get("value") == key[2]:
+                        rows.append(obj)
+                    elif str(obj.get("Id")) in index.by_id:
+                        # Deleted, or moved to another customer
+                        rows.append({"Id": obj.get("Id"), "status": "Deleted"})
+                if rows:
+                    self._entries[key] = (loaded_at, index.patched(rows))
+
+
+open_invoice_cache = OpenInvoiceCache()
+add_change_listener(open_invoice_cache.apply_changes)
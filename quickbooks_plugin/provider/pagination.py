@@ -0,0 +1,198 @@
+import queue
+import threading
+from collections import deque
+from collections.abc import Iterator, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any, NamedTuple
+
+from provider.client import QuickBooksClient, raise_for_error
+from provider.query_parser import Condition, parse_query
+
+# QuickBooks returns at most 1000 rows per query page
+MAX_PAGE_SIZE = 1000
+DEFAULT_PAGE_CONCURRENCY = 4
+# Date-sharded queries scan a quarter per window by default
+DEFAULT_SHARD_DAYS = 90
+
+_RESPONSE_META = ("startPosition", "maxResults", "totalCount")
+
+# Marks the end of one window's pages in a sharded query
+_WINDOW_DONE = object()
+
+
+class QueryPage(NamedTuple):
+    start_position: int
+    entity: str | None
+    rows: list[dict[str, Any]]
+    # (first, last) TxnDate of the window this page belongs to in sharded queries
+    shard: tuple[str, str] | None = None
+
+
+def strip_paging(query: str) -> str:
+    """Remove STARTPOSITION and MAXRESULTS clauses so paging can be applied."""
+    return parse_query(query).without_paging().render()
+
+
+def page_query(query: str, start_position: int, page_size: int) -> str:
+    return parse_query(query).paged(start_position, page_size).render()
+
+
+def count_query(query: str) -> str:
+    """Turn a SELECT query into the matching COUNT(*) query."""
+    return parse_query(query).counting().render()
+
+
+def add_condition(query: str, *conditions: Condition) -> str:
+    """AND conditions into a query's WHERE clause, dropping any paging."""
+    return parse_query(query).without_paging().where(*conditions).render()
+
+
+def date_windows(start: date, end: date, days: int) -> list[tuple[date, date]]:
+    """Split the inclusive range ``start``..``end`` into consecutive windows of ``days`` days."""
+    if end < start:
+        raise ValueError("date_to must not be before date_from")
+    days = max(1, days)
+    windows = []
+    while start <= end:
+        window_end = min(start + timedelta(days=days - 1), end)
+        windows.append((start, window_end))
+        start = window_end + timedelta(days=1)
+    return windows
+
+
+def extract_rows(query_response: dict[str, Any]) -> tuple[str | None, list[dict[str, Any]]]:
+    """Find the entity key and rows in a QueryResponse."""
+    for key, value in query_response.items():
+        if key not in _RESPONSE_META:
+            return key, value
+    return None, []
+
+
+def _fetch_page(client: QuickBooksClient, query: str, start_position: int, page_size: int) -> QueryPage:
+    response = client.query(page_query(query, start_position, page_size))
+    raise_for_error(response)
+    entity, rows = extract_rows(response.json().get("QueryResponse", {}))
+    return QueryPage(start_position, entity, rows)
+
+
+def fetch_total_count(client: QuickBooksClient, query: str) -> int:
+    response = client.query(count_query(query))
+    raise_for_error(response)
+    return int(response.json().get("QueryResponse", {}).get("totalCount", 0))
+
+
+def iter_query_pages(
+    client: QuickBooksClient,
+    query: str,
+    page_size: int = MAX_PAGE_SIZE,
+    limit: int | None = None,
+    concurrency: int = 1
+) -> Iterator[QueryPage]:
+    """Yield query results page by page until the data or ``limit`` rows run out.
+
+    With ``concurrency`` above 1 a COUNT query sizes the result first and the remaining pages are
+    fetched in parallel; pages are still yielded in order.
+    """
+    query = strip_paging(query)
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+
+    if concurrency > 1:
+        total = fetch_total_count(client, query)
+        if limit:
+            total = min(total, limit)
+        starts = list(range(1, total + 1, page_size))
+
+        def fetch(start: int) -> QueryPage:
+            return _fetch_page(client, query, start, min(page_size, total - start + 1))
+
+        # Keep only a small window of pages in flight so memory stays bounded on large pulls
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending: deque[Future[QueryPage]] = deque()
+            for start in starts:
+                pending.append(executor.submit(fetch, start))
+                if len(pending) >= concurrency * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        return
+
+    start_position = 1
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        page = _fetch_page(client, query, start_position, size)
+        if page.rows:
+            yield page
+        if len(page.rows) < size:
+            return
+        start_position += len(page.rows)
+        if remaining is not None:
+            remaining -= len(page.rows)
+
+
+def iter_sharded_pages(
+    client: QuickBooksClient,
+    query: str,
+    windows: Sequence[tuple[date, date]],
+    *,
+    field: str = "TxnDate",
+    limit: int | None = None,
+    concurrency: int = DEFAULT_PAGE_CONCURRENCY
+) -> Iterator[QueryPage]:
+    """Run a query once per date window, several windows at a time, and yield pages in window order.
+
+    Each window is paged on its own, so no single scan runs into QuickBooks' paging limits. Rows are
+    ordered by window, then by the query's own order within a window; windows run newest first when
+    the query orders by ``field`` descending. Pages of the window being yielded are passed on as soon
+    as they arrive, while later windows fill their own queues in the background.
+    """
+    order_by = parse_query(query).order_by
+    if order_by and order_by[0] == (field, "DESC"):
+        windows = list(reversed(windows))
+
+    stop = threading.Event()
+
+    def fetch_window(window: tuple[date, date], feed: queue.Queue) -> None:
+        first, last = window[0].isoformat(), window[1].isoformat()
+        window_query = add_condition(query, Condition(field, ">=", first), Condition(field, "<=", last))
+        try:
+            for page in iter_query_pages(client, window_query):
+                if stop.is_set():
+                    return
+                feed.put(page._replace(shard=(first, last)))
+        except Exception as e:
+            feed.put(e)
+        finally:
+            feed.put(_WINDOW_DONE)
+
+    remaining = limit
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        feeds: deque[queue.Queue] = deque()
+        windows_iter = iter(windows)
+
+        def submit_next() -> None:
+            window = next(windows_iter, None)
+            if window is not None:
+                feed: queue.Queue = queue.Queue()
+                executor.submit(fetch_window, window, feed)
+                feeds.append(feed)
+
+        for _ in range(max(1, concurrency)):
+            submit_next()
+        try:
+            while feeds:
+                feed = feeds.popleft()
+                submit_next()
+                while (page := feed.get()) is not _WINDOW_DONE:
+                    if isinstance(page, Exception):
+                        raise page
+                    if remaining is not None:
+                        page = page._replace(rows=page.rows[:remaining])
+                        remaining -= len(page.rows)
+                    yield page
+                    if remaining is not None and remaining <= 0:
+                        return
+        finally:
+            # Let windows still running stop after their current page
+            stop.set()
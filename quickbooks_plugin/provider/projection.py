@@ -0,0 +1,45 @@
+import re
+from typing import Any
+
+from provider.query_parser import parse_query
+
+_FIELD_PATH = re.compile(r"^[A-Za-z]\w*(?:\.[A-Za-z]\w*)*$")
+
+
+def parse_fields(fields: str) -> list[str]:
+    """Split a comma-separated list of field paths such as ``"Id, TxnDate, VendorRef.name"``."""
+    paths = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    invalid = [path for path in paths if not _FIELD_PATH.match(path)]
+    if invalid:
+        raise ValueError(f"Invalid field path: {', '.join(invalid)}. Use names like Id, TxnDate or VendorRef.name")
+    return paths
+
+
+def _top_level(paths: list[str]) -> list[str]:
+    return list(dict.fromkeys(path.split(".", 1)[0] for path in paths))
+
+
+def select_list(paths: list[str]) -> str:
+    """Return the QuickBooks select list for the paths; QuickBooks only projects top-level properties."""
+    return ", ".join(_top_level(paths))
+
+
+def project_query(query: str, paths: list[str]) -> str:
+    """Replace ``SELECT *`` with the top-level properties the paths need; explicit select lists are kept."""
+    return parse_query(query).projected(_top_level(paths)).render()
+
+
+def _get_path(value: Any, parts: list[str]) -> Any:
+    for index, part in enumerate(parts):
+        if isinstance(value, list):
+            # Collect the field from every element, e.g. Line.Amount
+            return [_get_path(item, parts[index:]) for item in value]
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def flatten_row(row: dict[str, Any], paths: list[str]) -> dict[str, Any]:
+    """Build a compact row keyed by field path, e.g. ``{"Id": "1", "VendorRef.name": "Acme"}``."""
+    return {path: _get_path(row, path.split(".")) for path in paths}
@@ -0,0 +1,270 @@
+import functools
+import re
+from typing import Any, NamedTuple
+
+# One pass over the text; anything no group matches (';', '--', quotes left open, ...) is an error
+_TOKEN = re.compile(
+    r"""
+    (?P<space>\s+)
+    | (?P<string>'(?:[^'\\]|\\.|'')*')
+    | (?P<number>-?\d+(?:\.\d+)?(?![\w.]))
+    | (?P<operator><=|>=|!=|<>|=|<|>)
+    | (?P<punct>[(),*])
+    | (?P<name>[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*)
+    """,
+    re.VERBOSE
+)
+_ESCAPE = re.compile(r"\\(.)|''")
+
+_KEYWORDS = frozenset({
+    "SELECT", "FROM", "WHERE", "AND", "OR", "ORDER", "ORDERBY", "BY", "ASC", "DESC", "STARTPOSITION",
+    "MAXRESULTS", "LIKE", "IN", "COUNT"
+})
+_MAX_QUERY_LENGTH = 100000
+
+
+class Token(NamedTuple):
+    kind: str
+    text: str
+    position: int
+
+
+class Condition(NamedTuple):
+    field: str
+    # Upper-cased operator: =, !=, <>, <, >, <=, >=, LIKE or IN
+    op: str
+    # str, int, float or bool; a tuple of those for IN
+    value: Any
+
+
+class Query(NamedTuple):
+    """A parsed ``SELECT ... FROM ... [WHERE] [ORDERBY] [STARTPOSITION] [MAXRESULTS]`` statement."""
+
+    entity: str
+    # Selected properties; empty for ``SELECT *``
+    fields: tuple[str, ...] = ()
+    count: bool = False
+    conditions: tuple[Condition, ...] = ()
+    # "AND" or "OR" between consecutive conditions
+    connectors: tuple[str, ...] = ()
+    # (field, "ASC" | "DESC") pairs
+    order_by: tuple[tuple[str, str], ...] = ()
+    start_position: int | None = None
+    max_results: int | None = None
+
+    @property
+    def uses_or(self) -> bool:
+        return "OR" in self.connectors
+
+    def render(self) -> str:
+        """Canonical query text; equal queries render identically, so it doubles as a cache key."""
+        select = "COUNT(*)" if self.count else ", ".join(self.fields) or "*"
+        parts = [f"SELECT {select} FROM {self.entity}"]
+        if self.conditions:
+            where = _render_condition(self.conditions[0])
+            for connector, condition in zip(self.connectors, self.conditions[1:], strict=True):
+                where += f" {connector} {_render_condition(condition)}"
+            parts.append(f"WHERE {where}")
+        if self.order_by:
+            parts.append("ORDERBY " + ", ".join(f"{field} {direction}" for field, direction in self.order_by))
+        if self.start_position is not None:
+            parts.append(f"STARTPOSITION {self.start_position}")
+        if self.max_results is not None:
+            parts.append(f"MAXRESULTS {self.max_results}")
+        return " ".join(parts)
+
+    def without_paging(self) -> "Query":
+        return self._replace(start_position=None, max_results=None)
+
+    def paged(self, start_position: int, max_results: int) -> "Query":
+        return self._replace(start_position=start_position, max_results=max_results)
+
+    def counting(self) -> "Query":
+        """The matching ``COUNT(*)`` query, without ordering or paging."""
+        return self._replace(fields=(), count=True, order_by=(), start_position=None, max_results=None)
+
+    def projected(self, fields: tuple[str, ...] | list[str]) -> "Query":
+        """Select ``fields`` instead of ``*``; explicit select lists and counts are kept."""
+        if self.count or self.fields:
+            return self
+        return self._replace(fields=tuple(fields))
+
+    def where(self, *conditions: Condition) -> "Query":
+        """AND ``conditions`` into the query."""
+        if self.uses_or:
+            raise ValueError("Conditions cannot be added to a query that uses OR")
+        combined = self.conditions + conditions
+        return self._replace(conditions=combined, connectors=("AND",) * max(len(combined) - 1, 0))
+
+
+def _render_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        escaped = value.replace("\\", "\\\\").replace("'", "\\'")
+        return f"'{escaped}'"
+    if isinstance(value, tuple):
+        return "(" + ", ".join(_render_value(item) for item in value) + ")"
+    return str(value)
+
+
+def _render_condition(condition: Condition) -> str:
+    return f"{condition.field} {condition.op} {_render_value(condition.value)}"
+
+
+def tokenize(text: str) -> list[Token]:
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None:
+            raise ValueError(f"Invalid query: unexpected {text[position:position + 10]!r} at position {position}")
+        kind = match.lastgroup or ""
+        if kind != "space":
+            tokens.append(Token(kind, match.group(), position))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text: str):
+        self.tokens = tokenize(text)
+        self.index = 0
+
+    def _peek(self) -> Token | None:
+        return self.tokens[self.index] if self.index < len(self.tokens) else None
+
+    def _error(self, expected: str) -> ValueError:
+        token = self._peek()
+        found = f"'{token.text}' at position {token.position}" if token else "end of query"
+        return ValueError(f"Invalid query: expected {expected}, found {found}")
+
+    def _keyword(self, *words: str) -> str | None:
+        token = self._peek()
+        if token is not None and token.kind == "name" and token.text.upper() in words:
+            self.index += 1
+            return token.text.upper()
+        return None
+
+    def _expect_keyword(self, word: str) -> None:
+        if self._keyword(word) is None:
+            raise self._error(word)
+
+    def _punct(self, char: str) -> bool:
+        token = self._peek()
+        if token is not None and token.kind == "punct" and token.text == char:
+            self.index += 1
+            return True
+        return False
+
+    def _expect_punct(self, char: str) -> None:
+        if not self._punct(char):
+            raise self._error(f"'{char}'")
+
+    def _name(self, what: str) -> str:
+        token = self._peek()
+        if token is None or token.kind != "name" or token.text.upper() in _KEYWORDS:
+            raise self._error(what)
+        self.index += 1
+        return token.text
+
+    def _integer(self, what: str) -> int:
+        token = self._peek()
+        if token is None or token.kind != "number" or not token.text.isdigit():
+            raise self._error(what)
+        self.index += 1
+        return int(token.text)
+
+    def _value(self) -> Any:
+        token = self._peek()
+        if token is None:
+            raise self._error("a value")
+        if token.kind == "string":
+            self.index += 1
+            return _ESCAPE.sub(lambda m: m.group(1) or "'", token.text[1:-1])
+        if token.kind == "number":
+            self.index += 1
+            return float(token.text) if "." in token.text else int(token.text)
+        if token.kind == "name" and token.text.lower() in ("true", "false"):
+            self.index += 1
+            return token.text.lower() == "true"
+        raise self._error("a quoted string, number, true or false")
+
+    def _condition(self) -> Condition:
+        field = self._name("a field name")
+        op = self._keyword("LIKE", "IN")
+        if op is None:
+            token = self._peek()
+            if token is None or token.kind != "operator":
+                raise self._error("a comparison operator")
+            self.index += 1
+            op = token.text
+        if op != "IN":
+            return Condition(field, op, self._value())
+        self._expect_punct("(")
+        values = [self._value()]
+        while self._punct(","):
+            values.append(self._value())
+        self._expect_punct(")")
+        return Condition(field, op, tuple(values))
+
+    def parse(self) -> Query:
+        self._expect_keyword("SELECT")
+        fields: list[str] = []
+        count = False
+        if self._keyword("COUNT"):
+            self._expect_punct("(")
+            self._expect_punct("*")
+            self._expect_punct(")")
+            count = True
+        elif not self._punct("*"):
+            fields.append(self._name("'*', COUNT(*) or a field name"))
+            while self._punct(","):
+                fields.append(self._name("a field name"))
+        self._expect_keyword("FROM")
+        entity = self._name("an entity name")
+
+        conditions: list[Condition] = []
+        connectors: list[str] = []
+        if self._keyword("WHERE"):
+            conditions.append(self._condition())
+            while connector := self._keyword("AND", "OR"):
+                connectors.append(connector)
+                conditions.append(self._condition())
+
+        order_by: list[tuple[str, str]] = []
+        # QuickBooks documents ORDERBY; ORDER BY is accepted too
+        order = self._keyword("ORDERBY", "ORDER")
+        if order == "ORDER":
+            self._expect_keyword("BY")
+        if order:
+            while True:
+                field = self._name("a field name to order by")
+                order_by.append((field, self._keyword("ASC", "DESC") or "ASC"))
+                if not self._punct(","):
+                    break
+
+        paging: dict[str, int] = {}
+        while keyword := self._keyword("STARTPOSITION", "MAXRESULTS"):
+            if keyword in paging:
+                raise ValueError(f"Invalid query: {keyword} is given twice")
+            paging[keyword] = self._integer(f"a number after {keyword}")
+
+        if self._peek() is not None:
+            raise self._error("end of query")
+        return Query(
+            entity, tuple(fields), count, tuple(conditions), tuple(connectors), tuple(order_by),
+            paging.get("STARTPOSITION"), paging.get("MAXRESULTS")
+        )
+
+
+@functools.lru_cache(maxsize=512)
+def parse_query(text: str) -> Query:
+    """Parse a QuickBooks query statement, raising ValueError with the position of the first problem.
+
+    Only the read-only SELECT dialect parses, so anything else (other statements, comments, stray
+    quotes) is rejected by the grammar itself. Results are cached; Query objects are immutable.
+    """
+    if len(text) > _MAX_QUERY_LENGTH:
+        raise ValueError("Invalid query: query is too long")
+    return _Parser(text).parse()
@@ -1,6 +1,5 @@
 import logging
 import secrets
-import time
 import urllib.parse
 from collections.abc import Mapping
 from typing import Any
@@ -11,6 +10,8 @@ from werkzeug import Request
 from dify_plugin import ToolProvider
 from dify_plugin.entities.oauth import ToolOAuthCredentials
 from dify_plugin.errors.tool import ToolProviderCredentialValidationError, ToolProviderOAuthError
+from provider.client import API_BASE_URLS, QuickBooksClient, fault_message
+from provider.token_refresh import proactive_expires_at, token_refresh_coordinator
 
 logger = logging.getLogger(__name__)
 
@@ -20,10 +21,7 @@ class QuickBooksProvider(ToolProvider):
 
     _AUTH_URL = "https://appcenter.intuit.com/connect/oauth2"
     _TOKEN_URL = "https://oauth.platform.intuit.com/oauth2/v1/tokens/bearer"
-    _API_BASE_URLS = {
-        "production": "https://quickbooks.api.intuit.com/v3",
-        "sandbox": "https://sandbox-quickbooks.api.intuit.com/v3"
-    }
+    _API_BASE_URLS = API_BASE_URLS
     _REQUEST_TIMEOUT = 30
 
     def _oauth_get_authorization_url(self, redirect_uri: str, system_credentials: Mapping[str, Any]) -> str:
@@ -95,8 +93,8 @@ class QuickBooksProvider(ToolProvider):
             if not access_token:
                 raise ToolProviderOAuthError(f"Error in QuickBooks OAuth: {response_json}")
 
-            # Calculate expiration timestamp
-            expires_at = int(time.time()) + expires_in
+            # Calculate expiration timestamp, early enough to refresh before calls start failing
+            expires_at = proactive_expires_at(expires_in)
 
             credentials = {"access_token": access_token}
             if refresh_token:
@@ -120,6 +118,10 @@ class QuickBooksProvider(ToolProvider):
         QuickBooks implements refresh token rotation - each refresh invalidates the old
         refresh token and returns a new one. We MUST save the new refresh token.
 
+        Refreshes are single-flight per refresh token: concurrent callers, including the
+        QuickBooks Payments plugin when QUICKBOOKS_TOKEN_LOCK_DIR is shared, reuse the first
+        caller's result instead of spending the rotated-out token again.
+
         Args:
             redirect_uri: The callback URL
             system_credentials: System-level credentials containing client_id and client_secret
@@ -132,6 +134,18 @@ class QuickBooksProvider(ToolProvider):
         if not refresh_token:
             raise ToolProviderOAuthError("No refresh token available. Please re-authorize QuickBooks.")
 
+        result = token_refresh_coordinator.refresh(
+            refresh_token, lambda: self._request_token_refresh(system_credentials, refresh_token)
+        )
+
+        new_credentials = dict(result.credentials)
+        # Preserve realm_id if it exists; a refresh shared by another plugin does not carry it
+        if "realm_id" in credentials:
+            new_credentials["realm_id"] = credentials["realm_id"]
+        return ToolOAuthCredentials(credentials=new_credentials, expires_at=result.expires_at)
+
+    def _request_token_refresh(self, system_credentials: Mapping[str, Any], refresh_token: str) -> ToolOAuthCredentials:
+        """Exchange a refresh token for new tokens at the Intuit token endpoint."""
         logger.info("[QBO_REFRESH] Starting token refresh")
 
         data = {
@@ -189,7 +203,7 @@ class QuickBooksProvider(ToolProvider):
 
             logger.info("[QBO_REFRESH] Successfully received new tokens")
 
-            expires_at = int(time.time()) + expires_in
+            expires_at = proactive_expires_at(expires_in)
 
             # Build new credentials with the rotated refresh token
             new_credentials = {
@@ -197,10 +211,6 @@ class QuickBooksProvider(ToolProvider):
                 "refresh_token": new_refresh_token
             }
 
-            # Preserve realm_id if it exists
-            if "realm_id" in credentials:
-                new_credentials["realm_id"] = credentials["realm_id"]
-
             return ToolOAuthCredentials(credentials=new_credentials, expires_at=expires_at)
 
         except ToolProviderOAuthError:
@@ -238,21 +248,10 @@ class QuickBooksProvider(ToolProvider):
                     "QuickBooks Realm ID (Company ID) is required."
                 )
 
-            # Get environment
-            environment = credentials.get("environment", "sandbox")
-            api_base_url = self._API_BASE_URLS.get(environment, self._API_BASE_URLS["sandbox"])
-
-            headers = {
-                "Authorization": f"Bearer {access_token}",
-                "Accept": "application/json"
-            }
+            client = QuickBooksClient(access_token, realm_id, credentials.get("environment", "sandbox"))
 
             # Validate by querying CompanyInfo
-            response = httpx.get(
-                f"{api_base_url}/company/{realm_id}/companyinfo/{realm_id}",
-                headers=headers,
-                timeout=self._REQUEST_TIMEOUT
-            )
+            response = client.get(f"companyinfo/{realm_id}", timeout=self._REQUEST_TIMEOUT)
 
             if response.status_code == 401:
                 raise ToolProviderCredentialValidationError(
@@ -265,12 +264,7 @@ class QuickBooksProvider(ToolProvider):
                 )
 
             if response.status_code >= 400:
-                try:
-                    error_detail = response.json()
-                    error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
-                except Exception:
-                    error_msg = response.text
-
+                error_msg = fault_message(response)
                 raise ToolProviderCredentialValidationError(
                     f"QuickBooks API validation failed: {error_msg}"
                 )
@@ -0,0 +1,187 @@
+import threading
+import time
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+from provider.accounts import normalize_name
+from provider.batch import execute_batch
+from provider.cdc import add_change_listener
+from provider.client import QuickBooksClient
+from provider.pagination import MAX_PAGE_SIZE, iter_query_pages
+
+# Lists sales documents refer to; all are tracked by Change Data Capture
+REFERENCE_ENTITIES = ["Item", "Class", "Department", "Term", "PaymentMethod", "TaxCode"]
+# Company-wide settings; not tracked by CDC, so they only refresh with the TTL
+SETTINGS_ENTITIES = ["CompanyInfo", "Preferences"]
+REFERENCE_CACHE_TTL = 600
+
+
+class ReferenceData:
+    """Immutable lookup tables over one realm's active reference lists and company settings."""
+
+    def __init__(
+        self,
+        records: Mapping[str, Iterable[dict[str, Any]]],
+        company_info: dict[str, Any] | None = None,
+        preferences: dict[str, Any] | None = None
+    ):
+        self.company_info = company_info or {}
+        self.preferences = preferences or {}
+        self.records: dict[str, list[dict[str, Any]]] = {}
+        self.by_id: dict[str, dict[str, dict[str, Any]]] = {}
+        self.by_name: dict[str, dict[str, list[dict[str, Any]]]] = {}
+        for entity in REFERENCE_ENTITIES:
+            active = [rec for rec in records.get(entity, []) if rec.get("Active", True)]
+            self.records[entity] = active
+            self.by_id[entity] = {str(rec.get("Id")): rec for rec in active}
+            names: dict[str, list[dict[str, Any]]] = {}
+            for rec in active:
+                keys = {normalize_name(rec[key]) for key in ("Name", "FullyQualifiedName") if rec.get(key)}
+                for key in keys:
+                    names.setdefault(key, []).append(rec)
+            self.by_name[entity] = names
+
+    def find(self, entity: str, name_or_id: str) -> list[dict[str, Any]]:
+        """Match an ID, a fully qualified name ("Services:Gardening") or a plain name, ignoring case."""
+        if entity not in self.by_id:
+            raise ValueError(f"Unsupported reference entity '{entity}'. Supported: {', '.join(REFERENCE_ENTITIES)}")
+        record = self.by_id[entity].get(str(name_or_id).strip())
+        if record is not None:
+            return [record]
+        key = normalize_name(name_or_id)
+        matches = self.by_name[entity].get(key, [])
+        exact = [rec for rec in matches if normalize_name(rec.get("FullyQualifiedName", "")) == key]
+        return exact if len(exact) == 1 else list(matches)
+
+    def resolve(self, entity: str, name_or_id: str) -> str:
+        """Return the ID of the one active record matching ``name_or_id``."""
+        matches = self.find(entity, name_or_id)
+        if len(matches) == 1:
+            return str(matches[0].get("Id"))
+        if not matches:
+            raise ValueError(f"No active {entity} named '{name_or_id}'")
+        names = ", ".join(rec.get("FullyQualifiedName") or rec.get("Name", "") for rec in matches)
+        raise ValueError(f"{entity} '{name_or_id}' is ambiguous ({names}); use the ID or the full name")
+
+    def patched(self, entity: str, objects: Iterable[dict[str, Any]]) -> "ReferenceData":
+        """Return a new bundle with CDC changes to one list applied; deleted or inactive records drop out."""
+        current = {str(rec.get("Id")): rec for rec in self.records.get(entity, [])}
+        for obj in objects:
+            if not obj.get("Id"):
+                continue
+            record_id = str(obj["Id"])
+            if obj.get("status") == "Deleted" or not obj.get("Active", True):
+                current.pop(record_id, None)
+            else:
+                current[record_id] = obj
+        return ReferenceData({**self.records, entity: current.values()}, self.company_info, self.preferences)
+
+
+def load_reference_data(client: QuickBooksClient) -> ReferenceData:
+    """Load every reference list and the company settings in one batch request.
+
+    A list that fills its 1000-row page is re-read in full with paged queries.
+    """
+    queries = [f"SELECT * FROM {entity} MAXRESULTS {MAX_PAGE_SIZE}" for entity in REFERENCE_ENTITIES]
+    queries += [f"SELECT * FROM {entity}" for entity in SETTINGS_ENTITIES]
+    items = [{"bId": str(index), "Query": query} for index, query in enumerate(queries)]
+    responses = execute_batch(client, items)
+
+    loaded: dict[str, list[dict[str, Any]]] = {}
+    for entity, response in zip(REFERENCE_ENTITIES + SETTINGS_ENTITIES, responses, strict=True):
+        if "Error" in response:
+            raise Exception(f"Could not load {entity}: {response['Error']}")
+        if "Fault" in response:
+            errors = response["Fault"].get("Error") or [{}]
+            raise Exception(f"Could not load {entity}: {errors[0].get('Message', 'Unknown error')}")
+        rows = (response.get("QueryResponse") or {}).get(entity) or []
+        if len(rows) >= MAX_PAGE_SIZE:
+            rows = [row for page in iter_query_pages(client, f"SELECT * FROM {entity}") for row in page.rows]
+        loaded[entity] = rows
+
+    company_info = loaded.pop("CompanyInfo")
+    preferences = loaded.pop("Preferences")
+    return ReferenceData(
+        loaded, company_info[0] if company_info else None, preferences[0] if preferences else None
+    )
+
+
+class ReferenceDataCache:
+    """Per-realm reference data bundles with a TTL.
+
+    Concurrent callers for the same realm wait on a single in-flight load. Changes seen by a CDC sync,
+    or written through this plugin, are applied to the cached bundle without resetting its TTL.
+    """
+
+    def __init__(self, ttl: float = REFERENCE_CACHE_TTL):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, str], tuple[float, ReferenceData]] = {}
+        self._inflight: dict[tuple[str, str], threading.Lock] = {}
+
+    def _cached(self, key: tuple[str, str]) -> tuple[float, ReferenceData] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[0] < self._ttl:
+            return entry
+        return None
+
+    def get_with_age(self, client: QuickBooksClient, refresh: bool = False) -> tuple[ReferenceData, float]:
+        """Return the realm's bundle and how many seconds ago it was loaded."""
+        key = (client.realm_id, client.environment)
+        cached = None if refresh else self._cached(key)
+        if cached is None:
+            with self._lock:
+                load_lock = self._inflight.setdefault(key, threading.Lock())
+            with load_lock:
+                cached = None if refresh else self._cached(key)
+                if cached is None:
+                    cached = (time.monotonic(), load_reference_data(client))
+                    with self._lock:
+                        self._entries[key] = cached
+        loaded_at, data = cached
+        return data, time.monotonic() - loaded_at
+
+    def get(self, client: QuickBooksClient, refresh: bool = False) -> ReferenceData:
+        return self.get_with_age(client, refresh)[0]
+
+    def invalidate(self, realm_id: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == realm_id]:
+                del self._entries[key]
+
+    def apply_changes(self, realm_id: str, entity: str, objects: list[dict[str, Any]]) -> None:
+        """CDC change listener: patch cached bundles for the realm without resetting their TTL."""
+        if entity not in REFERENCE_ENTITIES or not objects:
+            return
+        with self._lock:
+            for key, (loaded_at, data) in list(self._entries.items()):
+                if key[0] == realm_id:
+                    self._entries[key] = (loaded_at, data.patched(entity, objects))
+
+
+reference_cache = ReferenceDataCache()
+add_change_listener(reference_cache.apply_changes)
+
+
+def resolve_ref(client: QuickBooksClient, entity: str, value: Any) -> dict[str, str]:
+    """Build a ``{"value": id}`` reference from an ID or a name.
+
+    All-digit values are taken as IDs without a lookup; names are resolved through the cached bundle.
+    """
+    text = str(value).strip()
+    if text.isdigit():
+        return {"value": text}
+    return {"value": reference_cache.get(client).resolve(entity, text)}
+
+
+def resolve_item_ref(client: QuickBooksClient, line: Mapping[str, Any]) -> dict[str, str] | None:
+    """Resolve a sales line's item from ``ItemRef`` (``{"value"}`` or ``{"name"}``), ``item_id`` or ``item``."""
+    ref = line.get("ItemRef")
+    if isinstance(ref, dict):
+        if ref.get("value"):
+            return ref
+        if ref.get("name"):
+            return resolve_ref(client, "Item", ref["name"])
+    value = line.get("item_id") or line.get("item") or (ref if isinstance(ref, str | int) else None)
+    return resolve_ref(client, "Item", value) if value else None
@@ -0,0 +1,224 @@
+import re
+import threading
+import time
+from collections.abc import Iterator, Mapping
+from typing import Any, NamedTuple
+
+from provider.cdc import add_change_listener
+from provider.client import QuickBooksClient, fault_message, raise_for_error
+
+REPORT_NAMES = [
+    "ProfitAndLoss", "ProfitAndLossDetail", "BalanceSheet", "CashFlow", "TrialBalance", "GeneralLedger",
+    "JournalReport", "TransactionList", "TransactionListWithSplits", "TransactionListByCustomer",
+    "TransactionListByVendor", "AgedPayables", "AgedPayableDetail", "AgedReceivables", "AgedReceivableDetail",
+    "VendorBalance", "VendorBalanceDetail", "VendorExpenses", "CustomerBalance", "CustomerBalanceDetail",
+    "CustomerIncome", "CustomerSales", "ItemSales", "ClassSales", "DepartmentSales", "AccountList",
+    "InventoryValuationSummary", "InventoryValuationDetail", "TaxSummary"
+]
+# Reports change with every posting; keep them just long enough to serve a dashboard refresh
+REPORT_CACHE_TTL = 300
+_MAX_CACHED_REPORTS = 256
+
+_CacheKey = tuple[str, str, str, tuple[tuple[str, str], ...]]
+
+
+class ReportColumn(NamedTuple):
+    key: str
+    title: str
+    col_type: str
+
+
+class Report(NamedTuple):
+    name: str
+    header: dict[str, Any]
+    columns: list[ReportColumn]
+    rows: list[dict[str, Any]]
+    fetched_at: float
+
+
+def report_name(name: str) -> str:
+    """Return the canonical report name for ``name``, matched ignoring case."""
+    by_lower = {known.lower(): known for known in REPORT_NAMES}
+    canonical = by_lower.get(name.strip().lower())
+    if canonical is None:
+        raise ValueError(f"Unsupported report '{name}'. Supported: {', '.join(REPORT_NAMES)}")
+    return canonical
+
+
+def _snake_case(value: str) -> str:
+    return re.sub(r"[^0-9a-z]+", "_", value.lower()).strip("_")
+
+
+def _leaf_columns(columns: list[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+    for column in columns:
+        children = (column.get("Columns") or {}).get("Column")
+        if children:
+            yield from _leaf_columns(children)
+        else:
+            yield column
+
+
+def parse_columns(report: Mapping[str, Any]) -> list[ReportColumn]:
+    """Name each data column by its ColKey, falling back to its title or type; names are unique."""
+    parsed: list[ReportColumn] = []
+    seen: set[str] = set()
+    for column in _leaf_columns((report.get("Columns") or {}).get("Column") or []):
+        meta = {item.get("Name"): item.get("Value") for item in column.get("MetaData") or []}
+        title = column.get("ColTitle") or ""
+        col_type = column.get("ColType") or ""
+        key = _snake_case(meta.get("ColKey") or title or col_type) or f"column_{len(parsed) + 1}"
+        if key in seen:
+            key = f"{key}_{len(parsed) + 1}"
+        seen.add(key)
+        parsed.append(ReportColumn(key, title, col_type))
+    return parsed
+
+
+def _cell_value(column: ReportColumn, value: str | None) -> Any:
+    if column.col_type != "Money":
+        return value
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _flat_row(
+    columns: list[ReportColumn], col_data: list[dict[str, Any]], row_type: str, path: list[str], group: str | None
+) -> dict[str, Any]:
+    row: dict[str, Any] = {"row_type": row_type, "section": " > ".join(path), "depth": len(path)}
+    if group:
+        row["group"] = group
+    for column, cell in zip(columns, col_data, strict=False):
+        row[column.key] = _cell_value(column, cell.get("value"))
+        if cell.get("id"):
+            row[f"{column.key}_id"] = cell["id"]
+    return row
+
+
+def iter_report_rows(
+    report: Mapping[str, Any], columns: list[ReportColumn], include_summaries: bool = True
+) -> Iterator[dict[str, Any]]:
+    """Flatten the nested Rows/ColData tree into one dict per row, in report order.
+
+    Sections are walked with an explicit stack, so rows are produced one at a time however deep the
+    report nests. Each row names its enclosing sections (e.g. ``"Income > Landscaping Services"``).
+    Section headers are emitted only when they carry values, and section totals only with
+    ``include_summaries``.
+    """
+    stack: list[tuple[Iterator[dict[str, Any]], list[str], dict[str, Any] | None]] = [
+        (iter((report.get("Rows") or {}).get("Row") or []), [], None)
+    ]
+    while stack:
+        rows, path, section = stack[-1]
+        row = next(rows, None)
+        if row is None:
+            stack.pop()
+            if section is not None and include_summaries and section.get("Summary"):
+                summary = section["Summary"].get("ColData") or []
+                yield _flat_row(columns, summary, "Summary", path[:-1], section.get("group"))
+            continue
+
+        if row.get("ColData"):
+            yield _flat_row(columns, row["ColData"], row.get("type") or "Data", path, row.get("group"))
+            continue
+
+        header = (row.get("Header") or {}).get("ColData") or []
+        label = header[0].get("value", "") if header else ""
+        if any(cell.get("value") for cell in header[1:]):
+            yield _flat_row(columns, header, "Header", path, row.get("group"))
+        child_path = [*path, label or row.get("group") or ""]
+        stack.append((iter((row.get("Rows") or {}).get("Row") or []), child_path, row))
+
+
+def _encode_params(params: Mapping[str, Any]) -> dict[str, str]:
+    encoded: dict[str, str] = {}
+    for key, value in params.items():
+        if value is None or value == "":
+            continue
+        if isinstance(value, bool):
+            encoded[key] = "true" if value else "false"
+        elif isinstance(value, list | tuple):
+            encoded[key] = ",".join(str(item) for item in value)
+        else:
+            encoded[key] = str(value)
+    return encoded
+
+
+def fetch_report(client: QuickBooksClient, name: str, params: Mapping[str, Any]) -> Report:
+    """Run a report and parse it into flat rows."""
+    response = client.get(f"reports/{name}", params=_encode_params(params))
+    raise_for_error(response)
+    if response.status_code != 200:
+        raise Exception(f"Failed to run report {name}: {response.status_code} - {fault_message(response)}")
+    data = response.json()
+    columns = parse_columns(data)
+    return Report(name, data.get("Header") or {}, columns, list(iter_report_rows(data, columns)), time.time())
+
+
+class ReportCache:
+    """Parsed reports keyed by realm, report and parameters, kept for a short TTL.
+
+    Concurrent requests for the same report wait on one call. A CDC sync that sees any change in a
+    realm drops that realm's cached reports.
+    """
+
+    def __init__(self, ttl: float = REPORT_CACHE_TTL):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: dict[_CacheKey, tuple[float, Report]] = {}
+        self._inflight: dict[_CacheKey, threading.Lock] = {}
+
+    def _cached(self, key: _CacheKey) -> Report | None:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[0] < self._ttl:
+            return entry[1]
+        return None
+
+    def get(
+        self, client: QuickBooksClient, name: str, params: Mapping[str, Any], refresh: bool = False
+    ) -> tuple[Report, bool]:
+        """Return the report and whether it came from the cache."""
+        key = (client.realm_id, client.environment, name, tuple(sorted(_encode_params(params).items())))
+        if not refresh:
+            cached = self._cached(key)
+            if cached is not None:
+                return cached, True
+
+        with self._lock:
+            load_lock = self._inflight.setdefault(key, threading.Lock())
+        try:
+            with load_lock:
+                if not refresh:
+                    cached = self._cached(key)
+                    if cached is not None:
+                        return cached, True
+                loaded_at = time.monotonic()
+                report = fetch_report(client, name, params)
+                with self._lock:
+                    self._entries[key] = (loaded_at, report)
+                    expired = [k for k, (at, _) in self._entries.items() if loaded_at - at >= self._ttl]
+                    for stale in expired:
+                        del self._entries[stale]
+                    while len(self._entries) > _MAX_CACHED_REPORTS:
+                        del self._entries[next(iter(self._entries))]
+                return report, False
+        finally:
+            with self._lock:
+                if not load_lock.locked():
+                    self._inflight.pop(key, None)
+
+    def apply_changes(self, realm_id: str, entity: str, objects: list[dict[str, Any]]) -> None:
+        """CDC change listener: any change can move any report, so drop the realm's reports."""
+        if not objects:
+            return
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == realm_id]:
+                del self._entries[key]
+
+
+report_cache = ReportCache()
+add_change_listener(report_cache.apply_changes)
@@ -0,0 +1,141 @@
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any
+
+import httpx
+
+from provider.cdc import add_change_listener
+from provider.client import QuickBooksClient, raise_for_error
+
+logger = logging.getLogger(__name__)
+
+# QuickBooks error code for an update carrying an outdated SyncToken
+STALE_OBJECT_CODE = "5010"
+# Re-read the latest SyncToken and resend this many times after a stale-object error
+MAX_STALE_RETRIES = 3
+_MAX_CACHED_TOKENS = 10000
+
+# Entities QuickBooks accepts sparse updates for; the rest must be sent in full
+SPARSE_UPDATE_ENTITIES = frozenset({
+    "BillPayment", "CompanyInfo", "CreditCardPayment", "Customer", "Deposit", "Estimate", "Invoice",
+    "JournalEntry", "Payment", "RefundReceipt", "SalesReceipt", "Transfer", "Vendor"
+})
+
+_TokenKey = tuple[str, str, str, str]
+
+
+def is_stale_object(response: httpx.Response) -> bool:
+    if response.status_code != 400:
+        return False
+    try:
+        errors = response.json().get("Fault", {}).get("Error") or []
+    except ValueError:
+        return False
+    return any(str(error.get("code")) == STALE_OBJECT_CODE for error in errors)
+
+
+class SyncTokenCache:
+    """Last SyncToken seen per entity record, fed by reads, writes and Change Data Capture syncs.
+
+    Tokens only save a read before an update; a stale one costs a stale-object error and a retry,
+    never a lost write.
+    """
+
+    def __init__(self, max_size: int = _MAX_CACHED_TOKENS):
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._tokens: OrderedDict[_TokenKey, str] = OrderedDict()
+
+    @staticmethod
+    def _key(realm_id: str, environment: str, entity: str, entity_id: Any) -> _TokenKey:
+        return realm_id, environment, entity, str(entity_id)
+
+    def get(self, client: QuickBooksClient, entity: str, entity_id: Any) -> str | None:
+        with self._lock:
+            return self._tokens.get(self._key(client.realm_id, client.environment, entity, entity_id))
+
+    def _set(self, key: _TokenKey, sync_token: str | None) -> None:
+        with self._lock:
+            if sync_token is None:
+                self._tokens.pop(key, None)
+                return
+            self._tokens[key] = str(sync_token)
+            self._tokens.move_to_end(key)
+            while len(self._tokens) > self._max_size:
+                self._tokens.popitem(last=False)
+
+    def remember(self, client: QuickBooksClient, entity: str, record: Mapping[str, Any]) -> None:
+        """Record the SyncToken of an entity returned by QuickBooks."""
+        if record.get("Id") is not None:
+            key = self._key(client.realm_id, client.environment, entity, record["Id"])
+            self._set(key, record.get("SyncToken"))
+
+    def apply_changes(self, realm_id: str, entity: str, objects: list[dict[str, Any]]) -> None:
+        """CDC change listener: refresh tokens of records this process has already seen."""
+        with self._lock:
+            keys = [key for key in self._tokens if key[0] == realm_id and key[2] == entity]
+        by_id = {str(obj.get("Id")): obj for obj in objects}
+        for key in keys:
+            obj = by_id.get(key[3])
+            if obj is not None:
+                self._set(key, None if obj.get("status") == "Deleted" else obj.get("SyncToken"))
+
+
+sync_token_cache = SyncTokenCache()
+add_change_listener(sync_token_cache.apply_changes)
+
+
+def read_entity(client: QuickBooksClient, entity: str, entity_id: Any) -> httpx.Response:
+    """Read one record and remember its SyncToken."""
+    response = client.get(f"{entity.lower()}/{entity_id}")
+    if response.status_code == 200:
+        sync_token_cache.remember(client, entity, response.json().get(entity, {}))
+    return response
+
+
+def read_latest(client: QuickBooksClient, entity: str, entity_id: Any) -> dict[str, Any]:
+    response = read_entity(client, entity, entity_id)
+    raise_for_error(response)
+    if response.status_code != 200:
+        raise Exception(f"Could not read {entity} {entity_id}: {response.status_code}")
+    return response.json().get(entity, {})
+
+
+def update_entity(
+    client: QuickBooksClient,
+    entity: str,
+    entity_id: Any,
+    changes: Mapping[str, Any],
+    *,
+    sync_token: str | None = None,
+    max_retries: int = MAX_STALE_RETRIES
+) -> httpx.Response:
+    """Apply ``changes`` to a record, retrying when another edit lands first.
+
+    Entities in ``SPARSE_UPDATE_ENTITIES`` get a sparse update with only ``changes``; its SyncToken
+    comes from ``sync_token``, then the cache, then a read. The others only take full updates, so
+    ``changes`` are merged into the latest record as read. After a stale-object error the latest
+    version is read and the same changes are applied again: the fields being changed win over the
+    concurrent edit and the rest of that edit is kept.
+    """
+    if not changes:
+        raise ValueError(f"No {entity} fields to update were given")
+    sparse = entity in SPARSE_UPDATE_ENTITIES
+    token = sync_token or sync_token_cache.get(client, entity, entity_id)
+    for attempt in range(max_retries + 1):
+        if sparse:
+            token = token or read_latest(client, entity, entity_id).get("SyncToken")
+            payload = {**changes, "Id": str(entity_id), "SyncToken": token, "sparse": True}
+        else:
+            payload = {**read_latest(client, entity, entity_id), **changes}
+        response = client.post(entity.lower(), json=payload)
+        if response.status_code == 200:
+            sync_token_cache.remember(client, entity, response.json().get(entity, {}))
+            return response
+        if not is_stale_object(response) or attempt == max_retries:
+            return response
+        logger.info("Stale %s %s; retrying on the latest version (attempt %d)", entity, entity_id, attempt + 1)
+        token = None
+    return response
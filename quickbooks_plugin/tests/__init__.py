@@ -0,0 +1 @@
+# QuickBooks Plugin Tests
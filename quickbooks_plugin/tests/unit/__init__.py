@@ -0,0 +1 @@
+# QuickBooks Plugin Unit Tests
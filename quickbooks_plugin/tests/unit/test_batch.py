@@ -0,0 +1,112 @@
+"""
+Unit tests for Batch API request building and chunked execution.
+"""
+
+import os
+import sys
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+# Add plugin directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from provider.batch import BATCH_LIMIT, build_batch_item, execute_batch, summarize_batch_response  # noqa: E402
+
+
+def batch_client(handler) -> MagicMock:
+    """Client whose batch posts are answered by ``handler(items)``."""
+    client = MagicMock()
+
+    def post(path, json):
+        return handler(json["BatchItemRequest"])
+
+    client.post.side_effect = post
+    return client
+
+
+def echo(items):
+    return httpx.Response(200, json={"BatchItemResponse": [
+        {"bId": item["bId"], "Bill": {"Id": item["bId"], "SyncToken": "0"}} for item in reversed(items)
+    ]})
+
+
+class TestBuildBatchItem:
+    """Operations are validated before any request is sent."""
+
+    def test_create(self):
+        item = build_batch_item(3, {"operation": "Create", "entity": "Bill", "data": {"TotalAmt": 5}})
+        assert item == {"bId": "3", "operation": "create", "Bill": {"TotalAmt": 5}}
+
+    def test_query(self):
+        assert build_batch_item(0, {"operation": "query", "query": "SELECT * FROM Bill"}) == {
+            "bId": "0", "Query": "SELECT * FROM Bill"
+        }
+
+    @pytest.mark.parametrize("operation", ["create", None, ["create"]])
+    def test_operation_must_be_an_object(self, operation):
+        with pytest.raises(ValueError, match="Operation 1: must be an object"):
+            build_batch_item(1, operation)
+
+    def test_unknown_operation(self):
+        with pytest.raises(ValueError, match="unknown operation 'merge'"):
+            build_batch_item(0, {"operation": "merge", "entity": "Bill", "data": {"Id": "1"}})
+
+    def test_unsupported_entity(self):
+        with pytest.raises(ValueError, match="unsupported entity 'Report'"):
+            build_batch_item(0, {"operation": "create", "entity": "Report", "data": {"a": 1}})
+
+    def test_update_needs_sync_token(self):
+        with pytest.raises(ValueError, match="Id and SyncToken are required to update Bill"):
+            build_batch_item(0, {"operation": "update", "entity": "Bill", "data": {"Id": "1"}})
+
+    def test_sync_token_zero_is_accepted(self):
+        item = build_batch_item(0, {"operation": "delete", "entity": "Bill", "data": {"Id": "1", "SyncToken": 0}})
+        assert item["operation"] == "delete"
+
+
+class TestExecuteBatch:
+    """Items are chunked, and responses come back in input order."""
+
+    def test_chunks_and_keeps_order(self):
+        client = batch_client(echo)
+        items = [{"bId": str(i), "operation": "create", "Bill": {}} for i in range(BATCH_LIMIT + 5)]
+
+        responses = execute_batch(client, items, max_concurrency=2)
+
+        assert [response["bId"] for response in responses] == [item["bId"] for item in items]
+        assert sorted(len(call.kwargs["json"]["BatchItemRequest"]) for call in client.post.call_args_list) == [
+            5, BATCH_LIMIT
+        ]
+
+    def test_failed_chunk_reports_each_item(self):
+        client = batch_client(lambda items: httpx.Response(500, json={"Fault": {"Error": [{"Message": "Down"}]}}))
+        responses = execute_batch(client, [{"bId": "0"}, {"bId": "1"}])
+        assert [response["bId"] for response in responses] == ["0", "1"]
+        assert all("Error" in response for response in responses)
+
+    def test_missing_item_response(self):
+        client = batch_client(lambda items: httpx.Response(200, json={"BatchItemResponse": []}))
+        (response,) = execute_batch(client, [{"bId": "0"}])
+        assert response["Error"] == "No response for batch item"
+
+    def test_empty(self):
+        assert execute_batch(MagicMock(), []) == []
+
+
+class TestSummarize:
+    """Batch item responses are flattened for tool output."""
+
+    def test_entity(self):
+        summary = summarize_batch_response({"bId": "0", "Bill": {"Id": "7", "SyncToken": "1"}})
+        assert summary["success"] is True
+        assert (summary["entity"], summary["id"], summary["sync_token"]) == ("Bill", "7", "1")
+
+    def test_fault(self):
+        summary = summarize_batch_response({"Fault": {"Error": [{"Message": "Stale", "Detail": "SyncToken"}]}})
+        assert summary == {"success": False, "error": "Stale: SyncToken"}
+
+    def test_query(self):
+        summary = summarize_batch_response({"QueryResponse": {"Bill": [{"Id": "1"}]}})
+        assert (summary["entity"], summary["count"]) == ("Bill", 1)
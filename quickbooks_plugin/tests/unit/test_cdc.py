@@ -0,0 +1,146 @@
+"""
+Unit tests for Change Data Capture syncs and watermarks.
+"""
+
+import os
+import sys
+from datetime import UTC, datetime, timedelta
+from unittest.mock import MagicMock
+
+import httpx
+
+# Add plugin directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from provider.cdc import (  # noqa: E402
+    CDC_PAGE_LIMIT,
+    add_change_listener,
+    advance_watermark,
+    load_watermark,
+    save_watermark,
+    sync_changes
+)
+
+REALM_ID = "1234567890"
+SERVER_TIME = "2026-10-19T12:00:00-07:00"
+SINCE = "2026-10-18T10:00:00-07:00"
+
+
+class MockStorage(dict):
+    def set(self, key, value):
+        self[key] = value
+
+    def exist(self, key):
+        return key in self
+
+    def delete(self, key):
+        self.pop(key, None)
+
+
+def cdc_response(**changes) -> httpx.Response:
+    return httpx.Response(200, json={
+        "time": SERVER_TIME,
+        "CDCResponse": [{"QueryResponse": [{entity: objects} for entity, objects in changes.items()]}]
+    })
+
+
+def changed(object_id: str, updated: str = SINCE, **fields) -> dict:
+    return {"Id": object_id, "MetaData": {"LastUpdatedTime": updated}, **fields}
+
+
+def make_client(*responses: httpx.Response) -> MagicMock:
+    client = MagicMock(realm_id=REALM_ID)
+    client.get.side_effect = list(responses)
+    return client
+
+
+def recent(hours: int) -> str:
+    return (datetime.now(UTC) - timedelta(hours=hours)).isoformat(timespec="seconds")
+
+
+class TestAdvanceWatermark:
+    """Where the next CDC call resumes."""
+
+    def test_partial_page_moves_to_server_time(self):
+        objects = [changed("1")]
+        assert advance_watermark(MagicMock(), "Bill", objects, SINCE, SERVER_TIME) == (objects, SERVER_TIME, False)
+
+    def test_full_page_resumes_at_newest_object(self):
+        objects = [changed(str(i), "2026-10-18T10:00:00-07:00") for i in range(CDC_PAGE_LIMIT - 1)]
+        objects.append(changed("last", "2026-10-18T11:30:00-07:00"))
+
+        _, watermark, truncated = advance_watermark(MagicMock(), "Bill", objects, SINCE, SERVER_TIME)
+
+        assert (watermark, truncated) == ("2026-10-18T11:30:00-07:00", True)
+
+    def test_full_page_stuck_on_one_second_reads_it_with_a_query(self):
+        objects = [changed(str(i)) for i in range(CDC_PAGE_LIMIT)]
+        objects.append(changed("gone", status="Deleted"))
+        rows = [changed(str(i)) for i in range(CDC_PAGE_LIMIT + 200)]
+        client = MagicMock()
+        client.query.side_effect = [
+            httpx.Response(200, json={"QueryResponse": {"Bill": rows[:CDC_PAGE_LIMIT]}}),
+            httpx.Response(200, json={"QueryResponse": {"Bill": rows[CDC_PAGE_LIMIT:]}})
+        ]
+
+        result, watermark, truncated = advance_watermark(client, "Bill", objects, SINCE, SERVER_TIME)
+
+        assert watermark == "2026-10-18T17:00:01+00:00"
+        assert truncated is True
+        assert {o["Id"] for o in result} == {o["Id"] for o in rows} | {"gone"}
+        query = client.query.call_args_list[0].args[0]
+        assert "MetaData.LastUpdatedTime >= '2026-10-18T10:00:00-07:00'" in query
+        assert "MetaData.LastUpdatedTime < '2026-10-18T17:00:01+00:00'" in query
+
+    def test_name_lists_include_inactive_records(self):
+        objects = [changed(str(i)) for i in range(CDC_PAGE_LIMIT)]
+        client = MagicMock()
+        client.query.return_value = httpx.Response(200, json={"QueryResponse": {}})
+        advance_watermark(client, "Vendor", objects, SINCE, SERVER_TIME)
+        assert "Active IN (true, false)" in client.query.call_args.args[0]
+
+
+class TestSyncChanges:
+    """Stored watermarks drive each sync."""
+
+    def test_saves_watermark_and_splits_deletions(self):
+        storage = MockStorage()
+        save_watermark(storage, REALM_ID, "Bill", recent(2))
+        client = make_client(cdc_response(Bill=[changed("1"), changed("2", status="Deleted")]))
+
+        (result,) = sync_changes(client, storage, ["Bill"])
+
+        assert [o["Id"] for o in result.changed] == ["1"]
+        assert [o["Id"] for o in result.deleted] == ["2"]
+        assert load_watermark(storage, REALM_ID, "Bill") == SERVER_TIME
+
+    def test_dry_run_keeps_watermark(self):
+        storage = MockStorage()
+        since = recent(2)
+        save_watermark(storage, REALM_ID, "Bill", since)
+        sync_changes(make_client(cdc_response(Bill=[])), storage, ["Bill"], commit=False)
+        assert load_watermark(storage, REALM_ID, "Bill") == since
+
+    def test_entities_sharing_a_watermark_share_a_call(self):
+        storage = MockStorage()
+        since = recent(2)
+        for entity in ("Bill", "Invoice"):
+            save_watermark(storage, REALM_ID, entity, since)
+        client = make_client(cdc_response(Bill=[], Invoice=[]))
+
+        sync_changes(client, storage, ["Bill", "Invoice"])
+
+        assert client.get.call_count == 1
+        assert client.get.call_args.kwargs["params"]["entities"] == "Bill,Invoice"
+
+    def test_expired_watermark_requires_resync(self):
+        storage = MockStorage()
+        save_watermark(storage, REALM_ID, "Bill", recent(24 * 40))
+        (result,) = sync_changes(make_client(cdc_response(Bill=[])), storage, ["Bill"])
+        assert result.resync_required is True
+
+    def test_listeners_see_changes(self):
+        seen = []
+        add_change_listener(lambda realm_id, entity, objects: seen.append((realm_id, entity, len(objects))))
+        sync_changes(make_client(cdc_response(Bill=[changed("1")])), MockStorage(), ["Bill"])
+        assert (REALM_ID, "Bill", 1) in seen
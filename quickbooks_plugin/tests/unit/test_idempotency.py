@@ -0,0 +1,156 @@
+"""
+Unit tests for posting Mercury-sourced entities at most once.
+"""
+
+import json
+import os
+import sys
+import time
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+# Add plugin directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from provider import idempotency  # noqa: E402
+from provider.idempotency import (  # noqa: E402
+    POSTED_TTL,
+    PostedEntry,
+    expire_posted,
+    load_posted,
+    post_once,
+    request_id,
+    save_posted,
+    stamp_note
+)
+
+REALM_ID = "1234567890"
+DAY = 24 * 60 * 60
+# QuickBooks limit on PrivateNote length
+NOTE_LIMIT = 4000
+
+
+class MockStorage(dict):
+    def set(self, key, value):
+        self[key] = value
+
+    def exist(self, key):
+        return key in self
+
+    def delete(self, key):
+        self.pop(key, None)
+
+
+@pytest.fixture(autouse=True)
+def fresh_worker(monkeypatch):
+    monkeypatch.setattr(idempotency, "_ledger_sequence", {})
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Move ``time.time`` as seen by the index; starts at the real time."""
+    now = [time.time()]
+    monkeypatch.setattr(idempotency.time, "time", lambda: now[0])
+    return now
+
+
+def make_client(status_code: int = 200) -> MagicMock:
+    client = MagicMock(realm_id=REALM_ID)
+    client.post.return_value = httpx.Response(status_code, json={"Purchase": {"Id": "42", "SyncToken": "0"}})
+    return client
+
+
+def posted_keys(storage: MockStorage) -> list[str]:
+    return [key for key in storage if key.startswith("qbo_posted:")]
+
+
+class TestPostOnce:
+    """An external ID is posted once per company."""
+
+    def test_second_post_returns_stored_entry(self):
+        storage = MockStorage()
+        client = make_client()
+
+        response = post_once(client, storage, "Purchase", "txn_1", {"TotalAmt": 5})
+        again = post_once(client, storage, "Purchase", "txn_1", {"TotalAmt": 5})
+
+        assert response.status_code == httpx.codes.OK
+        assert isinstance(again, PostedEntry)
+        assert again.id == "42"
+        assert client.post.call_count == 1
+
+    def test_post_carries_request_id_and_stamp(self):
+        client = make_client()
+        post_once(client, MockStorage(), "Purchase", "txn_1", {"PrivateNote": "Coffee"})
+
+        kwargs = client.post.call_args.kwargs
+        assert kwargs["params"] == {"requestid": request_id(REALM_ID, "Purchase", "txn_1")}
+        assert kwargs["json"]["PrivateNote"] == "Coffee\nExternal ID: txn_1"
+
+    def test_failed_post_is_not_recorded(self):
+        storage = MockStorage()
+        post_once(make_client(400), storage, "Purchase", "txn_1", {})
+        assert load_posted(storage, REALM_ID, "Purchase", "txn_1") is None
+
+    def test_ids_are_per_company_and_entity(self):
+        storage = MockStorage()
+        save_posted(storage, REALM_ID, "Purchase", "txn_1", {"Id": "42"})
+        assert load_posted(storage, "other", "Purchase", "txn_1") is None
+        assert load_posted(storage, REALM_ID, "Deposit", "txn_1") is None
+
+
+class TestExpiry:
+    """Entries older than the TTL are deleted through the per-worker ledger."""
+
+    def test_old_entries_expire_as_new_ones_are_saved(self, clock):
+        storage = MockStorage()
+        expire_posted(storage, REALM_ID)
+        save_posted(storage, REALM_ID, "Purchase", "old", {"Id": "1"})
+
+        old_day = int(clock[0] // DAY)
+        clock[0] += POSTED_TTL + 2 * DAY
+        save_posted(storage, REALM_ID, "Purchase", "new", {"Id": "2"})
+
+        assert posted_keys(storage) == [idempotency._posted_key(REALM_ID, "Purchase", "new")]
+        assert not any(key.startswith(f"qbo_posted_ledger:{REALM_ID}:{old_day}:") for key in storage)
+
+    def test_entries_of_every_worker_expire(self, clock, monkeypatch):
+        storage = MockStorage()
+        expire_posted(storage, REALM_ID)
+        workers = ("worker-a", "worker-b")
+        per_worker = 3
+        for worker in workers:
+            monkeypatch.setattr(idempotency, "_WORKER_ID", worker)
+            monkeypatch.setattr(idempotency, "_ledger_sequence", {})
+            for number in range(per_worker):
+                save_posted(storage, REALM_ID, "Purchase", f"{worker}-{number}", {"Id": str(number)})
+        assert len(posted_keys(storage)) == len(workers) * per_worker
+        assert json.loads(storage[f"qbo_posted_workers:{REALM_ID}:{int(clock[0] // DAY)}"]) == list(workers)
+
+        clock[0] += POSTED_TTL + 2 * DAY
+        assert expire_posted(storage, REALM_ID) == len(workers) * per_worker
+        assert posted_keys(storage) == []
+
+    def test_expired_entry_is_dropped_on_read(self):
+        storage = MockStorage()
+        save_posted(storage, REALM_ID, "Purchase", "txn_1", {"Id": "42"})
+        key = posted_keys(storage)[0]
+        storage[key] = json.dumps({"id": "42", "posted_at": "2000-01-01T00:00:00+00:00"}).encode()
+
+        assert load_posted(storage, REALM_ID, "Purchase", "txn_1") is None
+        assert key not in storage
+
+
+class TestStampNote:
+    """The external ID is appended to the PrivateNote once."""
+
+    def test_stamp(self):
+        assert stamp_note("", "txn_1") == "External ID: txn_1"
+        assert stamp_note("External ID: txn_1", "txn_1") == "External ID: txn_1"
+
+    def test_long_note_keeps_the_stamp(self):
+        note = stamp_note("x" * 5000, "txn_1")
+        assert len(note) == NOTE_LIMIT
+        assert note.endswith("\nExternal ID: txn_1")
@@ -0,0 +1,102 @@
+"""
+Unit tests for parsing and validating journal entry CSV imports.
+"""
+
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+
+# Add plugin directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from provider.accounts import AccountIndex  # noqa: E402
+from provider.journal_import import build_journal_entry, csv_lines, parse_journal_csv, resolve_accounts  # noqa: E402
+
+HEADER = "Entry,Date,Memo,Account,Debit,Credit,Description\n"
+
+ACCOUNTS = AccountIndex([
+    {"Id": "35", "Name": "Checking", "FullyQualifiedName": "Checking"},
+    {"Id": "7", "Name": "Rent", "FullyQualifiedName": "Expenses:Rent"},
+    {"Id": "8", "Name": "Rent", "FullyQualifiedName": "Income:Rent"}
+])
+
+
+def parse(rows: str):
+    return parse_journal_csv(csv_lines(HEADER + rows))
+
+
+class TestParse:
+    """Rows are grouped into entries and totalled in exact cents."""
+
+    def test_groups_rows_by_entry(self):
+        drafts = parse(
+            "JE1,2024-01-31,Rent,Expenses:Rent,\"1,200.10\",,January\n"
+            "JE1,2024-01-31,Rent,Checking,,$1200.10,\n"
+            "JE2,2024-02-01,,Checking,0.1,,\n"
+            "JE2,2024-02-01,,Checking,0.2,,\n"
+            "JE2,2024-02-01,,Checking,,0.3,\n"
+        )
+        assert [draft.key for draft in drafts] == ["JE1", "JE2"]
+        assert all(not draft.errors for draft in drafts)
+        assert drafts[0].debits == drafts[0].credits == Decimal("1200.10")
+        assert drafts[1].debits == Decimal("0.3")
+
+    def test_uploaded_file_with_bom(self):
+        drafts = parse_journal_csv(csv_lines({"data": ("\ufeff" + HEADER + "JE1,,,Checking,1,,\n").encode()}))
+        assert drafts[0].key == "JE1"
+
+    def test_unbalanced_entry(self):
+        (draft,) = parse("JE1,,,Checking,10,,\nJE1,,,Checking,,9.99,\n")
+        assert draft.errors == ["Debits (10) do not equal credits (9.99)"]
+
+    def test_conflicting_entry_fields(self):
+        (draft,) = parse("JE1,2024-01-01,,Checking,1,,\nJE1,2024-01-02,,Checking,,1,\n")
+        assert "Row 3: txn_date '2024-01-02' differs from '2024-01-01'" in draft.errors
+
+    def test_missing_columns(self):
+        with pytest.raises(ValueError, match="missing column"):
+            parse_journal_csv(csv_lines("Entry,Debit\nJE1,1\n"))
+
+    @pytest.mark.parametrize(("debit", "credit", "error"), [
+        ("abc", "", "Row 2: debit and credit must be numbers"),
+        ("NaN", "", "Row 2: debit and credit must be numbers"),
+        ("Infinity", "", "Row 2: debit and credit must be numbers"),
+        ("1e400", "", "Row 2: amount 1E+400 is too large"),
+        ("1", "1", "Row 2: give exactly one of debit or credit"),
+        ("", "", "Row 2: give exactly one of debit or credit"),
+        ("-5", "", "Row 2: amounts must be positive; use the other column for reversals"),
+        ("1.001", "", "Row 2: amounts can have at most 2 decimal places")
+    ])
+    def test_bad_amounts_are_row_errors(self, debit, credit, error):
+        (draft,) = parse(f"JE1,,,Checking,{debit},{credit},\n")
+        assert error in draft.errors
+
+
+class TestAccounts:
+    """Account names and ids resolve against active accounts only."""
+
+    def test_resolves_names_and_ids(self):
+        drafts = parse("JE1,,,Expenses:Rent,5,,\nJE1,,,checking,,5,\n")
+        assert resolve_accounts(drafts, ACCOUNTS) == {2: "7", 3: "35"}
+
+    def test_ambiguous_and_unknown(self):
+        (draft,) = parse("JE1,,,Rent,5,,\nJE1,,,Savings,,5,\n")
+        resolve_accounts([draft], ACCOUNTS)
+        assert draft.errors == [
+            "Row 2: account 'Rent' is ambiguous (Expenses:Rent, Income:Rent)",
+            "Row 3: no active account named 'Savings'"
+        ]
+
+
+def test_build_journal_entry():
+    (draft,) = parse("JE1,2024-01-31,Rent,Expenses:Rent,5,,January\nJE1,2024-01-31,Rent,Checking,,5,\n")
+    payload = build_journal_entry(draft, resolve_accounts([draft], ACCOUNTS))
+
+    assert payload["TxnDate"] == "2024-01-31"
+    assert payload["PrivateNote"] == "Rent"
+    debit, credit = payload["Line"]
+    assert debit["Description"] == "January"
+    assert debit["JournalEntryLineDetail"] == {"PostingType": "Debit", "AccountRef": {"value": "7"}}
+    assert credit["JournalEntryLineDetail"]["PostingType"] == "Credit"
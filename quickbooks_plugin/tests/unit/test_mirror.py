@@ -0,0 +1,119 @@
+"""
+Unit tests for the SQLite entity mirror's query translation.
+"""
+
+import os
+import sqlite3
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# Add plugin directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from provider.mirror import EntityMirror  # noqa: E402
+
+REALM_ID = "1234567890"
+
+INVOICES = [
+    {"Id": "2", "DocNumber": "1002", "TxnDate": "2024-01-05", "TotalAmt": 50.0, "Balance": 0},
+    {"Id": "9", "DocNumber": "1009", "TxnDate": "2024-02-10", "TotalAmt": 150.0, "Balance": 25.5},
+    {"Id": "10", "DocNumber": "1010", "TxnDate": "2024-03-15", "TotalAmt": 250.0, "Balance": 250.0},
+    {"Id": "11", "DocNumber": "1011", "TxnDate": "2024-04-20", "TotalAmt": 100, "Balance": 100,
+     "PrivateNote": "42"}
+]
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    mirror = EntityMirror(str(tmp_path / "mirror.db"))
+    mirror.upsert(REALM_ID, "Invoice", INVOICES)
+    with patch.object(EntityMirror, "refresh", return_value=0.0):
+        yield mirror
+
+
+def query_ids(mirror: EntityMirror, query: str) -> list[str]:
+    client = MagicMock(realm_id=REALM_ID)
+    result = mirror.query(client, query, max_staleness=60)
+    assert result is not None
+    return [row["Id"] for row in result.rows]
+
+
+class TestNumericLiterals:
+    """Quoted numbers must compare as numbers against numeric fields."""
+
+    def test_quoted_zero_balance(self, mirror):
+        assert query_ids(mirror, "SELECT * FROM Invoice WHERE Balance > '0'") == ["9", "10", "11"]
+
+    def test_quoted_total_amount(self, mirror):
+        assert query_ids(mirror, "SELECT * FROM Invoice WHERE TotalAmt > '100'") == ["9", "10"]
+
+    def test_quoted_and_bare_literals_agree(self, mirror):
+        quoted = query_ids(mirror, "SELECT * FROM Invoice WHERE TotalAmt <= '100.0'")
+        bare = query_ids(mirror, "SELECT * FROM Invoice WHERE TotalAmt <= 100.0")
+        assert quoted == bare == ["2", "11"]
+
+    def test_quoted_equality(self, mirror):
+        assert query_ids(mirror, "SELECT * FROM Invoice WHERE Balance = '100'") == ["11"]
+
+    def test_quoted_in(self, mirror):
+        assert query_ids(mirror, "SELECT * FROM Invoice WHERE Balance IN ('0', '250')") == ["2", "10"]
+
+    def test_id_range_is_numeric(self, mirror):
+        assert query_ids(mirror, "SELECT * FROM Invoice WHERE Id > '10'") == ["11"]
+        assert query_ids(mirror, "SELECT * FROM Invoice WHERE Id < '10'") == ["2", "9"]
+
+    def test_id_equality(self, mirror):
+        assert query_ids(mirror, "SELECT * FROM Invoice WHERE Id = '10'") == ["10"]
+        assert query_ids(mirror, "SELECT * FROM Invoice WHERE Id IN ('2', '11')") == ["2", "11"]
+
+    def test_string_field_keeps_string_comparison(self, mirror):
+        assert query_ids(mirror, "SELECT * FROM Invoice WHERE PrivateNote = '42'") == ["11"]
+        assert query_ids(mirror, "SELECT * FROM Invoice WHERE DocNumber >= '1010'") == ["10", "11"]
+
+
+class TestReferenceColumns:
+    """Each reference filter matches only its own property."""
+
+    @pytest.fixture
+    def purchases(self, mirror):
+        mirror.upsert(REALM_ID, "Purchase", [
+            {"Id": "1", "EntityRef": {"value": "56"}, "AccountRef": {"value": "35"}},
+            {"Id": "2", "VendorRef": {"value": "56"}, "DepositToAccountRef": {"value": "35"}}
+        ])
+        return mirror
+
+    def test_vendor_ref_ignores_entity_ref(self, purchases):
+        assert query_ids(purchases, "SELECT * FROM Purchase WHERE VendorRef = '56'") == ["2"]
+        assert query_ids(purchases, "SELECT * FROM Purchase WHERE EntityRef = '56'") == ["1"]
+
+    def test_account_ref_ignores_other_accounts(self, purchases):
+        assert query_ids(purchases, "SELECT * FROM Purchase WHERE AccountRef = '35'") == ["1"]
+        assert query_ids(purchases, "SELECT * FROM Purchase WHERE DepositToAccountRef = '35'") == ["2"]
+
+    def test_line_filters_fall_back(self, purchases):
+        client = MagicMock(realm_id=REALM_ID)
+        query = "SELECT * FROM Purchase WHERE Line.Amount > '10'"
+        assert purchases.query(client, query, max_staleness=60) is None
+
+
+def test_outdated_schema_is_rebuilt(tmp_path):
+    path = str(tmp_path / "mirror.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE records (realm_id TEXT, entity TEXT, id TEXT, data TEXT)")
+    mirror = EntityMirror(path)
+    mirror.upsert(REALM_ID, "Bill", [{"Id": "1", "VendorRef": {"value": "7"}}])
+    with patch.object(EntityMirror, "refresh", return_value=0.0):
+        assert query_ids(mirror, "SELECT * FROM Bill WHERE VendorRef = '7'") == ["1"]
+
+
+def test_load_replaces_records_in_one_step(tmp_path):
+    mirror = EntityMirror(str(tmp_path / "mirror.db"))
+    mirror.upsert(REALM_ID, "Bill", [{"Id": "1"}, {"Id": "2"}])
+    client = MagicMock(realm_id=REALM_ID)
+    pages = [MagicMock(rows=[{"Id": "2"}]), MagicMock(rows=[{"Id": "3"}])]
+    with patch("provider.mirror.iter_query_pages", return_value=iter(pages)):
+        mirror._load(client, "Bill")
+    with patch.object(EntityMirror, "refresh", return_value=0.0):
+        assert query_ids(mirror, "SELECT * FROM Bill") == ["2", "3"]
@@ -0,0 +1,842 @@
+#!/usr/bin/env python3
+"""
+Unit tests for QuickBooks Plugin - New Tools
+
+Tests all new tool implementations with mocked HTTP responses.
+"""
+
+import json
+import sys
+import os
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# Add plugin directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+
+def create_mock_runtime(credentials: dict = None):
+    """Create a mock runtime object for testing."""
+    runtime = MagicMock()
+    runtime.credentials = credentials or {
+        "access_token": "test_token",
+        "realm_id": "1234567890",
+        "environment": "sandbox"
+    }
+    return runtime
+
+
+def create_mock_session():
+    """Create a mock session object."""
+    return MagicMock()
+
+
+def get_message_text(result) -> str:
+    """Extract text from ToolInvokeMessage."""
+    if hasattr(result, 'message'):
+        msg = result.message
+        if hasattr(msg, 'text'):
+            return msg.text
+        return str(msg)
+    return str(result)
+
+
+def get_json_data(result) -> dict:
+    """Extract JSON data from ToolInvokeMessage."""
+    if hasattr(result, 'message'):
+        msg = result.message
+        if hasattr(msg, 'json_object'):
+            return msg.json_object
+        if isinstance(msg, dict):
+            return msg
+    return {}
+
+
+# =============================================================================
+# PaymentManagementTool Tests
+# =============================================================================
+class TestPaymentManagementTool:
+    """Tests for PaymentManagementTool."""
+
+    @patch('httpx.post')
+    def test_create_payment_success(self, mock_post):
+        """Test successful payment creation."""
+        from tools.payment_management import PaymentManagementTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "Payment": {
+                "Id": "pmt_123",
+                "SyncToken": "0",
+                "CustomerRef": {"value": "cust_1", "name": "John Doe"},
+                "TotalAmt": 100.00
+            }
+        }
+        mock_post.return_value = mock_response
+
+        tool = PaymentManagementTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({
+            "operation": "create",
+            "customer_id": "cust_1",
+            "total_amount": 100.00
+        }))
+
+        assert len(results) == 1
+        data = get_json_data(results[0])
+        assert data["success"] is True
+        assert data["operation"] == "create"
+        assert data["payment"]["id"] == "pmt_123"
+
+    @patch('httpx.get')
+    def test_read_payment_success(self, mock_get):
+        """Test successful payment retrieval."""
+        from tools.payment_management import PaymentManagementTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "Payment": {
+                "Id": "pmt_123",
+                "TotalAmt": 100.00
+            }
+        }
+        mock_get.return_value = mock_response
+
+        tool = PaymentManagementTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({"operation": "read", "payment_id": "pmt_123"}))
+
+        assert len(results) == 1
+        data = get_json_data(results[0])
+        assert data["success"] is True
+        assert data["operation"] == "read"
+
+    @patch('httpx.post')
+    def test_void_payment_success(self, mock_post):
+        """Test successful payment void."""
+        from tools.payment_management import PaymentManagementTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_post.return_value = mock_response
+
+        tool = PaymentManagementTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({
+            "operation": "void",
+            "payment_id": "pmt_123",
+            "sync_token": "0"
+        }))
+
+        assert len(results) == 1
+        data = get_json_data(results[0])
+        assert data["success"] is True
+        assert data["operation"] == "void"
+
+    @patch('httpx.get')
+    def test_query_payments_success(self, mock_get):
+        """Test successful payments query."""
+        from tools.payment_management import PaymentManagementTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "QueryResponse": {
+                "Payment": [{"Id": "1"}, {"Id": "2"}]
+            }
+        }
+        mock_get.return_value = mock_response
+
+        tool = PaymentManagementTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({"operation": "query"}))
+
+        assert len(results) == 1
+        data = get_json_data(results[0])
+        assert data["count"] == 2
+
+    def test_create_payment_missing_fields(self):
+        """Test error when required fields missing."""
+        from tools.payment_management import PaymentManagementTool
+
+        tool = PaymentManagementTool(runtime=create_mock_runtime(), session=create_mock_session())
+        with pytest.raises(ValueError, match="customer_id and total_amount are required"):
+            list(tool._invoke({"operation": "create"}))
+
+
+# =============================================================================
+# BillPaymentManagementTool Tests
+# =============================================================================
+class TestBillPaymentManagementTool:
+    """Tests for BillPaymentManagementTool."""
+
+    @patch('httpx.post')
+    def test_create_bill_payment_success(self, mock_post):
+        """Test successful bill payment creation."""
+        from tools.bill_payment_management import BillPaymentManagementTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "BillPayment": {
+                "Id": "bp_123",
+                "SyncToken": "0",
+                "VendorRef": {"value": "v_1"},
+                "TotalAmt": 500.00,
+                "PayType": "Check"
+            }
+        }
+        mock_post.return_value = mock_response
+
+        tool = BillPaymentManagementTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({
+            "operation": "create",
+            "vendor_id": "v_1",
+            "total_amount": 500.00,
+            "pay_type": "Check",
+            "bank_account_id": "acc_1"
+        }))
+
+        assert len(results) == 1
+        data = get_json_data(results[0])
+        assert data["success"] is True
+        assert data["operation"] == "create"
+
+    @patch('httpx.post')
+    def test_void_bill_payment_success(self, mock_post):
+        """Test successful bill payment void."""
+        from tools.bill_payment_management import BillPaymentManagementTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_post.return_value = mock_response
+
+        tool = BillPaymentManagementTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({
+            "operation": "void",
+            "bill_payment_id": "bp_123",
+            "sync_token": "0"
+        }))
+
+        assert len(results) == 1
+        data = get_json_data(results[0])
+        assert data["success"] is True
+
+
+# =============================================================================
+# JournalEntryManagementTool Tests
+# =============================================================================
+class TestJournalEntryManagementTool:
+    """Tests for JournalEntryManagementTool."""
+
+    @patch('httpx.post')
+    def test_create_journal_entry_success(self, mock_post):
+        """Test successful journal entry creation."""
+        from tools.journal_entry_management import JournalEntryManagementTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "JournalEntry": {
+                "Id": "je_123",
+                "SyncToken": "0",
+                "TxnDate": "2024-01-15"
+            }
+        }
+        mock_post.return_value = mock_response
+
+        tool = JournalEntryManagementTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({
+            "operation": "create",
+            "lines_json": '[{"Amount": 100, "PostingType": "Debit", "AccountRef": {"value": "1"}}, {"Amount": 100, "PostingType": "Credit", "AccountRef": {"value": "2"}}]'
+        }))
+
+        assert len(results) == 1
+        data = get_json_data(results[0])
+        assert data["success"] is True
+
+    def test_create_journal_entry_invalid_json(self):
+        """Test error when lines_json is invalid."""
+        from tools.journal_entry_management import JournalEntryManagementTool
+
+        tool = JournalEntryManagementTool(runtime=create_mock_runtime(), session=create_mock_session())
+        with pytest.raises(ValueError, match="Invalid lines_json"):
+            list(tool._invoke({
+                "operation": "create",
+                "lines_json": "not valid json"
+            }))
+
+
+# =============================================================================
+# ItemManagementTool Tests
+# =============================================================================
+class TestItemManagementTool:
+    """Tests for ItemManagementTool."""
+
+    @patch('httpx.post')
+    def test_create_service_item_success(self, mock_post):
+        """Test successful service item creation."""
+        from tools.item_management import ItemManagementTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "Item": {
+                "Id": "item_123",
+                "SyncToken": "0",
+                "Name": "Consulting",
+                "Type": "Service",
+                "UnitPrice": 150.00
+            }
+        }
+        mock_post.return_value = mock_response
+
+        tool = ItemManagementTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({
+            "operation": "create",
+            "name": "Consulting",
+            "item_type": "Service",
+            "unit_price": 150.00,
+            "income_account_id": "acc_1"
+        }))
+
+        assert len(results) == 1
+        data = get_json_data(results[0])
+        assert data["success"] is True
+        assert data["item"]["name"] == "Consulting"
+
+    @patch('httpx.post')
+    def test_create_inventory_item_success(self, mock_post):
+        """Test successful inventory item creation."""
+        from tools.item_management import ItemManagementTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "Item": {
+                "Id": "item_456",
+                "Name": "Widget",
+                "Type": "Inventory",
+                "QtyOnHand": 100
+            }
+        }
+        mock_post.return_value = mock_response
+
+        tool = ItemManagementTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({
+            "operation": "create",
+            "name": "Widget",
+            "item_type": "Inventory",
+            "qty_on_hand": 100,
+            "asset_account_id": "acc_1",
+            "income_account_id": "acc_2",
+            "expense_account_id": "acc_3"
+        }))
+
+        assert len(results) == 1
+        data = get_json_data(results[0])
+        assert data["success"] is True
+
+    @patch('httpx.get')
+    def test_query_items_success(self, mock_get):
+        """Test successful items query."""
+        from tools.item_management import ItemManagementTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "QueryResponse": {
+                "Item": [{"Id": "1", "Name": "Item1"}, {"Id": "2", "Name": "Item2"}]
+            }
+        }
+        mock_get.return_value = mock_response
+
+        tool = ItemManagementTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({"operation": "query"}))
+
+        assert len(results) == 1
+        data = get_json_data(results[0])
+        assert data["count"] == 2
+
+
+# =============================================================================
+# EstimateManagementTool Tests
+# =============================================================================
+class TestEstimateManagementTool:
+    """Tests for EstimateManagementTool."""
+
+    @patch('httpx.post')
+    def test_create_estimate_success(self, mock_post):
+        """Test successful estimate creation."""
+        from tools.estimate_management import EstimateManagementTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "Estimate": {
+                "Id": "est_123",
+                "SyncToken": "0",
+                "CustomerRef": {"value": "c_1"},
+                "TotalAmt": 1000.00
+            }
+        }
+        mock_post.return_value = mock_response
+
+        tool = EstimateManagementTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({
+            "operation": "create",
+            "customer_id": "c_1",
+            "lines_json": '[{"DetailType": "SalesItemLineDetail", "Amount": 1000, "SalesItemLineDetail": {"ItemRef": {"value": "1"}}}]'
+        }))
+
+        assert len(results) == 1
+        data = get_json_data(results[0])
+        assert data["success"] is True
+
+
+# =============================================================================
+# SalesReceiptManagementTool Tests
+# =============================================================================
+class TestSalesReceiptManagementTool:
+    """Tests for SalesReceiptManagementTool."""
+
+    @patch('httpx.post')
+    def test_create_sales_receipt_success(self, mock_post):
+        """Test successful sales receipt creation."""
+        from tools.sales_receipt_management import SalesReceiptManagementTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "SalesReceipt": {
+                "Id": "sr_123",
+                "SyncToken": "0",
+                "TotalAmt": 500.00
+            }
+        }
+        mock_post.return_value = mock_response
+
+        tool = SalesReceiptManagementTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({
+            "operation": "create",
+            "lines_json": '[{"DetailType": "SalesItemLineDetail", "Amount": 500, "SalesItemLineDetail": {"ItemRef": {"value": "1"}}}]'
+        }))
+
+        assert len(results) == 1
+        data = get_json_data(results[0])
+        assert data["success"] is True
+
+
+# =============================================================================
+# CreditMemoManagementTool Tests
+# =============================================================================
+class TestCreditMemoManagementTool:
+    """Tests for CreditMemoManagementTool."""
+
+    @patch('httpx.post')
+    def test_create_credit_memo_success(self, mock_post):
+        """Test successful credit memo creation."""
+        from tools.credit_memo_management import CreditMemoManagementTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "CreditMemo": {
+                "Id": "cm_123",
+                "SyncToken": "0",
+                "TotalAmt": 50.00
+            }
+        }
+        mock_post.return_value = mock_response
+
+        tool = CreditMemoManagementTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({
+            "operation": "create",
+            "customer_id": "c_1",
+            "lines_json": '[{"DetailType": "SalesItemLineDetail", "Amount": 50, "SalesItemLineDetail": {"ItemRef": {"value": "1"}}}]'
+        }))
+
+        assert len(results) == 1
+        data = get_json_data(results[0])
+        assert data["success"] is True
+
+
+# =============================================================================
+# RefundReceiptManagementTool Tests
+# =============================================================================
+class TestRefundReceiptManagementTool:
+    """Tests for RefundReceiptManagementTool."""
+
+    @patch('httpx.post')
+    def test_create_refund_receipt_success(self, mock_post):
+        """Test successful refund receipt creation."""
+        from tools.refund_receipt_management import RefundReceiptManagementTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "RefundReceipt": {
+                "Id": "rr_123",
+                "SyncToken": "0",
+                "TotalAmt": 75.00
+            }
+        }
+        mock_post.return_value = mock_response
+
+        tool = RefundReceiptManagementTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({
+            "operation": "create",
+            "deposit_to_account_id": "acc_1",
+            "lines_json": '[{"DetailType": "SalesItemLineDetail", "Amount": 75, "SalesItemLineDetail": {"ItemRef": {"value": "1"}}}]'
+        }))
+
+        assert len(results) == 1
+        data = get_json_data(results[0])
+        assert data["success"] is True
+
+
+# =============================================================================
+# PurchaseOrderManagementTool Tests
+# =============================================================================
+class TestPurchaseOrderManagementTool:
+    """Tests for PurchaseOrderManagementTool."""
+
+    @patch('httpx.post')
+    def test_create_purchase_order_success(self, mock_post):
+        """Test successful purchase order creation."""
+        from tools.purchase_order_management import PurchaseOrderManagementTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "PurchaseOrder": {
+                "Id": "po_123",
+                "SyncToken": "0",
+                "VendorRef": {"value": "v_1"},
+                "TotalAmt": 2000.00
+            }
+        }
+        mock_post.return_value = mock_response
+
+        tool = PurchaseOrderManagementTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({
+            "operation": "create",
+            "vendor_id": "v_1",
+            "ap_account_id": "ap_1",
+            "lines_json": '[{"DetailType": "ItemBasedExpenseLineDetail", "Amount": 2000, "ItemBasedExpenseLineDetail": {"ItemRef": {"value": "1"}}}]'
+        }))
+
+        assert len(results) == 1
+        data = get_json_data(results[0])
+        assert data["success"] is True
+
+
+# =============================================================================
+# EmployeeManagementTool Tests
+# =============================================================================
+class TestEmployeeManagementTool:
+    """Tests for EmployeeManagementTool."""
+
+    @patch('httpx.post')
+    def test_create_employee_success(self, mock_post):
+        """Test successful employee creation."""
+        from tools.employee_management import EmployeeManagementTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "Employee": {
+                "Id": "emp_123",
+                "SyncToken": "0",
+                "GivenName": "John",
+                "FamilyName": "Doe",
+                "DisplayName": "John Doe"
+            }
+        }
+        mock_post.return_value = mock_response
+
+        tool = EmployeeManagementTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({
+            "operation": "create",
+            "given_name": "John",
+            "family_name": "Doe"
+        }))
+
+        assert len(results) == 1
+        data = get_json_data(results[0])
+        assert data["success"] is True
+
+    @patch('httpx.get')
+    def test_query_employees_success(self, mock_get):
+        """Test successful employees query."""
+        from tools.employee_management import EmployeeManagementTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "QueryResponse": {
+                "Employee": [{"Id": "1"}, {"Id": "2"}]
+            }
+        }
+        mock_get.return_value = mock_response
+
+        tool = EmployeeManagementTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({"operation": "query"}))
+
+        assert len(results) == 1
+        data = get_json_data(results[0])
+        assert data["count"] == 2
+
+
+# =============================================================================
+# ClassManagementTool Tests
+# =============================================================================
+class TestClassManagementTool:
+    """Tests for ClassManagementTool."""
+
+    @patch('httpx.post')
+    def test_create_class_success(self, mock_post):
+        """Test successful class creation."""
+        from tools.class_management import ClassManagementTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "Class": {
+                "Id": "cls_123",
+                "SyncToken": "0",
+                "Name": "Marketing",
+                "Active": True
+            }
+        }
+        mock_post.return_value = mock_response
+
+        tool = ClassManagementTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({
+            "operation": "create",
+            "name": "Marketing"
+        }))
+
+        assert len(results) == 1
+        data = get_json_data(results[0])
+        assert data["success"] is True
+
+
+# =============================================================================
+# DepartmentManagementTool Tests
+# =============================================================================
+class TestDepartmentManagementTool:
+    """Tests for DepartmentManagementTool."""
+
+    @patch('httpx.post')
+    def test_create_department_success(self, mock_post):
+        """Test successful department creation."""
+        from tools.department_management import DepartmentManagementTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "Department": {
+                "Id": "dept_123",
+                "SyncToken": "0",
+                "Name": "Engineering",
+                "Active": True
+            }
+        }
+        mock_post.return_value = mock_response
+
+        tool = DepartmentManagementTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({
+            "operation": "create",
+            "name": "Engineering"
+        }))
+
+        assert len(results) == 1
+        data = get_json_data(results[0])
+        assert data["success"] is True
+
+
+# =============================================================================
+# QueryEntitiesTool Tests
+# =============================================================================
+class TestQueryEntitiesTool:
+    """Tests for QueryEntitiesTool."""
+
+    @patch('httpx.get')
+    def test_query_accounts_success(self, mock_get):
+        """Test successful accounts query."""
+        from tools.query_entities import QueryEntitiesTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "QueryResponse": {
+                "Account": [{"Id": "1"}, {"Id": "2"}, {"Id": "3"}]
+            }
+        }
+        mock_get.return_value = mock_response
+
+        tool = QueryEntitiesTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({"entity_type": "Account"}))
+
+        assert len(results) == 1
+        data = get_json_data(results[0])
+        assert data["success"] is True
+        assert data["count"] == 3
+        assert data["entity_type"] == "Account"
+
+    @patch('httpx.get')
+    def test_query_with_where_clause(self, mock_get):
+        """Test query with WHERE clause."""
+        from tools.query_entities import QueryEntitiesTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "QueryResponse": {"Customer": [{"Id": "1"}]}
+        }
+        mock_get.return_value = mock_response
+
+        tool = QueryEntitiesTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({
+            "entity_type": "Customer",
+            "query_string": "Active = true"
+        }))
+
+        # Verify the query was constructed correctly
+        call_args = mock_get.call_args
+        assert "WHERE" in call_args[0][0] or "WHERE" in str(call_args)
+
+    @patch('httpx.get')
+    def test_custom_query_success(self, mock_get):
+        """Test custom SQL query."""
+        from tools.query_entities import QueryEntitiesTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "QueryResponse": {"Invoice": [{"Id": "1"}]}
+        }
+        mock_get.return_value = mock_response
+
+        tool = QueryEntitiesTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({
+            "custom_query": "SELECT * FROM Invoice WHERE TotalAmt > 1000"
+        }))
+
+        assert len(results) == 1
+        data = get_json_data(results[0])
+        assert data["success"] is True
+
+    def test_unsupported_entity_type(self):
+        """Test error with unsupported entity type."""
+        from tools.query_entities import QueryEntitiesTool
+
+        tool = QueryEntitiesTool(runtime=create_mock_runtime(), session=create_mock_session())
+        with pytest.raises(ValueError, match="Unsupported entity type"):
+            list(tool._invoke({"entity_type": "InvalidEntity"}))
+
+    def test_missing_entity_and_query(self):
+        """Test error when neither entity_type nor custom_query provided."""
+        from tools.query_entities import QueryEntitiesTool
+
+        tool = QueryEntitiesTool(runtime=create_mock_runtime(), session=create_mock_session())
+        with pytest.raises(ValueError, match="Either entity_type or custom_query"):
+            list(tool._invoke({}))
+
+
+# =============================================================================
+# AttachableManagementTool Tests
+# =============================================================================
+class TestAttachableManagementTool:
+    """Tests for AttachableManagementTool."""
+
+    @patch('httpx.post')
+    def test_create_note_success(self, mock_post):
+        """Test successful note creation."""
+        from tools.attachable_management import AttachableManagementTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "Attachable": {
+                "Id": "att_123",
+                "SyncToken": "0",
+                "Note": "Test note"
+            }
+        }
+        mock_post.return_value = mock_response
+
+        tool = AttachableManagementTool(runtime=create_mock_runtime(), session=create_mock_session())
+        results = list(tool._invoke({
+            "operation": "create_note",
+            "note": "Test note",
+            "entity_id": "inv_123"
+        }))
+
+        assert len(results) == 1
+        data = get_json_data(results[0])
+        assert data["success"] is True
+
+
+# =============================================================================
+# Credentials and Environment Tests
+# =============================================================================
+class TestCredentialsAndEnvironment:
+    """Tests for credentials validation and environment handling."""
+
+    def test_missing_credentials(self):
+        """Test error when credentials are missing."""
+        from tools.payment_management import PaymentManagementTool
+
+        runtime = create_mock_runtime({"environment": "sandbox"})
+        tool = PaymentManagementTool(runtime=runtime, session=create_mock_session())
+        with pytest.raises(Exception, match="credentials required"):
+            list(tool._invoke({"operation": "query"}))
+
+    @patch('httpx.get')
+    def test_sandbox_url(self, mock_get):
+        """Test sandbox environment uses correct URL."""
+        from tools.query_entities import QueryEntitiesTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"QueryResponse": {"Account": []}}
+        mock_get.return_value = mock_response
+
+        runtime = create_mock_runtime({
+            "access_token": "test",
+            "realm_id": "123",
+            "environment": "sandbox"
+        })
+        tool = QueryEntitiesTool(runtime=runtime, session=create_mock_session())
+        list(tool._invoke({"entity_type": "Account"}))
+
+        call_args = mock_get.call_args
+        assert "sandbox-quickbooks" in call_args[0][0]
+
+    @patch('httpx.get')
+    def test_production_url(self, mock_get):
+        """Test production environment uses correct URL."""
+        from tools.query_entities import QueryEntitiesTool
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"QueryResponse": {"Account": []}}
+        mock_get.return_value = mock_response
+
+        runtime = create_mock_runtime({
+            "access_token": "test",
+            "realm_id": "123",
+            "environment": "production"
+        })
+        tool = QueryEntitiesTool(runtime=runtime, session=create_mock_session())
+        list(tool._invoke({"entity_type": "Account"}))
+
+        call_args = mock_get.call_args
+        assert "quickbooks.api.intuit.com" in call_args[0][0]
+        assert "sandbox" not in call_args[0][0]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,102 @@
+"""
+Unit tests for allocating a payment across open invoices.
+"""
+
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+
+# Add plugin directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from provider.open_invoices import (  # noqa: E402
+    OpenInvoice,
+    OpenInvoiceCache,
+    OpenInvoiceIndex,
+    allocate_exact,
+    allocate_oldest_first
+)
+
+
+def invoice(invoice_id: str, due_date: str, balance: str) -> OpenInvoice:
+    return OpenInvoice(invoice_id, f"INV-{invoice_id}", due_date, due_date, Decimal(balance))
+
+
+INVOICES = OpenInvoiceIndex([
+    invoice("3", "2024-03-01", "300.00"),
+    invoice("1", "2024-01-01", "100.00"),
+    invoice("2", "2024-02-01", "250.50"),
+    invoice("4", "2024-04-01", "49.50")
+]).invoices
+
+
+def paid(allocations) -> list[tuple[str, Decimal]]:
+    return [(allocation.invoice.id, allocation.amount) for allocation in allocations]
+
+
+class TestAllocateOldestFirst:
+    """Tests for allocate_oldest_first."""
+
+    def test_pays_oldest_invoices_first(self):
+        assert paid(allocate_oldest_first(INVOICES, Decimal("350.50"))) == [
+            ("1", Decimal("100.00")), ("2", Decimal("250.50"))
+        ]
+
+    def test_last_invoice_paid_in_part(self):
+        assert paid(allocate_oldest_first(INVOICES, Decimal("150.00"))) == [
+            ("1", Decimal("100.00")), ("2", Decimal("50.00"))
+        ]
+
+    def test_amount_above_total_balance_pays_everything(self):
+        allocations = allocate_oldest_first(INVOICES, Decimal("1000.00"))
+        assert paid(allocations) == [(inv.id, inv.balance) for inv in INVOICES]
+
+    def test_empty_invoice_list(self):
+        assert allocate_oldest_first([], Decimal("10.00")) == []
+
+
+class TestAllocateExact:
+    """Tests for allocate_exact."""
+
+    def test_single_invoice_match_wins(self):
+        assert paid(allocate_exact(INVOICES, Decimal("300.00"))) == [("3", Decimal("300.00"))]
+
+    def test_run_of_oldest_invoices(self):
+        assert paid(allocate_exact(INVOICES, Decimal("350.50"))) == [
+            ("1", Decimal("100.00")), ("2", Decimal("250.50"))
+        ]
+
+    def test_combination_is_returned_oldest_first(self):
+        assert paid(allocate_exact(INVOICES, Decimal("349.50"))) == [
+            ("3", Decimal("300.00")), ("4", Decimal("49.50"))
+        ]
+
+    def test_prefers_older_invoices(self):
+        invoices = OpenInvoiceIndex([
+            invoice("1", "2024-01-01", "60.00"),
+            invoice("2", "2024-02-01", "40.00"),
+            invoice("3", "2024-03-01", "90.00"),
+            invoice("4", "2024-04-01", "10.00")
+        ]).invoices
+        assert paid(allocate_exact(invoices, Decimal("70.00"))) == [("1", Decimal("60.00")), ("4", Decimal("10.00"))]
+
+    def test_no_combination_raises(self):
+        with pytest.raises(ValueError, match="adds up to exactly 123.45"):
+            allocate_exact(INVOICES, Decimal("123.45"))
+
+
+class TestOpenInvoiceCacheInvalidate:
+    """Tests for OpenInvoiceCache.invalidate."""
+
+    def test_invalidates_one_customer_or_the_whole_realm(self):
+        cache = OpenInvoiceCache()
+        index = OpenInvoiceIndex(INVOICES)
+        for key in [("r1", "sandbox", "c1"), ("r1", "sandbox", "c2"), ("r2", "sandbox", "c1")]:
+            cache._entries[key] = (0.0, index)
+
+        cache.invalidate("r1", "c1")
+        assert set(cache._entries) == {("r1", "sandbox", "c2"), ("r2", "sandbox", "c1")}
+        cache.invalidate("r1")
+        assert set(cache._entries) == {("r2", "sandbox", "c1")}
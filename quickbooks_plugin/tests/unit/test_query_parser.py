@@ -0,0 +1,101 @@
+"""
+Unit tests for the QuickBooks query tokenizer and parser.
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add plugin directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from provider.query_parser import Condition, parse_query  # noqa: E402
+
+
+class TestParse:
+    """Statements parse into their parts."""
+
+    def test_full_statement(self):
+        query = parse_query(
+            "select Id, TxnDate from Bill where TotalAmt >= 10.5 and DocNumber LIKE 'INV%' "
+            "orderby TxnDate desc startposition 11 maxresults 5"
+        )
+        assert query.entity == "Bill"
+        assert query.fields == ("Id", "TxnDate")
+        assert query.conditions == (Condition("TotalAmt", ">=", 10.5), Condition("DocNumber", "LIKE", "INV%"))
+        assert query.order_by == (("TxnDate", "DESC"),)
+        assert (query.start_position, query.max_results) == (11, 5)
+
+    def test_count(self):
+        query = parse_query("SELECT COUNT(*) FROM Invoice")
+        assert query.count is True
+        assert query.fields == ()
+
+    def test_in_and_booleans(self):
+        (condition,) = parse_query("SELECT * FROM Customer WHERE Active IN (true, false)").conditions
+        assert condition == Condition("Active", "IN", (True, False))
+
+    def test_order_by_two_words(self):
+        assert parse_query("SELECT * FROM Bill ORDER BY Id").order_by == (("Id", "ASC"),)
+
+    def test_escaped_quotes(self):
+        (condition,) = parse_query("SELECT * FROM Vendor WHERE DisplayName = 'O\\'Brien'").conditions
+        assert condition.value == "O'Brien"
+        (condition,) = parse_query("SELECT * FROM Vendor WHERE DisplayName = 'O''Brien'").conditions
+        assert condition.value == "O'Brien"
+
+    def test_or_is_recorded(self):
+        assert parse_query("SELECT * FROM Bill WHERE Id = '1' OR Id = '2'").uses_or is True
+
+
+class TestReject:
+    """Anything outside the read-only SELECT dialect fails with a position."""
+
+    @pytest.mark.parametrize("text", [
+        "DELETE FROM Bill",
+        "SELECT * FROM Bill; DROP TABLE Bill",
+        "SELECT * FROM Bill -- comment",
+        "SELECT * FROM Bill WHERE DocNumber = 'open",
+        "SELECT * FROM Bill WHERE",
+        "SELECT * FROM Bill MAXRESULTS 5 MAXRESULTS 6",
+        "SELECT * FROM Bill WHERE Id = Id"
+    ])
+    def test_invalid(self, text):
+        with pytest.raises(ValueError, match="Invalid query"):
+            parse_query(text)
+
+    def test_too_long(self):
+        with pytest.raises(ValueError, match="too long"):
+            parse_query("SELECT * FROM Bill WHERE DocNumber = '" + "x" * 100000 + "'")
+
+
+class TestRender:
+    """Parsed queries render back to canonical text."""
+
+    def test_round_trip(self):
+        text = "SELECT * FROM Bill WHERE DocNumber = 'O\\'Brien' AND Active = true ORDERBY Id DESC MAXRESULTS 10"
+        assert parse_query(text).render() == text
+
+    def test_equal_queries_render_alike(self):
+        assert parse_query("select * from Bill where Id='1'").render() == parse_query(
+            "SELECT  *  FROM Bill WHERE Id = '1'"
+        ).render()
+
+    def test_paging_and_counting(self):
+        query = parse_query("SELECT * FROM Bill ORDERBY Id STARTPOSITION 5 MAXRESULTS 2")
+        assert query.without_paging().render() == "SELECT * FROM Bill ORDERBY Id ASC"
+        assert query.paged(1, 100).render() == "SELECT * FROM Bill ORDERBY Id ASC STARTPOSITION 1 MAXRESULTS 100"
+        assert query.counting().render() == "SELECT COUNT(*) FROM Bill"
+
+    def test_where_adds_conditions(self):
+        query = parse_query("SELECT * FROM Bill WHERE Id > '1'").where(Condition("TxnDate", ">=", "2024-01-01"))
+        assert query.render() == "SELECT * FROM Bill WHERE Id > '1' AND TxnDate >= '2024-01-01'"
+
+    def test_where_refuses_or(self):
+        with pytest.raises(ValueError, match="OR"):
+            parse_query("SELECT * FROM Bill WHERE Id = '1' OR Id = '2'").where(Condition("Id", "=", "3"))
+
+    def test_projected_keeps_explicit_fields(self):
+        assert parse_query("SELECT * FROM Bill").projected(["Id"]).fields == ("Id",)
+        assert parse_query("SELECT TxnDate FROM Bill").projected(["Id"]).fields == ("TxnDate",)
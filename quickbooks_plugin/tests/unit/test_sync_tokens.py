@@ -0,0 +1,117 @@
+"""
+Unit tests for SyncToken caching and stale-object retries on updates.
+"""
+
+import os
+import sys
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+# Add plugin directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from provider.sync_tokens import SyncTokenCache, is_stale_object, sync_token_cache, update_entity  # noqa: E402
+
+REALM_ID = "1234567890"
+
+STALE = httpx.Response(400, json={"Fault": {"Error": [{"code": "5010", "Message": "Stale Object Error"}]}})
+
+
+def make_client(**routes) -> MagicMock:
+    """Client whose GET and POST calls return the given response lists in order."""
+    client = MagicMock(realm_id=REALM_ID, environment="sandbox")
+    client.get.side_effect = routes.get("get", [])
+    client.post.side_effect = routes.get("post", [])
+    return client
+
+
+def record(entity: str, sync_token: str, **fields) -> httpx.Response:
+    return httpx.Response(200, json={entity: {"Id": "7", "SyncToken": sync_token, **fields}})
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    sync_token_cache._tokens.clear()
+
+
+class TestCache:
+    """Tokens are kept per company and record, and follow CDC changes."""
+
+    def test_remember_and_evict(self):
+        cache = SyncTokenCache(max_size=2)
+        client = make_client()
+        for entity_id in ("1", "2", "3"):
+            cache.remember(client, "Invoice", {"Id": entity_id, "SyncToken": "0"})
+        assert cache.get(client, "Invoice", "1") is None
+        assert cache.get(client, "Invoice", 3) == "0"
+
+    def test_cdc_changes_update_known_records_only(self):
+        cache = SyncTokenCache()
+        client = make_client()
+        cache.remember(client, "Invoice", {"Id": "1", "SyncToken": "0"})
+        cache.remember(client, "Invoice", {"Id": "2", "SyncToken": "0"})
+
+        cache.apply_changes(REALM_ID, "Invoice", [
+            {"Id": "1", "SyncToken": "4"}, {"Id": "2", "status": "Deleted"}, {"Id": "3", "SyncToken": "1"}
+        ])
+
+        assert cache.get(client, "Invoice", "1") == "4"
+        assert cache.get(client, "Invoice", "2") is None
+        assert cache.get(client, "Invoice", "3") is None
+
+    def test_stale_object_detection(self):
+        assert is_stale_object(STALE)
+        assert not is_stale_object(httpx.Response(400, json={"Fault": {"Error": [{"code": "6000"}]}}))
+        assert not is_stale_object(httpx.Response(400, text="not json"))
+
+
+class TestUpdateEntity:
+    """Updates are sparse where QuickBooks allows and retried after stale-object errors."""
+
+    def test_sparse_update_uses_given_token(self):
+        client = make_client(post=[record("Invoice", "3")])
+
+        update_entity(client, "Invoice", "7", {"DueDate": "2024-02-01"}, sync_token="2")
+
+        client.get.assert_not_called()
+        assert client.post.call_args.kwargs["json"] == {
+            "DueDate": "2024-02-01", "Id": "7", "SyncToken": "2", "sparse": True
+        }
+        assert sync_token_cache.get(client, "Invoice", "7") == "3"
+
+    def test_sparse_update_reads_missing_token(self):
+        client = make_client(get=[record("Invoice", "5")], post=[record("Invoice", "6")])
+        update_entity(client, "Invoice", "7", {"DueDate": "2024-02-01"})
+        assert client.post.call_args.kwargs["json"]["SyncToken"] == "5"
+
+    def test_stale_token_is_reread_and_retried(self):
+        client = make_client(get=[record("Invoice", "9")], post=[STALE, record("Invoice", "10")])
+
+        response = update_entity(client, "Invoice", "7", {"DueDate": "2024-02-01"}, sync_token="2")
+
+        assert response.json()["Invoice"]["SyncToken"] == "10"
+        assert [call.kwargs["json"]["SyncToken"] for call in client.post.call_args_list] == ["2", "9"]
+
+    def test_retries_are_bounded(self):
+        retries = 2
+        client = make_client(get=[record("Invoice", "9")] * retries, post=[STALE] * (retries + 1))
+        response = update_entity(client, "Invoice", "7", {"DueDate": "2024-02-01"}, sync_token="2", max_retries=retries)
+        assert is_stale_object(response)
+        assert client.post.call_count == retries + 1
+
+    def test_full_update_merges_into_latest_record(self):
+        latest = record("Bill", "4", VendorRef={"value": "56"}, DueDate="2024-01-01")
+        client = make_client(get=[latest], post=[record("Bill", "5")])
+
+        update_entity(client, "Bill", "7", {"DueDate": "2024-02-01"})
+
+        payload = client.post.call_args.kwargs["json"]
+        assert payload["VendorRef"] == {"value": "56"}
+        assert payload["DueDate"] == "2024-02-01"
+        assert "sparse" not in payload
+
+    def test_no_changes(self):
+        with pytest.raises(ValueError, match="No Invoice fields"):
+            update_entity(make_client(), "Invoice", "7", {})
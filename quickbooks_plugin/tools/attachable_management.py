@@ -1,4 +1,4 @@
-import urllib.parse
+import uuid
 from collections.abc import Generator
 from typing import Any
 
@@ -6,27 +6,22 @@ import httpx
 
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
-from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.attachments import (
+    ATTACHABLE_CATEGORIES,
+    BLOB_CHUNK_SIZE,
+    DEFAULT_UPLOAD_CONCURRENCY,
+    iter_download,
+    upload_attachments
+)
+from provider.client import QuickBooksClient, fault_message, raise_for_error
+from provider.sync_tokens import read_entity, update_entity
 
 
 class AttachableManagementTool(Tool):
     """Tool to manage attachments and notes in QuickBooks."""
 
     def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
-        access_token = self.runtime.credentials.get("access_token")
-        realm_id = self.runtime.credentials.get("realm_id")
-
-        if not access_token or not realm_id:
-            raise ToolProviderCredentialValidationError("QuickBooks credentials required.")
-
-        environment = self.runtime.credentials.get("environment", "sandbox")
-        api_base_url = f"https://{'sandbox-' if environment == 'sandbox' else ''}quickbooks.api.intuit.com/v3"
-
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
 
         operation = tool_parameters.get("operation")
         if not operation:
@@ -34,23 +29,25 @@ class AttachableManagementTool(Tool):
 
         try:
             if operation == "create_note":
-                yield from self._create_note(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._create_note(client, tool_parameters)
+            elif operation == "upload":
+                yield from self._upload(client, tool_parameters)
             elif operation == "read":
-                yield from self._read(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._read(client, tool_parameters)
             elif operation == "update":
-                yield from self._update(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._update(client, tool_parameters)
             elif operation == "delete":
-                yield from self._delete(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._delete(client, tool_parameters)
             elif operation == "download":
-                yield from self._download(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._download(client, tool_parameters)
             elif operation == "query":
-                yield from self._query(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._query(client, tool_parameters)
             else:
                 raise ValueError(f"Unknown operation: {operation}")
         except httpx.HTTPError as e:
             raise Exception(f"Network error: {str(e)}") from e
 
-    def _create_note(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _create_note(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         note = params.get("note")
         if not note:
             raise ValueError("note is required for create_note")
@@ -65,8 +62,7 @@ class AttachableManagementTool(Tool):
                 "IncludeOnSend": params.get("include_on_send", False)
             }]
 
-        url = f"{api_base_url}/company/{realm_id}/attachable?minorversion=65"
-        response = httpx.post(url, headers=headers, json=payload, timeout=30)
+        response = client.post("attachable", json=payload)
 
         if response.status_code == 200:
             data = response.json()
@@ -82,13 +78,62 @@ class AttachableManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _read(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _upload(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+        files = params.get("files") or []
+        if not isinstance(files, list):
+            files = [files]
+        if not files:
+            raise ValueError("files are required for upload")
+
+        metadata: dict[str, Any] = {}
+        entity_type = params.get("entity_type")
+        entity_id = params.get("entity_id")
+        if entity_type and entity_id:
+            metadata["AttachableRef"] = [{
+                "EntityRef": {"type": entity_type, "value": entity_id},
+                "IncludeOnSend": params.get("include_on_send", False)
+            }]
+        if params.get("note"):
+            metadata["Note"] = params["note"]
+        category = params.get("category")
+        if category:
+            if category not in ATTACHABLE_CATEGORIES:
+                raise ValueError(f"Invalid category '{category}'. Supported: {', '.join(ATTACHABLE_CATEGORIES)}")
+            metadata["Category"] = category
+
+        try:
+            max_concurrency = int(params.get("max_concurrency") or DEFAULT_UPLOAD_CONCURRENCY)
+        except (TypeError, ValueError):
+            max_concurrency = DEFAULT_UPLOAD_CONCURRENCY
+
+        results = upload_attachments(client, files, metadata, max_concurrency)
+        uploaded = [self._format(r["attachable"]) for r in results if r["success"]]
+        failed = [{"file_name": r["file_name"], "error": r["error"]} for r in results if not r["success"]]
+        if failed and not uploaded:
+            raise Exception("; ".join(f"{f['file_name']}: {f['error']}" for f in failed))
+
+        message = f"Uploaded {len(uploaded)} of {len(results)} files"
+        if entity_type and entity_id:
+            message += f" to {entity_type} {entity_id}"
+        result = {
+            "success": not failed,
+            "operation": "upload",
+            "attachables": uploaded,
+            "failed": failed,
+            "count": len(uploaded),
+            "message": message
+        }
+        # Only create variable messages for scalar values
+        for key in ("success", "operation", "count", "message"):
+            yield self.create_variable_message(key, result[key])
+        yield self.create_json_message(result)
+
+    def _read(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         attachable_id = params.get("attachable_id")
         if not attachable_id:
             raise ValueError("attachable_id is required for read")
 
-        url = f"{api_base_url}/company/{realm_id}/attachable/{attachable_id}?minorversion=65"
-        response = httpx.get(url, headers=headers, timeout=30)
+        response = read_entity(client, "Attachable", attachable_id)
 
         if response.status_code == 200:
             data = response.json()
@@ -104,31 +149,25 @@ class AttachableManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _update(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _update(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         attachable_id = params.get("attachable_id")
-        sync_token = params.get("sync_token")
-
-        if not attachable_id or not sync_token:
-            raise ValueError("attachable_id and sync_token are required for update")
 
-        payload: dict[str, Any] = {
-            "Id": attachable_id,
-            "SyncToken": sync_token
-        }
+        if not attachable_id:
+            raise ValueError("attachable_id is required for update")
 
+        changes: dict[str, Any] = {}
         if params.get("note"):
-            payload["Note"] = params["note"]
+            changes["Note"] = params["note"]
 
         entity_type = params.get("entity_type")
         entity_id = params.get("entity_id")
         if entity_type and entity_id:
-            payload["AttachableRef"] = [{
+            changes["AttachableRef"] = [{
                 "EntityRef": {"type": entity_type, "value": entity_id},
                 "IncludeOnSend": params.get("include_on_send", False)
             }]
 
-        url = f"{api_base_url}/company/{realm_id}/attachable?minorversion=65"
-        response = httpx.post(url, headers=headers, json=payload, timeout=30)
+        response = update_entity(client, "Attachable", attachable_id, changes, sync_token=params.get("sync_token"))
 
         if response.status_code == 200:
             data = response.json()
@@ -144,7 +183,7 @@ class AttachableManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _delete(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _delete(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         attachable_id = params.get("attachable_id")
         sync_token = params.get("sync_token")
 
@@ -152,8 +191,7 @@ class AttachableManagementTool(Tool):
             raise ValueError("attachable_id and sync_token are required for delete")
 
         # Need to read first to get full payload
-        read_url = f"{api_base_url}/company/{realm_id}/attachable/{attachable_id}?minorversion=65"
-        read_response = httpx.get(read_url, headers=headers, timeout=30)
+        read_response = read_entity(client, "Attachable", attachable_id)
 
         if read_response.status_code != 200:
             self._handle_error(read_response)
@@ -161,8 +199,7 @@ class AttachableManagementTool(Tool):
         payload = read_response.json().get("Attachable", {})
         payload["SyncToken"] = sync_token
 
-        url = f"{api_base_url}/company/{realm_id}/attachable?operation=delete&minorversion=65"
-        response = httpx.post(url, headers=headers, json=payload, timeout=30)
+        response = client.post("attachable", params={"operation": "delete"}, json=payload)
 
         if response.status_code == 200:
             result = {
@@ -176,39 +213,72 @@ class AttachableManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _download(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _download(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         attachable_id = params.get("attachable_id")
         if not attachable_id:
             raise ValueError("attachable_id is required for download")
 
         # Use text/plain for download endpoint
-        download_headers = {**headers, "Accept": "text/plain"}
-        url = f"{api_base_url}/company/{realm_id}/download/{attachable_id}?minorversion=65"
-        response = httpx.get(url, headers=download_headers, timeout=30)
+        response = client.get(f"download/{attachable_id}", headers={"Accept": "text/plain"})
 
-        if response.status_code == 200:
-            download_url = response.text.strip().strip('"')
-            result = {
-                "success": True,
-                "operation": "download",
-                "download_url": download_url,
-                "message": "Download URL retrieved (expires in 15 minutes)"
-            }
-            for key, value in result.items():
-                yield self.create_variable_message(key, value)
-            yield self.create_json_message(result)
-        else:
+        if response.status_code != 200:
             self._handle_error(response)
 
-    def _query(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+        download_url = response.text.strip().strip('"')
+        result = {
+            "success": True,
+            "operation": "download",
+            "download_url": download_url,
+            "message": "Download URL retrieved (expires in 15 minutes)"
+        }
+        if params.get("include_file"):
+            yield from self._stream_file(client, attachable_id, download_url)
+            result["message"] = "File downloaded; the download URL expires in 15 minutes"
+        for key, value in result.items():
+            yield self.create_variable_message(key, value)
+        yield self.create_json_message(result)
+
+    def _stream_file(
+        self, client: QuickBooksClient, attachable_id: str, download_url: str
+    ) -> Generator[ToolInvokeMessage, None, None]:
+        """Relay the file to Dify chunk by chunk as it downloads, without holding it in memory."""
+        read_response = read_entity(client, "Attachable", attachable_id)
+        if read_response.status_code != 200:
+            self._handle_error(read_response)
+        attachable = read_response.json().get("Attachable", {})
+        meta = {
+            "filename": attachable.get("FileName") or f"attachment_{attachable_id}",
+            "mime_type": attachable.get("ContentType") or "application/octet-stream"
+        }
+
+        blob_id = uuid.uuid4().hex
+        sequence = 0
+        total = 0
+        for chunk, total in iter_download(download_url, attachable.get("Size")):
+            for start in range(0, len(chunk), BLOB_CHUNK_SIZE):
+                yield self._blob_chunk(blob_id, sequence, total, chunk[start:start + BLOB_CHUNK_SIZE], meta)
+                sequence += 1
+        yield self._blob_chunk(blob_id, sequence, total, b"", meta, end=True)
+
+    @staticmethod
+    def _blob_chunk(
+        blob_id: str, sequence: int, total: int, chunk: bytes, meta: dict, *, end: bool = False
+    ) -> ToolInvokeMessage:
+        return ToolInvokeMessage(
+            type=ToolInvokeMessage.MessageType.BLOB_CHUNK,
+            message=ToolInvokeMessage.BlobChunkMessage(
+                id=blob_id, sequence=sequence, total_length=total, blob=chunk, end=end
+            ),
+            meta=meta
+        )
+
+    def _query(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         query_string = params.get("query_string", "")
         query = "SELECT * FROM Attachable"
         if query_string:
             query += f" WHERE {query_string}"
 
-        encoded_query = urllib.parse.quote(query)
-        url = f"{api_base_url}/company/{realm_id}/query?query={encoded_query}&minorversion=65"
-        response = httpx.get(url, headers=headers, timeout=30)
+        response = client.query(query)
 
         if response.status_code == 200:
             data = response.json()
@@ -251,8 +321,6 @@ class AttachableManagementTool(Tool):
         }
 
     def _handle_error(self, response: httpx.Response) -> None:
-        if response.status_code == 401:
-            raise ToolProviderCredentialValidationError("Authentication failed.")
-        error_detail = response.json() if response.content else {}
-        error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
+        raise_for_error(response)
+        error_msg = fault_message(response)
         raise Exception(f"API error {response.status_code}: {error_msg}")
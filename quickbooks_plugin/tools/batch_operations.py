@@ -0,0 +1,91 @@
+import json
+from collections.abc import Generator
+from typing import Any
+
+import httpx
+from dify_plugin import Tool
+from dify_plugin.entities.tool import ToolInvokeMessage
+
+from provider.batch import DEFAULT_CONCURRENCY, build_batch_item, execute_batch, summarize_batch_response
+from provider.client import QuickBooksClient
+from provider.open_invoices import open_invoice_cache
+
+
+class BatchOperationsTool(Tool):
+    """Tool to run many create, update, delete and query operations through the QuickBooks Batch API."""
+
+    def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
+        """
+        Invoke the batch_operations tool.
+
+        Args:
+            tool_parameters: Dictionary containing:
+                - operations_json: JSON array of operations
+                - max_concurrency: Number of batch requests sent at once (optional)
+
+        Returns:
+            Per-operation results in input order, plus success and failure counts
+        """
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
+
+        operations_json = tool_parameters.get("operations_json")
+        if not operations_json:
+            raise ValueError("operations_json is required")
+
+        try:
+            operations = json.loads(operations_json) if isinstance(operations_json, str) else operations_json
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid operations_json format: {e}") from e
+
+        if not isinstance(operations, list) or not operations:
+            raise ValueError("operations_json must be a non-empty JSON array")
+
+        items = [build_batch_item(index, operation) for index, operation in enumerate(operations)]
+
+        try:
+            max_concurrency = int(tool_parameters.get("max_concurrency") or DEFAULT_CONCURRENCY)
+        except (TypeError, ValueError):
+            max_concurrency = DEFAULT_CONCURRENCY
+
+        try:
+            responses = execute_batch(client, items, max_concurrency)
+        except httpx.HTTPError as e:
+            raise Exception(f"Network error: {str(e)}") from e
+
+        results = []
+        for index, (operation, response) in enumerate(zip(operations, responses, strict=True)):
+            results.append({
+                "index": index,
+                "operation": operation.get("operation"),
+                **summarize_batch_response(response)
+            })
+        self._invalidate_open_invoices(client, operations, results)
+
+        succeeded = sum(1 for r in results if r["success"])
+        result = {
+            "success": succeeded == len(results),
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "results": results,
+            "message": f"Ran {len(results)} operations: {succeeded} succeeded, {len(results) - succeeded} failed"
+        }
+        # Only create variable messages for scalar values
+        for key in ("success", "total", "succeeded", "failed", "message"):
+            yield self.create_variable_message(key, result[key])
+        yield self.create_json_message(result)
+
+    @staticmethod
+    def _invalidate_open_invoices(
+        client: QuickBooksClient, operations: list[dict[str, Any]], results: list[dict[str, Any]]
+    ) -> None:
+        """Drop cached open invoices for customers whose invoices or payments the batch changed."""
+        for operation, result in zip(operations, results, strict=True):
+            if not result["success"] or operation.get("entity") not in ("Invoice", "Payment"):
+                continue
+            customer_id = (result.get("data", {}).get("CustomerRef") or {}).get("value")
+            # Deletes and customer changes leave the affected customer unknown; reload the whole company
+            if operation.get("operation") == "create" and customer_id:
+                open_invoice_cache.invalidate(client.realm_id, str(customer_id))
+            else:
+                open_invoice_cache.invalidate(client.realm_id)
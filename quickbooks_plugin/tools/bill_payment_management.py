@@ -1,4 +1,3 @@
-import urllib.parse
 from collections.abc import Generator
 from typing import Any
 
@@ -6,27 +5,14 @@ import httpx
 
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
-from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.client import QuickBooksClient, fault_message, raise_for_error
 
 
 class BillPaymentManagementTool(Tool):
     """Tool to manage bill payments (payments to vendors) in QuickBooks."""
 
     def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
-        access_token = self.runtime.credentials.get("access_token")
-        realm_id = self.runtime.credentials.get("realm_id")
-
-        if not access_token or not realm_id:
-            raise ToolProviderCredentialValidationError("QuickBooks credentials required.")
-
-        environment = self.runtime.credentials.get("environment", "sandbox")
-        api_base_url = f"https://{'sandbox-' if environment == 'sandbox' else ''}quickbooks.api.intuit.com/v3"
-
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
 
         operation = tool_parameters.get("operation")
         if not operation:
@@ -34,21 +20,21 @@ class BillPaymentManagementTool(Tool):
 
         try:
             if operation == "create":
-                yield from self._create(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._create(client, tool_parameters)
             elif operation == "read":
-                yield from self._read(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._read(client, tool_parameters)
             elif operation == "delete":
-                yield from self._delete(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._delete(client, tool_parameters)
             elif operation == "void":
-                yield from self._void(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._void(client, tool_parameters)
             elif operation == "query":
-                yield from self._query(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._query(client, tool_parameters)
             else:
                 raise ValueError(f"Unknown operation: {operation}")
         except httpx.HTTPError as e:
             raise Exception(f"Network error: {str(e)}") from e
 
-    def _create(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _create(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         vendor_id = params.get("vendor_id")
         total_amount = params.get("total_amount")
         pay_type = params.get("pay_type")
@@ -85,8 +71,7 @@ class BillPaymentManagementTool(Tool):
         if params.get("private_note"):
             payload["PrivateNote"] = params["private_note"]
 
-        url = f"{api_base_url}/company/{realm_id}/billpayment?minorversion=65"
-        response = httpx.post(url, headers=headers, json=payload, timeout=30)
+        response = client.post("billpayment", json=payload)
 
         if response.status_code == 200:
             data = response.json()
@@ -102,13 +87,12 @@ class BillPaymentManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _read(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _read(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         bill_payment_id = params.get("bill_payment_id")
         if not bill_payment_id:
             raise ValueError("bill_payment_id is required for read")
 
-        url = f"{api_base_url}/company/{realm_id}/billpayment/{bill_payment_id}?minorversion=65"
-        response = httpx.get(url, headers=headers, timeout=30)
+        response = client.get(f"billpayment/{bill_payment_id}")
 
         if response.status_code == 200:
             data = response.json()
@@ -124,7 +108,7 @@ class BillPaymentManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _delete(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _delete(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         bill_payment_id = params.get("bill_payment_id")
         sync_token = params.get("sync_token")
 
@@ -132,8 +116,7 @@ class BillPaymentManagementTool(Tool):
             raise ValueError("bill_payment_id and sync_token are required for delete")
 
         payload = {"Id": bill_payment_id, "SyncToken": sync_token}
-        url = f"{api_base_url}/company/{realm_id}/billpayment?operation=delete&minorversion=65"
-        response = httpx.post(url, headers=headers, json=payload, timeout=30)
+        response = client.post("billpayment", params={"operation": "delete"}, json=payload)
 
         if response.status_code == 200:
             result = {
@@ -147,7 +130,7 @@ class BillPaymentManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _void(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _void(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         bill_payment_id = params.get("bill_payment_id")
         sync_token = params.get("sync_token")
 
@@ -155,8 +138,7 @@ class BillPaymentManagementTool(Tool):
             raise ValueError("bill_payment_id and sync_token are required for void")
 
         payload = {"Id": bill_payment_id, "SyncToken": sync_token, "sparse": True}
-        url = f"{api_base_url}/company/{realm_id}/billpayment?operation=update&include=void&minorversion=65"
-        response = httpx.post(url, headers=headers, json=payload, timeout=30)
+        response = client.post("billpayment", params={"operation": "update", "include": "void"}, json=payload)
 
         if response.status_code == 200:
             result = {
@@ -170,15 +152,13 @@ class BillPaymentManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _query(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _query(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         query_string = params.get("query_string", "")
         query = "SELECT * FROM BillPayment"
         if query_string:
             query += f" WHERE {query_string}"
 
-        encoded_query = urllib.parse.quote(query)
-        url = f"{api_base_url}/company/{realm_id}/query?query={encoded_query}&minorversion=65"
-        response = httpx.get(url, headers=headers, timeout=30)
+        response = client.query(query)
 
         if response.status_code == 200:
             data = response.json()
@@ -213,8 +193,6 @@ class BillPaymentManagementTool(Tool):
         }
 
     def _handle_error(self, response: httpx.Response) -> None:
-        if response.status_code == 401:
-            raise ToolProviderCredentialValidationError("Authentication failed.")
-        error_detail = response.json() if response.content else {}
-        error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
+        raise_for_error(response)
+        error_msg = fault_message(response)
         raise Exception(f"API error {response.status_code}: {error_msg}")
@@ -0,0 +1,97 @@
+from collections.abc import Generator
+from typing import Any
+
+import httpx
+from dify_plugin import Tool
+from dify_plugin.entities.tool import ToolInvokeMessage
+
+from provider.cdc import CDC_ENTITIES, reset_watermark, sync_changes
+from provider.client import QuickBooksClient
+
+
+class ChangeDataCaptureTool(Tool):
+    """Tool to fetch only the QuickBooks records that changed since the previous run."""
+
+    def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
+        """
+        Invoke the change_data_capture tool.
+
+        Args:
+            tool_parameters: Dictionary containing:
+                - entities: Comma-separated entity names (e.g. "Customer,Vendor,Account")
+                - changed_since: Explicit start time, overriding the stored watermark (optional)
+                - reset: Forget stored watermarks before running (optional)
+                - save_watermark: Advance stored watermarks after the run (default true)
+
+        Returns:
+            Changed and deleted records per entity
+        """
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
+
+        entities_param = tool_parameters.get("entities", "")
+        entities = list(dict.fromkeys(e.strip() for e in entities_param.split(",") if e.strip()))
+        if not entities:
+            raise ValueError("entities is required, e.g. 'Customer,Vendor,Account'")
+
+        unsupported = [e for e in entities if e not in CDC_ENTITIES]
+        if unsupported:
+            raise ValueError(
+                f"Unsupported entity type: {', '.join(unsupported)}. Supported: {', '.join(CDC_ENTITIES)}"
+            )
+
+        storage = self.session.storage
+        if tool_parameters.get("reset"):
+            for entity in entities:
+                reset_watermark(storage, client.realm_id, entity)
+
+        save_watermark = tool_parameters.get("save_watermark")
+        try:
+            results = sync_changes(
+                client,
+                storage,
+                entities,
+                changed_since=tool_parameters.get("changed_since") or None,
+                commit=save_watermark is None or bool(save_watermark)
+            )
+        except httpx.HTTPError as e:
+            raise Exception(f"Network error: {str(e)}") from e
+
+        changes = {
+            r.entity: {
+                "changed": r.changed,
+                "deleted": r.deleted,
+                "changed_count": len(r.changed),
+                "deleted_count": len(r.deleted),
+                "changed_since": r.changed_since,
+                "watermark": r.watermark,
+                "has_more": r.truncated,
+                "resync_required": r.resync_required
+            }
+            for r in results
+        }
+        changed_count = sum(len(r.changed) for r in results)
+        deleted_count = sum(len(r.deleted) for r in results)
+        has_more = any(r.truncated for r in results)
+        resync = [r.entity for r in results if r.resync_required]
+
+        message = f"Found {changed_count} changed and {deleted_count} deleted records"
+        if has_more:
+            message += "; more changes remain, run again to continue"
+        if resync:
+            message += f"; last sync is older than 30 days, run a full query for {', '.join(resync)}"
+
+        result = {
+            "success": True,
+            "changes": changes,
+            "changed_count": changed_count,
+            "deleted_count": deleted_count,
+            "has_more": has_more,
+            "resync_required": resync,
+            "message": message
+        }
+        # Only create variable messages for scalar values
+        yield self.create_variable_message("changed_count", changed_count)
+        yield self.create_variable_message("deleted_count", deleted_count)
+        yield self.create_variable_message("has_more", has_more)
+        yield self.create_variable_message("message", message)
+        yield self.create_json_message(result)
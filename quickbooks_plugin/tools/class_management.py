@@ -1,4 +1,3 @@
-import urllib.parse
 from collections.abc import Generator
 from typing import Any
 
@@ -6,27 +5,16 @@ import httpx
 
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
-from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.client import QuickBooksClient, fault_message, raise_for_error
+from provider.reference_data import reference_cache
+from provider.sync_tokens import read_entity, update_entity
 
 
 class ClassManagementTool(Tool):
     """Tool to manage classes in QuickBooks for tracking business segments."""
 
     def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
-        access_token = self.runtime.credentials.get("access_token")
-        realm_id = self.runtime.credentials.get("realm_id")
-
-        if not access_token or not realm_id:
-            raise ToolProviderCredentialValidationError("QuickBooks credentials required.")
-
-        environment = self.runtime.credentials.get("environment", "sandbox")
-        api_base_url = f"https://{'sandbox-' if environment == 'sandbox' else ''}quickbooks.api.intuit.com/v3"
-
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
 
         operation = tool_parameters.get("operation")
         if not operation:
@@ -34,19 +22,19 @@ class ClassManagementTool(Tool):
 
         try:
             if operation == "create":
-                yield from self._create(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._create(client, tool_parameters)
             elif operation == "read":
-                yield from self._read(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._read(client, tool_parameters)
             elif operation == "update":
-                yield from self._update(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._update(client, tool_parameters)
             elif operation == "query":
-                yield from self._query(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._query(client, tool_parameters)
             else:
                 raise ValueError(f"Unknown operation: {operation}")
         except httpx.HTTPError as e:
             raise Exception(f"Network error: {str(e)}") from e
 
-    def _create(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _create(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         name = params.get("name")
         if not name:
             raise ValueError("name is required for create")
@@ -56,11 +44,11 @@ class ClassManagementTool(Tool):
         if params.get("parent_id"):
             payload["ParentRef"] = {"value": params["parent_id"]}
 
-        url = f"{api_base_url}/company/{realm_id}/class?minorversion=65"
-        response = httpx.post(url, headers=headers, json=payload, timeout=30)
+        response = client.post("class", json=payload)
 
         if response.status_code == 200:
             data = response.json()
+            reference_cache.apply_changes(client.realm_id, "Class", [data.get("Class", {})])
             result = {
                 "success": True,
                 "operation": "create",
@@ -73,13 +61,12 @@ class ClassManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _read(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _read(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         class_id = params.get("class_id")
         if not class_id:
             raise ValueError("class_id is required for read")
 
-        url = f"{api_base_url}/company/{realm_id}/class/{class_id}?minorversion=65"
-        response = httpx.get(url, headers=headers, timeout=30)
+        response = read_entity(client, "Class", class_id)
 
         if response.status_code == 200:
             data = response.json()
@@ -95,33 +82,23 @@ class ClassManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _update(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _update(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         class_id = params.get("class_id")
-        sync_token = params.get("sync_token")
 
-        if not class_id or not sync_token:
-            raise ValueError("class_id and sync_token are required for update")
-
-        # First read the existing class
-        read_url = f"{api_base_url}/company/{realm_id}/class/{class_id}?minorversion=65"
-        read_response = httpx.get(read_url, headers=headers, timeout=30)
-
-        if read_response.status_code != 200:
-            self._handle_error(read_response)
-
-        payload = read_response.json().get("Class", {})
-        payload["SyncToken"] = sync_token
+        if not class_id:
+            raise ValueError("class_id is required for update")
 
+        changes: dict[str, Any] = {}
         if params.get("name"):
-            payload["Name"] = params["name"]
+            changes["Name"] = params["name"]
         if params.get("active") is not None:
-            payload["Active"] = params["active"]
+            changes["Active"] = params["active"]
 
-        url = f"{api_base_url}/company/{realm_id}/class?minorversion=65"
-        response = httpx.post(url, headers=headers, json=payload, timeout=30)
+        response = update_entity(client, "Class", class_id, changes, sync_token=params.get("sync_token"))
 
         if response.status_code == 200:
             data = response.json()
+            reference_cache.apply_changes(client.realm_id, "Class", [data.get("Class", {})])
             result = {
                 "success": True,
                 "operation": "update",
@@ -134,15 +111,13 @@ class ClassManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _query(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _query(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         query_string = params.get("query_string", "")
         query = "SELECT * FROM Class"
         if query_string:
             query += f" WHERE {query_string}"
 
-        encoded_query = urllib.parse.quote(query)
-        url = f"{api_base_url}/company/{realm_id}/query?query={encoded_query}&minorversion=65"
-        response = httpx.get(url, headers=headers, timeout=30)
+        response = client.query(query)
 
         if response.status_code == 200:
             data = response.json()
@@ -175,8 +150,6 @@ class ClassManagementTool(Tool):
         }
 
     def _handle_error(self, response: httpx.Response) -> None:
-        if response.status_code == 401:
-            raise ToolProviderCredentialValidationError("Authentication failed.")
-        error_detail = response.json() if response.content else {}
-        error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
+        raise_for_error(response)
+        error_msg = fault_message(response)
         raise Exception(f"API error {response.status_code}: {error_msg}")
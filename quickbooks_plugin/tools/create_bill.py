@@ -6,6 +6,7 @@ import httpx
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
 from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.client import QuickBooksClient, error_message, fault_message
 
 
 class CreateBillTool(Tool):
@@ -58,25 +59,7 @@ class CreateBillTool(Tool):
         private_note = tool_parameters.get("private_note", "").strip()
         ap_account_id = tool_parameters.get("ap_account_id", "").strip()
 
-        # Get credentials
-        access_token = self.runtime.credentials.get("access_token")
-        realm_id = self.runtime.credentials.get("realm_id")
-
-        if not access_token or not realm_id:
-            raise ToolProviderCredentialValidationError("QuickBooks API Access Token and Realm ID are required.")
-
-        # Get API base URL
-        environment = self.runtime.credentials.get("environment", "sandbox")
-        if environment == "sandbox":
-            api_base_url = "https://sandbox-quickbooks.api.intuit.com/v3"
-        else:
-            api_base_url = "https://quickbooks.api.intuit.com/v3"
-
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
 
         # Build line items for QuickBooks Bill format
         qb_lines = []
@@ -126,12 +109,7 @@ class CreateBillTool(Tool):
             payload["APAccountRef"] = {"value": ap_account_id}
 
         try:
-            response = httpx.post(
-                f"{api_base_url}/company/{realm_id}/bill?minorversion=65",
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
+            response = client.post("bill", json=payload)
 
             if response.status_code == 200:
                 data = response.json()
@@ -156,9 +134,7 @@ class CreateBillTool(Tool):
                 yield self.create_json_message(result)
 
             elif response.status_code == 400:
-                error_detail = response.json() if response.content else {}
-                errors = error_detail.get("Fault", {}).get("Error", [])
-                error_msg = errors[0].get("Message", response.text) if errors else response.text
+                error_msg = fault_message(response)
                 raise ValueError(f"Invalid request: {error_msg}")
 
             elif response.status_code == 401:
@@ -167,12 +143,7 @@ class CreateBillTool(Tool):
                 )
 
             else:
-                error_detail = response.json() if response.content else {}
-                errors = error_detail.get("Fault", {}).get("Error", [])
-                error_msg = errors[0].get("Message", response.text) if errors else response.text
-                raise Exception(
-                    f"Failed to create bill: {response.status_code} - {error_msg}"
-                )
+                raise Exception(f"Failed to create bill: {error_message(response)}")
 
         except httpx.HTTPError as e:
             raise Exception(f"Network error while creating bill: {str(e)}") from e
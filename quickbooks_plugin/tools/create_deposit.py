@@ -6,6 +6,8 @@ import httpx
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
 from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.client import QuickBooksClient, error_message, fault_message
+from provider.idempotency import PostedEntry, post_once
 
 
 class CreateDepositTool(Tool):
@@ -33,26 +35,9 @@ class CreateDepositTool(Tool):
         txn_date = tool_parameters.get("txn_date")
         description = tool_parameters.get("description", "")
         note = tool_parameters.get("note", "")
+        external_id = (tool_parameters.get("external_id") or "").strip()
 
-        # Get credentials
-        access_token = self.runtime.credentials.get("access_token")
-        realm_id = self.runtime.credentials.get("realm_id")
-
-        if not access_token or not realm_id:
-            raise ToolProviderCredentialValidationError("QuickBooks API Access Token and Realm ID are required.")
-
-        # Get API base URL
-        environment = self.runtime.credentials.get("environment", "sandbox")
-        if environment == "sandbox":
-            api_base_url = "https://sandbox-quickbooks.api.intuit.com/v3"
-        else:
-            api_base_url = "https://quickbooks.api.intuit.com/v3"
-
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
 
         # Build request payload
         payload = {
@@ -80,13 +65,24 @@ class CreateDepositTool(Tool):
             payload["PrivateNote"] = note
 
         try:
-            # Make API request
-            response = httpx.post(
-                f"{api_base_url}/company/{realm_id}/deposit?minorversion=65",
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
+            # Make API request; with an external ID, at most once per source transaction
+            if external_id:
+                outcome = post_once(client, self.session.storage, "Deposit", external_id, payload)
+                if isinstance(outcome, PostedEntry):
+                    result = {
+                        "id": outcome.id,
+                        "sync_token": outcome.sync_token,
+                        "external_id": external_id,
+                        "already_posted": True,
+                        "posted_at": outcome.posted_at
+                    }
+                    for key, value in result.items():
+                        yield self.create_variable_message(key, value)
+                    yield self.create_json_message(result)
+                    return
+                response = outcome
+            else:
+                response = client.post("deposit", json=payload)
 
             if response.status_code == 200:
                 data = response.json()
@@ -100,7 +96,9 @@ class CreateDepositTool(Tool):
                     "deposit_to_account": deposit.get("DepositToAccountRef", {}).get("name"),
                     "private_note": deposit.get("PrivateNote", ""),
                     "sync_token": deposit.get("SyncToken"),
-                    "meta_data": deposit.get("MetaData", {})
+                    "meta_data": deposit.get("MetaData", {}),
+                    "external_id": external_id or None,
+                    "already_posted": False
                 }
 
                 for key, value in result.items():
@@ -108,8 +106,7 @@ class CreateDepositTool(Tool):
                 yield self.create_json_message(result)
 
             elif response.status_code == 400:
-                error_detail = response.json() if response.content else {}
-                error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
+                error_msg = fault_message(response)
                 raise ValueError(f"Invalid request: {error_msg}")
 
             elif response.status_code == 401:
@@ -118,11 +115,7 @@ class CreateDepositTool(Tool):
                 )
 
             else:
-                error_detail = response.json() if response.content else {}
-                error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
-                raise Exception(
-                    f"Failed to create deposit: {response.status_code} - {error_msg}"
-                )
+                raise Exception(f"Failed to create deposit: {error_message(response)}")
 
         except httpx.HTTPError as e:
             raise Exception(f"Network error while creating deposit: {str(e)}") from e
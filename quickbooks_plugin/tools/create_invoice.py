@@ -6,6 +6,9 @@ import httpx
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
 from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.client import QuickBooksClient, error_message, fault_message
+from provider.open_invoices import open_invoice_cache
+from provider.reference_data import resolve_item_ref, resolve_ref
 
 
 class CreateInvoiceTool(Tool):
@@ -25,6 +28,7 @@ class CreateInvoiceTool(Tool):
                 - customer_memo: Message to customer (optional)
                 - private_note: Internal note (optional)
                 - bill_email: Email to send invoice to (optional)
+                - sales_term: Payment term ID or name, e.g. "Net 30" (optional)
 
         Returns:
             Created invoice details including ID and total amount
@@ -59,26 +63,9 @@ class CreateInvoiceTool(Tool):
         customer_memo = tool_parameters.get("customer_memo", "").strip()
         private_note = tool_parameters.get("private_note", "").strip()
         bill_email = tool_parameters.get("bill_email", "").strip()
+        sales_term = (tool_parameters.get("sales_term") or "").strip()
 
-        # Get credentials
-        access_token = self.runtime.credentials.get("access_token")
-        realm_id = self.runtime.credentials.get("realm_id")
-
-        if not access_token or not realm_id:
-            raise ToolProviderCredentialValidationError("QuickBooks API Access Token and Realm ID are required.")
-
-        # Get API base URL
-        environment = self.runtime.credentials.get("environment", "sandbox")
-        if environment == "sandbox":
-            api_base_url = "https://sandbox-quickbooks.api.intuit.com/v3"
-        else:
-            api_base_url = "https://quickbooks.api.intuit.com/v3"
-
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
 
         # Build line items for QuickBooks format
         qb_lines = []
@@ -92,8 +79,10 @@ class CreateInvoiceTool(Tool):
                 line["Description"] = item["description"]
 
             sales_detail = {}
-            if item.get("item_id"):
-                sales_detail["ItemRef"] = {"value": str(item["item_id"])}
+            # item_id takes an ID; item (or item_id) may also be a product/service name
+            item_ref = resolve_item_ref(client, item)
+            if item_ref:
+                sales_detail["ItemRef"] = item_ref
             if item.get("quantity"):
                 sales_detail["Qty"] = float(item["quantity"])
             if item.get("unit_price"):
@@ -130,15 +119,14 @@ class CreateInvoiceTool(Tool):
         if bill_email:
             payload["BillEmail"] = {"Address": bill_email}
 
+        if sales_term:
+            payload["SalesTermRef"] = resolve_ref(client, "Term", sales_term)
+
         try:
-            response = httpx.post(
-                f"{api_base_url}/company/{realm_id}/invoice?minorversion=65",
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
+            response = client.post("invoice", json=payload)
 
             if response.status_code == 200:
+                open_invoice_cache.invalidate(client.realm_id, customer_id)
                 data = response.json()
                 invoice = data.get("Invoice", {})
 
@@ -164,9 +152,7 @@ class CreateInvoiceTool(Tool):
                 yield self.create_json_message(result)
 
             elif response.status_code == 400:
-                error_detail = response.json() if response.content else {}
-                errors = error_detail.get("Fault", {}).get("Error", [])
-                error_msg = errors[0].get("Message", response.text) if errors else response.text
+                error_msg = fault_message(response)
                 raise ValueError(f"Invalid request: {error_msg}")
 
             elif response.status_code == 401:
@@ -175,12 +161,7 @@ class CreateInvoiceTool(Tool):
                 )
 
             else:
-                error_detail = response.json() if response.content else {}
-                errors = error_detail.get("Fault", {}).get("Error", [])
-                error_msg = errors[0].get("Message", response.text) if errors else response.text
-                raise Exception(
-                    f"Failed to create invoice: {response.status_code} - {error_msg}"
-                )
+                raise Exception(f"Failed to create invoice: {error_message(response)}")
 
         except httpx.HTTPError as e:
             raise Exception(f"Network error while creating invoice: {str(e)}") from e
@@ -6,26 +6,14 @@ import httpx
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
 from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.client import QuickBooksClient, error_message
 
 
 class CreateJournalEntryTool(Tool):
     """Tool to create journal entries in QuickBooks."""
 
     def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
-        access_token = self.runtime.credentials.get("access_token")
-        realm_id = self.runtime.credentials.get("realm_id")
-
-        if not access_token or not realm_id:
-            raise ToolProviderCredentialValidationError("QuickBooks credentials required.")
-
-        environment = self.runtime.credentials.get("environment", "sandbox")
-        api_base_url = f"https://{'sandbox-' if environment == 'sandbox' else ''}quickbooks.api.intuit.com/v3"
-
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
 
         # Build lines from individual parameters
         lines = []
@@ -71,8 +59,7 @@ class CreateJournalEntryTool(Tool):
             payload["PrivateNote"] = tool_parameters["private_note"]
 
         try:
-            url = f"{api_base_url}/company/{realm_id}/journalentry?minorversion=65"
-            response = httpx.post(url, headers=headers, json=payload, timeout=30)
+            response = client.post("journalentry", json=payload)
 
             if response.status_code == 200:
                 data = response.json()
@@ -92,9 +79,7 @@ class CreateJournalEntryTool(Tool):
             elif response.status_code == 401:
                 raise ToolProviderCredentialValidationError("Authentication failed. Please check your QuickBooks credentials.")
             else:
-                error_detail = response.json() if response.content else {}
-                error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
-                raise Exception(f"Failed to create journal entry: {response.status_code} - {error_msg}")
+                raise Exception(f"Failed to create journal entry: {error_message(response)}")
 
         except httpx.HTTPError as e:
             raise Exception(f"Network error: {str(e)}") from e
@@ -6,6 +6,8 @@ import httpx
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
 from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.client import QuickBooksClient, error_message, fault_message
+from provider.idempotency import PostedEntry, post_once
 
 
 class CreatePurchaseTool(Tool):
@@ -34,27 +36,10 @@ class CreatePurchaseTool(Tool):
         txn_date = tool_parameters.get("txn_date")
         description = tool_parameters.get("description", "")
         note = tool_parameters.get("note", "")
+        external_id = (tool_parameters.get("external_id") or "").strip()
         vendor_id = tool_parameters.get("vendor_id")
 
-        # Get credentials
-        access_token = self.runtime.credentials.get("access_token")
-        realm_id = self.runtime.credentials.get("realm_id")
-
-        if not access_token or not realm_id:
-            raise ToolProviderCredentialValidationError("QuickBooks API Access Token and Realm ID are required.")
-
-        # Get API base URL
-        environment = self.runtime.credentials.get("environment", "sandbox")
-        if environment == "sandbox":
-            api_base_url = "https://sandbox-quickbooks.api.intuit.com/v3"
-        else:
-            api_base_url = "https://quickbooks.api.intuit.com/v3"
-
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
 
         # Build request payload
         payload = {
@@ -89,13 +74,24 @@ class CreatePurchaseTool(Tool):
             }
 
         try:
-            # Make API request
-            response = httpx.post(
-                f"{api_base_url}/company/{realm_id}/purchase?minorversion=65",
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
+            # Make API request; with an external ID, at most once per source transaction
+            if external_id:
+                outcome = post_once(client, self.session.storage, "Purchase", external_id, payload)
+                if isinstance(outcome, PostedEntry):
+                    result = {
+                        "id": outcome.id,
+                        "sync_token": outcome.sync_token,
+                        "external_id": external_id,
+                        "already_posted": True,
+                        "posted_at": outcome.posted_at
+                    }
+                    for key, value in result.items():
+                        yield self.create_variable_message(key, value)
+                    yield self.create_json_message(result)
+                    return
+                response = outcome
+            else:
+                response = client.post("purchase", json=payload)
 
             if response.status_code == 200:
                 data = response.json()
@@ -110,7 +106,9 @@ class CreatePurchaseTool(Tool):
                     "account": purchase.get("AccountRef", {}).get("name"),
                     "private_note": purchase.get("PrivateNote", ""),
                     "sync_token": purchase.get("SyncToken"),
-                    "meta_data": purchase.get("MetaData", {})
+                    "meta_data": purchase.get("MetaData", {}),
+                    "external_id": external_id or None,
+                    "already_posted": False
                 }
 
                 # Add entity/vendor info if available
@@ -125,8 +123,7 @@ class CreatePurchaseTool(Tool):
                 yield self.create_json_message(result)
 
             elif response.status_code == 400:
-                error_detail = response.json() if response.content else {}
-                error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
+                error_msg = fault_message(response)
                 raise ValueError(f"Invalid request: {error_msg}")
 
             elif response.status_code == 401:
@@ -135,11 +132,7 @@ class CreatePurchaseTool(Tool):
                 )
 
             else:
-                error_detail = response.json() if response.content else {}
-                error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
-                raise Exception(
-                    f"Failed to create purchase: {response.status_code} - {error_msg}"
-                )
+                raise Exception(f"Failed to create purchase: {error_message(response)}")
 
         except httpx.HTTPError as e:
             raise Exception(f"Network error while creating purchase: {str(e)}") from e
@@ -6,6 +6,7 @@ import httpx
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
 from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.client import QuickBooksClient, error_message, fault_message
 
 
 class CreateTransferTool(Tool):
@@ -33,25 +34,7 @@ class CreateTransferTool(Tool):
         txn_date = tool_parameters.get("txn_date")
         note = tool_parameters.get("note", "")
 
-        # Get credentials
-        access_token = self.runtime.credentials.get("access_token")
-        realm_id = self.runtime.credentials.get("realm_id")
-
-        if not access_token or not realm_id:
-            raise ToolProviderCredentialValidationError("QuickBooks API Access Token and Realm ID are required.")
-
-        # Get API base URL
-        environment = self.runtime.credentials.get("environment", "sandbox")
-        if environment == "sandbox":
-            api_base_url = "https://sandbox-quickbooks.api.intuit.com/v3"
-        else:
-            api_base_url = "https://quickbooks.api.intuit.com/v3"
-
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
 
         # Build request payload
         payload = {
@@ -72,12 +55,7 @@ class CreateTransferTool(Tool):
 
         try:
             # Make API request
-            response = httpx.post(
-                f"{api_base_url}/company/{realm_id}/transfer?minorversion=65",
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
+            response = client.post("transfer", json=payload)
 
             if response.status_code == 200:
                 data = response.json()
@@ -106,8 +84,7 @@ class CreateTransferTool(Tool):
                 yield self.create_json_message(result)
 
             elif response.status_code == 400:
-                error_detail = response.json() if response.content else {}
-                error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
+                error_msg = fault_message(response)
                 raise ValueError(f"Invalid request: {error_msg}")
 
             elif response.status_code == 401:
@@ -116,11 +93,7 @@ class CreateTransferTool(Tool):
                 )
 
             else:
-                error_detail = response.json() if response.content else {}
-                error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
-                raise Exception(
-                    f"Failed to create transfer: {response.status_code} - {error_msg}"
-                )
+                raise Exception(f"Failed to create transfer: {error_message(response)}")
 
         except httpx.HTTPError as e:
             raise Exception(f"Network error while creating transfer: {str(e)}") from e
@@ -6,6 +6,7 @@ import httpx
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
 from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.client import QuickBooksClient, error_message, fault_message
 
 
 class CustomerManagementTool(Tool):
@@ -28,40 +29,22 @@ class CustomerManagementTool(Tool):
         """
         action = tool_parameters.get("action", "list")
 
-        # Get credentials
-        access_token = self.runtime.credentials.get("access_token")
-        realm_id = self.runtime.credentials.get("realm_id")
-
-        if not access_token or not realm_id:
-            raise ToolProviderCredentialValidationError("QuickBooks API Access Token and Realm ID are required.")
-
-        # Get API base URL
-        environment = self.runtime.credentials.get("environment", "sandbox")
-        if environment == "sandbox":
-            api_base_url = "https://sandbox-quickbooks.api.intuit.com/v3"
-        else:
-            api_base_url = "https://quickbooks.api.intuit.com/v3"
-
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
 
         try:
             if action == "list":
-                yield from self._list_customers(api_base_url, realm_id, headers)
+                yield from self._list_customers(client)
             elif action == "search":
                 display_name = tool_parameters.get("display_name", "")
                 if not display_name:
                     raise ValueError("display_name is required for search")
-                yield from self._search_customer(api_base_url, realm_id, headers, display_name)
+                yield from self._search_customer(client, display_name)
             elif action == "create":
                 display_name = tool_parameters.get("display_name", "")
                 if not display_name:
                     raise ValueError("display_name is required for create")
                 yield from self._create_customer(
-                    api_base_url, realm_id, headers,
+                    client,
                     display_name,
                     tool_parameters.get("company_name"),
                     tool_parameters.get("email"),
@@ -73,16 +56,11 @@ class CustomerManagementTool(Tool):
         except httpx.HTTPError as e:
             raise Exception(f"Network error: {str(e)}") from e
 
-    def _list_customers(self, api_base_url: str, realm_id: str, headers: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _list_customers(self, client: QuickBooksClient) -> Generator[ToolInvokeMessage, None, None]:
         """List all active customers."""
         query = "SELECT * FROM Customer WHERE Active = true MAXRESULTS 100"
 
-        response = httpx.get(
-            f"{api_base_url}/company/{realm_id}/query",
-            headers=headers,
-            params={"query": query, "minorversion": "65"},
-            timeout=30
-        )
+        response = client.query(query)
 
         if response.status_code == 200:
             data = response.json()
@@ -114,22 +92,15 @@ class CustomerManagementTool(Tool):
             )
 
         else:
-            error_detail = response.json() if response.content else {}
-            error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
-            raise Exception(f"Failed to list customers: {error_msg}")
+            raise Exception(f"Failed to list customers: {error_message(response)}")
 
-    def _search_customer(self, api_base_url: str, realm_id: str, headers: dict, display_name: str) -> Generator[ToolInvokeMessage, None, None]:
+    def _search_customer(self, client: QuickBooksClient, display_name: str) -> Generator[ToolInvokeMessage, None, None]:
         """Search for customer by name."""
         # Escape single quotes in the name
         safe_name = display_name.replace("'", "\\'")
         query = f"SELECT * FROM Customer WHERE DisplayName LIKE '%{safe_name}%'"
 
-        response = httpx.get(
-            f"{api_base_url}/company/{realm_id}/query",
-            headers=headers,
-            params={"query": query, "minorversion": "65"},
-            timeout=30
-        )
+        response = client.query(query)
 
         if response.status_code == 200:
             data = response.json()
@@ -163,11 +134,9 @@ class CustomerManagementTool(Tool):
             )
 
         else:
-            error_detail = response.json() if response.content else {}
-            error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
-            raise Exception(f"Failed to search customers: {error_msg}")
+            raise Exception(f"Failed to search customers: {error_message(response)}")
 
-    def _create_customer(self, api_base_url: str, realm_id: str, headers: dict,
+    def _create_customer(self, client: QuickBooksClient,
                         display_name: str, company_name: str = None,
                         email: str = None, phone: str = None) -> Generator[ToolInvokeMessage, None, None]:
         """Create a new customer."""
@@ -184,12 +153,7 @@ class CustomerManagementTool(Tool):
         if phone:
             payload["PrimaryPhone"] = {"FreeFormNumber": phone}
 
-        response = httpx.post(
-            f"{api_base_url}/company/{realm_id}/customer?minorversion=65",
-            headers=headers,
-            json=payload,
-            timeout=30
-        )
+        response = client.post("customer", json=payload)
 
         if response.status_code == 200:
             data = response.json()
@@ -207,8 +171,7 @@ class CustomerManagementTool(Tool):
             yield self.create_json_message(result)
 
         elif response.status_code == 400:
-            error_detail = response.json() if response.content else {}
-            error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
+            error_msg = fault_message(response)
             raise ValueError(f"Invalid request: {error_msg}")
 
         elif response.status_code == 401:
@@ -217,8 +180,4 @@ class CustomerManagementTool(Tool):
             )
 
         else:
-            error_detail = response.json() if response.content else {}
-            error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
-            raise Exception(
-                f"Failed to create customer: {response.status_code} - {error_msg}"
-            )
+            raise Exception(f"Failed to create customer: {error_message(response)}")
@@ -1,4 +1,3 @@
-import urllib.parse
 from collections.abc import Generator
 from typing import Any
 
@@ -6,27 +5,15 @@ import httpx
 
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
-from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.client import QuickBooksClient, fault_message, raise_for_error
+from provider.sync_tokens import read_entity, update_entity
 
 
 class EmployeeManagementTool(Tool):
     """Tool to manage employees in QuickBooks."""
 
     def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
-        access_token = self.runtime.credentials.get("access_token")
-        realm_id = self.runtime.credentials.get("realm_id")
-
-        if not access_token or not realm_id:
-            raise ToolProviderCredentialValidationError("QuickBooks credentials required.")
-
-        environment = self.runtime.credentials.get("environment", "sandbox")
-        api_base_url = f"https://{'sandbox-' if environment == 'sandbox' else ''}quickbooks.api.intuit.com/v3"
-
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
 
         operation = tool_parameters.get("operation")
         if not operation:
@@ -34,19 +21,19 @@ class EmployeeManagementTool(Tool):
 
         try:
             if operation == "create":
-                yield from self._create(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._create(client, tool_parameters)
             elif operation == "read":
-                yield from self._read(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._read(client, tool_parameters)
             elif operation == "update":
-                yield from self._update(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._update(client, tool_parameters)
             elif operation == "query":
-                yield from self._query(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._query(client, tool_parameters)
             else:
                 raise ValueError(f"Unknown operation: {operation}")
         except httpx.HTTPError as e:
             raise Exception(f"Network error: {str(e)}") from e
 
-    def _create(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _create(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         given_name = params.get("given_name")
         family_name = params.get("family_name")
 
@@ -77,8 +64,7 @@ class EmployeeManagementTool(Tool):
                 "PostalCode": params.get("postal_code", "")
             }
 
-        url = f"{api_base_url}/company/{realm_id}/employee?minorversion=65"
-        response = httpx.post(url, headers=headers, json=payload, timeout=30)
+        response = client.post("employee", json=payload)
 
         if response.status_code == 200:
             data = response.json()
@@ -94,13 +80,12 @@ class EmployeeManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _read(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _read(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         employee_id = params.get("employee_id")
         if not employee_id:
             raise ValueError("employee_id is required for read")
 
-        url = f"{api_base_url}/company/{realm_id}/employee/{employee_id}?minorversion=65"
-        response = httpx.get(url, headers=headers, timeout=30)
+        response = read_entity(client, "Employee", employee_id)
 
         if response.status_code == 200:
             data = response.json()
@@ -116,39 +101,28 @@ class EmployeeManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _update(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _update(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         employee_id = params.get("employee_id")
-        sync_token = params.get("sync_token")
-
-        if not employee_id or not sync_token:
-            raise ValueError("employee_id and sync_token are required for update")
-
-        # First read the existing employee
-        read_url = f"{api_base_url}/company/{realm_id}/employee/{employee_id}?minorversion=65"
-        read_response = httpx.get(read_url, headers=headers, timeout=30)
 
-        if read_response.status_code != 200:
-            self._handle_error(read_response)
-
-        payload = read_response.json().get("Employee", {})
-        payload["SyncToken"] = sync_token
+        if not employee_id:
+            raise ValueError("employee_id is required for update")
 
-        # Update fields
+        # Only the given fields are sent; QuickBooks keeps the rest
+        changes: dict[str, Any] = {}
         if params.get("given_name"):
-            payload["GivenName"] = params["given_name"]
+            changes["GivenName"] = params["given_name"]
         if params.get("family_name"):
-            payload["FamilyName"] = params["family_name"]
+            changes["FamilyName"] = params["family_name"]
         if params.get("display_name"):
-            payload["DisplayName"] = params["display_name"]
+            changes["DisplayName"] = params["display_name"]
         if params.get("email"):
-            payload["PrimaryEmailAddr"] = {"Address": params["email"]}
+            changes["PrimaryEmailAddr"] = {"Address": params["email"]}
         if params.get("phone"):
-            payload["PrimaryPhone"] = {"FreeFormNumber": params["phone"]}
+            changes["PrimaryPhone"] = {"FreeFormNumber": params["phone"]}
         if params.get("active") is not None:
-            payload["Active"] = params["active"]
+            changes["Active"] = params["active"]
 
-        url = f"{api_base_url}/company/{realm_id}/employee?minorversion=65"
-        response = httpx.post(url, headers=headers, json=payload, timeout=30)
+        response = update_entity(client, "Employee", employee_id, changes, sync_token=params.get("sync_token"))
 
         if response.status_code == 200:
             data = response.json()
@@ -164,15 +138,13 @@ class EmployeeManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _query(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _query(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         query_string = params.get("query_string", "")
         query = "SELECT * FROM Employee"
         if query_string:
             query += f" WHERE {query_string}"
 
-        encoded_query = urllib.parse.quote(query)
-        url = f"{api_base_url}/company/{realm_id}/query?query={encoded_query}&minorversion=65"
-        response = httpx.get(url, headers=headers, timeout=30)
+        response = client.query(query)
 
         if response.status_code == 200:
             data = response.json()
@@ -208,8 +180,6 @@ class EmployeeManagementTool(Tool):
         }
 
     def _handle_error(self, response: httpx.Response) -> None:
-        if response.status_code == 401:
-            raise ToolProviderCredentialValidationError("Authentication failed.")
-        error_detail = response.json() if response.content else {}
-        error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
+        raise_for_error(response)
+        error_msg = fault_message(response)
         raise Exception(f"API error {response.status_code}: {error_msg}")
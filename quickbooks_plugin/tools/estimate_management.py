@@ -1,5 +1,4 @@
 import json
-import urllib.parse
 from collections.abc import Generator
 from typing import Any
 
@@ -7,27 +6,15 @@ import httpx
 
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
-from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.client import QuickBooksClient, fault_message, raise_for_error
+from provider.reference_data import resolve_item_ref
 
 
 class EstimateManagementTool(Tool):
     """Tool to manage estimates (quotes) in QuickBooks."""
 
     def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
-        access_token = self.runtime.credentials.get("access_token")
-        realm_id = self.runtime.credentials.get("realm_id")
-
-        if not access_token or not realm_id:
-            raise ToolProviderCredentialValidationError("QuickBooks credentials required.")
-
-        environment = self.runtime.credentials.get("environment", "sandbox")
-        api_base_url = f"https://{'sandbox-' if environment == 'sandbox' else ''}quickbooks.api.intuit.com/v3"
-
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
 
         operation = tool_parameters.get("operation")
         if not operation:
@@ -35,19 +22,19 @@ class EstimateManagementTool(Tool):
 
         try:
             if operation == "create":
-                yield from self._create(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._create(client, tool_parameters)
             elif operation == "read":
-                yield from self._read(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._read(client, tool_parameters)
             elif operation == "delete":
-                yield from self._delete(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._delete(client, tool_parameters)
             elif operation == "query":
-                yield from self._query(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._query(client, tool_parameters)
             else:
                 raise ValueError(f"Unknown operation: {operation}")
         except httpx.HTTPError as e:
             raise Exception(f"Network error: {str(e)}") from e
 
-    def _create(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _create(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         customer_id = params.get("customer_id")
         lines_json = params.get("lines_json")
 
@@ -66,7 +53,7 @@ class EstimateManagementTool(Tool):
                 "DetailType": "SalesItemLineDetail",
                 "Amount": line.get("Amount"),
                 "SalesItemLineDetail": {
-                    "ItemRef": line.get("ItemRef"),
+                    "ItemRef": resolve_item_ref(client, line),
                     "Qty": line.get("Qty", 1),
                     "UnitPrice": line.get("UnitPrice")
                 }
@@ -86,8 +73,7 @@ class EstimateManagementTool(Tool):
         if params.get("private_note"):
             payload["PrivateNote"] = params["private_note"]
 
-        url = f"{api_base_url}/company/{realm_id}/estimate?minorversion=65"
-        response = httpx.post(url, headers=headers, json=payload, timeout=30)
+        response = client.post("estimate", json=payload)
 
         if response.status_code == 200:
             data = response.json()
@@ -103,13 +89,12 @@ class EstimateManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _read(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _read(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         estimate_id = params.get("estimate_id")
         if not estimate_id:
             raise ValueError("estimate_id is required for read")
 
-        url = f"{api_base_url}/company/{realm_id}/estimate/{estimate_id}?minorversion=65"
-        response = httpx.get(url, headers=headers, timeout=30)
+        response = client.get(f"estimate/{estimate_id}")
 
         if response.status_code == 200:
             data = response.json()
@@ -125,7 +110,7 @@ class EstimateManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _delete(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _delete(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         estimate_id = params.get("estimate_id")
         sync_token = params.get("sync_token")
 
@@ -133,8 +118,7 @@ class EstimateManagementTool(Tool):
             raise ValueError("estimate_id and sync_token are required for delete")
 
         payload = {"Id": estimate_id, "SyncToken": sync_token}
-        url = f"{api_base_url}/company/{realm_id}/estimate?operation=delete&minorversion=65"
-        response = httpx.post(url, headers=headers, json=payload, timeout=30)
+        response = client.post("estimate", params={"operation": "delete"}, json=payload)
 
         if response.status_code == 200:
             result = {
@@ -148,15 +132,13 @@ class EstimateManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _query(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _query(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         query_string = params.get("query_string", "")
         query = "SELECT * FROM Estimate"
         if query_string:
             query += f" WHERE {query_string}"
 
-        encoded_query = urllib.parse.quote(query)
-        url = f"{api_base_url}/company/{realm_id}/query?query={encoded_query}&minorversion=65"
-        response = httpx.get(url, headers=headers, timeout=30)
+        response = client.query(query)
 
         if response.status_code == 200:
             data = response.json()
@@ -192,8 +174,6 @@ class EstimateManagementTool(Tool):
         }
 
     def _handle_error(self, response: httpx.Response) -> None:
-        if response.status_code == 401:
-            raise ToolProviderCredentialValidationError("Authentication failed.")
-        error_detail = response.json() if response.content else {}
-        error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
+        raise_for_error(response)
+        error_msg = fault_message(response)
         raise Exception(f"API error {response.status_code}: {error_msg}")
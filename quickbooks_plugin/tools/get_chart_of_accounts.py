@@ -1,4 +1,3 @@
-import urllib.parse
 from collections.abc import Generator
 from typing import Any
 
@@ -6,7 +5,8 @@ import httpx
 
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
-from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.accounts import account_cache, fetch_balances
+from provider.client import QuickBooksClient
 
 
 class GetChartOfAccountsTool(Tool):
@@ -16,6 +16,9 @@ class GetChartOfAccountsTool(Tool):
         """
         Invoke the get_chart_of_accounts tool to fetch QuickBooks accounts.
 
+        Accounts are matched against a per-realm cache, so repeated lookups (e.g. resolving an
+        account name to the id create_purchase needs) are cheap. Balances are always read live.
+
         Args:
             tool_parameters: Dictionary containing query parameters
 
@@ -23,98 +26,65 @@ class GetChartOfAccountsTool(Tool):
             List of accounts with their details
         """
         # Get optional parameters
+        account_id = tool_parameters.get("account_id")
+        name = tool_parameters.get("name")
         account_type = tool_parameters.get("account_type")
+        account_sub_type = tool_parameters.get("account_sub_type")
+        refresh = bool(tool_parameters.get("refresh", False))
 
-        # Get credentials
-        access_token = self.runtime.credentials.get("access_token")
-        realm_id = self.runtime.credentials.get("realm_id")
-
-        if not access_token or not realm_id:
-            raise ToolProviderCredentialValidationError("QuickBooks API Access Token and Realm ID are required.")
-
-        # Get API base URL
-        environment = self.runtime.credentials.get("environment", "sandbox")
-        if environment == "sandbox":
-            api_base_url = "https://sandbox-quickbooks.api.intuit.com/v3"
-        else:
-            api_base_url = "https://quickbooks.api.intuit.com/v3"
-
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json"
-        }
-
-        # Build query
-        query = "select * from Account"
-        if account_type:
-            query += f" where AccountType = '{account_type}'"
-
-        encoded_query = urllib.parse.quote(query)
-        url = f"{api_base_url}/company/{realm_id}/query?query={encoded_query}&minorversion=65"
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
 
         try:
-            # Make API request
-            response = httpx.get(
-                url,
-                headers=headers,
-                timeout=30
-            )
-
-            if response.status_code == 200:
-                data = response.json()
-                accounts = data.get("QueryResponse", {}).get("Account", [])
-
-                if not accounts:
-                    result = {
-                        "accounts": [],
-                        "count": 0,
-                        "message": "No accounts found."
-                    }
-                    yield self.create_variable_message("count", 0)
-                    yield self.create_variable_message("message", "No accounts found.")
-                    yield self.create_json_message(result)
-                    return
-
-                # Format accounts for output
-                output = []
-                for acc in accounts:
-                    account_info = {
-                        "id": acc.get("Id"),
-                        "name": acc.get("Name"),
-                        "type": acc.get("AccountType"),
-                        "sub_type": acc.get("AccountSubType"),
-                        "active": acc.get("Active"),
-                        "current_balance": acc.get("CurrentBalance", 0),
-                        "classification": acc.get("Classification"),
-                        "fully_qualified_name": acc.get("FullyQualifiedName")
-                    }
-                    output.append(account_info)
-
-                result = {
-                    "accounts": output,
-                    "count": len(output)
-                }
-                # Only create variable message for simple scalar values
-                # Complex nested structures should use json_message only
-                yield self.create_variable_message("count", len(output))
-                yield self.create_json_message(result)
-
-            elif response.status_code == 400:
-                error_detail = response.json() if response.content else {}
-                error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
-                raise ValueError(f"Invalid request: {error_msg}")
-
-            elif response.status_code == 401:
-                raise ToolProviderCredentialValidationError(
-                    "Authentication failed. Please check your QuickBooks API access token."
-                )
+            index = account_cache.get(client, refresh=refresh)
+        except httpx.HTTPError as e:
+            raise Exception(f"Network error while fetching accounts: {str(e)}") from e
 
-            else:
-                error_detail = response.json() if response.content else {}
-                error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
-                raise Exception(
-                    f"Failed to retrieve accounts: {response.status_code} - {error_msg}"
-                )
+        accounts = index.filter(
+            account_id=account_id,
+            name=name,
+            account_type=account_type,
+            account_sub_type=account_sub_type
+        )
 
+        try:
+            balances = fetch_balances(client, [str(acc.get("Id")) for acc in accounts])
         except httpx.HTTPError as e:
-            raise Exception(f"Network error while fetching accounts: {str(e)}") from e
+            raise Exception(f"Network error while fetching account balances: {str(e)}") from e
+
+        if not accounts:
+            result = {
+                "accounts": [],
+                "count": 0,
+                "message": "No accounts found."
+            }
+            yield self.create_variable_message("count", 0)
+            yield self.create_variable_message("message", "No accounts found.")
+            yield self.create_json_message(result)
+            return
+
+        # Format accounts for output
+        output = []
+        for acc in accounts:
+            account_info = {
+                "id": acc.get("Id"),
+                "name": acc.get("Name"),
+                "type": acc.get("AccountType"),
+                "sub_type": acc.get("AccountSubType"),
+                "active": acc.get("Active"),
+                "current_balance": balances.get(str(acc.get("Id")), 0),
+                "classification": acc.get("Classification"),
+                "fully_qualified_name": acc.get("FullyQualifiedName")
+            }
+            output.append(account_info)
+
+        result = {
+            "accounts": output,
+            "count": len(output)
+        }
+        # Only create variable message for simple scalar values
+        # Complex nested structures should use json_message only
+        yield self.create_variable_message("count", len(output))
+        if len(output) == 1:
+            # Single match from an id or name lookup: expose the id for the next node directly
+            yield self.create_variable_message("account_id", output[0]["id"])
+        yield self.create_json_message(result)
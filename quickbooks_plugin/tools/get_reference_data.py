@@ -0,0 +1,105 @@
+from collections.abc import Generator
+from typing import Any
+
+import httpx
+from dify_plugin import Tool
+from dify_plugin.entities.tool import ToolInvokeMessage
+
+from provider.client import QuickBooksClient
+from provider.reference_data import REFERENCE_ENTITIES, reference_cache
+
+# Fields kept for each list besides id, name and fully_qualified_name
+_EXTRA_FIELDS = {
+    "Item": {"type": "Type", "sku": "Sku", "unit_price": "UnitPrice", "taxable": "Taxable"},
+    "Term": {"due_days": "DueDays", "discount_percent": "DiscountPercent", "discount_days": "DiscountDays"},
+    "TaxCode": {"description": "Description", "taxable": "Taxable"},
+    "PaymentMethod": {"type": "Type"}
+}
+
+
+def _summarize(entity: str, record: dict[str, Any]) -> dict[str, Any]:
+    summary = {
+        "id": record.get("Id"),
+        "name": record.get("Name"),
+        "fully_qualified_name": record.get("FullyQualifiedName") or record.get("Name")
+    }
+    for key, field in _EXTRA_FIELDS.get(entity, {}).items():
+        if field in record:
+            summary[key] = record[field]
+    if entity == "Item" and record.get("IncomeAccountRef"):
+        summary["income_account_id"] = record["IncomeAccountRef"].get("value")
+    return summary
+
+
+def _company_summary(company_info: dict[str, Any], preferences: dict[str, Any]) -> dict[str, Any]:
+    accounting = preferences.get("AccountingInfoPrefs", {})
+    currency = preferences.get("CurrencyPrefs", {})
+    sales_forms = preferences.get("SalesFormsPrefs", {})
+    return {
+        "company_name": company_info.get("CompanyName"),
+        "legal_name": company_info.get("LegalName"),
+        "country": company_info.get("Country"),
+        "fiscal_year_start_month": company_info.get("FiscalYearStartMonth"),
+        "home_currency": (currency.get("HomeCurrency") or {}).get("value"),
+        "multi_currency_enabled": currency.get("MultiCurrencyEnabled"),
+        "track_classes": accounting.get("ClassTrackingPerTxn") or accounting.get("ClassTrackingPerTxnLine"),
+        "track_departments": accounting.get("TrackDepartments"),
+        "department_terminology": accounting.get("DepartmentTerminology"),
+        "default_terms_id": (sales_forms.get("DefaultTerms") or {}).get("value"),
+        "custom_txn_numbers": sales_forms.get("CustomTxnNumbers"),
+        "using_sales_tax": preferences.get("TaxPrefs", {}).get("UsingSalesTax")
+    }
+
+
+class GetReferenceDataTool(Tool):
+    """Tool to look up items, classes, departments, terms, payment methods and tax codes."""
+
+    def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
+        """
+        Return the company's reference lists and settings from the per-realm reference data cache.
+
+        The whole bundle is loaded with one batch request and kept for up to 10 minutes; Change Data
+        Capture syncs and this plugin's own writes keep it current in between.
+
+        Args:
+            tool_parameters: Dictionary containing entity, name and refresh
+
+        Returns:
+            Compact reference lists, or the matches for a name, plus a company settings summary
+        """
+        entity = tool_parameters.get("entity") or ""
+        name = (tool_parameters.get("name") or "").strip()
+        refresh = bool(tool_parameters.get("refresh", False))
+
+        if entity and entity not in REFERENCE_ENTITIES:
+            raise ValueError(f"Unsupported entity '{entity}'. Supported: {', '.join(REFERENCE_ENTITIES)}")
+        if name and not entity:
+            raise ValueError("entity is required when looking up a name")
+
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
+        try:
+            data, age = reference_cache.get_with_age(client, refresh=refresh)
+        except httpx.HTTPError as e:
+            raise Exception(f"Network error while fetching reference data: {str(e)}") from e
+
+        if name:
+            matches = [_summarize(entity, record) for record in data.find(entity, name)]
+            result = {"entity": entity, "matches": matches, "count": len(matches)}
+            yield self.create_variable_message("count", len(matches))
+            if len(matches) == 1:
+                # Single match: expose the id for the next node directly
+                yield self.create_variable_message("id", matches[0]["id"])
+            yield self.create_json_message(result)
+            return
+
+        lists = {
+            list_name: [_summarize(list_name, record) for record in data.records[list_name]]
+            for list_name in ([entity] if entity else REFERENCE_ENTITIES)
+        }
+        result = {
+            "company": _company_summary(data.company_info, data.preferences),
+            "lists": lists,
+            "counts": {list_name: len(records) for list_name, records in lists.items()},
+            "cache_age_seconds": round(age)
+        }
+        yield self.create_json_message(result)
@@ -0,0 +1,141 @@
+from collections.abc import Generator
+from typing import Any
+
+import httpx
+from dify_plugin import Tool
+from dify_plugin.entities.tool import ToolInvokeMessage
+
+from provider.accounts import account_cache
+from provider.batch import DEFAULT_CONCURRENCY, build_batch_item, execute_batch, summarize_batch_response
+from provider.client import QuickBooksClient
+from provider.idempotency import load_posted, save_posted, stamp_note
+from provider.journal_import import build_journal_entry, csv_lines, parse_journal_csv, resolve_accounts
+
+
+class ImportJournalEntriesTool(Tool):
+    """Tool to import journal entries from a CSV of journal lines through the QuickBooks Batch API."""
+
+    def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
+        """
+        Invoke the import_journal_entries tool.
+
+        Every entry is checked before anything is posted: each line has one positive debit or credit,
+        each entry balances, and each account resolves to exactly one active account. Unless
+        skip_invalid is set, one bad entry stops the whole import.
+
+        Args:
+            tool_parameters: Dictionary containing:
+                - csv_file: Uploaded CSV file (optional if csv_text is given)
+                - csv_text: CSV content as text (optional if csv_file is given)
+                - validate_only: Check the file without posting (optional)
+                - skip_invalid: Post the valid entries even when others fail checks (optional)
+                - import_id: Stable ID for this file; re-running with it skips entries already posted (optional)
+                - max_concurrency: Number of batch requests sent at once (optional)
+
+        Returns:
+            Per-entry status in file order, plus counts
+        """
+        source = tool_parameters.get("csv_file") or tool_parameters.get("csv_text")
+        if not source:
+            raise ValueError("Either csv_file or csv_text is required")
+        try:
+            drafts = parse_journal_csv(csv_lines(source))
+        except UnicodeDecodeError as e:
+            raise ValueError("CSV must be UTF-8 encoded") from e
+        if not drafts:
+            raise ValueError("CSV has no journal lines")
+
+        validate_only = bool(tool_parameters.get("validate_only"))
+        skip_invalid = bool(tool_parameters.get("skip_invalid"))
+        import_id = (tool_parameters.get("import_id") or "").strip()
+        try:
+            max_concurrency = int(tool_parameters.get("max_concurrency") or DEFAULT_CONCURRENCY)
+        except (TypeError, ValueError):
+            max_concurrency = DEFAULT_CONCURRENCY
+
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
+        storage = self.session.storage
+
+        try:
+            account_ids = resolve_accounts(drafts, account_cache.get(client))
+        except httpx.HTTPError as e:
+            raise Exception(f"Network error: {str(e)}") from e
+
+        entries = [
+            {
+                "entry_key": draft.key,
+                "row": draft.first_row,
+                "line_count": len(draft.lines),
+                "total": float(draft.debits),
+                "status": "invalid" if draft.errors else "valid",
+                "errors": draft.errors
+            }
+            for draft in drafts
+        ]
+        invalid_count = sum(1 for draft in drafts if draft.errors)
+
+        to_post = []
+        if not validate_only and (skip_invalid or not invalid_count):
+            for draft, entry in zip(drafts, entries, strict=True):
+                if draft.errors:
+                    continue
+                payload = build_journal_entry(draft, account_ids)
+                external_id = f"{import_id}:{draft.key}" if import_id else None
+                if external_id:
+                    posted = load_posted(storage, client.realm_id, "JournalEntry", external_id)
+                    if posted is not None:
+                        entry.update({"status": "already_posted", "id": posted.id, "posted_at": posted.posted_at})
+                        continue
+                    payload["PrivateNote"] = stamp_note(payload.get("PrivateNote", ""), external_id)
+                to_post.append((entry, external_id, payload))
+
+        items = [
+            build_batch_item(index, {"operation": "create", "entity": "JournalEntry", "data": payload})
+            for index, (_, _, payload) in enumerate(to_post)
+        ]
+        try:
+            responses = execute_batch(client, items, max_concurrency)
+        except httpx.HTTPError as e:
+            raise Exception(f"Network error: {str(e)}") from e
+
+        for (entry, external_id, _), response in zip(to_post, responses, strict=True):
+            outcome = summarize_batch_response(response)
+            if not outcome["success"]:
+                entry.update({"status": "failed", "errors": [outcome["error"]]})
+                continue
+            record = outcome.get("data") or {}
+            entry.update({"status": "posted", "id": outcome.get("id"), "doc_number": record.get("DocNumber")})
+            if external_id:
+                save_posted(storage, client.realm_id, "JournalEntry", external_id, record)
+
+        counts = {status: sum(1 for e in entries if e["status"] == status) for status in
+                  ("valid", "posted", "already_posted", "failed")}
+        if validate_only:
+            message = f"Checked {len(entries)} entries: {len(entries) - invalid_count} valid, {invalid_count} invalid"
+        elif invalid_count and not skip_invalid:
+            message = (
+                f"Nothing posted: {invalid_count} of {len(entries)} entries failed checks. "
+                "Fix them, or set skip_invalid to post the rest"
+            )
+        else:
+            message = (
+                f"Posted {counts['posted']} of {len(entries)} entries: {counts['already_posted']} already posted, "
+                f"{invalid_count} invalid, {counts['failed']} failed"
+            )
+
+        result = {
+            "success": not invalid_count and not counts["failed"],
+            "entry_count": len(entries),
+            "line_count": sum(len(draft.lines) for draft in drafts),
+            "invalid_count": invalid_count,
+            "posted_count": counts["posted"],
+            "already_posted_count": counts["already_posted"],
+            "failed_count": counts["failed"],
+            "entries": entries,
+            "message": message
+        }
+        # Only create variable messages for scalar values
+        for key in ("success", "entry_count", "invalid_count", "posted_count", "already_posted_count",
+                    "failed_count", "message"):
+            yield self.create_variable_message(key, result[key])
+        yield self.create_json_message(result)
@@ -1,4 +1,3 @@
-import urllib.parse
 from collections.abc import Generator
 from typing import Any
 
@@ -6,27 +5,16 @@ import httpx
 
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
-from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.client import QuickBooksClient, fault_message, raise_for_error
+from provider.reference_data import reference_cache
+from provider.sync_tokens import read_entity, update_entity
 
 
 class ItemManagementTool(Tool):
     """Tool to manage items (products, services, inventory) in QuickBooks."""
 
     def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
-        access_token = self.runtime.credentials.get("access_token")
-        realm_id = self.runtime.credentials.get("realm_id")
-
-        if not access_token or not realm_id:
-            raise ToolProviderCredentialValidationError("QuickBooks credentials required.")
-
-        environment = self.runtime.credentials.get("environment", "sandbox")
-        api_base_url = f"https://{'sandbox-' if environment == 'sandbox' else ''}quickbooks.api.intuit.com/v3"
-
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
 
         operation = tool_parameters.get("operation")
         if not operation:
@@ -34,19 +22,19 @@ class ItemManagementTool(Tool):
 
         try:
             if operation == "create":
-                yield from self._create(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._create(client, tool_parameters)
             elif operation == "read":
-                yield from self._read(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._read(client, tool_parameters)
             elif operation == "update":
-                yield from self._update(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._update(client, tool_parameters)
             elif operation == "query":
-                yield from self._query(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._query(client, tool_parameters)
             else:
                 raise ValueError(f"Unknown operation: {operation}")
         except httpx.HTTPError as e:
             raise Exception(f"Network error: {str(e)}") from e
 
-    def _create(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _create(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         name = params.get("name")
         item_type = params.get("item_type")
 
@@ -86,11 +74,11 @@ class ItemManagementTool(Tool):
             from datetime import date
             payload["InvStartDate"] = date.today().isoformat()
 
-        url = f"{api_base_url}/company/{realm_id}/item?minorversion=65"
-        response = httpx.post(url, headers=headers, json=payload, timeout=30)
+        response = client.post("item", json=payload)
 
         if response.status_code == 200:
             data = response.json()
+            reference_cache.apply_changes(client.realm_id, "Item", [data.get("Item", {})])
             result = {
                 "success": True,
                 "operation": "create",
@@ -103,13 +91,12 @@ class ItemManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _read(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _read(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         item_id = params.get("item_id")
         if not item_id:
             raise ValueError("item_id is required for read")
 
-        url = f"{api_base_url}/company/{realm_id}/item/{item_id}?minorversion=65"
-        response = httpx.get(url, headers=headers, timeout=30)
+        response = read_entity(client, "Item", item_id)
 
         if response.status_code == 200:
             data = response.json()
@@ -125,22 +112,18 @@ class ItemManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _update(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _update(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         item_id = params.get("item_id")
-        sync_token = params.get("sync_token")
-        name = params.get("name")
-        item_type = params.get("item_type")
-
-        if not all([item_id, sync_token, name, item_type]):
-            raise ValueError("item_id, sync_token, name, and item_type are required for update")
-
-        payload: dict[str, Any] = {
-            "Id": item_id,
-            "SyncToken": sync_token,
-            "Name": name,
-            "Type": item_type
-        }
 
+        if not item_id:
+            raise ValueError("item_id is required for update")
+
+        # Only the given fields are sent; QuickBooks keeps the rest
+        payload: dict[str, Any] = {}
+        if params.get("name"):
+            payload["Name"] = params["name"]
+        if params.get("item_type"):
+            payload["Type"] = params["item_type"]
         if params.get("income_account_id"):
             payload["IncomeAccountRef"] = {"value": params["income_account_id"]}
         if params.get("expense_account_id"):
@@ -156,11 +139,11 @@ class ItemManagementTool(Tool):
         if params.get("taxable") is not None:
             payload["Taxable"] = params["taxable"]
 
-        url = f"{api_base_url}/company/{realm_id}/item?minorversion=65"
-        response = httpx.post(url, headers=headers, json=payload, timeout=30)
+        response = update_entity(client, "Item", item_id, payload, sync_token=params.get("sync_token"))
 
         if response.status_code == 200:
             data = response.json()
+            reference_cache.apply_changes(client.realm_id, "Item", [data.get("Item", {})])
             result = {
                 "success": True,
                 "operation": "update",
@@ -173,15 +156,13 @@ class ItemManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _query(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _query(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         query_string = params.get("query_string", "")
         query = "SELECT * FROM Item"
         if query_string:
             query += f" WHERE {query_string}"
 
-        encoded_query = urllib.parse.quote(query)
-        url = f"{api_base_url}/company/{realm_id}/query?query={encoded_query}&minorversion=65"
-        response = httpx.get(url, headers=headers, timeout=30)
+        response = client.query(query)
 
         if response.status_code == 200:
             data = response.json()
@@ -221,8 +202,6 @@ class ItemManagementTool(Tool):
         }
 
     def _handle_error(self, response: httpx.Response) -> None:
-        if response.status_code == 401:
-            raise ToolProviderCredentialValidationError("Authentication failed.")
-        error_detail = response.json() if response.content else {}
-        error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
+        raise_for_error(response)
+        error_msg = fault_message(response)
         raise Exception(f"API error {response.status_code}: {error_msg}")
@@ -1,35 +1,23 @@
-import urllib.parse
 from collections.abc import Generator
+from decimal import Decimal, InvalidOperation
 from typing import Any
 
 import httpx
 
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
-from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.client import QuickBooksClient, fault_message, raise_for_error
+from provider.idempotency import PostedEntry, load_posted, post_once
+from provider.open_invoices import CENT, allocate, open_invoice_cache
+from provider.reference_data import resolve_ref
+from provider.sync_tokens import read_entity, update_entity
 
 
 class PaymentManagementTool(Tool):
     """Tool to manage customer payments in QuickBooks."""
 
     def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
-        access_token = self.runtime.credentials.get("access_token")
-        realm_id = self.runtime.credentials.get("realm_id")
-
-        if not access_token or not realm_id:
-            raise ToolProviderCredentialValidationError("QuickBooks credentials required.")
-
-        environment = self.runtime.credentials.get("environment", "sandbox")
-        if environment == "sandbox":
-            api_base_url = "https://sandbox-quickbooks.api.intuit.com/v3"
-        else:
-            api_base_url = "https://quickbooks.api.intuit.com/v3"
-
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
 
         operation = tool_parameters.get("operation")
         if not operation:
@@ -37,24 +25,26 @@ class PaymentManagementTool(Tool):
 
         try:
             if operation == "create":
-                yield from self._create_payment(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._create_payment(client, tool_parameters)
+            elif operation == "apply":
+                yield from self._apply_payment(client, tool_parameters)
             elif operation == "read":
-                yield from self._read_payment(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._read_payment(client, tool_parameters)
             elif operation == "update":
-                yield from self._update_payment(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._update_payment(client, tool_parameters)
             elif operation == "delete":
-                yield from self._delete_payment(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._delete_payment(client, tool_parameters)
             elif operation == "void":
-                yield from self._void_payment(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._void_payment(client, tool_parameters)
             elif operation == "query":
-                yield from self._query_payments(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._query_payments(client, tool_parameters)
             else:
                 raise ValueError(f"Unknown operation: {operation}")
 
         except httpx.HTTPError as e:
             raise Exception(f"Network error: {str(e)}") from e
 
-    def _create_payment(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _create_payment(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         customer_id = params.get("customer_id")
         total_amount = params.get("total_amount")
 
@@ -65,15 +55,7 @@ class PaymentManagementTool(Tool):
             "CustomerRef": {"value": customer_id},
             "TotalAmt": total_amount
         }
-
-        if params.get("txn_date"):
-            payload["TxnDate"] = params["txn_date"]
-        if params.get("deposit_to_account_id"):
-            payload["DepositToAccountRef"] = {"value": params["deposit_to_account_id"]}
-        if params.get("payment_method_id"):
-            payload["PaymentMethodRef"] = {"value": params["payment_method_id"]}
-        if params.get("private_note"):
-            payload["PrivateNote"] = params["private_note"]
+        self._add_optional_fields(client, params, payload)
 
         if params.get("invoice_id"):
             payload["Line"] = [{
@@ -81,10 +63,10 @@ class PaymentManagementTool(Tool):
                 "LinkedTxn": [{"TxnId": params["invoice_id"], "TxnType": "Invoice"}]
             }]
 
-        url = f"{api_base_url}/company/{realm_id}/payment?minorversion=65"
-        response = httpx.post(url, headers=headers, json=payload, timeout=30)
+        response = client.post("payment", json=payload)
 
         if response.status_code == 200:
+            open_invoice_cache.invalidate(client.realm_id, str(customer_id))
             data = response.json()
             payment = data.get("Payment", {})
             result = {
@@ -99,13 +81,123 @@ class PaymentManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _read_payment(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _apply_payment(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+        """Apply one payment across the customer's open invoices, with one LinkedTxn line per invoice."""
+        customer_id = str(params.get("customer_id") or "").strip()
+        if not customer_id or params.get("total_amount") is None:
+            raise ValueError("customer_id and total_amount are required for apply")
+        try:
+            amount = Decimal(str(params["total_amount"])).quantize(CENT)
+        except InvalidOperation as e:
+            raise ValueError(f"Invalid total_amount: {params['total_amount']}") from e
+        if amount <= 0:
+            raise ValueError("total_amount must be greater than zero")
+
+        strategy = params.get("allocation") or "oldest_first"
+        invoice_refs = [ref.strip() for ref in str(params.get("invoice_ids") or "").split(",") if ref.strip()]
+        preview = bool(params.get("preview", False))
+        external_id = (params.get("external_id") or "").strip()
+
+        # Checked before allocating: once posted, the invoices it paid are no longer open
+        posted = load_posted(self.session.storage, client.realm_id, "Payment", external_id) if external_id else None
+        if posted is not None and not preview:
+            yield from self._already_posted(posted, external_id)
+            return
+
+        index = open_invoice_cache.get(client, customer_id)
+        candidates = index.select(invoice_refs) if invoice_refs else index.invoices
+        if not candidates:
+            raise ValueError(f"Customer {customer_id} has no open invoices")
+        allocations = allocate(candidates, amount, strategy)
+        applied = sum((allocation.amount for allocation in allocations), Decimal(0))
+        applications = [
+            {
+                "invoice_id": allocation.invoice.id,
+                "doc_number": allocation.invoice.doc_number,
+                "txn_date": allocation.invoice.txn_date,
+                "due_date": allocation.invoice.due_date,
+                "open_balance": float(allocation.invoice.balance),
+                "amount": float(allocation.amount),
+                "remaining_balance": float(allocation.invoice.balance - allocation.amount)
+            }
+            for allocation in allocations
+        ]
+        result: dict[str, Any] = {
+            "success": True,
+            "operation": "apply",
+            "allocation": strategy,
+            "applications": applications,
+            "invoice_count": len(applications),
+            "applied_amount": float(applied),
+            "unapplied_amount": float(amount - applied),
+            "open_balance": float(index.total_balance)
+        }
+
+        if preview:
+            result["preview"] = True
+            result["message"] = f"Would apply {applied} to {len(applications)} invoices"
+            yield from self._yield_apply_result(result)
+            return
+
+        payload: dict[str, Any] = {
+            "CustomerRef": {"value": customer_id},
+            "TotalAmt": float(amount),
+            "Line": [
+                {
+                    "Amount": float(allocation.amount),
+                    "LinkedTxn": [{"TxnId": allocation.invoice.id, "TxnType": "Invoice"}]
+                }
+                for allocation in allocations
+            ]
+        }
+        self._add_optional_fields(client, params, payload)
+
+        if external_id:
+            outcome = post_once(client, self.session.storage, "Payment", external_id, payload)
+            if isinstance(outcome, PostedEntry):
+                yield from self._already_posted(outcome, external_id)
+                return
+            response = outcome
+        else:
+            response = client.post("payment", json=payload)
+
+        if response.status_code != 200:
+            # The cached balances may be out of date; the next attempt reloads them
+            open_invoice_cache.invalidate(client.realm_id, customer_id)
+            self._handle_error(response)
+
+        open_invoice_cache.record_payment(client, customer_id, allocations)
+        result["payment"] = self._format_payment(response.json().get("Payment", {}))
+        result["external_id"] = external_id or None
+        result["already_posted"] = False
+        result["message"] = f"Payment of {amount} applied to {len(applications)} invoices"
+        yield from self._yield_apply_result(result)
+
+    def _already_posted(self, posted: PostedEntry, external_id: str) -> Generator[ToolInvokeMessage, None, None]:
+        result = {
+            "success": True,
+            "operation": "apply",
+            "payment": {"id": posted.id, "sync_token": posted.sync_token},
+            "external_id": external_id,
+            "already_posted": True,
+            "posted_at": posted.posted_at,
+            "message": f"Payment for {external_id} was already recorded"
+        }
+        yield from self._yield_apply_result(result)
+
+    def _yield_apply_result(self, result: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
+        # Only create variable messages for scalar values
+        for key, value in result.items():
+            if not isinstance(value, dict | list):
+                yield self.create_variable_message(key, value)
+        yield self.create_json_message(result)
+
+    def _read_payment(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         payment_id = params.get("payment_id")
         if not payment_id:
             raise ValueError("payment_id is required for read")
 
-        url = f"{api_base_url}/company/{realm_id}/payment/{payment_id}?minorversion=65"
-        response = httpx.get(url, headers=headers, timeout=30)
+        response = read_entity(client, "Payment", payment_id)
 
         if response.status_code == 200:
             data = response.json()
@@ -124,31 +216,28 @@ class PaymentManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _update_payment(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _update_payment(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         payment_id = params.get("payment_id")
-        sync_token = params.get("sync_token")
-        customer_id = params.get("customer_id")
-        total_amount = params.get("total_amount")
-
-        if not all([payment_id, sync_token, customer_id]) or total_amount is None:
-            raise ValueError("payment_id, sync_token, customer_id, and total_amount are required for update")
-
-        payload: dict[str, Any] = {
-            "Id": payment_id,
-            "SyncToken": sync_token,
-            "CustomerRef": {"value": customer_id},
-            "TotalAmt": total_amount
-        }
 
+        if not payment_id:
+            raise ValueError("payment_id is required for update")
+
+        # Only the given fields are sent; QuickBooks keeps the rest
+        payload: dict[str, Any] = {}
+        if params.get("customer_id"):
+            payload["CustomerRef"] = {"value": params["customer_id"]}
+        if params.get("total_amount") is not None:
+            payload["TotalAmt"] = params["total_amount"]
         if params.get("txn_date"):
             payload["TxnDate"] = params["txn_date"]
         if params.get("private_note"):
             payload["PrivateNote"] = params["private_note"]
 
-        url = f"{api_base_url}/company/{realm_id}/payment?minorversion=65"
-        response = httpx.post(url, headers=headers, json=payload, timeout=30)
+        response = update_entity(client, "Payment", payment_id, payload, sync_token=params.get("sync_token"))
 
         if response.status_code == 200:
+            # The payment may have moved from another customer, whose balances change too
+            open_invoice_cache.invalidate(client.realm_id)
             data = response.json()
             payment = data.get("Payment", {})
             result = {
@@ -163,7 +252,7 @@ class PaymentManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _delete_payment(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _delete_payment(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         payment_id = params.get("payment_id")
         sync_token = params.get("sync_token")
 
@@ -171,10 +260,11 @@ class PaymentManagementTool(Tool):
             raise ValueError("payment_id and sync_token are required for delete")
 
         payload = {"Id": payment_id, "SyncToken": sync_token}
-        url = f"{api_base_url}/company/{realm_id}/payment?operation=delete&minorversion=65"
-        response = httpx.post(url, headers=headers, json=payload, timeout=30)
+        response = client.post("payment", params={"operation": "delete"}, json=payload)
 
         if response.status_code == 200:
+            # The customer is not known here, so every cached customer of the company is reloaded
+            open_invoice_cache.invalidate(client.realm_id)
             result = {
                 "success": True,
                 "operation": "delete",
@@ -186,7 +276,7 @@ class PaymentManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _void_payment(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _void_payment(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         payment_id = params.get("payment_id")
         sync_token = params.get("sync_token")
 
@@ -194,10 +284,10 @@ class PaymentManagementTool(Tool):
             raise ValueError("payment_id and sync_token are required for void")
 
         payload = {"Id": payment_id, "SyncToken": sync_token}
-        url = f"{api_base_url}/company/{realm_id}/payment?operation=void&minorversion=65"
-        response = httpx.post(url, headers=headers, json=payload, timeout=30)
+        response = client.post("payment", params={"operation": "void"}, json=payload)
 
         if response.status_code == 200:
+            open_invoice_cache.invalidate(client.realm_id)
             result = {
                 "success": True,
                 "operation": "void",
@@ -209,15 +299,13 @@ class PaymentManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _query_payments(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _query_payments(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         query_string = params.get("query_string", "")
         query = f"SELECT * FROM Payment"
         if query_string:
             query += f" WHERE {query_string}"
 
-        encoded_query = urllib.parse.quote(query)
-        url = f"{api_base_url}/company/{realm_id}/query?query={encoded_query}&minorversion=65"
-        response = httpx.get(url, headers=headers, timeout=30)
+        response = client.query(query)
 
         if response.status_code == 200:
             data = response.json()
@@ -238,6 +326,16 @@ class PaymentManagementTool(Tool):
         else:
             self._handle_error(response)
 
+    def _add_optional_fields(self, client: QuickBooksClient, params: dict, payload: dict[str, Any]) -> None:
+        if params.get("txn_date"):
+            payload["TxnDate"] = params["txn_date"]
+        if params.get("deposit_to_account_id"):
+            payload["DepositToAccountRef"] = {"value": params["deposit_to_account_id"]}
+        if params.get("payment_method_id"):
+            payload["PaymentMethodRef"] = resolve_ref(client, "PaymentMethod", params["payment_method_id"])
+        if params.get("private_note"):
+            payload["PrivateNote"] = params["private_note"]
+
     def _format_payment(self, payment: dict) -> dict:
         return {
             "id": payment.get("Id"),
@@ -256,8 +354,6 @@ class PaymentManagementTool(Tool):
         }
 
     def _handle_error(self, response: httpx.Response) -> None:
-        if response.status_code == 401:
-            raise ToolProviderCredentialValidationError("Authentication failed.")
-        error_detail = response.json() if response.content else {}
-        error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
+        raise_for_error(response)
+        error_msg = fault_message(response)
         raise Exception(f"API error {response.status_code}: {error_msg}")
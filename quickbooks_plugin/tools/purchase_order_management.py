@@ -1,5 +1,4 @@
 import json
-import urllib.parse
 from collections.abc import Generator
 from typing import Any
 
@@ -7,27 +6,15 @@ import httpx
 
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
-from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.client import QuickBooksClient, fault_message, raise_for_error
+from provider.reference_data import resolve_item_ref
 
 
 class PurchaseOrderManagementTool(Tool):
     """Tool to manage purchase orders in QuickBooks."""
 
     def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
-        access_token = self.runtime.credentials.get("access_token")
-        realm_id = self.runtime.credentials.get("realm_id")
-
-        if not access_token or not realm_id:
-            raise ToolProviderCredentialValidationError("QuickBooks credentials required.")
-
-        environment = self.runtime.credentials.get("environment", "sandbox")
-        api_base_url = f"https://{'sandbox-' if environment == 'sandbox' else ''}quickbooks.api.intuit.com/v3"
-
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
 
         operation = tool_parameters.get("operation")
         if not operation:
@@ -35,19 +22,19 @@ class PurchaseOrderManagementTool(Tool):
 
         try:
             if operation == "create":
-                yield from self._create(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._create(client, tool_parameters)
             elif operation == "read":
-                yield from self._read(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._read(client, tool_parameters)
             elif operation == "delete":
-                yield from self._delete(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._delete(client, tool_parameters)
             elif operation == "query":
-                yield from self._query(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._query(client, tool_parameters)
             else:
                 raise ValueError(f"Unknown operation: {operation}")
         except httpx.HTTPError as e:
             raise Exception(f"Network error: {str(e)}") from e
 
-    def _create(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _create(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         vendor_id = params.get("vendor_id")
         ap_account_id = params.get("ap_account_id")
         lines_json = params.get("lines_json")
@@ -66,7 +53,7 @@ class PurchaseOrderManagementTool(Tool):
                 "DetailType": "ItemBasedExpenseLineDetail",
                 "Amount": line.get("Amount"),
                 "ItemBasedExpenseLineDetail": {
-                    "ItemRef": line.get("ItemRef"),
+                    "ItemRef": resolve_item_ref(client, line),
                     "Qty": line.get("Qty", 1),
                     "UnitPrice": line.get("UnitPrice"),
                     "BillableStatus": line.get("BillableStatus", "NotBillable")
@@ -90,8 +77,7 @@ class PurchaseOrderManagementTool(Tool):
         if params.get("ship_to_customer_id"):
             payload["ShipTo"] = {"value": params["ship_to_customer_id"]}
 
-        url = f"{api_base_url}/company/{realm_id}/purchaseorder?minorversion=65"
-        response = httpx.post(url, headers=headers, json=payload, timeout=30)
+        response = client.post("purchaseorder", json=payload)
 
         if response.status_code == 200:
             data = response.json()
@@ -107,13 +93,12 @@ class PurchaseOrderManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _read(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _read(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         po_id = params.get("purchase_order_id")
         if not po_id:
             raise ValueError("purchase_order_id is required for read")
 
-        url = f"{api_base_url}/company/{realm_id}/purchaseorder/{po_id}?minorversion=65"
-        response = httpx.get(url, headers=headers, timeout=30)
+        response = client.get(f"purchaseorder/{po_id}")
 
         if response.status_code == 200:
             data = response.json()
@@ -129,7 +114,7 @@ class PurchaseOrderManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _delete(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _delete(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         po_id = params.get("purchase_order_id")
         sync_token = params.get("sync_token")
 
@@ -137,8 +122,7 @@ class PurchaseOrderManagementTool(Tool):
             raise ValueError("purchase_order_id and sync_token are required for delete")
 
         payload = {"Id": po_id, "SyncToken": sync_token}
-        url = f"{api_base_url}/company/{realm_id}/purchaseorder?operation=delete&minorversion=65"
-        response = httpx.post(url, headers=headers, json=payload, timeout=30)
+        response = client.post("purchaseorder", params={"operation": "delete"}, json=payload)
 
         if response.status_code == 200:
             result = {
@@ -152,15 +136,13 @@ class PurchaseOrderManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _query(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _query(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         query_string = params.get("query_string", "")
         query = "SELECT * FROM PurchaseOrder"
         if query_string:
             query += f" WHERE {query_string}"
 
-        encoded_query = urllib.parse.quote(query)
-        url = f"{api_base_url}/company/{realm_id}/query?query={encoded_query}&minorversion=65"
-        response = httpx.get(url, headers=headers, timeout=30)
+        response = client.query(query)
 
         if response.status_code == 200:
             data = response.json()
@@ -197,8 +179,6 @@ class PurchaseOrderManagementTool(Tool):
         }
 
     def _handle_error(self, response: httpx.Response) -> None:
-        if response.status_code == 401:
-            raise ToolProviderCredentialValidationError("Authentication failed.")
-        error_detail = response.json() if response.content else {}
-        error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
+        raise_for_error(response)
+        error_msg = fault_message(response)
         raise Exception(f"API error {response.status_code}: {error_msg}")
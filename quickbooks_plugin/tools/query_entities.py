@@ -1,13 +1,28 @@
-import re
-import urllib.parse
+import time
 from collections.abc import Generator
+from datetime import date
 from typing import Any
 
 import httpx
 
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
-from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.client import QuickBooksClient, fault_message, raise_for_error
+from provider.fanout import DEFAULT_REALM_CONCURRENCY, fan_out, parse_realms, remember_connection, verify_access
+from provider.mirror import MirrorResult, get_mirror
+from provider.pagination import (
+    DEFAULT_PAGE_CONCURRENCY,
+    DEFAULT_SHARD_DAYS,
+    MAX_PAGE_SIZE,
+    add_condition,
+    date_windows,
+    extract_rows,
+    iter_query_pages,
+    iter_sharded_pages,
+    strip_paging
+)
+from provider.projection import flatten_row, parse_fields, project_query, select_list
+from provider.query_parser import Condition, Query, parse_query
 
 
 class QueryEntitiesTool(Tool):
@@ -22,103 +37,94 @@ class QueryEntitiesTool(Tool):
         "TimeActivity", "Transfer", "Vendor", "VendorCredit"
     ]
 
-    # Dangerous SQL keywords that could indicate injection attempts
-    _DANGEROUS_KEYWORDS = [
-        "DELETE", "UPDATE", "INSERT", "DROP", "ALTER", "TRUNCATE",
-        "CREATE", "EXEC", "EXECUTE", "UNION", "INTO", "--", "/*", "*/"
-    ]
+    _ENTITIES_BY_UPPER = {entity.upper(): entity for entity in SUPPORTED_ENTITIES}
 
-    def _validate_custom_query(self, query: str) -> None:
-        """Validate custom query to prevent injection attacks.
+    def _validate_custom_query(self, query: str) -> Query:
+        """Parse a custom query, returning it with the entity spelled as QuickBooks documents it.
 
-        Ensures the query:
-        - Starts with SELECT
-        - Does not contain dangerous keywords
-        - References only supported entity types
+        Only the read-only SELECT dialect parses, so other statements, comments and stray quotes are
+        rejected by the grammar; words like "update" inside string literals are just values.
         """
         if not query or not query.strip():
             raise ValueError("Custom query cannot be empty")
 
-        normalized = query.strip().upper()
-
-        # Must start with SELECT
-        if not normalized.startswith("SELECT"):
+        parsed = parse_query(query.strip())
+        entity = self._ENTITIES_BY_UPPER.get(parsed.entity.upper())
+        if entity is None:
             raise ValueError(
-                "Custom query must start with SELECT. "
-                "Only read operations are allowed."
+                f"Unsupported entity type in query: {parsed.entity}. "
+                f"Supported entities: {', '.join(self.SUPPORTED_ENTITIES)}"
             )
-
-        # Check for dangerous keywords
-        for keyword in self._DANGEROUS_KEYWORDS:
-            # Use word boundary matching for SQL keywords, literal match for comment markers
-            if keyword.startswith("-") or keyword.startswith("/") or keyword.startswith("*"):
-                if keyword in normalized:
-                    raise ValueError(
-                        f"Custom query contains forbidden pattern: {keyword}. "
-                        "Only SELECT queries are allowed."
-                    )
-            else:
-                # Word boundary check for SQL keywords
-                pattern = rf"\b{keyword}\b"
-                if re.search(pattern, normalized):
-                    raise ValueError(
-                        f"Custom query contains forbidden keyword: {keyword}. "
-                        "Only SELECT queries are allowed."
-                    )
-
-        # Validate FROM clause references a supported entity
-        from_match = re.search(r"\bFROM\s+(\w+)", normalized)
-        if from_match:
-            entity = from_match.group(1)
-            # Check against supported entities (case-insensitive)
-            entity_upper_list = [e.upper() for e in self.SUPPORTED_ENTITIES]
-            if entity not in entity_upper_list:
-                raise ValueError(
-                    f"Unsupported entity type in query: {entity}. "
-                    f"Supported entities: {', '.join(self.SUPPORTED_ENTITIES)}"
-                )
+        return parsed._replace(entity=entity)
 
     def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
-        access_token = self.runtime.credentials.get("access_token")
-        realm_id = self.runtime.credentials.get("realm_id")
-
-        if not access_token or not realm_id:
-            raise ToolProviderCredentialValidationError("QuickBooks credentials required.")
-
-        environment = self.runtime.credentials.get("environment", "sandbox")
-        api_base_url = f"https://{'sandbox-' if environment == 'sandbox' else ''}quickbooks.api.intuit.com/v3"
-
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
+        # Lets searches made under other companies' connections include this company by realm id
+        remember_connection(self.session.storage, self.runtime.credentials)
 
         entity_type = tool_parameters.get("entity_type")
         query_string = tool_parameters.get("query_string", "")
         custom_query = tool_parameters.get("custom_query", "")
         max_results = tool_parameters.get("max_results", 100)
+        auto_paginate = tool_parameters.get("auto_paginate", False)
+        fields = parse_fields(tool_parameters.get("fields") or "")
+        windows = self._txn_date_windows(tool_parameters)
+        if windows:
+            # Sharded scans always return every page of every window
+            auto_paginate = True
 
         try:
             if custom_query:
-                # Validate custom query for injection protection
-                self._validate_custom_query(custom_query)
-                query = custom_query
+                query = self._validate_custom_query(custom_query).render()
+                if fields:
+                    query = project_query(query, fields)
             elif entity_type:
                 if entity_type not in self.SUPPORTED_ENTITIES:
                     raise ValueError(f"Unsupported entity type: {entity_type}. Supported: {', '.join(self.SUPPORTED_ENTITIES)}")
 
-                query = f"SELECT * FROM {entity_type}"
+                query = f"SELECT {select_list(fields) if fields else '*'} FROM {entity_type}"
                 if query_string:
                     query += f" WHERE {query_string}"
-                if max_results:
+                if max_results and not auto_paginate:
                     query += f" MAXRESULTS {max_results}"
+                query = parse_query(query).render()
             else:
                 raise ValueError("Either entity_type or custom_query is required")
 
-            encoded_query = urllib.parse.quote(query)
-            url = f"{api_base_url}/company/{realm_id}/query?query={encoded_query}&minorversion=65"
-            response = httpx.get(url, headers=headers, timeout=30)
+            max_staleness = tool_parameters.get("max_staleness")
+            mirror = get_mirror() if max_staleness else None
+            mirror_query = query
+            if mirror is not None and windows:
+                mirror_query = add_condition(
+                    query,
+                    Condition("TxnDate", ">=", windows[0][0].isoformat()),
+                    Condition("TxnDate", "<=", windows[-1][1].isoformat())
+                )
+
+            if tool_parameters.get("realms_json"):
+                yield from self._fan_out(
+                    tool_parameters, query, entity_type, max_results, bool(auto_paginate),
+                    fields=fields,
+                    windows=windows,
+                    mirror_query=mirror_query if mirror is not None else None
+                )
+                return
+
+            if mirror is not None:
+                local = mirror.query(client, mirror_query, float(max_staleness), unlimited=bool(auto_paginate))
+                if local is not None:
+                    yield from self._mirror_results(local, query, bool(auto_paginate), max_results, fields)
+                    return
+
+            if auto_paginate:
+                yield from self._paginate(
+                    client, query, entity_type, max_results, tool_parameters.get("parallel_pages", False),
+                    fields=fields,
+                    windows=windows
+                )
+                return
+
+            response = client.query(query)
 
             if response.status_code == 200:
                 data = response.json()
@@ -132,6 +138,8 @@ class QueryEntitiesTool(Tool):
                         result_key = key
                         results = query_response[key]
                         break
+                if fields:
+                    results = [flatten_row(row, fields) for row in results]
 
                 result = {
                     "success": True,
@@ -140,6 +148,7 @@ class QueryEntitiesTool(Tool):
                     "count": len(results),
                     "total_count": query_response.get("totalCount"),
                     "query": query,
+                    "source": "quickbooks",
                     "message": f"Query executed successfully, found {len(results)} results"
                 }
                 # Only create variable messages for scalar values, not lists
@@ -156,9 +165,236 @@ class QueryEntitiesTool(Tool):
         except httpx.HTTPError as e:
             raise Exception(f"Network error: {str(e)}") from e
 
+    def _paginate(
+        self,
+        client: QuickBooksClient,
+        query: str,
+        entity_type: str | None,
+        max_results: Any,
+        parallel: bool,
+        *,
+        fields: list[str],
+        windows: list[tuple[date, date]] | None = None
+    ) -> Generator[ToolInvokeMessage, None, None]:
+        """Stream every page of a query as its own JSON message, then a summary."""
+        limit = int(max_results) if max_results else None
+        concurrency = DEFAULT_PAGE_CONCURRENCY if parallel else 1
+        if windows:
+            page_iter = iter_sharded_pages(client, query, windows, limit=limit, concurrency=DEFAULT_PAGE_CONCURRENCY)
+        else:
+            page_iter = iter_query_pages(client, query, limit=limit, concurrency=concurrency)
+
+        count = 0
+        pages = 0
+        result_key = None
+        for page in page_iter:
+            pages += 1
+            count += len(page.rows)
+            result_key = result_key or page.entity
+            page_message = {
+                "page": pages,
+                "start_position": page.start_position,
+                "entity_type": page.entity,
+                "results": [flatten_row(row, fields) for row in page.rows] if fields else page.rows,
+                "count": len(page.rows)
+            }
+            if page.shard:
+                page_message["date_range"] = {"from": page.shard[0], "to": page.shard[1]}
+            yield self.create_json_message(page_message)
+
+        query = strip_paging(query)
+        result = {
+            "success": True,
+            "entity_type": result_key or entity_type,
+            "count": count,
+            "total_count": count,
+            "pages": pages,
+            "query": query,
+            "message": f"Query executed successfully, fetched {count} results in {pages} pages"
+        }
+        if windows:
+            result["date_windows"] = len(windows)
+            result["message"] += f" across {len(windows)} date windows"
+        for key, value in result.items():
+            yield self.create_variable_message(key, value)
+        yield self.create_json_message(result)
+
+    def _fan_out(
+        self,
+        tool_parameters: dict[str, Any],
+        query: str,
+        entity_type: str | None,
+        max_results: Any,
+        auto_paginate: bool,
+        *,
+        fields: list[str],
+        windows: list[tuple[date, date]] | None,
+        mirror_query: str | None
+    ) -> Generator[ToolInvokeMessage, None, None]:
+        """Run the query against every listed company at once and merge the rows, tagged by realm."""
+        realms = parse_realms(tool_parameters["realms_json"], self.runtime.credentials, self.session.storage)
+        limit = int(max_results) if max_results and auto_paginate else None
+        page_concurrency = DEFAULT_PAGE_CONCURRENCY if tool_parameters.get("parallel_pages") else 1
+        max_staleness = tool_parameters.get("max_staleness")
+        try:
+            realm_concurrency = int(tool_parameters.get("realm_concurrency") or DEFAULT_REALM_CONCURRENCY)
+        except (TypeError, ValueError):
+            realm_concurrency = DEFAULT_REALM_CONCURRENCY
+
+        def fetch(client: QuickBooksClient) -> tuple[str | None, list[dict[str, Any]], int | None, str]:
+            if mirror_query is not None:
+                local = self._query_mirror(client, mirror_query, float(max_staleness), auto_paginate)
+                if local is not None:
+                    rows = local.rows[:limit] if limit else local.rows
+                    return local.entity, rows, len(rows) if auto_paginate else local.total_count, "mirror"
+            if auto_paginate:
+                if windows:
+                    pages = iter_sharded_pages(client, query, windows, limit=limit, concurrency=page_concurrency)
+                else:
+                    pages = iter_query_pages(client, query, limit=limit, concurrency=page_concurrency)
+                entity = None
+                rows = []
+                for page in pages:
+                    entity = entity or page.entity
+                    rows.extend(page.rows)
+                return entity, rows, len(rows), "quickbooks"
+            response = client.query(query)
+            raise_for_error(response)
+            query_response = response.json().get("QueryResponse", {})
+            entity, rows = extract_rows(query_response)
+            return entity, rows, query_response.get("totalCount"), "quickbooks"
+
+        results = []
+        realm_summaries = []
+        result_key = None
+        for outcome in fan_out(realms, fetch, realm_concurrency):
+            realm = outcome.realm
+            summary: dict[str, Any] = {"realm_id": realm.realm_id, "name": realm.name}
+            if outcome.error:
+                realm_summaries.append({**summary, "success": False, "error": outcome.error})
+                continue
+            entity, rows, total_count, source = outcome.value
+            result_key = result_key or entity
+            if fields:
+                rows = [flatten_row(row, fields) for row in rows]
+            results.extend({"realm_id": realm.realm_id, "realm_name": realm.name, **row} for row in rows)
+            realm_summaries.append(
+                {**summary, "success": True, "count": len(rows), "total_count": total_count, "source": source}
+            )
+
+        failed = [r for r in realm_summaries if not r["success"]]
+        if len(failed) == len(realm_summaries):
+            raise Exception("Query failed for every company: " + "; ".join(
+                f"{r['name']}: {r['error']}" for r in failed
+            ))
+
+        message = f"Query executed across {len(realms)} companies, found {len(results)} results"
+        if failed:
+            message += f"; {len(failed)} of {len(realms)} companies failed"
+        result = {
+            "success": not failed,
+            "entity_type": result_key or entity_type,
+            "results": results,
+            "count": len(results),
+            "realm_count": len(realms),
+            "failed_realm_count": len(failed),
+            "realms": realm_summaries,
+            "query": strip_paging(query) if auto_paginate else query,
+            "message": message
+        }
+        # Only create variable messages for scalar values
+        for key in ("success", "entity_type", "count", "realm_count", "failed_realm_count", "query", "message"):
+            yield self.create_variable_message(key, result[key])
+        yield self.create_json_message(result)
+
+    def _query_mirror(
+        self, client: QuickBooksClient, query: str, max_staleness: float, unlimited: bool
+    ) -> MirrorResult | None:
+        """Answer one company's query from the mirror, which is keyed by realm only.
+
+        Stored tokens for other companies must prove access to their realm before any mirrored data
+        is read for them.
+        """
+        verify_access(client, self.runtime.credentials)
+        return get_mirror().query(client, query, max_staleness, unlimited=unlimited)
+
+    @staticmethod
+    def _txn_date_windows(tool_parameters: dict[str, Any]) -> list[tuple[date, date]] | None:
+        """Split the requested TxnDate range into windows, or return None when no range was given."""
+        date_from = tool_parameters.get("date_from")
+        date_to = tool_parameters.get("date_to")
+        if not date_from and not date_to:
+            return None
+        if not (date_from and date_to):
+            raise ValueError("date_from and date_to must be provided together")
+        try:
+            start = date.fromisoformat(str(date_from).strip())
+            end = date.fromisoformat(str(date_to).strip())
+        except ValueError as e:
+            raise ValueError(f"Invalid date, use YYYY-MM-DD: {e}") from e
+        return date_windows(start, end, int(tool_parameters.get("shard_days") or DEFAULT_SHARD_DAYS))
+
+    def _mirror_results(
+        self, local: MirrorResult, query: str, auto_paginate: bool, max_results: Any, fields: list[str]
+    ) -> Generator[ToolInvokeMessage, None, None]:
+        """Emit a query answered from the local mirror in the same shape as a QuickBooks response."""
+        age = max(0, int(time.time() - local.synced_at))
+        rows = local.rows
+        if auto_paginate and max_results:
+            rows = rows[:int(max_results)]
+        if fields:
+            rows = [flatten_row(row, fields) for row in rows]
+        count = len(rows)
+        total_count = local.total_count
+
+        if auto_paginate:
+            # Keep the auto-paginate contract: one message per page, then a summary without rows
+            pages = 0
+            for start in range(0, count, MAX_PAGE_SIZE):
+                pages += 1
+                page_rows = rows[start:start + MAX_PAGE_SIZE]
+                yield self.create_json_message({
+                    "page": pages,
+                    "start_position": start + 1,
+                    "entity_type": local.entity,
+                    "results": page_rows,
+                    "count": len(page_rows)
+                })
+            summary = {
+                "success": True,
+                "entity_type": local.entity,
+                "count": count,
+                "total_count": count,
+                "pages": pages,
+                "query": strip_paging(query),
+                "source": "mirror",
+                "data_age_seconds": age,
+                "message": f"Query answered from local copy ({age}s old), fetched {count} results in {pages} pages"
+            }
+            for key, value in summary.items():
+                yield self.create_variable_message(key, value)
+            yield self.create_json_message(summary)
+            return
+
+        found = count if total_count is None else total_count
+        message = f"Query answered from local copy ({age}s old), found {found} results"
+        result = {
+            "success": True,
+            "entity_type": local.entity,
+            "results": rows,
+            "count": count,
+            "total_count": total_count,
+            "query": query,
+            "source": "mirror",
+            "data_age_seconds": age,
+            "message": message
+        }
+        for key, value in result.items():
+            if key != "results":
+                yield self.create_variable_message(key, value)
+        yield self.create_json_message(result)
+
     def _handle_error(self, response: httpx.Response) -> None:
-        if response.status_code == 401:
-            raise ToolProviderCredentialValidationError("Authentication failed.")
-        error_detail = response.json() if response.content else {}
-        error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
+        raise_for_error(response)
+        error_msg = fault_message(response)
         raise Exception(f"API error {response.status_code}: {error_msg}")
@@ -0,0 +1,75 @@
+from collections.abc import Generator
+from typing import Any
+
+import httpx
+from dify_plugin import Tool
+from dify_plugin.entities.tool import ToolInvokeMessage
+
+from provider.client import QuickBooksClient
+from provider.counterparties import counterparty_resolver
+
+
+class ResolveCounterpartyTool(Tool):
+    """Tool to turn a vendor or customer name into its QuickBooks id, creating it when missing."""
+
+    def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
+        """
+        Invoke the resolve_counterparty tool.
+
+        Args:
+            tool_parameters: Dictionary containing:
+                - name: Vendor or customer display name
+                - entity_type: "vendor" or "customer" (default vendor)
+                - create_if_missing: Create the record when no match exists (default true)
+                - refresh: Reload the name index from QuickBooks first (optional)
+
+        Returns:
+            The matched or created record's id and display name
+        """
+        name = tool_parameters.get("name") or ""
+        if not name.strip():
+            raise ValueError("name is required")
+
+        entity_type = (tool_parameters.get("entity_type") or "vendor").lower()
+        if entity_type not in ("vendor", "customer"):
+            raise ValueError("entity_type must be 'vendor' or 'customer'")
+        entity = entity_type.capitalize()
+
+        create_if_missing = tool_parameters.get("create_if_missing")
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
+
+        try:
+            resolution = counterparty_resolver.resolve(
+                client,
+                entity,
+                name,
+                create=create_if_missing is None or bool(create_if_missing),
+                refresh=bool(tool_parameters.get("refresh", False))
+            )
+        except httpx.HTTPError as e:
+            raise Exception(f"Network error: {str(e)}") from e
+
+        if resolution is None:
+            message = f"No {entity_type} named '{name.strip()}' found"
+            yield self.create_variable_message("found", False)
+            yield self.create_variable_message("message", message)
+            yield self.create_json_message({"found": False, "entity_type": entity_type, "message": message})
+            return
+
+        record = resolution.record
+        result = {
+            "found": True,
+            "created": resolution.created,
+            "entity_type": entity_type,
+            "id": record.get("Id"),
+            "display_name": record.get("DisplayName"),
+            "active": record.get("Active", True),
+            "sync_token": record.get("SyncToken"),
+            "message": f"{'Created' if resolution.created else 'Found'} {entity_type} '{record.get('DisplayName')}'"
+        }
+        if not result["active"]:
+            result["message"] += " (inactive)"
+
+        for key, value in result.items():
+            yield self.create_variable_message(key, value)
+        yield self.create_json_message(result)
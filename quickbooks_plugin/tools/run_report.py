@@ -0,0 +1,101 @@
+import json
+import time
+from collections.abc import Generator
+from typing import Any
+
+import httpx
+from dify_plugin import Tool
+from dify_plugin.entities.tool import ToolInvokeMessage
+
+from provider.client import QuickBooksClient
+from provider.reports import report_cache, report_name
+
+DEFAULT_MAX_ROWS = 1000
+MAX_ROWS_LIMIT = 10000
+
+
+class RunReportTool(Tool):
+    """Tool to run QuickBooks Online reports such as ProfitAndLoss or GeneralLedger."""
+
+    def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
+        """
+        Invoke the run_report tool.
+
+        Reports are flattened into one row per line and cached per company, report and parameters
+        for a few minutes, so a dashboard re-reading the same report does not call QuickBooks again.
+
+        Args:
+            tool_parameters: Dictionary containing:
+                - report_name: Report to run, e.g. "ProfitAndLoss"
+                - start_date / end_date / date_macro: Report period (optional)
+                - accounting_method: Cash or Accrual (optional)
+                - summarize_column_by: Column grouping, e.g. "Month" (optional)
+                - columns: Comma-separated columns for detail reports (optional)
+                - options_json: Other report parameters as a JSON object (optional)
+                - include_summaries: Include section total rows (default true)
+                - max_rows: Maximum rows to return (default 1000)
+                - refresh: Bypass the cache (optional)
+
+        Returns:
+            Report header, columns and flat rows
+        """
+        name = report_name(tool_parameters.get("report_name") or "")
+
+        params: dict[str, Any] = {}
+        options_json = tool_parameters.get("options_json")
+        if options_json:
+            try:
+                options = json.loads(options_json)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid options_json format: {e}") from e
+            if not isinstance(options, dict):
+                raise ValueError('options_json must be a JSON object, e.g. {"customer": "1,2"}')
+            params.update(options)
+        for key in ["start_date", "end_date", "date_macro", "accounting_method", "summarize_column_by", "columns"]:
+            if tool_parameters.get(key):
+                params[key] = tool_parameters[key]
+
+        include_summaries = tool_parameters.get("include_summaries")
+        include_summaries = include_summaries is None or bool(include_summaries)
+        max_rows = int(tool_parameters.get("max_rows") or DEFAULT_MAX_ROWS)
+        if not 1 <= max_rows <= MAX_ROWS_LIMIT:
+            raise ValueError(f"max_rows must be between 1 and {MAX_ROWS_LIMIT}")
+
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
+
+        try:
+            report, cached = report_cache.get(client, name, params, refresh=bool(tool_parameters.get("refresh")))
+        except httpx.HTTPError as e:
+            raise Exception(f"Network error: {str(e)}") from e
+
+        rows = report.rows if include_summaries else [row for row in report.rows if row["row_type"] != "Summary"]
+        truncated = len(rows) > max_rows
+        rows = rows[:max_rows]
+        data_age = int(time.time() - report.fetched_at)
+
+        header = report.header
+        message = f"{name}: {len(rows)} rows"
+        if truncated:
+            message += f" (truncated to max_rows={max_rows}; narrow the period or raise max_rows)"
+        if cached:
+            message += f", from a report fetched {data_age}s ago"
+
+        result = {
+            "report_name": name,
+            "start_period": header.get("StartPeriod"),
+            "end_period": header.get("EndPeriod"),
+            "report_basis": header.get("ReportBasis"),
+            "currency": header.get("Currency"),
+            "generated_at": header.get("Time"),
+            "columns": [{"key": c.key, "title": c.title, "type": c.col_type} for c in report.columns],
+            "rows": rows,
+            "row_count": len(rows),
+            "truncated": truncated,
+            "cached": cached,
+            "data_age_seconds": data_age,
+            "message": message
+        }
+        # Only create variable messages for scalar values
+        for key in ["report_name", "start_period", "end_period", "row_count", "truncated", "cached", "message"]:
+            yield self.create_variable_message(key, result[key])
+        yield self.create_json_message(result)
@@ -1,5 +1,4 @@
 import json
-import urllib.parse
 from collections.abc import Generator
 from typing import Any
 
@@ -7,27 +6,15 @@ import httpx
 
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
-from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.client import QuickBooksClient, fault_message, raise_for_error
+from provider.reference_data import resolve_item_ref, resolve_ref
 
 
 class SalesReceiptManagementTool(Tool):
     """Tool to manage sales receipts in QuickBooks."""
 
     def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
-        access_token = self.runtime.credentials.get("access_token")
-        realm_id = self.runtime.credentials.get("realm_id")
-
-        if not access_token or not realm_id:
-            raise ToolProviderCredentialValidationError("QuickBooks credentials required.")
-
-        environment = self.runtime.credentials.get("environment", "sandbox")
-        api_base_url = f"https://{'sandbox-' if environment == 'sandbox' else ''}quickbooks.api.intuit.com/v3"
-
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
 
         operation = tool_parameters.get("operation")
         if not operation:
@@ -35,19 +22,19 @@ class SalesReceiptManagementTool(Tool):
 
         try:
             if operation == "create":
-                yield from self._create(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._create(client, tool_parameters)
             elif operation == "read":
-                yield from self._read(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._read(client, tool_parameters)
             elif operation == "delete":
-                yield from self._delete(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._delete(client, tool_parameters)
             elif operation == "query":
-                yield from self._query(api_base_url, realm_id, headers, tool_parameters)
+                yield from self._query(client, tool_parameters)
             else:
                 raise ValueError(f"Unknown operation: {operation}")
         except httpx.HTTPError as e:
             raise Exception(f"Network error: {str(e)}") from e
 
-    def _create(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _create(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         lines_json = params.get("lines_json")
         if not lines_json:
             raise ValueError("lines_json is required for create")
@@ -63,7 +50,7 @@ class SalesReceiptManagementTool(Tool):
                 "DetailType": "SalesItemLineDetail",
                 "Amount": line.get("Amount"),
                 "SalesItemLineDetail": {
-                    "ItemRef": line.get("ItemRef"),
+                    "ItemRef": resolve_item_ref(client, line),
                     "Qty": line.get("Qty", 1),
                     "UnitPrice": line.get("UnitPrice")
                 }
@@ -76,14 +63,13 @@ class SalesReceiptManagementTool(Tool):
         if params.get("deposit_to_account_id"):
             payload["DepositToAccountRef"] = {"value": params["deposit_to_account_id"]}
         if params.get("payment_method_id"):
-            payload["PaymentMethodRef"] = {"value": params["payment_method_id"]}
+            payload["PaymentMethodRef"] = resolve_ref(client, "PaymentMethod", params["payment_method_id"])
         if params.get("txn_date"):
             payload["TxnDate"] = params["txn_date"]
         if params.get("private_note"):
             payload["PrivateNote"] = params["private_note"]
 
-        url = f"{api_base_url}/company/{realm_id}/salesreceipt?minorversion=65"
-        response = httpx.post(url, headers=headers, json=payload, timeout=30)
+        response = client.post("salesreceipt", json=payload)
 
         if response.status_code == 200:
             data = response.json()
@@ -99,13 +85,12 @@ class SalesReceiptManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _read(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _read(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         sr_id = params.get("sales_receipt_id")
         if not sr_id:
             raise ValueError("sales_receipt_id is required for read")
 
-        url = f"{api_base_url}/company/{realm_id}/salesreceipt/{sr_id}?minorversion=65"
-        response = httpx.get(url, headers=headers, timeout=30)
+        response = client.get(f"salesreceipt/{sr_id}")
 
         if response.status_code == 200:
             data = response.json()
@@ -121,7 +106,7 @@ class SalesReceiptManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _delete(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _delete(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         sr_id = params.get("sales_receipt_id")
         sync_token = params.get("sync_token")
 
@@ -129,8 +114,7 @@ class SalesReceiptManagementTool(Tool):
             raise ValueError("sales_receipt_id and sync_token are required for delete")
 
         payload = {"Id": sr_id, "SyncToken": sync_token}
-        url = f"{api_base_url}/company/{realm_id}/salesreceipt?operation=delete&minorversion=65"
-        response = httpx.post(url, headers=headers, json=payload, timeout=30)
+        response = client.post("salesreceipt", params={"operation": "delete"}, json=payload)
 
         if response.status_code == 200:
             result = {
@@ -144,15 +128,13 @@ class SalesReceiptManagementTool(Tool):
         else:
             self._handle_error(response)
 
-    def _query(self, api_base_url: str, realm_id: str, headers: dict, params: dict) -> Generator[ToolInvokeMessage, None, None]:
+    def _query(self, client: QuickBooksClient, params: dict) -> Generator[ToolInvokeMessage, None, None]:
         query_string = params.get("query_string", "")
         query = "SELECT * FROM SalesReceipt"
         if query_string:
             query += f" WHERE {query_string}"
 
-        encoded_query = urllib.parse.quote(query)
-        url = f"{api_base_url}/company/{realm_id}/query?query={encoded_query}&minorversion=65"
-        response = httpx.get(url, headers=headers, timeout=30)
+        response = client.query(query)
 
         if response.status_code == 200:
             data = response.json()
@@ -187,8 +169,6 @@ class SalesReceiptManagementTool(Tool):
         }
 
     def _handle_error(self, response: httpx.Response) -> None:
-        if response.status_code == 401:
-            raise ToolProviderCredentialValidationError("Authentication failed.")
-        error_detail = response.json() if response.content else {}
-        error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
+        raise_for_error(response)
+        error_msg = fault_message(response)
         raise Exception(f"API error {response.status_code}: {error_msg}")
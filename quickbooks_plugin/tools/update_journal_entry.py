@@ -7,63 +7,46 @@ import httpx
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
 from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.client import QuickBooksClient, error_message
+from provider.sync_tokens import update_entity
 
 
 class UpdateJournalEntryTool(Tool):
     """Tool to update journal entries in QuickBooks."""
 
     def _invoke(self, tool_parameters: dict[str, Any]) -> Generator[ToolInvokeMessage, None, None]:
-        access_token = self.runtime.credentials.get("access_token")
-        realm_id = self.runtime.credentials.get("realm_id")
-
-        if not access_token or not realm_id:
-            raise ToolProviderCredentialValidationError("QuickBooks credentials required.")
-
-        environment = self.runtime.credentials.get("environment", "sandbox")
-        api_base_url = f"https://{'sandbox-' if environment == 'sandbox' else ''}quickbooks.api.intuit.com/v3"
-
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
 
         je_id = tool_parameters.get("journal_entry_id")
-        sync_token = tool_parameters.get("sync_token")
         lines_json = tool_parameters.get("lines_json")
 
         if not je_id:
             raise ValueError("journal_entry_id is required")
-        if not sync_token:
-            raise ValueError("sync_token is required. Get it from reading the journal entry first.")
-        if not lines_json:
-            raise ValueError("lines_json is required")
 
-        try:
-            lines_data = json.loads(lines_json)
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Invalid lines_json format: {e}")
-
-        # Format lines for QuickBooks API
-        formatted_lines = []
-        for line in lines_data:
-            formatted_line = {
-                "DetailType": "JournalEntryLineDetail",
-                "Amount": line.get("Amount"),
-                "JournalEntryLineDetail": {
-                    "PostingType": line.get("PostingType"),
-                    "AccountRef": line.get("AccountRef")
+        # Sparse update: only the given fields change, the rest of the entry is kept
+        payload: dict[str, Any] = {}
+
+        if lines_json:
+            try:
+                lines_data = json.loads(lines_json)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid lines_json format: {e}")
+
+            # Format lines for QuickBooks API; the given lines replace all existing lines
+            formatted_lines = []
+            for line in lines_data:
+                formatted_line = {
+                    "DetailType": "JournalEntryLineDetail",
+                    "Amount": line.get("Amount"),
+                    "JournalEntryLineDetail": {
+                        "PostingType": line.get("PostingType"),
+                        "AccountRef": line.get("AccountRef")
+                    }
                 }
-            }
-            if line.get("Description"):
-                formatted_line["Description"] = line["Description"]
-            formatted_lines.append(formatted_line)
-
-        payload: dict[str, Any] = {
-            "Id": je_id,
-            "SyncToken": sync_token,
-            "Line": formatted_lines
-        }
+                if line.get("Description"):
+                    formatted_line["Description"] = line["Description"]
+                formatted_lines.append(formatted_line)
+            payload["Line"] = formatted_lines
 
         if tool_parameters.get("txn_date"):
             payload["TxnDate"] = tool_parameters["txn_date"]
@@ -72,9 +55,13 @@ class UpdateJournalEntryTool(Tool):
         if tool_parameters.get("private_note"):
             payload["PrivateNote"] = tool_parameters["private_note"]
 
+        if not payload:
+            raise ValueError("Nothing to update: provide lines_json, txn_date, doc_number or private_note")
+
         try:
-            url = f"{api_base_url}/company/{realm_id}/journalentry?minorversion=65"
-            response = httpx.post(url, headers=headers, json=payload, timeout=30)
+            response = update_entity(
+                client, "JournalEntry", je_id, payload, sync_token=tool_parameters.get("sync_token")
+            )
 
             if response.status_code == 200:
                 data = response.json()
@@ -94,9 +81,7 @@ class UpdateJournalEntryTool(Tool):
             elif response.status_code == 401:
                 raise ToolProviderCredentialValidationError("Authentication failed. Please check your QuickBooks credentials.")
             else:
-                error_detail = response.json() if response.content else {}
-                error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
-                raise Exception(f"Failed to update journal entry: {response.status_code} - {error_msg}")
+                raise Exception(f"Failed to update journal entry: {error_message(response)}")
 
         except httpx.HTTPError as e:
             raise Exception(f"Network error: {str(e)}") from e
@@ -1,4 +1,3 @@
-import urllib.parse
 from collections.abc import Generator
 from typing import Any
 
@@ -7,6 +6,7 @@ import httpx
 from dify_plugin import Tool
 from dify_plugin.entities.tool import ToolInvokeMessage
 from dify_plugin.errors.tool import ToolProviderCredentialValidationError
+from provider.client import QuickBooksClient, error_message, fault_message
 
 
 class VendorManagementTool(Tool):
@@ -32,39 +32,15 @@ class VendorManagementTool(Tool):
         if action not in ["search", "create"]:
             raise ValueError("action must be 'search' or 'create'")
 
-        # Get credentials
-        access_token = self.runtime.credentials.get("access_token")
-        realm_id = self.runtime.credentials.get("realm_id")
-
-        if not access_token or not realm_id:
-            raise ToolProviderCredentialValidationError("QuickBooks API Access Token and Realm ID are required.")
-
-        # Get API base URL
-        environment = self.runtime.credentials.get("environment", "sandbox")
-        if environment == "sandbox":
-            api_base_url = "https://sandbox-quickbooks.api.intuit.com/v3"
-        else:
-            api_base_url = "https://quickbooks.api.intuit.com/v3"
-
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
+        client = QuickBooksClient.from_credentials(self.runtime.credentials)
 
         try:
             if action == "search":
                 # Search for vendors by name
                 name_escaped = name.replace("'", "''")
                 query = f"select * from Vendor where DisplayName like '%{name_escaped}%'"
-                encoded_query = urllib.parse.quote(query)
-                url = f"{api_base_url}/company/{realm_id}/query?query={encoded_query}&minorversion=65"
 
-                response = httpx.get(
-                    url,
-                    headers=headers,
-                    timeout=30
-                )
+                response = client.query(query)
 
                 if response.status_code == 200:
                     data = response.json()
@@ -96,8 +72,7 @@ class VendorManagementTool(Tool):
                     yield self.create_json_message(result)
 
                 elif response.status_code == 400:
-                    error_detail = response.json() if response.content else {}
-                    error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
+                    error_msg = fault_message(response)
                     raise ValueError(f"Invalid request: {error_msg}")
 
                 elif response.status_code == 401:
@@ -106,26 +81,16 @@ class VendorManagementTool(Tool):
                     )
 
                 else:
-                    error_detail = response.json() if response.content else {}
-                    error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
-                    raise Exception(
-                        f"Failed to search vendors: {response.status_code} - {error_msg}"
-                    )
+                    raise Exception(f"Failed to search vendors: {error_message(response)}")
 
             elif action == "create":
                 # Create a new vendor
-                url = f"{api_base_url}/company/{realm_id}/vendor?minorversion=65"
                 payload = {
                     "DisplayName": name,
                     "CompanyName": name
                 }
 
-                response = httpx.post(
-                    url,
-                    headers=headers,
-                    json=payload,
-                    timeout=30
-                )
+                response = client.post("vendor", json=payload)
 
                 if response.status_code == 200:
                     data = response.json()
@@ -146,8 +111,7 @@ class VendorManagementTool(Tool):
                     yield self.create_json_message(result)
 
                 elif response.status_code == 400:
-                    error_detail = response.json() if response.content else {}
-                    error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
+                    error_msg = fault_message(response)
                     raise ValueError(f"Invalid request: {error_msg}")
 
                 elif response.status_code == 401:
@@ -156,11 +120,7 @@ class VendorManagementTool(Tool):
                     )
 
                 else:
-                    error_detail = response.json() if response.content else {}
-                    error_msg = error_detail.get("Fault", {}).get("Error", [{}])[0].get("Message", response.text)
-                    raise Exception(
-                        f"Failed to create vendor: {response.status_code} - {error_msg}"
-                    )
+                    raise Exception(f"Failed to create vendor: {error_message(response)}")
 
         except httpx.HTTPError as e:
             raise Exception(f"Network error while managing vendors: {str(e)}") from e
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Webhook Journal Replay - Re-dispatch Journaled Mercury Deliveries
+
+Reads the append-only journal written by mercury_trigger_plugin when
+MERCURY_WEBHOOK_JOURNAL_DIR is set, merging the plugin workers' segments
+in receive order, and re-posts every delivery received in a time range to
+a webhook endpoint. Replayed deliveries are not journaled again.
+
+Each replayed body is re-signed with the webhook secret and a fresh
+timestamp, so the trigger's signature and replay-window checks accept it
+and the event flows through the normal workflow path.
+
+Usage:
+    # List what would be replayed
+    python scripts/replay_webhook_journal.py --journal-dir /data/journal \\
+        --start 2026-01-15T00:00:00Z --end 2026-01-15T06:00:00Z --dry-run
+
+    # Replay at 10x the original pace
+    WEBHOOK_SECRET="whsec" python scripts/replay_webhook_journal.py \\
+        --journal-dir /data/journal --endpoint https://dify.example.com/triggers/xxx \\
+        --start 2026-01-15T00:00:00Z --speed 10
+
+    # Replay as fast as possible, only deliveries for one Mercury webhook
+    python scripts/replay_webhook_journal.py --journal-dir /data/journal \\
+        --endpoint http://localhost:8766/webhook --webhook-id wh_123 --speed 0
+
+Environment Variables:
+    WEBHOOK_SECRET  - Secret used to re-sign bodies (optional; without it the
+                      original Mercury-Signature header is forwarded as-is)
+"""
+
+import argparse
+import hashlib
+import hmac
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Optional
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mercury_trigger_plugin"))
+
+from provider.journal import REPLAY_HEADER, JournalRecord, iter_records  # noqa: E402
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """Parse an ISO 8601 timestamp into epoch seconds."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def build_headers(record: JournalRecord, secret: str) -> dict:
+    """Headers for the replayed request, re-signed when a secret is available."""
+    # Marked so the trigger does not journal the delivery a second time
+    headers = {"Content-Type": record.headers.get("Content-Type", "application/json"), REPLAY_HEADER: "1"}
+    if secret:
+        timestamp = int(time.time())
+        signed_payload = f"{timestamp}.{record.body.decode()}"
+        signature = hmac.new(secret.encode(), signed_payload.encode(), hashlib.sha256).hexdigest()
+        headers["Mercury-Signature"] = f"t={timestamp},v1={signature}"
+    elif record.headers.get("Mercury-Signature"):
+        headers["Mercury-Signature"] = record.headers["Mercury-Signature"]
+    return headers
+
+
+def replay(args: argparse.Namespace) -> int:
+    secret = args.secret or os.environ.get("WEBHOOK_SECRET", "")
+    start = parse_time(args.start)
+    end = parse_time(args.end)
+
+    sent = failed = 0
+    previous_received_at: Optional[float] = None
+    session = requests.Session()
+
+    for record in iter_records(args.journal_dir, start=start, end=end):
+        if args.webhook_id and record.webhook_id != args.webhook_id:
+            continue
+
+        # Preserve the original spacing between deliveries, scaled by --speed
+        if args.speed > 0 and previous_received_at is not None:
+            delay = (record.received_at - previous_received_at) / args.speed
+            if delay > 0:
+                time.sleep(delay)
+        previous_received_at = record.received_at
+
+        received = datetime.fromtimestamp(record.received_at).isoformat(timespec="seconds")
+        if args.dry_run:
+            print(f"[{received}] webhook={record.webhook_id or '-'} bytes={len(record.body)}")
+            sent += 1
+            continue
+
+        try:
+            resp = session.post(args.endpoint, data=record.body, headers=build_headers(record, secret), timeout=15)
+        except requests.exceptions.RequestException as e:
+            print(f"[{received}] FAIL: {e}")
+            failed += 1
+            continue
+
+        if resp.status_code >= 400:
+            print(f"[{received}] FAIL: HTTP {resp.status_code} {resp.text[:200]}")
+            failed += 1
+        else:
+            sent += 1
+            if args.verbose:
+                print(f"[{received}] OK: HTTP {resp.status_code}")
+
+    print(f"\nReplayed {sent} deliveries, {failed} failed")
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay journaled Mercury webhook deliveries")
+    parser.add_argument("--journal-dir", default=os.environ.get("MERCURY_WEBHOOK_JOURNAL_DIR"),
+                        help="Journal directory (default: $MERCURY_WEBHOOK_JOURNAL_DIR)")
+    parser.add_argument("--endpoint", help="Webhook URL to re-dispatch to (required unless --dry-run)")
+    parser.add_argument("--start", help="Replay deliveries received at or after this ISO 8601 time")
+    parser.add_argument("--end", help="Replay deliveries received before this ISO 8601 time")
+    parser.add_argument("--webhook-id", help="Only replay deliveries for this Mercury webhook id")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Pace multiplier: 1 = original timing, 10 = ten times faster, 0 = no delay")
+    parser.add_argument("--secret", help="Webhook secret for re-signing (default: $WEBHOOK_SECRET)")
+    parser.add_argument("--dry-run", action="store_true", help="List matching deliveries without sending")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print every successful delivery")
+    args = parser.parse_args()
+
+    if not args.journal_dir:
+        parser.error("--journal-dir is required")
+    if not args.dry_run and not args.endpoint:
+        parser.error("--endpoint is required unless --dry-run is set")
+    if args.speed < 0:
+        parser.error("--speed must be >= 0")
+
+    sys.exit(replay(args))
+
+
+if __name__ == "__main__":
+    main()